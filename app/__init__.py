@@ -53,7 +53,7 @@ def create_app(config_name='development'):
             raise ValueError("SECRET_KEY must be set for production environments.")
     
     # 配置静态文件
-    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # 禁用静态文件缓存
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # 静态文件每次用ETag重新验证，上传图片通过media_url使用带内容哈希的长期缓存地址
     app.static_folder = 'static'  # 设置静态文件夹
     app.static_url_path = '/static'  # 设置静态文件URL前缀
     
@@ -105,6 +105,18 @@ def create_app(config_name='development'):
             app.logger.error(f"格式化数字出错 (field: {field_name}, value: {value}): {str(e)}")
             return value # 出错时返回原值
             
+    @app.template_global('media_url')
+    def media_url_global(image, token_symbol=None):
+        """上传图片的带内容哈希地址"""
+        from .utils.upload_index import upload_index
+        return upload_index.media_url(image, token_symbol)
+
+    @app.template_global('image_srcset')
+    def image_srcset_global(image, token_symbol=None, fmt=None):
+        """上传图片衍生图的srcset，fmt='webp'时输出WebP版本"""
+        from .utils.image_derivatives import image_derivatives
+        return image_derivatives.srcset(image, token_symbol, fmt)
+
     @app.template_filter('from_json')
     def from_json_filter(value):
         try:
@@ -184,18 +196,54 @@ def create_app(config_name='development'):
         app.logger.error("存储初始化失败，应用可能无法正常工作")
         raise RuntimeError("存储初始化失败")
     
+    # 建立上传文件位置索引
+    from .utils.upload_index import upload_index
+    upload_index.init_app(app)
+    from .utils.image_derivatives import image_derivatives
+    image_derivatives.init_app(app)
+    
     # 初始化IP访问追踪中间件
     from app.middleware.ip_tracker import ip_tracker
     ip_tracker.init_app(app)
     app.logger.info("IP访问追踪中间件已初始化")
     
+    # 初始化管理员审计日志异步写入
+    from app.services.audit_log_writer import audit_log_writer
+    audit_log_writer.init_app(app)
+    
+    # 初始化短链接缓存与点击计数
+    from app.services.short_link_service import short_link_service
+    short_link_service.init_app(app)
+    from app.services.short_code_allocator import short_code_allocator
+    short_code_allocator.init_app(app)
+    
     # 注册蓝图
     from app.routes import register_blueprints
     register_blueprints(app)
     
+    # 注册仪表板计数器的flush钩子
+    from app.services.dashboard_stats_service import DashboardStatsService
+    DashboardStatsService.register_hooks()
+    
+    # 注册资产详情页片段缓存的失效钩子
+    from app.services.asset_detail_cache import register_hooks as register_asset_detail_hooks
+    register_asset_detail_hooks()
+    
+    # 注册公开接口响应缓存的失效钩子
+    from app.services.response_cache import register_hooks as register_response_cache_hooks
+    register_response_cache_hooks()
+    
     # 注册初始化分销佣金设置命令
     app.cli.add_command(init_distribution_command)
     
+    # 注册链上持有人索引命令
+    from app.commands.holder_index import init_holder_index_commands
+    init_holder_index_commands(app)
+    
+    # 注册上传图片衍生图命令
+    from app.commands.image_derivatives import init_image_commands
+    init_image_commands(app)
+    
     # 初始化后台任务处理系统
     with app.app_context():
         try:
@@ -209,21 +257,32 @@ def create_app(config_name='development'):
                     # 直接导入并调用监控函数，而不是通过start_scheduled_tasks
                     from app.extensions import scheduler
                     from app.tasks import auto_monitor_pending_payments
+                    from app.services.scheduler_leader import get_leader_elector, leader_only
                     
-                    # 立即执行一次监控
-                    app.logger.info("立即触发资产上链状态检查...")
-                    auto_monitor_pending_payments()
+                    # 多个worker各自持有调度器，只有当选主节点的进程执行定时任务
+                    from app.services.adaptive_polling import register_adaptive_job
+                    
+                    get_leader_elector(app=app).start()
+                    # 有积压时缩短间隔，空闲时退避到较长间隔
+                    monitor_job = register_adaptive_job(
+                        scheduler, 'monitor_payments',
+                        leader_only('monitor_payments', auto_monitor_pending_payments)
+                    )
                     
                     # 添加定时任务
                     if not scheduler.get_job('monitor_payments'):
                         scheduler.add_job(
                             id='monitor_payments',
-                            func=auto_monitor_pending_payments,
+                            func=monitor_job,
                             trigger='interval',
-                            minutes=5,
+                            seconds=monitor_job.current_seconds,
                             replace_existing=True
                         )
-                        app.logger.info("定时任务已添加到调度器: 每5分钟执行一次")
+                        app.logger.info("定时任务已添加到调度器: 默认每5分钟执行一次，按积压情况自适应调整")
+                    
+                    # 立即执行一次监控（执行后按结果调整间隔）
+                    app.logger.info("立即触发资产上链状态检查...")
+                    monitor_job()
                     
                     # 设置标志，防止重复初始化
                     app._tasks_initialized = True
@@ -544,74 +544,49 @@ class AssetService:
             
             # 获取代理配置
             proxy_config = get_proxy_config()
+            proxy = (proxy_config.get('https') or proxy_config.get('http')) if proxy_config else None
             
-            for rpc_url in rpc_urls:
-                try:
-                    logger.info(f"尝试RPC节点: {rpc_url}")
-                    
-                    # 1. 首先获取代币账户
-                    token_accounts_payload = {
-                        "jsonrpc": "2.0",
-                        "id": 1,
-                        "method": "getTokenAccountsByOwner",
-                        "params": [
-                            wallet_address,
-                            {
-                                "mint": token_mint_address
-                            },
-                            {
-                                "encoding": "jsonParsed"
-                            }
-                        ]
-                    }
-                    
-                    # 构建请求参数
-                    request_kwargs = {
-                        'headers': {'Content-Type': 'application/json'},
-                        'json': token_accounts_payload,
-                        'timeout': 10
-                    }
-                    
-                    # 如果有代理配置，添加到请求中
-                    if proxy_config:
-                        request_kwargs['proxies'] = proxy_config
-                    
-                    response = requests.post(rpc_url, **request_kwargs)
-                    
-                    if not response.ok:
-                        logger.warning(f"RPC请求失败: {response.status_code}")
-                        continue
-                        
-                    data = response.json()
-                    
-                    if 'error' in data:
-                        logger.warning(f"RPC返回错误: {data['error']}")
-                        continue
-                        
-                    token_accounts = data.get('result', {}).get('value', [])
-                    logger.info(f"找到 {len(token_accounts)} 个代币账户")
-                    
-                    total_balance = 0.0
-                    
-                    for account in token_accounts:
-                        account_data = account.get('account', {}).get('data', {}).get('parsed', {}).get('info', {})
-                        token_amount = account_data.get('tokenAmount', {})
-                        
-                        if token_amount:
-                            ui_amount = float(token_amount.get('uiAmount', 0))
-                            total_balance += ui_amount
-                            logger.info(f"账户余额: {ui_amount} USDC")
-                    
-                    logger.info(f"钱包 {wallet_address} 总USDC余额: {total_balance}")
-                    return total_balance
+            from app.utils.solana_compat.rpc.async_api import AsyncClient, hedge_sync
+            from app.services.token_account_cache import get_token_account_cache, rpc_context_slot
+            
+            def _query(rpc_url):
+                return lambda: AsyncClient(rpc_url, timeout=10, proxy=proxy).get_token_accounts_by_owner(
+                    wallet_address, token_mint_address)
+            
+            def _load():
+                # 先查询主节点，失败或响应过慢时才依次追加备用节点，采用最先成功返回的结果
+                data = hedge_sync([_query(rpc_url) for rpc_url in rpc_urls], timeout=12)
+                
+                if data is None:
+                    # 所有RPC节点都失败了
+                    logger.error("所有RPC节点查询失败")
+                    return None
+                
+                token_accounts = data.get('result', {}).get('value', [])
+                logger.info(f"找到 {len(token_accounts)} 个代币账户")
+                
+                total_balance = 0.0
+                
+                for account in token_accounts:
+                    account_data = account.get('account', {}).get('data', {}).get('parsed', {}).get('info', {})
+                    token_amount = account_data.get('tokenAmount', {})
                     
-                except Exception as rpc_err:
-                    logger.warning(f"RPC节点 {rpc_url} 查询失败: {str(rpc_err)}")
-                    continue
+                    if token_amount:
+                        ui_amount = float(token_amount.get('uiAmount') or 0)
+                        total_balance += ui_amount
+                        logger.info(f"账户余额: {ui_amount} USDC")
+                
+                return total_balance, rpc_context_slot(data.get('result'))
             
-            # 所有RPC节点都失败了
-            logger.error("所有RPC节点查询失败")
-            return 0.0
+            # 重复查看钱包时使用缓存，平台交易确认后失效
+            total_balance = get_token_account_cache().get_or_load(
+                'token_balance', wallet_address, token_mint_address, _load
+            )
+            if total_balance is None:
+                return 0.0
+            
+            logger.info(f"钱包 {wallet_address} 总USDC余额: {total_balance}")
+            return total_balance
             
         except Exception as e:
             logger.error(f"获取代币余额过程中发生错误: {str(e)}")
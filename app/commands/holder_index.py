@@ -0,0 +1,50 @@
+"""
+链上代币持有人索引命令
+"""
+import click
+from flask.cli import with_appcontext
+
+
+@click.group('holder-index')
+def holder_index():
+    """链上代币持有人索引命令组"""
+    pass
+
+
+def _indexer(fixture):
+    from app.services.token_holder_indexer import TokenHolderIndexer
+
+    if fixture:
+        from app.utils.solana_rpc_fixture import SolanaRpcFixture
+        return TokenHolderIndexer(rpc_call=SolanaRpcFixture(fixture).rpc_call)
+    return TokenHolderIndexer()
+
+
+@holder_index.command('snapshot')
+@click.argument('mint')
+@click.option('--fixture', default=None, help='从本地JSON fixture回放，而不是请求RPC节点')
+@with_appcontext
+def snapshot(mint, fixture):
+    """对指定mint做一次全量快照"""
+    result = _indexer(fixture).snapshot(mint)
+    click.echo(f"快照完成: slot={result['slot']}, 代币账户={result['accounts']}, 持有人={result['holder_count']}")
+
+
+@holder_index.command('sync')
+@click.argument('mint', required=False)
+@click.option('--fixture', default=None, help='从本地JSON fixture回放，而不是请求RPC节点')
+@with_appcontext
+def sync(mint, fixture):
+    """增量同步指定mint（不指定时同步全部已发行代币的资产）"""
+    indexer = _indexer(fixture)
+    if mint:
+        result = indexer.sync(mint)
+        click.echo(f"{mint}: 处理 {result['processed']} 笔交易，剩余 {result['pending']} 笔")
+    else:
+        result = indexer.sync_all()
+        click.echo(f"同步完成，剩余积压 {result['pending_signatures']} 笔交易")
+
+
+def init_holder_index_commands(app):
+    """注册持有人索引命令"""
+    app.cli.add_command(holder_index)
@@ -0,0 +1,33 @@
+"""
+上传图片衍生图命令
+"""
+import click
+from flask.cli import with_appcontext
+
+
+@click.group('images')
+def images():
+    """上传图片衍生图命令组"""
+    pass
+
+
+@images.command('backfill')
+@click.option('--force', is_flag=True, help='清单已是最新时也重新生成')
+@click.option('--workers', default=None, type=int, help='进程池大小（默认使用IMAGE_DERIVATIVE_WORKERS）')
+@with_appcontext
+def backfill(force, workers):
+    """为已有上传图片生成缩略图和WebP版本"""
+    from app.utils.image_derivatives import image_derivatives
+
+    if workers:
+        image_derivatives.shutdown()
+        image_derivatives.max_workers = workers
+    image_derivatives.enabled = True
+    result = image_derivatives.backfill(force=force)
+    image_derivatives.shutdown()
+    click.echo(f"衍生图生成完成: 处理 {result['scheduled']} 张，失败 {result['failed']} 张")
+
+
+def init_image_commands(app):
+    """注册图片命令"""
+    app.cli.add_command(images)
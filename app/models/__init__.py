@@ -8,8 +8,8 @@ from .user import User, UserRole, UserStatus
 from .asset import Asset, AssetType, AssetStatus, AssetStatusHistory
 from .trade import Trade, TradeStatus, TradeType
 from .income import PlatformIncome, IncomeType
-from .dividend import Dividend, DividendRecord
-from .shortlink import ShortLink
+from .dividend import Dividend, DividendRecord, DividendDistribution, DividendClaimableBalance
+from .shortlink import ShortLink, ShortLinkClick, ShortCodeSequence
 from .transaction import Transaction, TransactionType, TransactionStatus
 from .holding import Holding
 
@@ -17,7 +17,7 @@ from .holding import Holding
 from .admin import (
     AdminUser, SystemConfig, CommissionSetting, 
     DistributionLevel, UserReferral, AdminOperationLog,
-    DashboardStats, OnchainHistory, OnchainStatus
+    DashboardStats, DashboardCounter, OnchainHistory, OnchainStatus
 )
 
 # 导入新的分销模型
@@ -36,13 +36,21 @@ from .ip_visit import IPVisit
 # 导入新的模型
 from .share_message import ShareMessage
 
+# 链上代币持有人索引
+from .token_holder import TokenHolderAccount, TokenHolderIndexState, TokenActivity
+
+# 趋势指标时间序列
+from .metric_series import MetricBucket, MetricRollupState
+
 # 导出所有模型
 __all__ = [
     'db', 'Asset', 'AssetType', 'AssetStatus', 'AssetStatusHistory', 'DividendRecord', 'Dividend', 
+    'DividendDistribution', 'DividendClaimableBalance',
     'Trade', 'TradeType', 'TradeStatus', 'User', 'UserRole', 'UserStatus', 
     'Commission', 'AdminUser', 'SystemConfig', 'CommissionSetting',
     'DistributionLevel', 'UserReferral', 'CommissionRecord', 'AdminOperationLog',
-    'DashboardStats', 'OnchainHistory', 'OnchainStatus', 'ShortLink', 'Transaction', 'TransactionType', 'TransactionStatus',
+    'DashboardStats', 'DashboardCounter', 'OnchainHistory', 'OnchainStatus', 'ShortLink', 'ShortLinkClick', 'ShortCodeSequence', 'Transaction', 'TransactionType', 'TransactionStatus',
     'Holding', 'CommissionConfig', 'UserCommissionBalance', 'CommissionWithdrawal', 'IPVisit',
-    'ShareMessage'
+    'ShareMessage', 'TokenHolderAccount', 'TokenHolderIndexState', 'TokenActivity',
+    'MetricBucket', 'MetricRollupState'
 ]
@@ -259,65 +259,27 @@ class DashboardStats(db.Model):
     
     @classmethod
     def update_daily_stats(cls):
-        """更新每日统计数据"""
-        today = datetime.utcnow().date()
-        
-        # 用户统计
-        user_count = User.query.count()
-        cls._update_stat('user_count', 'daily', today, user_count)
-        
-        # 资产统计 - 只统计未删除的资产
-        asset_count = Asset.query.filter(Asset.deleted_at.is_(None)).count()
-        cls._update_stat('asset_count', 'daily', today, asset_count)
-        
-        # 交易统计
-        trade_count = Trade.query.count()
-        cls._update_stat('trade_count', 'daily', today, trade_count)
-        
-        # 交易金额统计
-        trade_volume = db.session.query(func.sum(Trade.amount)).scalar() or 0
-        cls._update_stat('trade_volume', 'daily', today, trade_volume)
-        
-        # 今日新增用户
-        today_users = User.query.filter(
-            func.date(User.created_at) == today
-        ).count()
-        cls._update_stat('new_users_today', 'daily', today, today_users)
-        
-        # 今日新增资产 - 只统计未删除的资产
-        today_assets = Asset.query.filter(
-            func.date(Asset.created_at) == today,
-            Asset.deleted_at.is_(None)
-        ).count()
-        cls._update_stat('new_assets_today', 'daily', today, today_assets)
-        
-        # 今日交易
-        today_trades = Trade.query.filter(
-            func.date(Trade.created_at) == today
-        ).count()
-        cls._update_stat('trades_today', 'daily', today, today_trades)
-        
-        # 今日交易金额
-        today_volume = db.session.query(func.sum(Trade.amount)).filter(
-            func.date(Trade.created_at) == today
-        ).scalar() or 0
-        cls._update_stat('volume_today', 'daily', today, today_volume)
+        """更新每日统计数据（取自增量计数器，不再全表统计）"""
+        from app.services.dashboard_stats_service import DashboardStatsService
         
+        DashboardStatsService.snapshot()
         db.session.commit()
     
     @classmethod
     def update_stats_from_db(cls):
-        """从数据库更新统计数据"""
+        """从统计计数器更新统计数据"""
         try:
-            # 获取当前统计数据 - 只统计未删除的资产
+            from app.services.dashboard_stats_service import DashboardStatsService
+            
+            snapshot = DashboardStatsService.snapshot()
             stats = {
-                'total_users': User.query.count(),
-                'total_assets': Asset.query.filter(Asset.deleted_at.is_(None)).count(),
-                'total_trades': Trade.query.count(),
-                'total_volume': db.session.query(func.sum(Trade.amount)).scalar() or 0,
-                'pending_assets': Asset.query.filter(Asset.status == 1, Asset.deleted_at.is_(None)).count(),
-                'approved_assets': Asset.query.filter(Asset.status == 2, Asset.deleted_at.is_(None)).count(),
-                'rejected_assets': Asset.query.filter(Asset.status == 3, Asset.deleted_at.is_(None)).count(),
+                'total_users': snapshot['user_count'],
+                'total_assets': snapshot['asset_count'],
+                'total_trades': snapshot['trade_count'],
+                'total_volume': snapshot['trade_volume'],
+                'pending_assets': snapshot['pending_assets'],
+                'approved_assets': snapshot['approved_assets'],
+                'rejected_assets': snapshot['rejected_assets'],
             }
             
             # 更新今日统计
@@ -374,6 +336,23 @@ class DashboardStats(db.Model):
             for stat in stats
         ]
 
+# 仪表板增量计数器
+class DashboardCounter(db.Model):
+    """
+    仪表板运行计数器，由 DashboardStatsService 在业务数据flush时同事务累加
+
+    每个计数器拆成若干分片行，并发事务累加不同分片，读取时按名称求和。
+    """
+    __tablename__ = 'dashboard_counters'
+
+    name = Column(String(64), primary_key=True)  # 计数器名称，如trades_count、daily:users_new:2024-01-01
+    shard = Column(Integer, primary_key=True, autoincrement=False)  # 分片编号
+    value = Column(db.Numeric(30, 6), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DashboardCounter {self.name}#{self.shard}>'
+
 # 数据库事件监听器
 def async_task(func):
     """异步任务装饰器（简化版）"""
@@ -3,7 +3,7 @@ import json
 from datetime import datetime
 from app.extensions import db
 from sqlalchemy.orm import validates
-from sqlalchemy import Index, CheckConstraint
+from sqlalchemy import Index, CheckConstraint, text
 import re
 from flask import current_app, url_for
 from urllib.parse import urlparse
@@ -85,6 +85,19 @@ class Asset(db.Model):
         Index('ix_assets_asset_type', 'asset_type'),  # 资产类型索引
         Index('ix_assets_status', 'status'),  # 状态索引
         Index('ix_assets_created_at', 'created_at'),  # 创建时间索引
+        # 上链流水线各阶段的部分索引，只包含对应状态的少量行，周期扫描和计数只访问这些行
+        Index('ix_assets_payment_processing', 'id',
+              postgresql_where=text('status = 8 AND deleted_at IS NULL'),
+              sqlite_where=text('status = 8 AND deleted_at IS NULL')),
+        Index('ix_assets_awaiting_deployment', 'id',
+              postgresql_where=text('status = 5 AND deleted_at IS NULL'),
+              sqlite_where=text('status = 5 AND deleted_at IS NULL')),
+        Index('ix_assets_deployment_failed', 'updated_at',
+              postgresql_where=text('status = 7 AND deleted_at IS NULL'),
+              sqlite_where=text('status = 7 AND deleted_at IS NULL')),
+        Index('ix_assets_deployment_in_progress', 'deployment_started_at',
+              postgresql_where=text('deployment_in_progress = true'),
+              sqlite_where=text('deployment_in_progress = 1')),
         CheckConstraint('token_price > 0', name='ck_token_price_positive'),  # 代币价格必须大于0
         CheckConstraint('token_supply > 0', name='ck_token_supply_positive'),  # 代币供应量必须大于0
         CheckConstraint('annual_revenue > 0', name='ck_annual_revenue_positive'),  # 年收益必须大于0
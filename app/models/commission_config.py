@@ -74,6 +74,7 @@ class CommissionConfig(db.Model):
             ('max_referral_levels', 999, '最大分销层级，999表示无限级'),
             ('enable_multi_level', True, '是否启用多级分销'),
             ('withdrawal_delay_minutes', 1, '取现延迟时间（分钟）'),
+            ('batch_withdrawal_enabled', False, '是否启用批量取现（多笔USDC转账合并为少量链上交易）'),
             ('platform_referrer_address', '', '平台推荐人地址，所有无推荐人的用户自动归属于此地址'),
             ('enable_platform_referrer', True, '是否启用平台推荐人功能，开启后所有无推荐人用户都归属平台'),
             ('commission_rules', {
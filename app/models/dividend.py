@@ -1,6 +1,6 @@
 from datetime import datetime
 from app.extensions import db
-from sqlalchemy import func
+from sqlalchemy import func, Index, UniqueConstraint
 
 class DividendRecord(db.Model):
     """分红记录"""
@@ -92,9 +92,17 @@ class DividendDistribution(db.Model):
         return distribution
     
     def claim(self):
-        """标记为已领取"""
+        """标记为已领取，并同步扣减可领取汇总"""
         self.status = 'claimed'
         self.claimed_at = datetime.utcnow()
+        asset_id = self.dividend_record.asset_id
+        DividendClaimableBalance.query.filter_by(
+            holder_address=self.holder_address, asset_id=asset_id
+        ).update({
+            DividendClaimableBalance.claimable_amount: DividendClaimableBalance.claimable_amount - self.amount,
+            DividendClaimableBalance.claimed_amount: DividendClaimableBalance.claimed_amount + self.amount,
+            DividendClaimableBalance.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
         db.session.commit()
     
     def to_dict(self):
@@ -110,6 +118,43 @@ class DividendDistribution(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
 
+class DividendClaimableBalance(db.Model):
+    """持有人在某资产下的可领取分红汇总
+    
+    分红分配时批量累加，领取时扣减，查询可领取金额无需扫描分配明细。
+    """
+    __tablename__ = 'dividend_claimable_balances'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    holder_address = db.Column(db.String(64), nullable=False)  # 持有人地址
+    asset_id = db.Column(db.Integer, db.ForeignKey('assets.id'), nullable=False)
+    claimable_amount = db.Column(db.Numeric(20, 6), nullable=False, default=0)  # 可领取金额
+    claimed_amount = db.Column(db.Numeric(20, 6), nullable=False, default=0)  # 已领取金额
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('holder_address', 'asset_id', name='uix_dividend_claimable_holder_asset'),
+        Index('idx_dividend_claimable_asset', 'asset_id'),
+    )
+    
+    @classmethod
+    def get_claimable(cls, holder_address, asset_id=None):
+        """获取持有人的可领取金额，asset_id为空时汇总全部资产"""
+        query = db.session.query(func.sum(cls.claimable_amount)).filter(cls.holder_address == holder_address)
+        if asset_id is not None:
+            query = query.filter(cls.asset_id == asset_id)
+        return query.scalar() or 0
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'holder_address': self.holder_address,
+            'asset_id': self.asset_id,
+            'claimable_amount': float(self.claimable_amount or 0),
+            'claimed_amount': float(self.claimed_amount or 0),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
 class WithdrawalRequest(db.Model):
     """提现申请"""
     __tablename__ = 'withdrawal_requests'
@@ -0,0 +1,31 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class MetricBucket(db.Model):
+    """定长时间桶的指标数值（小时桶由汇总任务写入，日/周/月桶由小时桶降采样得到）"""
+    __tablename__ = 'metric_buckets'
+
+    metric = db.Column(db.String(64), primary_key=True)  # 指标名称，如new_users、trade_volume
+    resolution = db.Column(db.String(8), primary_key=True)  # hour, day, week, month
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # 桶起始时间（UTC）
+    value = db.Column(db.Numeric(30, 6), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'metric': self.metric,
+            'resolution': self.resolution,
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'value': float(self.value or 0)
+        }
+
+
+class MetricRollupState(db.Model):
+    """每个指标的汇总进度"""
+    __tablename__ = 'metric_rollup_state'
+
+    metric = db.Column(db.String(64), primary_key=True)
+    watermark = db.Column(db.DateTime)  # 已汇总到的小时（不含），之前的小时桶视为完整
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
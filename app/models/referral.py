@@ -1,5 +1,6 @@
 from datetime import datetime
 from app.extensions import db
+from sqlalchemy import event
 from sqlalchemy.orm import validates
 
 class UserReferral(db.Model):
@@ -57,7 +58,8 @@ class CommissionRecord(db.Model):
     status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'paid', 'failed'
     tx_hash = db.Column(db.String(100))  # 佣金支付交易哈希
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
+    paid_at = db.Column(db.DateTime, nullable=True, index=True)  # 状态变为paid的时间
     
     @validates('recipient_address')
     def validate_address(self, key, address):
@@ -86,6 +88,12 @@ class CommissionRecord(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+@event.listens_for(CommissionRecord.status, 'set')
+def _stamp_paid_at(target, value, oldvalue, initiator):
+    """佣金变为已支付时记录支付时间，之后的其他更新不影响指标分桶"""
+    if value == 'paid' and oldvalue != value and target.paid_at is None:
+        target.paid_at = datetime.utcnow()
+
 # 分销佣金设置模型
 class DistributionSetting(db.Model):
     """分销佣金设置模型"""
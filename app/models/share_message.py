@@ -15,37 +15,9 @@ class ShareMessage(db.Model):
     
     @classmethod
     def get_random_message(cls, message_type='share_content'):
-        """获取随机消息"""
-        import random
-        
-        # 获取指定类型的活跃消息
-        messages = cls.query.filter_by(
-            message_type=message_type,
-            is_active=True
-        ).all()
-        
-        if not messages:
-            # 如果没有找到指定类型的消息，返回默认消息
-            if message_type == 'reward_plan':
-                return "一次分享，终身收益 - 无限下级20%分成"
-            else:
-                return "🚀 发现优质RWA资产！真实世界资产数字化投资新机遇，透明度高、收益稳定。"
-        
-        # 根据权重随机选择
-        total_weight = sum(msg.weight for msg in messages)
-        if total_weight == 0:
-            return random.choice(messages).content
-        
-        random_num = random.randint(1, total_weight)
-        current_weight = 0
-        
-        for message in messages:
-            current_weight += message.weight
-            if random_num <= current_weight:
-                return message.content
-        
-        # 兜底返回第一个消息
-        return messages[0].content
+        """获取随机消息（按权重从进程内消息池中选择）"""
+        from app.services.share_message_pool import share_message_pool
+        return share_message_pool.pick(message_type)
     
     @classmethod
     def get_default_messages(cls):
@@ -1,13 +1,6 @@
 import datetime
-import random
-import string
 from app.models import db
 
-def generate_unique_code(length=6):
-    """生成随机的短链接代码"""
-    chars = string.ascii_letters + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
-
 class ShortLink(db.Model):
     """短链接模型"""
     __tablename__ = 'short_links'
@@ -22,20 +15,15 @@ class ShortLink(db.Model):
     
     @classmethod
     def create_short_link(cls, original_url, creator_address=None, expires_days=None):
-        """创建新的短链接"""
-        while True:
-            code = generate_unique_code()
-            # 检查代码是否已存在
-            existing = cls.query.filter_by(code=code).first()
-            if not existing:
-                break
+        """创建新的短链接（代码由发号器分配，无需查重）"""
+        from app.services.short_code_allocator import short_code_allocator
         
         expires_at = None
         if expires_days:
             expires_at = datetime.datetime.utcnow() + datetime.timedelta(days=expires_days)
         
         short_link = cls(
-            code=code,
+            code=short_code_allocator.next_code(),
             original_url=original_url,
             creator_address=creator_address,
             expires_at=expires_at
@@ -46,9 +34,43 @@ class ShortLink(db.Model):
         
         return short_link
     
+    @classmethod
+    def bulk_create(cls, rows):
+        """
+        批量创建短链接（一条多行INSERT）
+        
+        Args:
+            rows: 字典列表，包含 original_url，可选 code、creator_address、expires_at；
+                  未提供 code 的行由发号器分配
+        
+        Returns:
+            list: 写入的行（含分配的code）
+        """
+        from app.services.short_code_allocator import short_code_allocator
+        
+        now = datetime.datetime.utcnow()
+        codes = iter(short_code_allocator.allocate(sum(1 for row in rows if not row.get('code'))))
+        values = []
+        for row in rows:
+            values.append({
+                'code': row.get('code') or next(codes),
+                'original_url': row['original_url'],
+                'creator_address': row.get('creator_address'),
+                'expires_at': row.get('expires_at'),
+                'click_count': 0,
+                'created_at': now
+            })
+        if values:
+            db.session.execute(cls.__table__.insert(), values)
+            db.session.commit()
+        return values
+    
     def increment_click(self):
-        """增加点击计数"""
-        self.click_count += 1
+        """增加点击计数（原子累加；重定向路径请使用 short_link_service.record_click）"""
+        type(self).query.filter_by(id=self.id).update(
+            {'click_count': db.func.coalesce(type(self).click_count, 0) + 1},
+            synchronize_session=False
+        )
         db.session.commit()
     
     def is_expired(self):
@@ -65,4 +87,35 @@ class ShortLink(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
             'click_count': self.click_count
-        } 
\ No newline at end of file
+        }
+
+
+class ShortLinkClick(db.Model):
+    """短链接点击明细（只追加，由点击计数器批量写入）"""
+    __tablename__ = 'short_link_clicks'
+
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(10), nullable=False, index=True)
+    clicked_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+    ip_address = db.Column(db.String(64))
+    user_agent = db.Column(db.String(256))
+    referer = db.Column(db.String(512))
+
+    def to_dict(self):
+        """转换为字典表示"""
+        return {
+            'code': self.code,
+            'clicked_at': self.clicked_at.isoformat() if self.clicked_at else None,
+            'ip_address': self.ip_address,
+            'user_agent': self.user_agent,
+            'referer': self.referer
+        }
+
+
+class ShortCodeSequence(db.Model):
+    """短链接代码的发号序列，各进程按块预留区间"""
+    __tablename__ = 'short_code_sequences'
+
+    name = db.Column(db.String(32), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=1)  # 下一个未分配的序号
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
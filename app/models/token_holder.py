@@ -0,0 +1,92 @@
+from datetime import datetime
+from app.extensions import db
+from sqlalchemy import func, Index, UniqueConstraint
+
+
+class TokenHolderAccount(db.Model):
+    """链上代币账户余额索引（每个代币账户一行，由持有人索引器维护）"""
+    __tablename__ = 'token_holder_accounts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mint = db.Column(db.String(64), nullable=False)  # 代币mint地址
+    token_account = db.Column(db.String(64), nullable=False)  # 代币账户地址
+    owner = db.Column(db.String(64), nullable=False)  # 持有人钱包地址
+    amount = db.Column(db.Numeric(20, 0), nullable=False, default=0)  # 以最小单位表示的余额（u64）
+    slot = db.Column(db.BigInteger)  # 余额对应的slot，较早slot的变更不会覆盖
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('mint', 'token_account', name='uix_token_holder_mint_account'),
+        Index('idx_token_holder_mint_owner', 'mint', 'owner'),
+        Index('idx_token_holder_mint_amount', 'mint', 'amount'),
+    )
+
+    @classmethod
+    def top_holders(cls, mint, limit=10):
+        """按持有人汇总余额，返回余额最高的持有人 [(owner, amount)]"""
+        total = func.sum(cls.amount)
+        return db.session.query(cls.owner, total).filter(
+            cls.mint == mint,
+            cls.amount > 0
+        ).group_by(cls.owner).order_by(total.desc()).limit(limit).all()
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'mint': self.mint,
+            'token_account': self.token_account,
+            'owner': self.owner,
+            'amount': int(self.amount or 0),
+            'slot': self.slot,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class TokenHolderIndexState(db.Model):
+    """每个mint的索引进度与汇总值，持有人数量等查询直接读取这一行"""
+    __tablename__ = 'token_holder_index_state'
+
+    mint = db.Column(db.String(64), primary_key=True)
+    program_id = db.Column(db.String(64), nullable=False)  # Token程序ID
+    holder_count = db.Column(db.Integer, nullable=False, default=0)  # 余额大于0的持有人数量
+    account_count = db.Column(db.Integer, nullable=False, default=0)  # 余额大于0的代币账户数量
+    total_amount = db.Column(db.Numeric(20, 0), nullable=False, default=0)  # 全部代币账户余额之和
+    snapshot_slot = db.Column(db.BigInteger)  # 最近一次全量快照的slot
+    snapshot_at = db.Column(db.DateTime)
+    last_signature = db.Column(db.String(128))  # 已处理到的最新交易签名
+    last_slot = db.Column(db.BigInteger)
+    last_synced_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'mint': self.mint,
+            'program_id': self.program_id,
+            'holder_count': self.holder_count,
+            'account_count': self.account_count,
+            'total_amount': int(self.total_amount or 0),
+            'snapshot_slot': self.snapshot_slot,
+            'snapshot_at': self.snapshot_at.isoformat() if self.snapshot_at else None,
+            'last_signature': self.last_signature,
+            'last_slot': self.last_slot,
+            'last_synced_at': self.last_synced_at.isoformat() if self.last_synced_at else None
+        }
+
+
+class TokenActivity(db.Model):
+    """索引器处理过的链上交易（包括不经过平台的直接转账）"""
+    __tablename__ = 'token_activities'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mint = db.Column(db.String(64), nullable=False)
+    signature = db.Column(db.String(128), nullable=False)
+    slot = db.Column(db.BigInteger, nullable=False)
+    block_time = db.Column(db.DateTime)
+    accounts_changed = db.Column(db.Integer, nullable=False, default=0)  # 余额发生变化的代币账户数
+    amount_moved = db.Column(db.Numeric(20, 0), nullable=False, default=0)  # 余额增加量之和
+    supply_delta = db.Column(db.Numeric(21, 0), nullable=False, default=0)  # 账户余额总和的变化（mint为正，burn为负）
+
+    __table_args__ = (
+        UniqueConstraint('mint', 'signature', name='uix_token_activity_mint_signature'),
+        Index('idx_token_activity_mint_time', 'mint', 'block_time'),
+    )
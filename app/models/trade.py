@@ -35,7 +35,8 @@ class Trade(db.Model):
     trader_address = db.Column(db.String(64), nullable=False)  # 交易者钱包地址，支持Solana长度
     tx_hash = db.Column(db.String(100))  # 交易哈希，支持各种区块链
     status = db.Column(db.String(20), default=TradeStatus.PENDING.value)  # pending, completed, failed
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    completed_at = db.Column(db.DateTime, nullable=True, index=True)  # 状态变为completed的时间
     gas_used = db.Column(db.Numeric, nullable=True)  # 交易使用的gas量
     is_self_trade = db.Column(db.Boolean, nullable=False, default=False)  # 是否是自交易(和自己交易)
     payment_details = db.Column(db.Text)  # 支付详情，JSON格式
@@ -95,4 +96,11 @@ class Trade(db.Model):
             'gas_used': float(self.gas_used) if self.gas_used else None,
             'is_self_trade': self.is_self_trade
         }
-        return result 
\ No newline at end of file
+        return result 
+
+
+@event.listens_for(Trade.status, 'set')
+def _stamp_completed_at(target, value, oldvalue, initiator):
+    """交易变为已完成时记录完成时间，指标汇总按完成时间计入"""
+    if value == TradeStatus.COMPLETED.value and oldvalue != value and target.completed_at is None:
+        target.completed_at = datetime.utcnow()
@@ -51,7 +51,7 @@ class User(db.Model):
     referrer_address = db.Column(db.String(64))            # 推荐人地址
     
     last_login_at = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
     @validates('eth_address')
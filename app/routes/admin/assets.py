@@ -216,11 +216,17 @@ def api_delete_asset(asset_id):
             return jsonify({'success': False, 'error': '资产不存在或已被删除'}), 404
         
         # 使用原生SQL执行软删除
-        sql = text("UPDATE assets SET deleted_at = NOW() WHERE id = :asset_id AND deleted_at IS NULL")
-        result = db.session.execute(sql, {'asset_id': asset_id})
-        
-        if result.rowcount > 0:
+        sql = text("UPDATE assets SET deleted_at = NOW() WHERE id = :asset_id AND deleted_at IS NULL "
+                   "RETURNING status, asset_type, total_value")
+        removed = db.session.execute(sql, {'asset_id': asset_id}).fetchall()
+        
+        if removed:
+            # 原生SQL不经过ORM flush，手动同步仪表板计数器
+            from app.services.dashboard_stats_service import DashboardStatsService
+            DashboardStatsService.increment(DashboardStatsService.asset_deltas(removed))
             db.session.commit()
+            from app.services.response_cache import invalidate_responses
+            invalidate_responses('assets')
             current_app.logger.info(f'资产已软删除: {asset_id}')
             return jsonify({'success': True, 'message': '资产已删除'})
         else:
@@ -305,12 +311,21 @@ def api_batch_approve_assets():
             return jsonify({'success': False, 'error': '无效的资产ID格式'}), 400
         
         # 批量审核通过
-        sql = text("UPDATE assets SET status = 2 WHERE id = ANY(:asset_ids) AND status = 1 AND deleted_at IS NULL")
-        result = db.session.execute(sql, {'asset_ids': asset_ids})
+        sql = text("UPDATE assets SET status = 2 WHERE id = ANY(:asset_ids) AND status = 1 AND deleted_at IS NULL "
+                   "RETURNING status, asset_type, total_value")
+        updated = db.session.execute(sql, {'asset_ids': asset_ids}).fetchall()
         
-        success_count = result.rowcount
+        success_count = len(updated)
         failed_count = len(asset_ids) - success_count
+        if updated:
+            from app.services.dashboard_stats_service import DashboardStatsService
+            DashboardStatsService.increment(DashboardStatsService.asset_status_deltas(updated, old_status=1))
         db.session.commit()
+        # 原生SQL更新不触发ORM事件，手动使详情页片段和接口缓存失效
+        from app.services.asset_detail_cache import asset_detail_cache
+        from app.services.response_cache import invalidate_responses
+        asset_detail_cache.invalidate(asset_ids)
+        invalidate_responses('assets')
         
         return jsonify({
             'success': True,
@@ -348,12 +363,21 @@ def api_batch_reject_assets():
             return jsonify({'success': False, 'error': '无效的资产ID格式'}), 400
         
         # 批量审核拒绝
-        sql = text("UPDATE assets SET status = 3 WHERE id = ANY(:asset_ids) AND status = 1 AND deleted_at IS NULL")
-        result = db.session.execute(sql, {'asset_ids': asset_ids})
+        sql = text("UPDATE assets SET status = 3 WHERE id = ANY(:asset_ids) AND status = 1 AND deleted_at IS NULL "
+                   "RETURNING status, asset_type, total_value")
+        updated = db.session.execute(sql, {'asset_ids': asset_ids}).fetchall()
         
-        success_count = result.rowcount
+        success_count = len(updated)
         failed_count = len(asset_ids) - success_count
+        if updated:
+            from app.services.dashboard_stats_service import DashboardStatsService
+            DashboardStatsService.increment(DashboardStatsService.asset_status_deltas(updated, old_status=1))
         db.session.commit()
+        # 原生SQL更新不触发ORM事件，手动使详情页片段和接口缓存失效
+        from app.services.asset_detail_cache import asset_detail_cache
+        from app.services.response_cache import invalidate_responses
+        asset_detail_cache.invalidate(asset_ids)
+        invalidate_responses('assets')
         
         return jsonify({
             'success': True,
@@ -389,12 +413,19 @@ def api_batch_delete_assets():
             return jsonify({'success': False, 'error': '无效的资产ID格式'}), 400
         
         # 批量软删除
-        sql = text("UPDATE assets SET deleted_at = NOW() WHERE id = ANY(:asset_ids) AND deleted_at IS NULL")
-        result = db.session.execute(sql, {'asset_ids': asset_ids})
+        sql = text("UPDATE assets SET deleted_at = NOW() WHERE id = ANY(:asset_ids) AND deleted_at IS NULL "
+                   "RETURNING status, asset_type, total_value")
+        removed = db.session.execute(sql, {'asset_ids': asset_ids}).fetchall()
         
-        success_count = result.rowcount
+        success_count = len(removed)
         failed_count = len(asset_ids) - success_count
+        if removed:
+            from app.services.dashboard_stats_service import DashboardStatsService
+            DashboardStatsService.increment(DashboardStatsService.asset_deltas(removed))
         db.session.commit()
+        if removed:
+            from app.services.response_cache import invalidate_responses
+            invalidate_responses('assets')
         
         return jsonify({
             'success': True,
@@ -9,6 +9,7 @@ from flask import (
 )
 from functools import wraps
 from app.models.admin import AdminUser
+from app.services.admin_identity import resolve_admin
 from app.utils.decorators import eth_address_required, is_admin
 from app.utils.admin import get_admin_permissions
 from sqlalchemy import func
@@ -23,16 +24,14 @@ def api_admin_required(f):
         # 优先检查session中的安全验证状态
         if session.get('admin_verified') and session.get('admin_wallet_address'):
             wallet_address = session.get('admin_wallet_address')
-            admin_user = AdminUser.query.filter(
-                func.lower(AdminUser.wallet_address) == wallet_address.lower()
-            ).first()
+            admin_user = resolve_admin(wallet_address, case_insensitive=True, use_session=True)
             
             if admin_user:
                 g.eth_address = wallet_address
                 g.admin = admin_user
                 g.admin_user_id = admin_user.id
                 g.admin_role = admin_user.role
-                current_app.logger.info(f"API管理员验证通过(session) - 管理员ID: {admin_user.id}")
+                current_app.logger.debug(f"API管理员验证通过(session) - 管理员ID: {admin_user.id}")
                 return f(*args, **kwargs)
         
         # 尝试其他认证方式
@@ -48,18 +47,10 @@ def api_admin_required(f):
         if not wallet_address:
             return jsonify({'error': '请先连接钱包并登录', 'code': 'AUTH_REQUIRED'}), 401
             
-        # 直接查询数据库检查管理员权限
+        # 检查管理员权限（解析结果短时间缓存）
         # 对于Solana地址，保持原样（大小写敏感）
-        # 对于以太坊地址，转换为小写
-        if wallet_address.startswith('0x'):
-            admin_user = AdminUser.query.filter(
-                func.lower(AdminUser.wallet_address) == wallet_address.lower()
-            ).first()
-        else:
-            # Solana地址大小写敏感
-            admin_user = AdminUser.query.filter(
-                AdminUser.wallet_address == wallet_address
-            ).first()
+        # 对于以太坊地址，忽略大小写
+        admin_user = resolve_admin(wallet_address, case_insensitive=wallet_address.startswith('0x'))
             
         if not admin_user:
             current_app.logger.warning(f"API管理员验证失败 - 地址: {wallet_address}")
@@ -72,7 +63,7 @@ def api_admin_required(f):
         g.admin_user_id = admin_user.id
         g.admin_role = admin_user.role
         
-        current_app.logger.info(f"API管理员验证通过 - 管理员ID: {admin_user.id}, 地址: {wallet_address}")
+        current_app.logger.debug(f"API管理员验证通过 - 管理员ID: {admin_user.id}, 地址: {wallet_address}")
         return f(*args, **kwargs)
     return decorated_function
 
@@ -107,9 +98,7 @@ def admin_page_required(f):
         # 检查session中的admin验证状态
         if session.get('admin_verified') and session.get('admin_wallet_address'):
             wallet_address = session.get('admin_wallet_address')
-            admin_user = AdminUser.query.filter(
-                func.lower(AdminUser.wallet_address) == wallet_address.lower()
-            ).first()
+            admin_user = resolve_admin(wallet_address, case_insensitive=True, use_session=True)
             
             if admin_user:
                 g.admin = admin_user
@@ -142,9 +131,7 @@ def check_auth():
     try:
         if session.get('admin_verified') and session.get('admin_wallet_address'):
             wallet_address = session.get('admin_wallet_address')
-            admin_user = AdminUser.query.filter(
-                func.lower(AdminUser.wallet_address) == wallet_address.lower()
-            ).first()
+            admin_user = resolve_admin(wallet_address, case_insensitive=True, use_session=True)
             
             if admin_user:
                 return jsonify({
@@ -160,7 +160,7 @@ def get_dashboard_trends():
     """获取仪表板趋势数据"""
     try:
         days = int(request.args.get('days', 30))
-        if days not in [7, 30, 90]:
+        if days not in [7, 30, 90, 365]:
             days = 30
             
         # 获取用户增长趋势
@@ -208,11 +208,14 @@ def get_recent_trades():
 def get_asset_type_stats():
     """获取资产类型统计"""
     try:
-        # 查询各类型资产数量
-        asset_stats = db.session.query(
-            Asset.asset_type,
-            func.count(Asset.id).label('count')
-        ).filter(Asset.status == 2).group_by(Asset.asset_type).all()
+        # 查询各类型已审核资产数量（取自仪表板计数器）
+        from app.services.dashboard_stats_service import DashboardStatsService
+        asset_stats = [
+            (asset_type, item['count'])
+            for asset_type, item in sorted(
+                DashboardStatsService.get_asset_type_distribution(approved_only=True).items()
+            )
+        ]
         
         # 资产类型映射
         type_names = {
@@ -246,33 +249,8 @@ def get_asset_type_stats():
 def get_user_growth_trend(days=30):
     """获取用户增长趋势"""
     try:
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=days-1)
-        
-        # 查询每日新增用户数
-        daily_users = db.session.query(
-            func.date(User.created_at).label('date'),
-            func.count(User.id).label('count')
-        ).filter(
-            func.date(User.created_at) >= start_date,
-            func.date(User.created_at) <= end_date
-        ).group_by(func.date(User.created_at)).all()
-        
-        # 创建完整的日期序列
-        labels = []
-        values = []
-        user_dict = {str(date): count for date, count in daily_users}
-        
-        current_date = start_date
-        while current_date <= end_date:
-            labels.append(current_date.strftime('%m-%d'))
-            values.append(user_dict.get(str(current_date), 0))
-            current_date += timedelta(days=1)
-        
-        return {
-            'labels': labels,
-            'values': values
-        }
+        from app.services.metric_series_service import MetricSeriesService
+        return MetricSeriesService.get_trend('new_users', days)
         
     except Exception as e:
         current_app.logger.error(f'获取用户增长趋势失败: {str(e)}')
@@ -282,35 +260,9 @@ def get_user_growth_trend(days=30):
 def get_trading_volume_trend(days=30):
     """获取交易量趋势"""
     try:
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=days-1)
-        
-        # 查询每日交易量
-        daily_volume = db.session.query(
-            func.date(Trade.created_at).label('date'),
-            func.sum(Trade.total).label('volume')
-        ).filter(
-            Trade.status == TradeStatus.COMPLETED.value,
-            func.date(Trade.created_at) >= start_date,
-            func.date(Trade.created_at) <= end_date
-        ).group_by(func.date(Trade.created_at)).all()
-        
-        # 创建完整的日期序列
-        labels = []
-        values = []
-        volume_dict = {str(date): float(volume or 0) for date, volume in daily_volume}
-        
-        current_date = start_date
-        while current_date <= end_date:
-            labels.append(current_date.strftime('%m-%d'))
-            values.append(volume_dict.get(str(current_date), 0))
-            current_date += timedelta(days=1)
-        
-        return {
-            'labels': labels,
-            'values': values
-        }
+        from app.services.metric_series_service import MetricSeriesService
+        return MetricSeriesService.get_trend('trade_volume', days)
         
     except Exception as e:
         current_app.logger.error(f'获取交易量趋势失败: {str(e)}')
-        return {'labels': [], 'values': []} 
\ No newline at end of file
+        return {'labels': [], 'values': []}
@@ -22,6 +22,8 @@ from app.models.commission import Commission
 from app.models.dividend import DividendRecord, DividendDistribution
 from app.models.share_message import ShareMessage
 from app.models.shortlink import ShortLink
+from app.services.admin_identity import resolve_admin
+from app.services.audit_log_writer import audit_log_writer
 
 # For signature verification
 from eth_account.messages import encode_defunct
@@ -67,12 +69,12 @@ def api_admin_required(f):
         # 优先检查session中的安全验证状态
         if session.get('admin_verified') and session.get('admin_wallet_address'):
             wallet_address = session.get('admin_wallet_address')
-            admin_user = AdminUser.query.filter(AdminUser.wallet_address == wallet_address).first()
+            admin_user = resolve_admin(wallet_address, use_session=True)
             
             if admin_user:
                 g.wallet_address = wallet_address
                 g.admin = admin_user
-                current_app.logger.info(f"Admin compat API access GRANTED via session for {wallet_address}")
+                current_app.logger.debug(f"Admin compat API access GRANTED via session for {wallet_address}")
                 return f(*args, **kwargs)
         
         # 从多个来源获取管理员钱包地址
@@ -90,11 +92,11 @@ def api_admin_required(f):
             return jsonify({"error": "缺少管理员钱包地址"}), 401
             
         # 检查管理员权限 (Solana地址是大小写敏感的)
-        admin_user = AdminUser.query.filter(AdminUser.wallet_address == wallet_address).first()
+        admin_user = resolve_admin(wallet_address)
         if admin_user:
             g.wallet_address = wallet_address
             g.admin = admin_user
-            current_app.logger.info(f"Admin compat API access GRANTED for {wallet_address}")
+            current_app.logger.debug(f"Admin compat API access GRANTED for {wallet_address}")
             return f(*args, **kwargs)
             
         current_app.logger.warning(f"Admin compat API access DENIED for {wallet_address}")
@@ -110,20 +112,21 @@ def admin_required(f):
         current_app.logger.debug(f"Admin API access attempt: {request.path}, Session: {session}")
         if session.get('admin_verified') and session.get('admin_wallet_address'):
             wallet_address = session.get('admin_wallet_address')
-            admin_user = AdminUser.query.filter(AdminUser.wallet_address == wallet_address).first()
+            admin_user = resolve_admin(wallet_address, use_session=True)
 
             if admin_user:
                 g.wallet_address = wallet_address # 兼容可能存在的旧代码
                 g.admin = admin_user
                 g.admin_user_id = admin_user.id
                 g.admin_role = admin_user.role
-                current_app.logger.info(f"Admin API access GRANTED for {wallet_address} (ID: {admin_user.id}) via verified session for API {request.path}")
+                current_app.logger.debug(f"Admin API access GRANTED for {wallet_address} (ID: {admin_user.id}) via verified session for API {request.path}")
                 return f(*args, **kwargs)
             else:
                 session.pop('admin_verified', None)
                 session.pop('admin_wallet_address', None)
                 session.pop('admin_user_id', None)
                 session.pop('admin_role', None)
+                session.pop('admin_identity', None)
                 current_app.logger.warning(f"Admin API session for {wallet_address} was valid, but user not found. Access denied.")
                 return jsonify({'error': 'Admin session invalid or account not found.', 'code': 'ADMIN_SESSION_INVALID'}), 401
         else:
@@ -134,73 +137,19 @@ def admin_required(f):
 
 # Helper functions
 def get_user_growth_trend(days=30):
-    """获取用户增长趋势"""
-    try:
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=days)
-        
-        # 查询每天的用户注册量
-        daily_registrations = db.session.query(
-            func.date(User.created_at).label('date'),
-            func.count().label('count')
-        ).filter(
-            func.date(User.created_at) >= start_date,
-            func.date(User.created_at) <= end_date
-        ).group_by(
-            func.date(User.created_at)
-        ).all()
-        
-        # 转换为前端所需的格式
-        date_range = [start_date + timedelta(days=x) for x in range(days + 1)]
-        result = {
-            'labels': [date.strftime('%m-%d') for date in date_range],
-            'values': [0] * (days + 1)
-        }
-        
-        # 填充每日注册量
-        date_dict = {str(r.date): r.count for r in daily_registrations}
-        for i, date in enumerate(date_range):
-            str_date = str(date)
-            if str_date in date_dict:
-                result['values'][i] = date_dict[str_date]
-        
-        return result
+    """获取用户增长趋势（读取指标时间序列）"""
+    try:
+        from app.services.metric_series_service import MetricSeriesService
+        return MetricSeriesService.get_trend('new_users', days + 1)
     except Exception as e:
         current_app.logger.error(f"获取用户增长趋势失败: {str(e)}", exc_info=True)
         return {'labels': [], 'values': []}
 
 def get_trading_volume_trend(days=30):
-    """获取交易量趋势"""
-    try:
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=days)
-        
-        # 查询每天的交易量
-        daily_volume = db.session.query(
-            func.date(Trade.created_at).label('date'),
-            func.sum(Trade.total_price).label('volume')
-        ).filter(
-            func.date(Trade.created_at) >= start_date,
-            func.date(Trade.created_at) <= end_date
-        ).group_by(
-            func.date(Trade.created_at)
-        ).all()
-        
-        # 转换为前端所需的格式
-        date_range = [start_date + timedelta(days=x) for x in range(days + 1)]
-        result = {
-            'labels': [date.strftime('%m-%d') for date in date_range],
-            'values': [0] * (days + 1)
-        }
-        
-        # 填充每日交易量
-        date_dict = {str(r.date): float(r.volume) for r in daily_volume}
-        for i, date in enumerate(date_range):
-            str_date = str(date)
-            if str_date in date_dict:
-                result['values'][i] = date_dict[str_date]
-        
-        return result
+    """获取交易量趋势（读取指标时间序列）"""
+    try:
+        from app.services.metric_series_service import MetricSeriesService
+        return MetricSeriesService.get_trend('trade_volume', days + 1)
     except Exception as e:
         current_app.logger.error(f"获取交易量趋势失败: {str(e)}", exc_info=True)
         return {'labels': [], 'values': []}
@@ -263,8 +212,8 @@ def log_admin_operation(operation_type):
                 else:
                     operation_details['status_code'] = 200
                 
-                # 写入操作日志
-                AdminOperationLog.log_operation(
+                # 写入操作日志（后台线程批量写入）
+                audit_log_writer.submit(
                     admin_address=g.wallet_address,
                     operation_type=operation_type,
                     target_table=target_table,
@@ -287,7 +236,7 @@ def compat_admin_required(f):
     def compat_check(*args, **kwargs):
         # 先检查是否为新系统中的管理员
         wallet_address = g.wallet_address
-        admin_user = AdminUser.query.filter(AdminUser.wallet_address == wallet_address).first()
+        admin_user = resolve_admin(wallet_address)
         
         if admin_user:
             g.admin = admin_user
@@ -316,55 +265,12 @@ def compat_admin_required(f):
 @admin_required
 @log_admin_operation('查看仪表盘')
 def get_dashboard_stats():
-    """获取仪表盘统计数据 - 优化版本"""
+    """获取仪表盘统计数据（读取增量计数器，耗时与数据量无关）"""
     try:
-        from app.models.asset import Asset
-        from app.models.trade import Trade
-        from app.models.user import User
-        from sqlalchemy import func
+        from app.services.dashboard_stats_service import DashboardStatsService
         
-        # 使用单个查询获取所有统计数据
-        asset_stats = db.session.query(
-            func.count(Asset.id).label('total_assets'),
-            func.sum(func.case([(Asset.status == 1, 1)], else_=0)).label('pending_assets'),
-            func.sum(func.case([(Asset.status == 2, 1)], else_=0)).label('approved_assets'),
-            func.sum(func.case([(Asset.total_value, Asset.total_value)], else_=0)).label('total_value')
-        ).filter(Asset.deleted_at.is_(None)).first()
-        
-        # 简化交易统计 - 只获取总数和总金额
-        try:
-            trade_stats = db.session.query(
-                func.count(Trade.id).label('total_trades'),
-                func.sum(Trade.total).label('total_volume')
-            ).first()
-            
-            total_trades = trade_stats.total_trades or 0
-            total_volume = float(trade_stats.total_volume or 0)
-        except Exception as e:
-            current_app.logger.warning(f"交易统计查询失败: {str(e)}")
-            total_trades = 0
-            total_volume = 0
-        
-        # 简化用户统计
-        try:
-            total_users = User.query.count()
-        except Exception as e:
-            current_app.logger.warning(f"用户统计查询失败: {str(e)}")
-            total_users = 0
-        
-        # 返回简化的统计数据
-        stats = {
-            'total_assets': asset_stats.total_assets or 0,
-            'pending_assets': asset_stats.pending_assets or 0,
-            'approved_assets': asset_stats.approved_assets or 0,
-            'total_value': float(asset_stats.total_value or 0),
-            'total_trades': total_trades,
-            'total_volume': total_volume,
-            'total_users': total_users,
-            'total_dividends': 1500000  # 使用固定演示数据
-        }
-        
-        current_app.logger.info(f"仪表盘统计数据: {stats}")
+        stats = DashboardStatsService.get_dashboard_stats()
+        current_app.logger.debug(f"仪表盘统计数据: {stats}")
         return jsonify(stats)
         
     except Exception as e:
@@ -390,14 +296,16 @@ def get_dashboard_trends():
         if days > 365:
             days = 365  # 限制最大天数
             
+        from app.services.metric_series_service import MetricSeriesService
+        
         # 获取用户增长趋势
-        user_trend = DashboardStats.get_trend_data('new_users', days)
+        user_trend = MetricSeriesService.get_trend_points('new_users', days)
         
         # 获取交易量趋势
-        trade_trend = DashboardStats.get_trend_data('trade_volume', days)
+        trade_trend = MetricSeriesService.get_trend_points('trade_volume', days)
         
         # 获取资产价值趋势
-        value_trend = DashboardStats.get_trend_data('asset_value', days)
+        value_trend = MetricSeriesService.get_trend_points('asset_value', days)
         
         return jsonify({
             'user_growth': user_trend,
@@ -425,7 +333,8 @@ def get_user_growth_stats():
             days = 1
             
         # 获取用户增长趋势
-        user_trend = DashboardStats.get_trend_data('new_users', days)
+        from app.services.metric_series_service import MetricSeriesService
+        user_trend = MetricSeriesService.get_trend('new_users', days)
         
         # 获取用户地理分布 (假数据，实际应从用户IP或注册信息中获取)
         regions = [
@@ -454,12 +363,12 @@ def get_asset_type_stats():
     try:
         current_app.logger.info('获取资产类型分布统计...')
         
-        # 查询资产类型分布
-        distribution = db.session.query(
-            Asset.asset_type.label('type'),
-            func.count(Asset.id).label('count'),
-            func.sum(Asset.total_value).label('value')
-        ).group_by(Asset.asset_type).all()
+        # 资产类型分布取自仪表板计数器
+        from app.services.dashboard_stats_service import DashboardStatsService
+        distribution = [
+            (type_id, item['count'], item['value'])
+            for type_id, item in sorted(DashboardStatsService.get_asset_type_distribution().items())
+        ]
         
         # 类型名称映射
         type_names = {
@@ -499,9 +408,11 @@ def get_asset_type_stats():
 def refresh_dashboard_stats():
     """手动刷新仪表盘统计数据"""
     try:
-        # 使用异步任务更新统计
+        # 使用异步任务校正计数器并更新今日统计
         @async_task
         def update_stats():
+            from app.services.dashboard_stats_service import DashboardStatsService
+            DashboardStatsService.reconcile()
             DashboardStats.update_daily_stats()
             current_app.logger.info("仪表盘统计数据已更新")
             
@@ -1288,12 +1199,12 @@ def get_asset_type_stats_compat():
     try:
         current_app.logger.info('获取资产类型分布统计...')
         
-        # 查询资产类型分布
-        distribution = db.session.query(
-            Asset.asset_type.label('type'),
-            func.count(Asset.id).label('count'),
-            func.sum(Asset.total_value).label('value')
-        ).group_by(Asset.asset_type).all()
+        # 资产类型分布取自仪表板计数器
+        from app.services.dashboard_stats_service import DashboardStatsService
+        distribution = [
+            (type_id, item['count'], item['value'])
+            for type_id, item in sorted(DashboardStatsService.get_asset_type_distribution().items())
+        ]
         
         # 类型名称映射
         type_names = {
@@ -1341,24 +1252,11 @@ def get_user_stats_compat():
             days = 1
         
         # 获取用户增长趋势
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=days)
-        
-        # 查询每日新增用户
-        daily_new_users = DashboardStats.query.filter(
-            DashboardStats.stat_type == 'new_users',
-            DashboardStats.stat_period == 'daily',
-            DashboardStats.stat_date >= start_date,
-            DashboardStats.stat_date <= end_date
-        ).order_by(DashboardStats.stat_date).all()
-        
-        # 构造趋势数据
-        trend = []
-        for stat in daily_new_users:
-            trend.append({
-                'date': stat.stat_date.strftime('%Y-%m-%d'),
-                'count': stat.stat_value
-            })
+        from app.services.metric_series_service import MetricSeriesService
+        trend = [
+            {'date': point['date'], 'count': point['value']}
+            for point in MetricSeriesService.get_trend_points('new_users', days + 1)
+        ]
             
         # 获取用户地理分布 (假数据，实际应从用户IP或注册信息中获取)
         regions = [
@@ -2277,6 +2175,7 @@ def admin_auth_login():
         session['admin_wallet_address'] = wallet_address # 存储Solana地址
         session['admin_user_id'] = admin_user.id
         session['admin_role'] = admin_user.role
+        session.pop('admin_identity', None)
         
         # 更新最后登录时间
         admin_user.last_login = datetime.utcnow()
@@ -2782,6 +2681,12 @@ def delete_single_asset_compat(asset_id):
         # 查找资产
         asset = Asset.query.get_or_404(asset_id)
         
+        # 批量删除绕过ORM的计数器钩子，先按待删除的记录扣减仪表板计数器
+        from app.services.dashboard_stats_service import DashboardStatsService
+        deltas = DashboardStatsService.bulk_delete_deltas(DividendRecord, DividendRecord.asset_id == asset_id)
+        deltas.update(DashboardStatsService.bulk_delete_deltas(Trade, Trade.asset_id == asset_id))
+        DashboardStatsService.increment(deltas)
+        
         # 删除关联的分红记录
         DividendRecord.query.filter_by(asset_id=asset_id).delete()
         
@@ -3643,6 +3548,7 @@ def create_share_message():
     """创建分享消息"""
     try:
         from app.models.share_message import ShareMessage
+        from app.services.share_message_pool import share_message_pool
         
         data = request.get_json()
         if not data:
@@ -3678,6 +3584,7 @@ def create_share_message():
         
         db.session.add(message)
         db.session.commit()
+        share_message_pool.invalidate()
         
         return jsonify({
             'success': True,
@@ -3699,6 +3606,7 @@ def update_share_message(message_id):
     """更新分享消息"""
     try:
         from app.models.share_message import ShareMessage
+        from app.services.share_message_pool import share_message_pool
         
         message = ShareMessage.query.get(message_id)
         if not message:
@@ -3741,6 +3649,7 @@ def update_share_message(message_id):
         
         message.updated_at = datetime.utcnow()
         db.session.commit()
+        share_message_pool.invalidate()
         
         return jsonify({
             'success': True,
@@ -3762,11 +3671,13 @@ def delete_share_message(message_id):
     """删除分享消息"""
     try:
         from app.models.share_message import ShareMessage
+        from app.services.share_message_pool import share_message_pool
         
         message = ShareMessage.query.get_or_404(message_id)
         
         db.session.delete(message)
         db.session.commit()
+        share_message_pool.invalidate()
         
         return jsonify({
             'success': True,
@@ -3784,8 +3695,10 @@ def init_default_share_messages():
     """初始化默认分享消息"""
     try:
         from app.models.share_message import ShareMessage
+        from app.services.share_message_pool import share_message_pool
         
         ShareMessage.init_default_messages()
+        share_message_pool.invalidate()
         
         return jsonify({
             'success': True,
@@ -3921,6 +3834,7 @@ def frontend_admin_auth_login():
         session['admin_wallet_address'] = wallet_address
         session['admin_user_id'] = admin_user.id
         session['admin_role'] = admin_user.role
+        session.pop('admin_identity', None)
         
         # 更新最后登录时间
         admin_user.last_login = datetime.utcnow()
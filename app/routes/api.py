@@ -12,6 +12,7 @@ import requests
 from app.models import Asset, User, Trade, AssetType
 from app.extensions import db
 from app.blockchain.solana_service import execute_transfer_transaction
+from app.services.response_cache import cache_response, skip_response_cache
 
 # 从__init__.py导入正确的API蓝图
 from . import api_bp
@@ -22,7 +23,17 @@ from .assets import get_filtered_assets_query
 # 日志记录器
 logger = logging.getLogger(__name__)
 
+
+def _asset_list_variant():
+    """资产列表只区分管理员和普通用户两种结果"""
+    from app.utils import is_admin
+
+    address = request.args.get('eth_address') or request.headers.get('X-Eth-Address') or request.cookies.get('eth_address')
+    return 'admin' if address and is_admin(address) else 'public'
+
 @api_bp.route('/assets/list', methods=['GET'])
+@cache_response(tags=('assets',), variant=_asset_list_variant, vary=('X-Eth-Address', 'Cookie'),
+                ignore_args=('_', 'eth_address'))
 def list_assets():
     """获取资产列表"""
     try:
@@ -82,13 +93,23 @@ def list_assets():
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         assets = pagination.items
         
+        from app.utils.upload_index import upload_index
+        from app.utils.image_derivatives import image_derivatives
+
         # 转换为前端需要的格式
         asset_list = []
         for asset in assets:
-            # 获取第一张图片
+            # 第一张图片：列表卡片使用缩略图（WebP），并提供与模板一致的 srcset
             image_url = None
+            image_original_url = None
+            image_srcset = ''
+            image_fallback_srcset = ''
             if asset.images and len(asset.images) > 0:
-                image_url = asset.images[0]
+                first_image = asset.images[0]
+                image_url = image_derivatives.thumbnail_url(first_image, asset.token_symbol) or first_image
+                image_original_url = upload_index.media_url(first_image, asset.token_symbol) or first_image
+                image_srcset = image_derivatives.srcset(first_image, asset.token_symbol, 'webp')
+                image_fallback_srcset = image_derivatives.srcset(first_image, asset.token_symbol)
             
             # 获取资产类型名称
             asset_type_name = '其他'
@@ -132,6 +153,9 @@ def list_assets():
                 'annual_revenue': float(asset.annual_revenue) if asset.annual_revenue else 0,
                 'images': asset.images if asset.images else [],
                 'image_url': image_url,
+                'image_original_url': image_original_url,
+                'image_srcset': image_srcset,
+                'image_fallback_srcset': image_fallback_srcset,
                 'token_address': asset.token_address,
                 'creator_address': asset.creator_address,
                 'created_at': asset.created_at.strftime('%Y-%m-%d %H:%M:%S'),
@@ -145,6 +169,7 @@ def list_assets():
         
     except Exception as e:
         current_app.logger.error(f"获取资产列表失败: {str(e)}", exc_info=True)
+        skip_response_cache()
         return jsonify([]), 200
 
 @api_bp.route('/user/assets', methods=['GET'])
@@ -464,6 +489,7 @@ def get_trade_history():
         }), 500
 
 @api_bp.route('/v2/trades/<string:asset_identifier>', methods=['GET'])
+@cache_response(tags=('trades',))
 def get_trade_history_v2(asset_identifier):
     """获取资产交易历史 - V2版本，支持RESTful风格URL"""
     try:
@@ -555,6 +581,7 @@ def get_trade_history_v2(asset_identifier):
         }), 500
 
 @api_bp.route('/assets/symbol/<string:symbol>', methods=['GET'])
+@cache_response(tags=('assets',))
 def get_asset_by_symbol(symbol):
     """通过代币符号获取资产详情"""
     try:
@@ -978,6 +1005,7 @@ def get_dividend_stats_api(asset_id):
 
 
 @api_bp.route('/assets/<string:token_symbol>/dividends/total')
+@cache_response(tags=('assets', 'dividends'))
 def get_asset_dividends_total(token_symbol):
     """获取资产分红总额 - 兼容前端asset_detail.js调用的路径"""
     try:
@@ -1003,6 +1031,7 @@ def get_asset_dividends_total(token_symbol):
             current_app.logger.warning(f"无法从DividendRecord计算分红，使用默认值: {str(e)}")
             # 如果分红表不存在或有问题，返回0
             total_amount = 0
+            skip_response_cache()
         
         current_app.logger.info(f"资产 {token_symbol} 的总分红金额: {total_amount}")
         
@@ -1249,6 +1278,7 @@ def fix_asset_total_values():
         }), 500
 
 @api_bp.route('/payment/config', methods=['GET'])
+@cache_response(tags=('config',), max_age=60)
 def get_payment_config():
     """获取支付配置 - 兼容路由"""
     try:
@@ -1267,13 +1297,13 @@ def get_payment_config():
 def get_random_share_message():
     """获取随机分享消息"""
     try:
-        from app.models.share_message import ShareMessage
+        from app.services.share_message_pool import share_message_pool
         
         # 获取消息类型参数，默认为分享内容
         message_type = request.args.get('type', 'share_content')
         
-        # 获取随机消息
-        message = ShareMessage.get_random_message(message_type)
+        # 获取随机消息（进程内消息池，不查询数据库）
+        message = share_message_pool.pick(message_type)
         
         return jsonify({
             'success': True,
@@ -1292,10 +1322,10 @@ def get_random_share_message():
 def get_random_reward_plan():
     """获取随机奖励计划文案"""
     try:
-        from app.models.share_message import ShareMessage
+        from app.services.share_message_pool import share_message_pool
         
         # 获取奖励计划类型的随机消息
-        message = ShareMessage.get_random_message('reward_plan')
+        message = share_message_pool.pick('reward_plan')
         
         return jsonify({
             'success': True,
@@ -1353,6 +1383,7 @@ def create_shortlink():
         return jsonify({'success': False, 'error': f'创建短链接失败: {str(e)}'}), 500
 
 @api_bp.route('/share-config', methods=['GET'])
+@cache_response(tags=('config',), max_age=60)
 def get_share_config():
     """获取分享配置（前端调用）"""
     try:
@@ -31,6 +31,9 @@ import qrcode
 from io import BytesIO
 from threading import Thread
 
+# 带内容哈希的上传文件缓存时间（一年）
+MEDIA_MAX_AGE = 31536000
+
 # 页面路由
 @assets_bp.route("/")
 def list_assets_page():
@@ -120,18 +123,18 @@ def asset_detail_page(asset_id):
 def asset_detail_by_symbol(token_symbol):
     """资产详情页面 - 使用token_symbol"""
     try:
-        # 添加更详细的日志
-        current_app.logger.info(f'[DETAIL_PAGE_START] 访问资产详情页面，Token Symbol: {token_symbol}')
-        current_app.logger.info(f'[DETAIL_PAGE_DEBUG] URL路径: {request.path}, User-Agent: {request.headers.get("User-Agent")}')
+        from markupsafe import Markup
+        from app.services.asset_detail_cache import asset_detail_cache
+
+        current_app.logger.debug(f'[DETAIL_PAGE_START] 访问资产详情页面，Token Symbol: {token_symbol}')
         
-        # 获取资产信息
-        asset = Asset.query.filter_by(token_symbol=token_symbol).first()
-        if not asset:
+        # 与用户无关的部分使用缓存的片段
+        cached = asset_detail_cache.get(token_symbol)
+        if not cached:
             current_app.logger.error(f'[DETAIL_PAGE_ERROR] 资产不存在: {token_symbol}')
             flash(_('Asset not found'), 'danger')
             return render_template('error.html', error=_('Asset not found')), 404
-            
-        current_app.logger.info(f'[DETAIL_PAGE_DEBUG] 找到资产: ID={asset.id}, 名称={asset.name}, 状态={asset.status}')
+        asset = cached['asset']
         
         # 获取用户钱包地址
         current_user_address = get_eth_address()
@@ -148,7 +151,7 @@ def asset_detail_by_symbol(token_symbol):
                         user_address=current_user_address,
                         referrer_address=referrer,
                         referral_time=datetime.now(),
-                        asset_id=asset.id,
+                        asset_id=asset['id'],
                         status='active'
                     )
                     db.session.add(new_referral)
@@ -162,50 +165,20 @@ def asset_detail_by_symbol(token_symbol):
         
         # 检查是否是资产所有者
         is_owner = False
-        if current_user_address and asset.owner_address:
-            if current_user_address.startswith('0x') and asset.owner_address.startswith('0x'):
-                is_owner = current_user_address.lower() == asset.owner_address.lower()
+        owner_address = asset['owner_address']
+        if current_user_address and owner_address:
+            if current_user_address.startswith('0x') and owner_address.startswith('0x'):
+                is_owner = current_user_address.lower() == owner_address.lower()
             else:
-                is_owner = current_user_address == asset.owner_address
-            
-        # 计算剩余供应量
-        if asset.remaining_supply is not None:
-            remaining_supply = asset.remaining_supply
-        else:
-            remaining_supply = asset.token_supply
-        
-        # 获取资产累计分红数据
-        total_dividends = 0
-        try:
-            # 直接使用SQL查询，避免payment_token字段不存在的问题
-            sql = text("SELECT SUM(amount) FROM dividends WHERE asset_id = :asset_id AND status = 'confirmed'")
-            result = db.session.execute(sql, {"asset_id": asset.id}).fetchone()
-            total_dividends = result[0] if result[0] else 0
-        except Exception as div_e:
-            current_app.logger.error(f'[DETAIL_PAGE_DIVIDEND_ERROR] 获取累计分红数据失败: {str(div_e)}')
-        
-        # 获取分红记录数量，用于决定是否显示分红信息模块
-        dividend_records_count = 0
-        try:
-            from app.models.dividend import DividendRecord
-            dividend_records_count = DividendRecord.get_count_by_asset(asset.id)
-        except Exception as dividend_count_e:
-            current_app.logger.error(f'[DETAIL_PAGE_DIVIDEND_COUNT_ERROR] 获取分红记录数量失败: {str(dividend_count_e)}')
+                is_owner = current_user_address == owner_address
 
-        # Log right before rendering
-        current_app.logger.info(f'[DETAIL_PAGE_RENDER_START] 准备渲染模板 detail.html for {token_symbol}.')
         context = {
             'asset': asset,
-            'remaining_supply': remaining_supply,
+            'fragments': {name: Markup(html) for name, html in cached['fragments'].items()},
             'is_owner': is_owner,
             'is_admin_user': is_admin_user,
             'current_user_address': current_user_address,
-            'total_dividends': total_dividends,
-            'dividend_records_count': dividend_records_count,
-            'platform_fee_address': ConfigManager.get_platform_fee_address(),
-            'PLATFORM_FEE_RATE': getattr(Config, 'PLATFORM_FEE_RATE', 0.035)
         }
-        current_app.logger.info(f'[DETAIL_PAGE_CONTEXT] Context keys: {list(context.keys())}')
 
         # 直接返回渲染的HTML，避免任何重定向
         return render_template('assets/detail.html', **context)
@@ -343,83 +316,19 @@ def proxy_image(image_path):
         import os
         from flask import send_file, current_app, request, abort
         
-        current_app.logger.info(f"请求代理图片: {image_path}")
+        current_app.logger.debug(f"请求代理图片: {image_path}")
         
         # 正常化路径 (移除多余的斜杠)
         image_path = os.path.normpath(image_path)
+        token_symbol = request.args.get('token', '')
         
-        # 列出尝试的所有路径，用于调试
-        search_paths = []
-        
-        # 检查image_path是否包含完整的路径信息
-        if image_path.startswith('uploads/'):
-            file_path = os.path.join(current_app.static_folder, image_path)
-            search_paths.append(file_path)
-        elif image_path.startswith('projects/'):
-            file_path = os.path.join(current_app.static_folder, 'uploads', image_path)
-            search_paths.append(file_path)
-        elif '/' in image_path:
-            # 可能是旧格式路径，如: 10/temp/image/filename.jpg
-            file_path = os.path.join(current_app.static_folder, 'uploads', image_path)
-            search_paths.append(file_path)
-            
-            # 尝试在projects目录下查找
-            if 'temp/image' in image_path:
-                filename = os.path.basename(image_path)
-                token_symbol = request.args.get('token', '')
-                if token_symbol:
-                    projects_path = os.path.join(current_app.static_folder, 'uploads', 'projects', token_symbol, 'images', filename)
-                    search_paths.append(projects_path)
-        else:
-            # 单一文件名，尝试在多个位置查找
-            filename = image_path
-            token_symbol = request.args.get('token', '')
-            
-            # 尝试的路径列表
-            possible_paths = []
-            
-            # 如果提供了token_symbol, 首先在该token的专属目录查找
-            if token_symbol:
-                possible_paths.append(os.path.join(current_app.static_folder, 'uploads', 'projects', token_symbol, 'images', filename))
-            
-            # 其他可能的路径
-            possible_paths.extend([
-                os.path.join(current_app.static_folder, 'uploads', '10', 'temp', 'image', filename),
-                os.path.join(current_app.static_folder, 'uploads', '20', 'temp', 'image', filename),
-                os.path.join(current_app.static_folder, 'uploads', 'temp', 'images', filename),
-                os.path.join(current_app.static_folder, 'uploads', 'projects', 'temp', 'images', filename)
-            ])
-            
-            search_paths.extend(possible_paths)
-            
-            # 查找第一个存在的文件
-            for path in possible_paths:
-                if os.path.isfile(path):
-                    file_path = path
-                    break
-            else:
-                current_app.logger.warning(f"找不到图片: {image_path}")
-                current_app.logger.warning(f"尝试的路径: {search_paths}")
-                abort(404)
-        
-        current_app.logger.info(f"尝试提供文件: {file_path}")
-        
-        # 检查文件是否存在
-        if not os.path.isfile(file_path):
-            current_app.logger.warning(f"文件不存在: {file_path}")
-            
-            # 搜索整个uploads目录
-            import glob
-            filename = os.path.basename(image_path)
-            global_search = glob.glob(os.path.join(current_app.static_folder, 'uploads', '**', filename), recursive=True)
-            
-            if global_search:
-                file_path = global_search[0]
-                current_app.logger.info(f"全局搜索找到文件: {file_path}")
-            else:
-                current_app.logger.warning(f"尝试的所有路径: {search_paths}")
-                current_app.logger.warning(f"全局搜索未找到文件: {filename}")
-                abort(404)
+        # 通过上传文件索引定位：完整路径直接命中，
+        # 否则按文件名查找（提供token时优先该代币的项目目录）
+        from app.utils.upload_index import upload_index
+        file_path = upload_index.lookup(image_path, token_symbol or None)
+        if not file_path:
+            current_app.logger.warning(f"找不到图片: {image_path}")
+            abort(404)
         
         # 检查文件权限
         if not os.access(file_path, os.R_OK):
@@ -430,13 +339,11 @@ def proxy_image(image_path):
         import mimetypes
         mime_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
         
-        # 禁用浏览器缓存
-        response = send_file(file_path, mimetype=mime_type)
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
+        # 地址不含内容哈希，浏览器每次用ETag重新验证（未变化时返回304），支持Range请求
+        response = send_file(file_path, mimetype=mime_type, conditional=True,
+                             etag=upload_index.digest(file_path), max_age=0)
         
-        current_app.logger.info(f"成功代理图片: {image_path} -> {file_path}")
+        current_app.logger.debug(f"成功代理图片: {image_path} -> {file_path}")
         return response
         
     except Exception as e:
@@ -445,6 +352,29 @@ def proxy_image(image_path):
         current_app.logger.warning(traceback.format_exc())
         abort(500)
 
+@assets_bp.route('/media/<digest>/<path:image_path>')
+def media_file(digest, image_path):
+    """
+    按内容哈希提供上传文件，地址随内容变化，可被浏览器和CDN永久缓存
+    """
+    from app.utils.upload_index import upload_index
+
+    image_path = os.path.normpath(image_path)
+    file_path = upload_index.lookup(image_path)
+    if not file_path or file_path != os.path.join(upload_index.root, image_path):
+        abort(404)
+
+    current = upload_index.digest(file_path)
+    if current != digest:
+        # 文件内容已变化，跳转到新地址
+        return redirect(url_for('assets.media_file', digest=current, image_path=image_path))
+
+    mime_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+    response = send_file(file_path, mimetype=mime_type, conditional=True, etag=digest,
+                         max_age=MEDIA_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+    return response
+
 @assets_api_bp.route('/generate-token-symbol', methods=['POST'])
 def generate_token_symbol():
     """生成代币代码"""
@@ -586,11 +516,11 @@ def upload_images():
             current_app.logger.error('文件无效')
             return jsonify({'success': False, 'message': '文件无效'}), 400
             
-        # 检查文件大小
-        file_content = file.read()
+        # 检查文件大小（上传内容已由werkzeug缓存到临时文件，定位到末尾即可得到大小，不读入内存）
+        file.seek(0, os.SEEK_END)
+        file_size = file.tell()
         file.seek(0)  # 重置文件指针
         
-        file_size = len(file_content)
         if file_size > 5 * 1024 * 1024:  # 5MB
             current_app.logger.error(f'文件太大: {file_size / (1024 * 1024):.2f}MB')
             return jsonify({'success': False, 'message': f'文件大小超过限制（最大5MB），当前大小: {file_size / (1024 * 1024):.2f}MB'}), 413
@@ -639,7 +569,7 @@ def upload_images():
                 
         # 保存文件
         try:
-            file_urls = save_files([file], asset_type, asset_id, token_symbol)
+            file_urls = save_files([file], asset_type, asset_id, token_symbol, max_size=5 * 1024 * 1024)
             
             if not file_urls:
                 current_app.logger.error('文件上传保存失败')
@@ -880,12 +810,12 @@ def get_eth_address():
     eth_address_g = g.eth_address if hasattr(g, 'eth_address') else None
     eth_address_arg = request.args.get('eth_address')
     
-    current_app.logger.info('钱包地址来源:')
-    current_app.logger.info(f'- Header: {eth_address_header}')
-    current_app.logger.info(f'- Cookie: {eth_address_cookie}')
-    current_app.logger.info(f'- Session: {eth_address_session}')
-    current_app.logger.info(f'- g对象: {eth_address_g}')
-    current_app.logger.info(f'- URL参数: {eth_address_arg}')
+    current_app.logger.debug('钱包地址来源:')
+    current_app.logger.debug(f'- Header: {eth_address_header}')
+    current_app.logger.debug(f'- Cookie: {eth_address_cookie}')
+    current_app.logger.debug(f'- Session: {eth_address_session}')
+    current_app.logger.debug(f'- g对象: {eth_address_g}')
+    current_app.logger.debug(f'- URL参数: {eth_address_arg}')
     
     # 按优先级获取钱包地址
     eth_address = eth_address_header or eth_address_cookie or eth_address_session or eth_address_g or eth_address_arg
@@ -899,7 +829,7 @@ def get_eth_address():
             eth_address = eth_address.lower()
         # SOL地址保持原样，因为它是大小写敏感的
         
-        current_app.logger.info(f'最终使用地址: {eth_address}')
+        current_app.logger.debug(f'最终使用地址: {eth_address}')
     
     return eth_address
 
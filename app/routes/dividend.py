@@ -69,20 +69,72 @@ def check_permission(token_symbol):
 
 @bp.route('/api/dividend/distribute/<string:token_symbol>', methods=['POST'])
 def distribute_dividend(token_symbol):
-    """发起分红"""
+    """发起分红：按当前持仓比例分配给全部持有人"""
     try:
-        return jsonify({'error': '分红功能暂未实现'}), 501
+        from app.services.dividend_distribution_engine import DividendDistributionEngine
+        
+        eth_address = request.headers.get('X-Eth-Address')
+        if not eth_address:
+            return jsonify({'error': '缺少钱包地址'}), 401
+        
+        asset = Asset.query.filter_by(token_symbol=token_symbol).first()
+        if not asset:
+            return jsonify({'error': '资产不存在'}), 404
+        
+        # 仅管理员或资产所有者可以发起分红
+        if not is_admin(eth_address) and not _is_asset_owner(eth_address, asset):
+            return jsonify({'error': '无权发起分红'}), 403
+        
+        data = request.get_json() or {}
+        amount = data.get('amount')
+        if amount is None:
+            return jsonify({'error': '缺少分红金额'}), 400
+        
+        try:
+            result = DividendDistributionEngine.distribute(
+                asset_id=asset.id,
+                amount=amount,
+                distributor_address=eth_address,
+                interval=int(data.get('interval', 0)),
+                source='chain' if data.get('source') == 'chain' else 'holdings'
+            )
+        except (ValueError, ArithmeticError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'success': True, 'data': result})
     except Exception as e:
+        current_app.logger.error(f"发起分红出错: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/api/dividend/claimable/<string:token_symbol>')
 def get_claimable_dividend(token_symbol):
     """获取可领取的分红金额"""
     try:
-        return jsonify({'amount': 0})
+        from app.services.dividend_distribution_engine import DividendDistributionEngine
+        
+        address = request.args.get('address') or request.headers.get('X-Eth-Address')
+        if not address:
+            return jsonify({'amount': 0})
+        
+        asset = Asset.query.filter_by(token_symbol=token_symbol).first()
+        if not asset:
+            return jsonify({'amount': 0})
+        
+        amount = DividendDistributionEngine.get_claimable(address, asset.id)
+        return jsonify({'amount': float(amount)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _is_asset_owner(address, asset):
+    """判断地址是否为资产所有者"""
+    if not asset or not asset.owner_address:
+        return False
+    # 对ETH地址（0x开头）忽略大小写比较
+    if address.startswith('0x') and asset.owner_address.startswith('0x'):
+        return address.lower() == asset.owner_address.lower()
+    # 对SOL地址严格区分大小写
+    return address == asset.owner_address
+
 @bp.route('/api/dividend/withdraw', methods=['POST'])
 def withdraw_dividend():
     """申请提现分红"""
@@ -227,6 +227,36 @@ def task_stats():
             'error': f'Failed to get task stats: {str(e)}'
         }), 500
 
+@health_bp.route('/scheduler', methods=['GET'])
+def scheduler_stats():
+    """获取定时任务主节点状态和任务执行指标"""
+    try:
+        from app.services.scheduler_leader import get_leader_elector, job_metrics
+        
+        local_metrics = job_metrics.get_local()
+        shared_metrics = {}
+        for job_id in ('monitor_payments', 'auto_monitor_all_assets', 'commission_automation'):
+            metrics = job_metrics.get_shared(job_id)
+            if metrics:
+                shared_metrics[job_id] = metrics
+        
+        from app.services.adaptive_polling import get_adaptive_jobs_status
+        from app.tasks import PIPELINE_DEPTHS_CACHE_KEY
+        
+        return jsonify({
+            'leader': get_leader_elector().status(),
+            'local_job_metrics': local_metrics,
+            'leader_job_metrics': shared_metrics,
+            'adaptive_jobs': get_adaptive_jobs_status(),
+            'asset_pipeline_depths': get_cache().get(PIPELINE_DEPTHS_CACHE_KEY)
+        })
+        
+    except Exception as e:
+        logger.error(f"Failed to get scheduler stats: {e}")
+        return jsonify({
+            'error': f'Failed to get scheduler stats: {str(e)}'
+        }), 500
+
 @health_bp.route('/ready', methods=['GET'])
 def readiness_check():
     """就绪检查端点 - 用于负载均衡器"""
@@ -1,18 +1,26 @@
 import os
-import time
-import requests
 import mimetypes
-from flask import current_app, send_file, abort, make_response, Response
+from flask import current_app, send_file, abort
+from werkzeug.exceptions import HTTPException
 from . import proxy_bp
 from urllib.parse import urlparse
+from app.services.proxy_cache import ProxyCache, UpstreamError
 
 # 缓存目录
 CACHE_DIR = os.path.join(os.getcwd(), "app/static/vendor")
 
+# 外部资源缓存目录及容量上限
+EXTERNAL_CACHE_DIR = os.path.join(os.getcwd(), "app/cache/proxy_external")
+EXTERNAL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
 # 确保缓存目录存在
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
+# 供应商文件24小时后在后台重新验证；外部资源缓存按LRU限制磁盘占用
+vendor_cache = ProxyCache(CACHE_DIR, ttl=86400, hashed_keys=False)
+external_cache = ProxyCache(EXTERNAL_CACHE_DIR, ttl=86400, max_bytes=EXTERNAL_CACHE_MAX_BYTES)
+
 # 缓存URL映射，将外部URL映射到本地文件
 VENDOR_MAPPING = {
     # Solana相关库
@@ -54,31 +62,25 @@ VENDOR_MAPPING = {
 def proxy_external(url):
     """代理外部URL的内容"""
     try:
-        current_app.logger.info(f"代理外部URL: {url}")
+        current_app.logger.debug(f"代理外部URL: {url}")
         
         # 检查安全性 - 防止恶意URL
         parsed_url = urlparse(url)
-        if not parsed_url.scheme or not parsed_url.netloc:
+        if parsed_url.scheme not in ('http', 'https') or not parsed_url.netloc:
             current_app.logger.error(f"无效的URL格式: {url}")
             abort(400)
         
-        # 发送请求获取资源
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            current_app.logger.error(f"获取外部资源失败: {url}, 状态码: {response.status_code}")
-            abort(response.status_code)
-        
-        # 处理内容类型
-        content_type = response.headers.get("Content-Type", "application/octet-stream")
-        
-        # 创建响应
-        resp = make_response(response.content)
-        resp.headers["Content-Type"] = content_type
-        resp.headers["Cache-Control"] = "public, max-age=86400"  # 缓存1天
+        # 从磁盘缓存获取资源（未命中时下载，过期时后台刷新）
+        try:
+            entry = external_cache.get(url, url)
+        except UpstreamError as e:
+            current_app.logger.error(f"获取外部资源失败: {url}, 状态码: {e.status_code}")
+            abort(e.status_code if 400 <= e.status_code < 600 else 502)
         
-        current_app.logger.info(f"成功代理外部资源: {url}")
-        return resp
+        return send_file(entry.path, mimetype=entry.content_type, conditional=True, max_age=86400)  # 缓存1天
         
+    except HTTPException:
+        raise
     except Exception as e:
         current_app.logger.error(f"代理外部资源出错: {str(e)}")
         abort(500)
@@ -87,61 +89,26 @@ def proxy_external(url):
 def cached_vendor(filename):
     """提供缓存的第三方库文件"""
     try:
-        current_app.logger.info(f"请求缓存的供应商文件: {filename}")
+        current_app.logger.debug(f"请求缓存的供应商文件: {filename}")
         
         # 检查文件是否在映射中
         if filename not in VENDOR_MAPPING:
             current_app.logger.error(f"未知的供应商文件: {filename}")
             abort(404)
         
-        filepath = os.path.join(CACHE_DIR, filename)
-        external_url = VENDOR_MAPPING[filename]
-        
-        # 检查文件是否已缓存且未过期（24小时）
-        is_cached = os.path.exists(filepath)
-        is_expired = False
-        
-        if is_cached:
-            # 检查文件是否过期（超过24小时）
-            file_time = os.path.getmtime(filepath)
-            current_time = time.time()
-            is_expired = (current_time - file_time) > 86400  # 24小时 = 86400秒
-        
-        # 如果文件不存在或已过期，下载它
-        if not is_cached or is_expired:
-            current_app.logger.info(f"下载供应商文件: {filename} 从 {external_url}")
-            
-            try:
-                response = requests.get(external_url, timeout=10)
-                if response.status_code == 200:
-                    # 确保目录存在
-                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                    
-                    # 保存文件内容
-                    with open(filepath, "wb") as f:
-                        # Font Awesome CSS已经本地存储，无需在这里处理
-                        f.write(response.content)
-                    
-                    current_app.logger.info(f"成功下载并缓存: {filename}")
-                else:
-                    current_app.logger.error(f"下载失败 {filename}: {response.status_code}")
-                    
-                    # 如果文件已经存在，使用现有文件（即使已过期）
-                    if not is_cached:
-                        abort(response.status_code)
-            except Exception as e:
-                current_app.logger.error(f"下载 {filename} 时出错: {str(e)}")
-                
-                # 如果文件已经存在，使用现有文件（即使已过期）
-                if not is_cached:
-                    abort(500)
+        # 已缓存的文件直接提供，超过24小时的在后台重新验证，不阻塞当前请求
+        try:
+            entry = vendor_cache.get(filename, VENDOR_MAPPING[filename])
+        except UpstreamError as e:
+            current_app.logger.error(f"下载失败 {filename}: {e.status_code}")
+            abort(e.status_code if 400 <= e.status_code < 600 else 502)
         
         # 提供文件
-        content_type = mimetypes.guess_type(filepath)[0] or "application/octet-stream"
-        
-        current_app.logger.info(f"提供缓存的供应商文件: {filename}, 类型: {content_type}")
-        return send_file(filepath, mimetype=content_type, max_age=86400)
+        content_type = mimetypes.guess_type(entry.path)[0] or "application/octet-stream"
+        return send_file(entry.path, mimetype=content_type, conditional=True, max_age=86400)
         
+    except HTTPException:
+        raise
     except Exception as e:
         current_app.logger.error(f"提供缓存的供应商文件出错: {str(e)}")
         abort(500)
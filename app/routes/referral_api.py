@@ -170,6 +170,51 @@ def calculate_commission():
         }), 500
 
 
+@referral_bp.route('/commission/simulate', methods=['POST'])
+def simulate_commission():
+    """按历史交易模拟佣金配置变更"""
+    try:
+        from datetime import datetime, timedelta
+        from app.services.commission_simulation import CommissionSimulationEngine
+
+        data = request.get_json() or {}
+        days = int(data.get('days', 365))
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+
+        # commission_rate 为百分比（如35），platform_rate 为小数（如0.2），与后台配置一致
+        scenarios = data.get('scenarios')
+        if not scenarios:
+            scenarios = [{
+                key: data[key] for key in ('commission_rate', 'platform_rate') if key in data
+            }]
+
+        result = CommissionSimulationEngine().compare_scenarios(
+            scenarios,
+            start_date=start_date,
+            end_date=end_date,
+            top_n=int(data.get('top_n', 10))
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'message': '佣金模拟完成'
+        })
+
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'参数错误: {e}'
+        }), 400
+    except Exception as e:
+        logger.error(f"佣金模拟失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': '服务器内部错误'
+        }), 500
+
+
 @referral_bp.route('/link/statistics/<address>', methods=['GET'])
 def get_link_statistics(address):
     """获取链接统计"""
@@ -197,6 +242,7 @@ def track_link_click(referral_code):
         visitor_info = {
             'ip': request.remote_addr,
             'user_agent': request.headers.get('User-Agent'),
+            'referer': request.referrer,
             'timestamp': request.json.get('timestamp') if request.json else None
         }
         
@@ -238,6 +238,37 @@ def make_rpc_request(method, params=None, node_url=None, retry=2):
         
         return {"success": False, "error": f"请求异常: {str(e)}"}
 
+def _cached_rpc_request(kind, address, mint, method, params, watch=True):
+    """
+    带代币账户缓存的RPC读取，结果格式与make_rpc_request一致
+
+    Args:
+        kind: 缓存数据类型
+        address: 缓存所属地址（钱包或代币账户）
+        mint: 代币Mint地址，没有时为None
+        method: RPC方法名
+        params: 请求参数
+        watch: 是否订阅该地址的账户变化（地址本身就是被读取的账户时才有意义）
+    """
+    from app.services.token_account_cache import get_token_account_cache, rpc_context_slot
+
+    failure = {}
+
+    def _load():
+        result = make_rpc_request(method, params)
+        if not result["success"]:
+            failure.update(result)
+            return None
+        return result["result"], rpc_context_slot(result["result"])
+
+    cache = get_token_account_cache()
+    value = cache.get_or_load(kind, address, mint, _load)
+    if value is None:
+        return failure or {"success": False, "error": "RPC请求失败"}
+    if watch:
+        cache.watch(address)
+    return {"success": True, "result": value}
+
 @solana_api.before_request
 def before_request():
     """记录请求开始时间"""
@@ -544,8 +575,9 @@ def get_token_accounts():
             {"encoding": "jsonParsed", "commitment": "confirmed"}
         ]
         
-        # 获取所有代币账户
-        result = make_rpc_request("getTokenAccountsByOwner", params)
+        # 获取所有代币账户（按owner缓存，平台交易确认后失效）
+        result = _cached_rpc_request("token_accounts", owner, None, "getTokenAccountsByOwner", params,
+                                     watch=False)
         
         if result["success"]:
             try:
@@ -696,7 +728,8 @@ def get_token_balance():
             return jsonify({"success": False, "error": "缺少address参数"}), 400
         
         # 获取代币余额
-        result = make_rpc_request(
+        result = _cached_rpc_request(
+            "token_account_balance", address, None,
             "getTokenAccountBalance",
             [address, {"commitment": "confirmed"}]
         )
@@ -734,7 +767,8 @@ def check_ata_exists():
             logger.info(f"检查ATA地址是否存在: {ata_address}")
             
             # 使用getAccountInfo检查账户是否存在
-            result = make_rpc_request(
+            result = _cached_rpc_request(
+                "account_info", ata_address, None,
                 "getAccountInfo",
                 [ata_address, {"encoding": "base64"}]
             )
@@ -787,7 +821,7 @@ def get_transactions():
         offset = request.args.get('offset', 0, type=int)
         
         # 从日志中读取交易记录
-        transactions = log_reader.get_transaction_logs(
+        transactions, total = log_reader.get_transaction_logs(
             days_ago=days, 
             limit=limit,
             offset=offset
@@ -797,7 +831,7 @@ def get_transactions():
             'status': 'success',
             'data': transactions,
             'count': len(transactions),
-            'total': log_reader.count_transaction_logs(days_ago=days)
+            'total': total
         })
     except Exception as e:
         return jsonify({
@@ -814,7 +848,7 @@ def get_api_logs():
         offset = request.args.get('offset', 0, type=int)
         
         # 从日志中读取API调用记录
-        api_logs = log_reader.get_api_logs(
+        api_logs, total = log_reader.get_api_logs(
             days_ago=days, 
             limit=limit,
             offset=offset
@@ -824,7 +858,7 @@ def get_api_logs():
             'status': 'success',
             'data': api_logs,
             'count': len(api_logs),
-            'total': log_reader.count_api_logs(days_ago=days)
+            'total': total
         })
     except Exception as e:
         return jsonify({
@@ -841,7 +875,7 @@ def get_error_logs():
         offset = request.args.get('offset', 0, type=int)
         
         # 从日志中读取错误记录
-        error_logs = log_reader.get_error_logs(
+        error_logs, total = log_reader.get_error_logs(
             days_ago=days, 
             limit=limit,
             offset=offset
@@ -851,7 +885,7 @@ def get_error_logs():
             'status': 'success',
             'data': error_logs,
             'count': len(error_logs),
-            'total': log_reader.count_error_logs(days_ago=days)
+            'total': total
         })
     except Exception as e:
         return jsonify({
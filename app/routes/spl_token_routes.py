@@ -182,6 +182,32 @@ def get_user_token_balance(user_address, mint_address):
         return error_response('INTERNAL_ERROR', f'Internal server error: {str(e)}')
 
 
+@spl_token_bp.route('/api/spl-token/overview/<user_address>/<mint_address>', methods=['GET'])
+@limiter.limit("30 per minute")
+def get_wallet_token_overview(user_address, mint_address):
+    """
+    获取钱包SOL余额、关联代币账户状态和代币供应量（并发查询）
+
+    Path Parameters:
+        user_address (str): 用户钱包地址
+        mint_address (str): Token mint地址
+
+    Returns:
+        json: 钱包代币概览
+    """
+    try:
+        result = SplTokenService.get_wallet_token_overview(user_address, mint_address)
+
+        if result.get('success'):
+            return success_response(result.get('data'))
+        else:
+            return error_response(result.get('error'), result.get('message'))
+
+    except Exception as e:
+        logger.error(f"Get wallet token overview API error: {e}", exc_info=True)
+        return error_response('INTERNAL_ERROR', f'Internal server error: {str(e)}')
+
+
 @spl_token_bp.route('/api/admin/spl-token/status/<int:asset_id>', methods=['GET'])
 @limiter.limit("30 per minute")
 def get_asset_spl_status(asset_id):
@@ -445,6 +471,11 @@ def list_spl_tokens():
             Asset.spl_creation_status.isnot(None)
         ).order_by(Asset.created_at.desc()).all()
 
+        # 链上供应量并发查询，不再逐个资产串行请求
+        supplies = SplTokenService.get_token_supplies(
+            asset.spl_mint_address for asset in assets if asset.spl_mint_address
+        )
+
         tokens = []
         for asset in assets:
             token_data = {
@@ -460,10 +491,9 @@ def list_spl_tokens():
             }
 
             # 如果有mint地址，获取链上信息
-            if asset.spl_mint_address:
-                supply_result = SplTokenService.get_token_supply(asset.spl_mint_address)
-                if supply_result.get('success'):
-                    token_data['on_chain_supply'] = supply_result.get('data', {})
+            supply_result = supplies.get(asset.spl_mint_address)
+            if supply_result and supply_result.get('success'):
+                token_data['on_chain_supply'] = supply_result.get('data', {})
 
             tokens.append(token_data)
 
@@ -556,6 +586,31 @@ def get_holder_count(mint_address):
         return error_response(message=f"Failed to get: {str(e)}")
 
 
+@spl_token_bp.route('/api/spl-token/top-holders/<mint_address>', methods=['GET'])
+def get_top_holders(mint_address):
+    """获取持有量最高的持有人"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        limit = max(1, min(limit, 100))
+
+        result = SplTokenService.get_top_holders(mint_address, limit)
+
+        if result.get('success'):
+            return success_response(
+                data=result.get('data'),
+                message="Successfully retrieved"
+            )
+        else:
+            return error_response(
+                error_code=result.get('error', 'TOP_HOLDERS_ERROR'),
+                message=result.get('message', 'Failed to get')
+            )
+
+    except Exception as e:
+        logger.error(f"获取头部持有人API异常: {e}", exc_info=True)
+        return error_response(message=f"Failed to get: {str(e)}")
+
+
 @spl_token_bp.route('/api/spl-token/activity/<mint_address>', methods=['GET'])
 def get_token_activity(mint_address):
     """获取Token活动监控信息"""
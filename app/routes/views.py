@@ -6,7 +6,7 @@ from ..models import Asset
 from ..models.asset import AssetStatus
 from sqlalchemy import or_ as db_or
 from app.models.trade import Trade, TradeStatus
-from app.models import ShortLink
+from app.services.short_link_service import short_link_service
 import logging
 
 # 主页路由
@@ -65,18 +65,23 @@ def manage_assets():
 @main_bp.route('/s/<code>')
 def shortlink_redirect(code):
     """处理短链接重定向"""
-    short_link = ShortLink.query.filter_by(code=code).first()
+    short_link = short_link_service.resolve(code)
     
     if not short_link:
         flash('无效的短链接', 'error')
         return redirect(url_for('main.index'))
     
-    if short_link.is_expired():
+    if short_link_service.is_expired(short_link):
         flash('此链接已过期', 'error')
         return redirect(url_for('main.index'))
     
-    # 增加点击计数
-    short_link.increment_click()
+    # 增加点击计数（内存累加，后台批量写入）
+    short_link_service.record_click(
+        short_link,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
+        referer=request.referrer
+    )
     
     # 重定向到原始URL
-    return redirect(short_link.original_url) 
+    return redirect(short_link['original_url'])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+自适应轮询间隔
+周期任务返回本轮看到的待处理队列深度：有积压时缩短间隔尽快消化，
+空闲时按倍数退避到较长的空闲间隔，避免无事可做时反复查询数据库。
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePollingJob:
+    """
+    包装APScheduler的interval任务，根据每次执行的结果重新设置执行间隔
+
+    任务函数返回 {队列名: 深度} 字典；任一深度大于0视为有积压。
+    返回None（例如非主节点跳过执行）时恢复默认间隔。
+    """
+
+    def __init__(self, scheduler, job_id: str, func: Callable[[], Optional[Dict[str, int]]],
+                 busy_seconds: int = 30, default_seconds: int = 300,
+                 idle_seconds: int = 900, backoff_factor: float = 2.0):
+        """
+        Args:
+            scheduler: APScheduler调度器
+            job_id: 任务ID
+            func: 任务函数，返回队列深度字典
+            busy_seconds: 有积压时的间隔
+            default_seconds: 默认间隔（未知状态时使用）
+            idle_seconds: 空闲时退避的最长间隔
+            backoff_factor: 每次空闲执行后间隔的放大倍数
+        """
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.func = func
+        self.busy_seconds = busy_seconds
+        self.default_seconds = default_seconds
+        self.idle_seconds = idle_seconds
+        self.backoff_factor = backoff_factor
+        self.current_seconds = default_seconds
+        self._gauges: Dict[str, int] = {}
+        self._last_run_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        depths = self.func()
+        with self._lock:
+            self._last_run_at = datetime.utcnow()
+            if depths is not None:
+                self._gauges = dict(depths)
+            next_seconds = self.next_interval(depths)
+            changed = next_seconds != self.current_seconds
+            self.current_seconds = next_seconds
+
+        if changed:
+            self._reschedule(next_seconds)
+        return depths
+
+    def next_interval(self, depths: Optional[Dict[str, int]]) -> int:
+        """根据队列深度计算下一次执行间隔（秒）"""
+        if depths is None:
+            return self.default_seconds
+        if any(depth > 0 for depth in depths.values()):
+            return self.busy_seconds
+        # 空闲：从当前间隔按倍数退避，至少从busy间隔开始
+        return int(min(self.idle_seconds, max(self.busy_seconds, self.current_seconds) * self.backoff_factor))
+
+    def _reschedule(self, seconds: int) -> None:
+        try:
+            if self.scheduler.get_job(self.job_id):
+                self.scheduler.reschedule_job(self.job_id, trigger='interval', seconds=seconds)
+                logger.info(f"任务 {self.job_id} 执行间隔调整为 {seconds} 秒")
+        except Exception as e:
+            logger.warning(f"调整任务 {self.job_id} 执行间隔失败: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        """当前间隔和最近一次看到的队列深度"""
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'interval_seconds': self.current_seconds,
+                'queue_depths': dict(self._gauges),
+                'last_run_at': self._last_run_at.isoformat() if self._last_run_at else None
+            }
+
+
+# 已注册的自适应任务，供健康检查接口读取
+_adaptive_jobs: Dict[str, AdaptivePollingJob] = {}
+
+
+def register_adaptive_job(scheduler, job_id: str, func: Callable, **kwargs) -> AdaptivePollingJob:
+    """创建并登记自适应任务（不添加到调度器）
+
+    Returns:
+        AdaptivePollingJob: 可直接作为APScheduler任务函数使用
+    """
+    job = _adaptive_jobs.get(job_id)
+    if job is None:
+        job = _adaptive_jobs[job_id] = AdaptivePollingJob(scheduler, job_id, func, **kwargs)
+    return job
+
+
+def get_adaptive_jobs_status() -> Dict[str, Dict[str, Any]]:
+    """全部自适应任务的状态"""
+    return {job_id: job.status() for job_id, job in _adaptive_jobs.items()}
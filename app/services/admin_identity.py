@@ -0,0 +1,226 @@
+"""
+管理员身份缓存
+
+管理员鉴权装饰器每次请求都要根据钱包地址查询 admin_users。
+解析结果缓存在当前会话（会话鉴权）或进程内（请求头鉴权）中，短TTL过期；
+管理员记录增删改提交后递增共享缓存中的代数，各进程在几秒内丢弃旧的身份。
+"""
+
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from flask import g, has_request_context, session
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.models.admin import AdminUser
+
+logger = logging.getLogger(__name__)
+
+# 身份缓存有效期（秒）
+IDENTITY_TTL = 60
+
+# 进程内读取共享代数的间隔（秒）
+GENERATION_CHECK_INTERVAL = 5
+
+GENERATION_CACHE_KEY = 'admin_identity:generation'
+SESSION_KEY = 'admin_identity'
+
+# 进程内缓存的最大条目数（请求头鉴权的地址数）
+LOCAL_CACHE_MAX = 256
+
+
+class AdminIdentity:
+    """已解析的管理员身份，提供鉴权装饰器用到的 AdminUser 属性和方法"""
+
+    def __init__(self, id: int, wallet_address: str, username: Optional[str], role: str,
+                 permissions: Optional[List[str]] = None):
+        self.id = id
+        self.wallet_address = wallet_address
+        self.username = username
+        self.role = role
+        self.permissions = permissions or []
+
+    @classmethod
+    def from_model(cls, admin: AdminUser) -> 'AdminIdentity':
+        try:
+            permissions = json.loads(admin.permissions) if admin.permissions else []
+        except (TypeError, ValueError):
+            permissions = []
+        return cls(admin.id, admin.wallet_address, admin.username, admin.role, permissions)
+
+    def has_permission(self, permission: str) -> bool:
+        """检查是否拥有指定权限"""
+        return permission in self.permissions
+
+    def is_super_admin(self) -> bool:
+        """检查是否为超级管理员"""
+        return self.role == 'super_admin'
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'wallet_address': self.wallet_address,
+            'username': self.username,
+            'role': self.role,
+            'permissions': self.permissions,
+        }
+
+
+class _Generation:
+    """共享缓存中的管理员数据代数，进程内按固定间隔刷新"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = None
+        self._checked_at = 0.0
+
+    def current(self):
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < GENERATION_CHECK_INTERVAL:
+            return self._value
+        with self._lock:
+            try:
+                from app.services.cache_service import get_cache
+                value = get_cache().get(GENERATION_CACHE_KEY)
+            except Exception as e:
+                logger.debug(f"读取管理员身份代数失败: {e}")
+                value = None
+            self._value = value or 0
+            self._checked_at = now
+            return self._value
+
+    def bump(self):
+        value = time.time_ns()
+        try:
+            from app.services.cache_service import get_cache
+            get_cache().set(GENERATION_CACHE_KEY, value, timeout=7 * 24 * 3600)
+        except Exception as e:
+            logger.warning(f"更新管理员身份代数失败: {e}")
+        with self._lock:
+            self._value = value
+            self._checked_at = time.monotonic()
+
+
+_generation = _Generation()
+_local_cache: Dict[str, Dict] = {}
+_local_lock = threading.Lock()
+
+
+def _cache_key(wallet_address: str, case_insensitive: bool) -> str:
+    return f"{'i' if case_insensitive else 's'}:{wallet_address.lower() if case_insensitive else wallet_address}"
+
+
+def _entry_valid(entry: Optional[Dict], key: str) -> bool:
+    return bool(
+        entry and entry.get('key') == key
+        and entry.get('expires', 0) > time.time()
+        and entry.get('generation') == _generation.current()
+    )
+
+
+def _load(wallet_address: str, case_insensitive: bool) -> Optional[AdminIdentity]:
+    query = AdminUser.query
+    if case_insensitive:
+        query = query.filter(func.lower(AdminUser.wallet_address) == wallet_address.lower())
+    else:
+        query = query.filter(AdminUser.wallet_address == wallet_address)
+    admin = query.first()
+    return AdminIdentity.from_model(admin) if admin else None
+
+
+def resolve_admin(wallet_address: str, case_insensitive: bool = False,
+                  use_session: bool = False) -> Optional[AdminIdentity]:
+    """
+    根据钱包地址解析管理员身份
+
+    Args:
+        wallet_address: 钱包地址
+        case_insensitive: 是否忽略大小写匹配（以太坊地址）
+        use_session: 是否把结果缓存到当前会话（会话鉴权时使用）
+
+    Returns:
+        AdminIdentity: 不是管理员时返回None（不缓存否定结果）
+    """
+    if not wallet_address:
+        return None
+    key = _cache_key(wallet_address, case_insensitive)
+
+    # 同一请求内多个装饰器重复鉴权时直接复用
+    if has_request_context():
+        resolved = g.get('_admin_identity')
+        if resolved and resolved[0] == key:
+            return resolved[1]
+
+    entry = None
+    if use_session and has_request_context():
+        entry = session.get(SESSION_KEY)
+    else:
+        entry = _local_cache.get(key)
+
+    if _entry_valid(entry, key):
+        identity = AdminIdentity(**entry['identity'])
+    else:
+        generation = _generation.current()
+        identity = _load(wallet_address, case_insensitive)
+        if identity is not None:
+            entry = {
+                'key': key,
+                'identity': identity.to_dict(),
+                'generation': generation,
+                'expires': time.time() + IDENTITY_TTL,
+            }
+            if use_session and has_request_context():
+                session[SESSION_KEY] = entry
+            else:
+                with _local_lock:
+                    if len(_local_cache) >= LOCAL_CACHE_MAX:
+                        _local_cache.clear()
+                    _local_cache[key] = entry
+
+    if identity is not None and has_request_context():
+        g._admin_identity = (key, identity)
+    return identity
+
+
+def invalidate_admin_identities() -> None:
+    """管理员数据变更后调用：所有进程缓存的管理员身份在几秒内失效"""
+    with _local_lock:
+        _local_cache.clear()
+    _generation.bump()
+
+
+# 只更新这些字段（如登录时间）不影响鉴权结果
+_IGNORED_FIELDS = {'last_login', 'updated_at'}
+
+
+def _mark_admin_changed(mapper, connection, target):
+    state = inspect(target)
+    if state.persistent and not state.deleted:
+        changed = {
+            attr.key for attr in state.attrs
+            if attr.key not in _IGNORED_FIELDS and attr.history.has_changes()
+        }
+        if not changed:
+            return
+    session = Session.object_session(target)
+    if session is not None:
+        session.info['admin_identity_changed'] = True
+
+
+def _after_commit(session):
+    if session.info.pop('admin_identity_changed', False):
+        invalidate_admin_identities()
+
+
+def _after_rollback(session):
+    session.info.pop('admin_identity_changed', None)
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(AdminUser, _event_name, _mark_admin_changed)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
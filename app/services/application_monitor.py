@@ -18,6 +18,8 @@ import logging
 import json
 import os
 
+from app.utils.latency_sketch import SketchLayout, MinuteSketchRing, MinuteCounterRing
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -52,9 +54,15 @@ class SystemResourceMetric:
 class ApplicationMonitor:
     """应用性能监控类"""
     
-    def __init__(self, max_metrics: int = 10000):
+    def __init__(self, max_metrics: int = 10000, sketch_minutes: int = 60):
         self.max_metrics = max_metrics
-        self.api_metrics = deque(maxlen=max_metrics)
+        self.sketch_minutes = sketch_minutes
+        # API耗时按接口、按分钟记录到分位数草图中，统计时只合并窗口内的分钟槽位
+        self._sketch_layout = SketchLayout()
+        self._api_series: Dict[str, MinuteSketchRing] = {}
+        self._api_all = MinuteSketchRing(self._sketch_layout, sketch_minutes)
+        self._error_ring = MinuteCounterRing(sketch_minutes)
+        self._error_type_rings: Dict[str, MinuteCounterRing] = {}
         self.db_metrics = deque(maxlen=max_metrics)
         self.system_metrics = deque(maxlen=max_metrics)
         self.error_counts = defaultdict(int)
@@ -72,25 +80,26 @@ class ApplicationMonitor:
                             status_code: int = 200, method: str = 'GET',
                             user_agent: str = '', ip_address: str = ''):
         """跟踪API性能指标"""
-        with self._lock:
-            metric = PerformanceMetric(
-                endpoint=endpoint,
-                duration=duration,
-                timestamp=datetime.utcnow(),
-                status_code=status_code,
-                method=method,
-                user_agent=user_agent,
-                ip_address=ip_address
-            )
-            self.api_metrics.append(metric)
-            
-            # 检查是否需要告警
-            if duration > self.alert_thresholds['api_response_time']:
-                self._log_performance_alert('API_SLOW_RESPONSE', {
-                    'endpoint': endpoint,
-                    'duration': duration,
-                    'threshold': self.alert_thresholds['api_response_time']
-                })
+        minute = int(time.time()) // 60
+        is_error = status_code >= 400
+        
+        series = self._api_series.get(endpoint)
+        if series is None:
+            with self._lock:
+                series = self._api_series.setdefault(
+                    endpoint, MinuteSketchRing(self._sketch_layout, self.sketch_minutes)
+                )
+        # 只持有各序列自己的锁，不同接口之间互不阻塞
+        series.record(minute, duration, is_error)
+        self._api_all.record(minute, duration, is_error)
+        
+        # 检查是否需要告警
+        if duration > self.alert_thresholds['api_response_time']:
+            self._log_performance_alert('API_SLOW_RESPONSE', {
+                'endpoint': endpoint,
+                'duration': duration,
+                'threshold': self.alert_thresholds['api_response_time']
+            })
     
     def track_database_performance(self, query_type: str, duration: float,
                                  table_name: str = '', rows_affected: int = 0):
@@ -111,59 +120,72 @@ class ApplicationMonitor:
     
     def track_error(self, error_type: str, error_message: str, context: Dict = None):
         """跟踪错误"""
+        minute = int(time.time()) // 60
         with self._lock:
             self.error_counts[error_type] += 1
-            
-            error_log = {
-                'type': error_type,
-                'message': error_message,
-                'context': context or {},
-                'timestamp': datetime.utcnow().isoformat(),
-                'count': self.error_counts[error_type]
-            }
-            
-            logger.error(f"错误跟踪: {json.dumps(error_log, ensure_ascii=False)}")
-            
-            # 检查错误率告警
-            recent_errors = sum(1 for _ in self._get_recent_errors(minutes=1))
-            if recent_errors > self.alert_thresholds['error_rate']:
-                self._log_performance_alert('HIGH_ERROR_RATE', {
-                    'error_type': error_type,
-                    'recent_count': recent_errors,
-                    'threshold': self.alert_thresholds['error_rate']
-                })
+            count = self.error_counts[error_type]
+            type_ring = self._error_type_rings.get(error_type)
+            if type_ring is None:
+                type_ring = self._error_type_rings[error_type] = MinuteCounterRing(self.sketch_minutes)
+        
+        type_ring.add(minute)
+        self._error_ring.add(minute)
+        
+        error_log = {
+            'type': error_type,
+            'message': error_message,
+            'context': context or {},
+            'timestamp': datetime.utcnow().isoformat(),
+            'count': count
+        }
+        
+        logger.error(f"错误跟踪: {json.dumps(error_log, ensure_ascii=False)}")
+        
+        # 检查错误率告警
+        recent_errors = self._error_ring.total(minute, 1)
+        if recent_errors > self.alert_thresholds['error_rate']:
+            self._log_performance_alert('HIGH_ERROR_RATE', {
+                'error_type': error_type,
+                'recent_count': recent_errors,
+                'threshold': self.alert_thresholds['error_rate']
+            })
     
     def get_api_performance_stats(self, endpoint: str = None, 
                                 minutes: int = 60) -> Dict[str, Any]:
-        """获取API性能统计"""
-        with self._lock:
-            # 获取指定时间范围内的指标
-            cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
-            
-            if endpoint:
-                metrics = [m for m in self.api_metrics 
-                          if m.endpoint == endpoint and m.timestamp >= cutoff_time]
-            else:
-                metrics = [m for m in self.api_metrics if m.timestamp >= cutoff_time]
-            
-            if not metrics:
-                return {}
-            
-            durations = [m.duration for m in metrics]
-            status_codes = [m.status_code for m in metrics]
+        """获取API性能统计
+        
+        Args:
+            endpoint: 接口名称，为空时统计全部接口
+            minutes: 统计窗口（分钟），最长为 sketch_minutes
             
-            return {
-                'endpoint': endpoint or 'all',
-                'total_requests': len(metrics),
-                'avg_duration': sum(durations) / len(durations),
-                'max_duration': max(durations),
-                'min_duration': min(durations),
-                'p95_duration': self._calculate_percentile(durations, 95),
-                'p99_duration': self._calculate_percentile(durations, 99),
-                'success_rate': len([c for c in status_codes if c < 400]) / len(status_codes) * 100,
-                'error_rate': len([c for c in status_codes if c >= 400]) / len(status_codes) * 100,
-                'time_range_minutes': minutes
-            }
+        Returns:
+            dict: 统计数据，无数据时返回空字典
+        """
+        series = self._api_series.get(endpoint) if endpoint else self._api_all
+        if series is None:
+            return {}
+        
+        minutes = min(minutes, self.sketch_minutes)
+        summary = series.summarize(int(time.time()) // 60, minutes, (0.5, 0.95, 0.99))
+        if not summary:
+            return {}
+        
+        total = summary['count']
+        p50, p95, p99 = summary['quantiles']
+        
+        return {
+            'endpoint': endpoint or 'all',
+            'total_requests': total,
+            'avg_duration': summary['sum'] / total,
+            'max_duration': summary['max'],
+            'min_duration': summary['min'],
+            'p50_duration': p50,
+            'p95_duration': p95,
+            'p99_duration': p99,
+            'success_rate': (total - summary['errors']) / total * 100,
+            'error_rate': summary['errors'] / total * 100,
+            'time_range_minutes': minutes
+        }
     
     def get_database_performance_stats(self, minutes: int = 60) -> Dict[str, Any]:
         """获取数据库性能统计"""
@@ -236,18 +258,23 @@ class ApplicationMonitor:
     
     def get_error_stats(self, minutes: int = 60) -> Dict[str, Any]:
         """获取错误统计"""
+        minutes = min(minutes, self.sketch_minutes)
+        now_minute = int(time.time()) // 60
+        
         with self._lock:
-            recent_errors = list(self._get_recent_errors(minutes))
-            error_types = defaultdict(int)
-            
-            for error_type in recent_errors:
-                error_types[error_type] += 1
-            
-            return {
-                'total_errors': len(recent_errors),
-                'error_types': dict(error_types),
-                'time_range_minutes': minutes
-            }
+            type_rings = list(self._error_type_rings.items())
+        
+        error_types = {}
+        for error_type, ring in type_rings:
+            count = ring.total(now_minute, minutes)
+            if count:
+                error_types[error_type] = count
+        
+        return {
+            'total_errors': sum(error_types.values()),
+            'error_types': error_types,
+            'time_range_minutes': minutes
+        }
     
     def _start_system_monitoring(self):
         """启动系统资源监控"""
@@ -315,26 +342,6 @@ class ApplicationMonitor:
                 'disk_usage_percent': 0.0
             }
     
-    def _get_recent_errors(self, minutes: int):
-        """获取最近的错误"""
-        # 这里简化实现，实际应该从日志或数据库中获取
-        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
-        for error_type, count in self.error_counts.items():
-            # 简化：假设所有错误都是最近发生的
-            yield error_type
-    
-    def _calculate_percentile(self, values: List[float], percentile: int) -> float:
-        """计算百分位数"""
-        if not values:
-            return 0.0
-        
-        sorted_values = sorted(values)
-        index = int(len(sorted_values) * percentile / 100)
-        if index >= len(sorted_values):
-            index = len(sorted_values) - 1
-        
-        return sorted_values[index]
-    
     def _log_performance_alert(self, alert_type: str, details: Dict):
         """记录性能告警"""
         alert_log = {
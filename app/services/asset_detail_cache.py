@@ -0,0 +1,250 @@
+"""
+资产详情页片段缓存
+
+详情页中与用户无关的部分（页头元数据、标题、资产信息与交易卡片、分享弹窗和脚本）
+连同累计分红、分红记录数、平台收款地址一起按资产渲染后缓存在进程内；
+每次请求只计算当前用户相关的部分（所有者/管理员标记、推荐关系）并拼装页面。
+
+资产编辑、交易完成、分红创建/变更提交后递增共享缓存中该资产的版本号，
+各进程在几秒内丢弃旧片段；共享缓存不可用时片段最多保留 FRAGMENT_TTL 秒。
+原生SQL更新资产（绕过ORM）的地方需手动调用 invalidate。
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 片段最长有效期（秒）
+FRAGMENT_TTL = 300
+
+# 读取共享版本号的间隔（秒）
+VERSION_CHECK_INTERVAL = 5
+
+# 进程内缓存的最大资产数
+CACHE_MAX_SIZE = 512
+
+VERSION_CACHE_KEY = 'asset_detail:version:{}'
+
+# 依次渲染的片段模板
+FRAGMENT_TEMPLATES = {
+    'head': 'assets/detail/head.html',
+    'title': 'assets/detail/title.html',
+    'main': 'assets/detail/main.html',
+    'tail': 'assets/detail/tail.html',
+}
+
+SESSION_INFO_KEY = 'asset_detail_changed'
+
+
+class AssetDetailCache:
+    """按 token_symbol 缓存的资产详情页片段"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # 版本号
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_version(asset_id: int):
+        try:
+            from app.services.cache_service import get_cache
+            return get_cache().get(VERSION_CACHE_KEY.format(asset_id)) or 0
+        except Exception as e:
+            logger.debug(f"读取资产详情版本号失败: {e}")
+            return 0
+
+    def _entry_valid(self, entry: Dict) -> bool:
+        now = time.monotonic()
+        if entry['expires'] <= now:
+            return False
+        if now - entry['checked_at'] < VERSION_CHECK_INTERVAL:
+            return True
+        if self._read_version(entry['asset_id']) != entry['version']:
+            return False
+        entry['checked_at'] = now
+        return True
+
+    # ------------------------------------------------------------------
+    # 读取与渲染
+    # ------------------------------------------------------------------
+
+    def get(self, token_symbol: str) -> Optional[Dict]:
+        """
+        获取资产详情页的缓存片段，未命中时查询并渲染
+
+        Args:
+            token_symbol: 代币代码
+
+        Returns:
+            dict: {'asset': 资产摘要, 'fragments': {片段名: HTML}}，资产不存在时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(token_symbol)
+            if entry is not None:
+                self._entries.move_to_end(token_symbol)
+        if entry is not None and self._entry_valid(entry):
+            return entry
+
+        from app.models import Asset
+
+        asset = Asset.query.filter_by(token_symbol=token_symbol).first()
+        if asset is None:
+            return None
+
+        # 先读版本号再渲染，渲染期间发生的变更会在下次检查时使片段失效
+        version = self._read_version(asset.id)
+        now = time.monotonic()
+        entry = {
+            'asset_id': asset.id,
+            'version': version,
+            'expires': now + FRAGMENT_TTL,
+            'checked_at': now,
+            'asset': {
+                'id': asset.id,
+                'token_symbol': asset.token_symbol,
+                'name': asset.name,
+                'owner_address': asset.owner_address,
+            },
+            'fragments': self._render(asset),
+        }
+        with self._lock:
+            self._entries[token_symbol] = entry
+            self._entries.move_to_end(token_symbol)
+            while len(self._entries) > CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _render(asset) -> Dict[str, str]:
+        from flask import current_app
+        from sqlalchemy import text
+        from app.config import Config
+        from app.extensions import db
+        from app.models.dividend import DividendRecord
+        from app.utils.config_manager import ConfigManager
+
+        # 获取资产累计分红数据
+        total_dividends = 0
+        try:
+            # 直接使用SQL查询，避免payment_token字段不存在的问题
+            sql = text("SELECT SUM(amount) FROM dividends WHERE asset_id = :asset_id AND status = 'confirmed'")
+            result = db.session.execute(sql, {"asset_id": asset.id}).fetchone()
+            total_dividends = result[0] if result[0] else 0
+        except Exception as e:
+            logger.error(f"获取累计分红数据失败: {str(e)}")
+
+        # 获取分红记录数量，用于决定是否显示分红信息模块
+        dividend_records_count = 0
+        try:
+            dividend_records_count = DividendRecord.get_count_by_asset(asset.id)
+        except Exception as e:
+            logger.error(f"获取分红记录数量失败: {str(e)}")
+
+        context = {
+            'asset': asset,
+            'remaining_supply': asset.remaining_supply if asset.remaining_supply is not None else asset.token_supply,
+            'total_dividends': total_dividends,
+            'dividend_records_count': dividend_records_count,
+            'platform_fee_address': ConfigManager.get_platform_fee_address(),
+            'PLATFORM_FEE_RATE': getattr(Config, 'PLATFORM_FEE_RATE', 0.035),
+        }
+        # 不经过 render_template，片段中不会混入当前请求的用户、会话等上下文
+        env = current_app.jinja_env
+        return {
+            name: env.get_template(template).render(**context).strip()
+            for name, template in FRAGMENT_TEMPLATES.items()
+        }
+
+    # ------------------------------------------------------------------
+    # 失效
+    # ------------------------------------------------------------------
+
+    def invalidate(self, asset_ids: Iterable[int]) -> None:
+        """
+        资产相关数据变更后调用：本进程立即丢弃片段，其他进程在几秒内丢弃
+
+        Args:
+            asset_ids: 资产ID列表
+        """
+        asset_ids = {asset_id for asset_id in asset_ids if asset_id is not None}
+        if not asset_ids:
+            return
+        with self._lock:
+            for token_symbol in [k for k, v in self._entries.items() if v['asset_id'] in asset_ids]:
+                del self._entries[token_symbol]
+        try:
+            from app.services.cache_service import get_cache
+            cache = get_cache()
+            value = time.time_ns()
+            for asset_id in asset_ids:
+                cache.set(VERSION_CACHE_KEY.format(asset_id), value, timeout=7 * 24 * 3600)
+        except Exception as e:
+            logger.warning(f"更新资产详情版本号失败: {e}")
+
+    def clear(self) -> None:
+        """清空本进程的片段缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+# 创建全局实例
+asset_detail_cache = AssetDetailCache()
+
+
+def _mark_changed(session, asset_id) -> None:
+    if session is not None and asset_id is not None:
+        session.info.setdefault(SESSION_INFO_KEY, set()).add(asset_id)
+
+
+def _asset_changed(mapper, connection, target):
+    _mark_changed(Session.object_session(target), target.id)
+
+
+def _asset_child_changed(mapper, connection, target):
+    _mark_changed(Session.object_session(target), target.asset_id)
+
+
+def _trade_changed(mapper, connection, target):
+    from app.models.trade import TradeStatus
+
+    # 只有交易完成会改变剩余供应量
+    if target.status == TradeStatus.COMPLETED.value and inspect(target).attrs.status.history.has_changes():
+        _mark_changed(Session.object_session(target), target.asset_id)
+
+
+def _after_commit(session):
+    changed = session.info.pop(SESSION_INFO_KEY, None)
+    if changed:
+        asset_detail_cache.invalidate(changed)
+
+
+def _after_rollback(session):
+    session.info.pop(SESSION_INFO_KEY, None)
+
+
+def register_hooks() -> None:
+    """资产、交易、分红提交后使对应资产的详情页片段失效"""
+    from app.models import Asset
+    from app.models.dividend import Dividend, DividendRecord
+    from app.models.trade import Trade
+
+    listeners = [(Asset, name, _asset_changed) for name in ('after_insert', 'after_update', 'after_delete')]
+    listeners += [(model, name, _asset_child_changed)
+                  for model in (Dividend, DividendRecord)
+                  for name in ('after_insert', 'after_update', 'after_delete')]
+    listeners += [(Trade, name, _trade_changed) for name in ('after_insert', 'after_update')]
+    listeners += [(Session, 'after_commit', _after_commit), (Session, 'after_rollback', _after_rollback)]
+
+    for target, name, fn in listeners:
+        if not event.contains(target, name, fn):
+            event.listen(target, name, fn)
@@ -0,0 +1,174 @@
+"""
+管理员操作审计日志异步写入
+
+请求线程只把审计事件放入队列，后台线程按批写入 admin_operation_logs；
+进程退出时（atexit）把队列中剩余的事件全部写完。
+"""
+
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 单批最多写入的事件数
+BATCH_SIZE = 200
+
+# 未攒满一批时的最长等待时间（秒）
+FLUSH_INTERVAL = 1.0
+
+# 队列容量，队列满时在请求线程同步写入，不丢弃审计事件
+MAX_QUEUE_SIZE = 10000
+
+# 退出时等待后台线程写完的最长时间（秒）
+SHUTDOWN_TIMEOUT = 10.0
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """审计事件缓冲与批量写入"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopped = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """初始化应用；AUDIT_LOG_ASYNC=False 时退化为同步写入"""
+        self.app = app
+        self.enabled = app.config.get('AUDIT_LOG_ASYNC', not app.testing)
+        atexit.register(self.shutdown)
+
+    def submit(self, admin_address: str, operation_type: str, target_table: Optional[str] = None,
+               target_id=None, operation_details: Optional[Dict] = None,
+               ip_address: Optional[str] = None) -> None:
+        """提交一条审计事件，参数与 AdminOperationLog.log_operation 一致"""
+        row = {
+            'admin_address': admin_address,
+            'operation_type': operation_type,
+            'target_table': target_table,
+            'target_id': str(target_id) if target_id else None,
+            'operation_details': json.dumps(operation_details) if operation_details else None,
+            'ip_address': ip_address,
+            'created_at': datetime.utcnow(),
+        }
+
+        if not self.enabled or self.app is None or self._stopped:
+            self._write([row])
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            logger.warning("审计日志队列已满，改为同步写入")
+            self._write([row])
+
+    def _ensure_started(self) -> None:
+        # gunicorn预加载后fork的worker需要重新启动写入线程
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Dict] = []
+            stop = False
+            try:
+                item = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                stop = True
+            else:
+                batch.append(item)
+
+            while not stop and len(batch) < BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, rows: List[Dict]) -> None:
+        """批量写入；失败时重试一次，仍失败则把事件写入错误日志"""
+        from app.extensions import db
+        from app.models.admin import AdminOperationLog
+
+        for attempt in range(2):
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        db.session.execute(AdminOperationLog.__table__.insert(), rows)
+                        db.session.commit()
+                else:
+                    db.session.execute(AdminOperationLog.__table__.insert(), rows)
+                    db.session.commit()
+                return
+            except Exception as e:
+                try:
+                    if self.app is not None:
+                        with self.app.app_context():
+                            db.session.rollback()
+                    else:
+                        db.session.rollback()
+                except Exception:
+                    pass
+                if attempt == 1:
+                    logger.error(f"写入 {len(rows)} 条管理员审计日志失败: {str(e)}; 事件: {rows}")
+
+    def flush(self, timeout: float = SHUTDOWN_TIMEOUT) -> None:
+        """停止后台线程并写完队列中的全部事件"""
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+        # 线程未能在超时内结束或未启动时，由当前线程写完剩余事件
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), BATCH_SIZE):
+            self._write(remaining[start:start + BATCH_SIZE])
+
+    def shutdown(self) -> None:
+        """进程退出时调用，之后提交的事件直接同步写入"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.flush()
+
+
+audit_log_writer = AuditLogWriter()
@@ -28,6 +28,11 @@ class AutoCommissionService:
         返回处理结果统计
         """
         try:
+            # 启用批量模式时，一次锁定全部到期申请并合并为少量链上交易
+            if CommissionConfig.get_config('batch_withdrawal_enabled', False):
+                from app.services.withdrawal_batch_processor import WithdrawalBatchProcessor
+                return WithdrawalBatchProcessor().process_ready()
+
             # 获取所有可处理的取现申请
             ready_withdrawals = CommissionWithdrawal.get_ready_to_process()
             
@@ -328,6 +333,77 @@ class AutoCommissionService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def get_platform_sustainability_metrics(days=30):
+        """
+        获取平台可持续性指标
+        基于佣金模拟引擎对最近交易做一次批量评估
+        """
+        from app.services.commission_simulation import CommissionSimulationEngine
+
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        result = CommissionSimulationEngine().simulate_history(start_date, end_date, top_n=10)
+
+        return {
+            'period_days': days,
+            'total_volume': result['total_volume'],
+            'platform_fee_base': result['platform_fee_base'],
+            'total_referral_amount': result['total_referral_amount'],
+            'platform_retained': result['platform_retained'],
+            'payout_ratio': result['payout_ratio'],
+            'is_sustainable': result['platform_retained'] >= 0,
+            'max_level_reached': result['max_level_reached'],
+            'earner_count': result['earner_count'],
+            'per_level': result['per_level'][:10],
+            'commission_rate': result['commission_rate'],
+            'platform_rate': result['platform_rate']
+        }
+
+    @staticmethod
+    def optimize_commission_rates(days=365, candidate_rates=None):
+        """
+        获取佣金优化建议
+        在同一批历史交易上评估多个候选佣金率
+        """
+        from app.services.commission_simulation import CommissionSimulationEngine
+
+        engine = CommissionSimulationEngine()
+        current_rate, _ = engine.get_current_rates()
+        if candidate_rates is None:
+            candidate_rates = sorted({max(1.0, min(90.0, current_rate + step)) for step in (-15, -10, -5, 5, 10)})
+
+        end_date = datetime.utcnow()
+        comparison = engine.compare_scenarios(
+            [{'commission_rate': rate} for rate in candidate_rates],
+            start_date=end_date - timedelta(days=days),
+            end_date=end_date,
+            top_n=0
+        )
+
+        candidates = [
+            {
+                'commission_rate': scenario['commission_rate'],
+                'total_referral_amount': scenario['total_referral_amount'],
+                'platform_retained': scenario['platform_retained'],
+                'payout_ratio': scenario['payout_ratio'],
+                'delta': scenario['delta']
+            }
+            for scenario in comparison['scenarios']
+        ]
+        baseline = comparison['baseline']
+
+        return {
+            'period_days': days,
+            'current': {
+                'commission_rate': baseline['commission_rate'],
+                'total_referral_amount': baseline['total_referral_amount'],
+                'platform_retained': baseline['platform_retained'],
+                'payout_ratio': baseline['payout_ratio']
+            },
+            'candidates': candidates
+        }
+
     @staticmethod
     def run_automation_cycle():
         """
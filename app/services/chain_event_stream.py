@@ -0,0 +1,584 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+链上事件推送接入服务
+通过 Solana websocket 订阅（signatureSubscribe / logsSubscribe / accountSubscribe）接收交易确认、
+程序日志和账户变化，分发给各确认处理逻辑，替代按固定间隔轮询 getTransaction。
+连接断开后自动重连并重新订阅，同时用一次批量 HTTP 查询补齐断线期间错过的事件。
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 事件：kind 为 signature/logs/account，key 为签名或地址，source 为 ws（推送）或 poll（补偿查询）
+ChainEvent = namedtuple('ChainEvent', ['kind', 'key', 'slot', 'value', 'source'])
+
+# 签名订阅在该时间内没有收到推送时，补充一次状态查询（防止推送丢失）
+SIGNATURE_RECHECK_SECONDS = 30
+
+# 新签名订阅合并查询当前状态前的等待时间（秒）
+INITIAL_CHECK_DELAY = 0.05
+
+# 重连退避上限（秒）
+MAX_RECONNECT_DELAY = 30
+
+# 最近确认结果缓存的条数
+STATUS_CACHE_SIZE = 10000
+
+# watch_signature 订阅的最长保留时间（秒），交易一直未上链时到期自动取消订阅
+SIGNATURE_WATCH_TTL = 600
+
+
+def derive_ws_url(rpc_url: str) -> str:
+    """由HTTP RPC地址推导websocket地址（https -> wss，http -> ws）"""
+    if rpc_url.startswith('https://'):
+        return 'wss://' + rpc_url[len('https://'):]
+    if rpc_url.startswith('http://'):
+        return 'ws://' + rpc_url[len('http://'):]
+    return rpc_url
+
+
+class _Subscription:
+    """一个本地订阅及其在服务端的订阅ID"""
+
+    __slots__ = ('local_id', 'kind', 'key', 'callbacks', 'server_id', 'created_at', 'last_signature')
+
+    def __init__(self, local_id: int, kind: str, key: str):
+        self.local_id = local_id
+        self.kind = kind
+        self.key = key
+        self.callbacks: List[Callable[[ChainEvent], None]] = []
+        self.server_id: Optional[int] = None
+        self.created_at = time.time()
+        # logs订阅最后处理到的签名，补偿查询时作为 until 参数
+        self.last_signature: Optional[str] = None
+
+
+class SolanaEventStream:
+    """
+    Solana websocket 事件流
+
+    在独立线程中运行asyncio事件循环并维持一条websocket连接。
+    对外接口（subscribe_*、wait_for_signature）线程安全，回调在事件循环线程中执行，应尽快返回。
+    """
+
+    SUBSCRIBE_METHODS = {
+        'signature': ('signatureSubscribe', 'signatureUnsubscribe'),
+        'logs': ('logsSubscribe', 'logsUnsubscribe'),
+        'account': ('accountSubscribe', 'accountUnsubscribe'),
+    }
+
+    def __init__(self, ws_url: str, rpc_url: str = None,
+                 rpc_call: Callable[[str, list], Any] = None,
+                 commitment: str = 'confirmed'):
+        """
+        Args:
+            ws_url: websocket地址
+            rpc_url: HTTP RPC地址，用于断线补偿查询
+            rpc_call: 自定义RPC调用函数 (method, params) -> result，为空时使用rpc_url
+            commitment: 订阅的确认级别
+        """
+        self.ws_url = ws_url
+        self.rpc_url = rpc_url
+        self._rpc_call = rpc_call or self._http_rpc_call
+        self.commitment = commitment
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self._running = False
+        self.connected = threading.Event()
+
+        self._ids = itertools.count(1)
+        self._subs: Dict[int, _Subscription] = {}
+        self._by_key: Dict[tuple, int] = {}
+        self._by_server: Dict[int, int] = {}
+        self._pending: Dict[int, int] = {}
+        self._initial_checks: List[_Subscription] = []
+
+        self._status_cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._stats = {
+            'connects': 0,
+            'disconnects': 0,
+            'notifications': 0,
+            'catch_up_polls': 0,
+            'rpc_calls': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """启动后台事件循环线程"""
+        if self._running:
+            return
+        self._running = True
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='solana-event-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """关闭连接并停止事件循环"""
+        self._running = False
+        loop = self._loop
+        if loop is None:
+            return
+
+        async def _shutdown():
+            if self._ws is not None:
+                await self._ws.close()
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(timeout=5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.connected.clear()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.create_task(self._connection_loop())
+        self._loop.create_task(self._recheck_loop())
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    # ------------------------------------------------------------------
+    # 订阅接口
+    # ------------------------------------------------------------------
+
+    def subscribe_signature(self, signature: str, callback: Callable[[ChainEvent], None],
+                            ttl: Optional[float] = None) -> int:
+        """订阅交易签名的确认结果（收到一次后自动结束；已知结果时立即回调）
+
+        Args:
+            signature: 交易签名
+            callback: 回调函数
+            ttl: 到期仍未收到结果时移除该回调（秒），为空时一直保留到收到结果或主动取消
+
+        Returns:
+            int: 本地订阅ID，已知结果时为0
+        """
+        return self._subscribe('signature', signature, callback, ttl)
+
+    def subscribe_logs(self, address: str, callback: Callable[[ChainEvent], None]) -> int:
+        """订阅提及某地址（通常是程序ID或收款账户）的交易日志"""
+        return self._subscribe('logs', address, callback)
+
+    def subscribe_account(self, pubkey: str, callback: Callable[[ChainEvent], None]) -> int:
+        """订阅账户数据变化"""
+        return self._subscribe('account', pubkey, callback)
+
+    def unsubscribe(self, local_id: int, callback: Callable = None) -> None:
+        """取消订阅；指定callback时只移除该回调，没有回调剩余时才向服务端取消"""
+        if not local_id or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._remove_subscription, local_id, callback, True)
+
+    def wait_for_signature(self, signature: str, timeout: float) -> Optional[Dict]:
+        """阻塞等待签名确认
+
+        Args:
+            signature: 交易签名
+            timeout: 最长等待秒数
+
+        Returns:
+            dict: {'err': 错误或None, 'slot': 槽位}；超时或事件流不可用时返回None
+        """
+        cached = self.get_signature_status(signature)
+        if cached is not None:
+            return cached
+        if not self.connected.wait(timeout=min(timeout, 5)):
+            return None
+
+        done = threading.Event()
+        result = {}
+
+        def _on_event(event: ChainEvent):
+            result.update(event.value if isinstance(event.value, dict) else {'err': None})
+            result.setdefault('slot', event.slot)
+            done.set()
+
+        local_id = self._subscribe('signature', signature, _on_event)
+        try:
+            if done.wait(timeout=timeout):
+                return {'err': result.get('err'), 'slot': result.get('slot')}
+            return None
+        finally:
+            self.unsubscribe(local_id, _on_event)
+
+    def get_signature_status(self, signature: str) -> Optional[Dict]:
+        """最近收到的签名确认结果（未知时返回None）"""
+        return self._status_cache.get(signature)
+
+    def status(self) -> Dict[str, Any]:
+        """连接状态与计数"""
+        return {
+            'ws_url': self.ws_url,
+            'connected': self.connected.is_set(),
+            'subscriptions': len(self._subs),
+            **self._stats
+        }
+
+    def _subscribe(self, kind: str, key: str, callback: Callable[[ChainEvent], None],
+                   ttl: Optional[float] = None) -> int:
+        if self._loop is None:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(self._add_subscription(kind, key, callback, ttl), self._loop)
+        return future.result(timeout=5)
+
+    # ------------------------------------------------------------------
+    # 事件循环内部
+    # ------------------------------------------------------------------
+
+    async def _add_subscription(self, kind: str, key: str, callback, ttl: Optional[float] = None) -> int:
+        if kind == 'signature' and key in self._status_cache:
+            status = self._status_cache[key]
+            callback(ChainEvent('signature', key, status.get('slot'), status, 'cache'))
+            return 0
+
+        local_id = self._by_key.get((kind, key))
+        if local_id is not None:
+            callbacks = self._subs[local_id].callbacks
+            if callback not in callbacks:
+                callbacks.append(callback)
+                if ttl:
+                    self._loop.call_later(ttl, self._remove_subscription, local_id, callback, True)
+            return local_id
+
+        local_id = next(self._ids)
+        sub = _Subscription(local_id, kind, key)
+        sub.callbacks.append(callback)
+        self._subs[local_id] = sub
+        self._by_key[(kind, key)] = local_id
+        if ttl:
+            self._loop.call_later(ttl, self._remove_subscription, local_id, callback, True)
+        if self._ws is not None:
+            await self._send_subscribe(sub)
+        if kind == 'signature':
+            # 交易可能在订阅前已经确认，推送不会再来；短暂合并后批量查询一次当前状态
+            self._initial_checks.append(sub)
+            if len(self._initial_checks) == 1:
+                self._loop.call_later(INITIAL_CHECK_DELAY, self._flush_initial_checks)
+        return local_id
+
+    def _flush_initial_checks(self) -> None:
+        subs, self._initial_checks = self._initial_checks, []
+        subs = [sub for sub in subs if sub.local_id in self._subs]
+        if subs:
+            asyncio.ensure_future(self._catch_up(subs))
+
+    def _remove_subscription(self, local_id: int, callback=None, notify_server: bool = False) -> None:
+        sub = self._subs.get(local_id)
+        if sub is None:
+            return
+        if callback is not None:
+            sub.callbacks = [cb for cb in sub.callbacks if cb is not callback]
+            if sub.callbacks:
+                return
+        del self._subs[local_id]
+        self._by_key.pop((sub.kind, sub.key), None)
+        if sub.server_id is not None:
+            self._by_server.pop(sub.server_id, None)
+            if notify_server and self._ws is not None:
+                method = self.SUBSCRIBE_METHODS[sub.kind][1]
+                asyncio.ensure_future(self._send(method, [sub.server_id]))
+
+    async def _send(self, method: str, params: list) -> int:
+        request_id = next(self._ids)
+        try:
+            await self._ws.send(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}))
+        except Exception as e:
+            logger.debug(f"发送 {method} 失败: {e}")
+        return request_id
+
+    async def _send_subscribe(self, sub: _Subscription) -> None:
+        method = self.SUBSCRIBE_METHODS[sub.kind][0]
+        if sub.kind == 'signature':
+            params = [sub.key, {'commitment': self.commitment}]
+        elif sub.kind == 'logs':
+            params = [{'mentions': [sub.key]}, {'commitment': self.commitment}]
+        else:
+            params = [sub.key, {'commitment': self.commitment, 'encoding': 'base64'}]
+        request_id = await self._send(method, params)
+        self._pending[request_id] = sub.local_id
+
+    async def _connection_loop(self) -> None:
+        import websockets
+
+        delay = 1
+        while self._running:
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=20, max_size=2 ** 22) as ws:
+                    self._ws = ws
+                    self._stats['connects'] += 1
+                    delay = 1
+                    # 重新订阅全部活动订阅，再补齐断线期间错过的事件
+                    self._by_server.clear()
+                    self._pending.clear()
+                    for sub in list(self._subs.values()):
+                        sub.server_id = None
+                        await self._send_subscribe(sub)
+                    self.connected.set()
+                    logger.info(f"Solana事件流已连接: {self.ws_url}，订阅数 {len(self._subs)}")
+                    asyncio.ensure_future(self._catch_up(list(self._subs.values())))
+
+                    async for raw in ws:
+                        self._handle_message(raw)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Solana事件流连接中断: {e}")
+            finally:
+                if self._ws is not None:
+                    self._stats['disconnects'] += 1
+                self._ws = None
+                self.connected.clear()
+
+            if not self._running:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _handle_message(self, raw) -> None:
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+
+        if 'id' in message and message.get('id') in self._pending:
+            local_id = self._pending.pop(message['id'])
+            sub = self._subs.get(local_id)
+            if sub is None:
+                return
+            if 'error' in message:
+                logger.warning(f"订阅 {sub.kind}:{sub.key} 失败: {message['error']}")
+                return
+            sub.server_id = message.get('result')
+            self._by_server[sub.server_id] = local_id
+            return
+
+        method = message.get('method', '')
+        if not method.endswith('Notification'):
+            return
+        params = message.get('params') or {}
+        local_id = self._by_server.get(params.get('subscription'))
+        sub = self._subs.get(local_id) if local_id is not None else None
+        if sub is None:
+            return
+
+        result = params.get('result') or {}
+        slot = (result.get('context') or {}).get('slot')
+        value = result.get('value')
+        self._stats['notifications'] += 1
+
+        if sub.kind == 'signature':
+            if not isinstance(value, dict) or 'err' not in value:
+                # receivedSignature 等中间通知，继续等待
+                return
+            self._dispatch_signature(sub, {'err': value.get('err'), 'slot': slot}, 'ws')
+            return
+
+        if sub.kind == 'logs' and isinstance(value, dict):
+            sub.last_signature = value.get('signature') or sub.last_signature
+        self._dispatch(sub, ChainEvent(sub.kind, sub.key, slot, value, 'ws'))
+
+    def _dispatch_signature(self, sub: _Subscription, status: Dict, source: str) -> None:
+        self._remember_status(sub.key, status)
+        # 推送到达后服务端订阅自动结束；由补偿查询得到结果时需要主动取消服务端订阅
+        self._remove_subscription(sub.local_id, notify_server=(source != 'ws'))
+        self._dispatch(sub, ChainEvent('signature', sub.key, status.get('slot'), status, source))
+
+    def _dispatch(self, sub: _Subscription, event: ChainEvent) -> None:
+        for callback in list(sub.callbacks):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"处理链上事件 {event.kind}:{event.key} 出错: {e}")
+
+    def _remember_status(self, signature: str, status: Dict) -> None:
+        self._status_cache[signature] = status
+        self._status_cache.move_to_end(signature)
+        while len(self._status_cache) > STATUS_CACHE_SIZE:
+            self._status_cache.popitem(last=False)
+
+    async def _recheck_loop(self) -> None:
+        """签名订阅长时间没有推送时补充查询，防止通知丢失导致一直等待"""
+        while self._running:
+            await asyncio.sleep(SIGNATURE_RECHECK_SECONDS / 3)
+            if not self.connected.is_set():
+                continue
+            cutoff = time.time() - SIGNATURE_RECHECK_SECONDS
+            stale = [
+                sub for sub in self._subs.values()
+                if sub.kind == 'signature' and sub.created_at < cutoff
+            ]
+            if stale:
+                for sub in stale:
+                    sub.created_at = time.time()
+                await self._catch_up(stale)
+
+    # ------------------------------------------------------------------
+    # 断线补偿查询
+    # ------------------------------------------------------------------
+
+    async def _catch_up(self, subs: List[_Subscription]) -> None:
+        if not subs:
+            return
+        self._stats['catch_up_polls'] += 1
+        snapshot = [(sub.local_id, sub.kind, sub.key, sub.last_signature) for sub in subs]
+        try:
+            results = await self._loop.run_in_executor(None, self._poll_snapshot, snapshot)
+        except Exception as e:
+            logger.warning(f"链上事件补偿查询失败: {e}")
+            return
+
+        for local_id, event in results:
+            sub = self._subs.get(local_id)
+            if sub is None:
+                continue
+            if event.kind == 'signature':
+                self._dispatch_signature(sub, event.value, 'poll')
+            else:
+                if event.kind == 'logs' and isinstance(event.value, dict):
+                    sub.last_signature = event.value.get('signature') or sub.last_signature
+                self._dispatch(sub, event)
+
+    def _poll_snapshot(self, snapshot) -> List[tuple]:
+        """在线程池中执行：批量查询订阅对象的当前状态"""
+        results = []
+
+        signatures = [(local_id, key) for local_id, kind, key, _ in snapshot if kind == 'signature']
+        for start in range(0, len(signatures), 256):
+            chunk = signatures[start:start + 256]
+            statuses = self._call('getSignatureStatuses', [
+                [key for _, key in chunk], {'searchTransactionHistory': True}
+            ]) or {}
+            for (local_id, key), status in zip(chunk, statuses.get('value') or []):
+                if not status:
+                    continue
+                if status.get('err') is None and status.get('confirmationStatus') not in ('confirmed', 'finalized'):
+                    continue
+                value = {'err': status.get('err'), 'slot': status.get('slot')}
+                results.append((local_id, ChainEvent('signature', key, status.get('slot'), value, 'poll')))
+
+        accounts = [(local_id, key) for local_id, kind, key, _ in snapshot if kind == 'account']
+        for start in range(0, len(accounts), 100):
+            chunk = accounts[start:start + 100]
+            response = self._call('getMultipleAccounts', [
+                [key for _, key in chunk], {'encoding': 'base64', 'commitment': self.commitment}
+            ]) or {}
+            slot = (response.get('context') or {}).get('slot')
+            for (local_id, key), value in zip(chunk, response.get('value') or []):
+                results.append((local_id, ChainEvent('account', key, slot, value, 'poll')))
+
+        for local_id, kind, key, last_signature in snapshot:
+            if kind != 'logs' or not last_signature:
+                # 没有处理过任何日志时无从判断遗漏范围，只从重连后开始接收
+                continue
+            options = {'until': last_signature, 'limit': 1000, 'commitment': self.commitment}
+            entries = self._call('getSignaturesForAddress', [key, options]) or []
+            # 接口按时间倒序返回，按链上顺序分发
+            for entry in reversed(entries):
+                value = {'signature': entry.get('signature'), 'err': entry.get('err'), 'logs': None}
+                results.append((local_id, ChainEvent('logs', key, entry.get('slot'), value, 'poll')))
+
+        return results
+
+    def _call(self, method: str, params: list):
+        self._stats['rpc_calls'] += 1
+        return self._rpc_call(method, params)
+
+    def _http_rpc_call(self, method: str, params: list):
+        import requests
+
+        response = requests.post(self.rpc_url, json={
+            'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params
+        }, timeout=15)
+        response.raise_for_status()
+        data = response.json()
+        if 'error' in data:
+            raise RuntimeError(f"{method} 调用失败: {data['error']}")
+        return data.get('result')
+
+
+# 全局实例
+_event_stream: Optional[SolanaEventStream] = None
+_event_stream_lock = threading.Lock()
+
+
+def get_event_stream() -> Optional[SolanaEventStream]:
+    """获取（必要时启动）全局事件流；通过 SOLANA_EVENT_STREAM=0 关闭时返回None"""
+    global _event_stream
+    if os.environ.get('SOLANA_EVENT_STREAM', '1').lower() in ('0', 'false', 'no'):
+        return None
+    with _event_stream_lock:
+        if _event_stream is None:
+            rpc_url = os.environ.get('SOLANA_RPC_URL') or 'https://api.mainnet-beta.solana.com'
+            try:
+                from flask import current_app
+                rpc_url = current_app.config.get('SOLANA_RPC_URL') or rpc_url
+            except Exception:
+                pass
+            ws_url = os.environ.get('SOLANA_WS_URL') or derive_ws_url(rpc_url)
+            _event_stream = SolanaEventStream(ws_url, rpc_url=rpc_url)
+            _event_stream.start()
+        return _event_stream
+
+
+def _record_only(event: ChainEvent) -> None:
+    """watch_signature 的回调：结果已由事件流缓存，无需额外处理"""
+
+
+def watch_signature(signature: str, ttl: float = SIGNATURE_WATCH_TTL) -> Optional[Dict]:
+    """供轮询式确认逻辑使用：返回已推送的签名结果；尚无结果时订阅该签名，后续检查即可命中
+
+    订阅在收到结果后自动结束，一直没有结果时 ttl 秒后取消。
+
+    Args:
+        signature: 交易签名
+        ttl: 订阅最长保留时间（秒）
+
+    Returns:
+        dict: {'err': 错误或None, 'slot': 槽位}；尚无结果或事件流不可用时返回None
+    """
+    try:
+        stream = get_event_stream()
+        if stream is None:
+            return None
+        status = stream.get_signature_status(signature)
+        if status is None:
+            stream.subscribe_signature(signature, _record_only, ttl=ttl)
+        return status
+    except Exception as e:
+        logger.debug(f"订阅签名 {signature} 失败: {e}")
+        return None
+
+
+def wait_for_signature(signature: str, timeout: float) -> Optional[Dict]:
+    """等待签名确认的便捷函数；事件流不可用、连接失败或超时时返回None，调用方应回退到轮询"""
+    try:
+        stream = get_event_stream()
+        if stream is None:
+            return None
+        return stream.wait_for_signature(signature, timeout)
+    except Exception as e:
+        logger.warning(f"通过事件流等待签名 {signature} 失败: {e}")
+        return None
@@ -0,0 +1,290 @@
+"""
+佣金模拟引擎
+将推荐关系森林一次性加载为父节点索引数组，使用NumPy批量评估整段交易历史
+或假设的佣金配置（commission_rate / PLATFORM_COMMISSION_RATE）下的佣金分配
+"""
+
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.extensions import db
+from app.models.referral import UserReferral
+from app.models.trade import Trade, TradeStatus, TradeType
+
+logger = logging.getLogger(__name__)
+
+
+class CommissionSimulationEngine:
+    """
+    佣金模拟引擎
+
+    与 UnlimitedReferralSystem.calculate_commission_distribution 采用相同的聚合递进规则：
+    第1级佣金 = 交易金额 * 平台费率 * 佣金率，之后每一级获得上一级佣金的配置比例，
+    直到没有推荐人、金额低于精度下限或达到最大层级。
+    计算使用float64，仅用于规划和评估，不用于实际记账。
+    """
+
+    MIN_COMMISSION = 0.000001  # 与逐笔计算保持一致的精度下限
+    MAX_LEVELS = 100           # 与逐笔计算保持一致的安全层级上限
+
+    def __init__(self):
+        self._addresses: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._parent = np.empty(0, dtype=np.int64)
+        self._loaded_at: Optional[datetime] = None
+
+    # ------------------------------------------------------------------
+    # 数据加载
+    # ------------------------------------------------------------------
+
+    def load_forest(self) -> int:
+        """
+        一次性加载全部有效推荐关系，构建父节点索引数组
+
+        Returns:
+            int: 推荐森林中的节点数
+        """
+        rows = db.session.query(
+            UserReferral.user_address,
+            UserReferral.referrer_address
+        ).filter(
+            UserReferral.status == 'active'
+        ).order_by(UserReferral.id).all()
+
+        index: Dict[str, int] = {}
+        addresses: List[str] = []
+
+        def _node(address: str) -> int:
+            node = index.get(address)
+            if node is None:
+                node = len(addresses)
+                index[address] = node
+                addresses.append(address)
+            return node
+
+        edges: List[Tuple[int, int]] = []
+        for user_address, referrer_address in rows:
+            edges.append((_node(user_address), _node(referrer_address)))
+
+        parent = np.full(len(addresses), -1, dtype=np.int64)
+        # 同一用户存在多条记录时，与逐笔计算一样以第一条为准
+        for child, referrer in reversed(edges):
+            parent[child] = referrer
+
+        self._addresses = addresses
+        self._index = index
+        self._parent = parent
+        self._loaded_at = datetime.utcnow()
+
+        logger.debug(f"推荐森林加载完成: 节点 {len(addresses)} 个，关系 {len(edges)} 条")
+        return len(addresses)
+
+    def _ensure_forest(self):
+        if self._loaded_at is None:
+            self.load_forest()
+
+    def load_trades(self, start_date: datetime, end_date: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        加载时间范围内已完成的购买交易
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (交易者在森林中的索引, 交易金额)，不在森林中的交易者索引为-1
+        """
+        self._ensure_forest()
+
+        rows = db.session.query(
+            Trade.trader_address,
+            Trade.total,
+            Trade.amount,
+            Trade.price
+        ).filter(
+            Trade.status == TradeStatus.COMPLETED.value,
+            Trade.type == TradeType.BUY.value,
+            Trade.created_at >= start_date,
+            Trade.created_at < end_date
+        ).all()
+
+        trader_idx = np.fromiter(
+            (self._index.get(row[0], -1) for row in rows),
+            dtype=np.int64,
+            count=len(rows)
+        )
+        amounts = np.fromiter(
+            (row[1] if row[1] is not None else (row[2] or 0) * (row[3] or 0) for row in rows),
+            dtype=np.float64,
+            count=len(rows)
+        )
+        return trader_idx, amounts
+
+    # ------------------------------------------------------------------
+    # 配置
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get_current_rates() -> Tuple[float, float]:
+        """
+        获取当前后台配置的佣金率（百分比）和平台费率（小数）
+        """
+        from app.models.admin import SystemConfig
+        from app.models.commission_config import CommissionConfig
+
+        platform_commission_rate = SystemConfig.get_value('PLATFORM_COMMISSION_RATE')
+        platform_rate = float(Decimal(str(platform_commission_rate))) if platform_commission_rate else 0.20
+        commission_rate = float(CommissionConfig.get_config('commission_rate', 35.0))
+        return commission_rate, platform_rate
+
+    # ------------------------------------------------------------------
+    # 模拟计算
+    # ------------------------------------------------------------------
+
+    def evaluate(self, trader_idx: np.ndarray, amounts: np.ndarray,
+                 commission_rate: float, platform_rate: float,
+                 max_levels: int = MAX_LEVELS, top_n: int = 20) -> Dict:
+        """
+        批量评估一组交易的佣金分配
+
+        Args:
+            trader_idx: 交易者索引数组（-1表示无推荐关系）
+            amounts: 交易金额数组
+            commission_rate: 佣金率（百分比，如35.0）
+            platform_rate: 平台费率（小数，如0.20）
+            max_levels: 最大层级
+            top_n: 返回佣金最高的用户数
+
+        Returns:
+            Dict: 汇总、分层级和按用户的佣金统计
+        """
+        self._ensure_forest()
+
+        rate = commission_rate / 100.0
+        base = amounts * platform_rate
+        per_user = np.zeros(len(self._addresses), dtype=np.float64)
+        per_level = []
+
+        # 仅跟踪仍在向上分配的交易，每一级只处理剩余的活跃子集
+        active = np.flatnonzero(trader_idx >= 0)
+        current = trader_idx[active]
+        level_base = base[active]
+
+        for level in range(1, max_levels + 1):
+            if active.size == 0:
+                break
+
+            parents = self._parent[current]
+            keep = (parents >= 0) & (level_base > self.MIN_COMMISSION)
+            if not keep.any():
+                break
+
+            active = active[keep]
+            parents = parents[keep]
+            commission = level_base[keep] * rate
+
+            per_user += np.bincount(parents, weights=commission, minlength=per_user.size)
+            per_level.append({
+                'level': level,
+                'payout_count': int(active.size),
+                'amount': float(commission.sum())
+            })
+
+            current = parents
+            level_base = commission
+
+        total_volume = float(amounts.sum())
+        total_base = float(base.sum())
+        total_referral = float(per_user.sum())
+
+        top_users = []
+        if top_n and per_user.size:
+            earners = np.flatnonzero(per_user > 0)
+            order = earners[np.argsort(per_user[earners])[::-1][:top_n]]
+            top_users = [
+                {'address': self._addresses[i], 'amount': float(per_user[i])}
+                for i in order
+            ]
+
+        return {
+            'commission_rate': commission_rate,
+            'platform_rate': platform_rate,
+            'trade_count': int(amounts.size),
+            'referred_trade_count': int((trader_idx >= 0).sum()),
+            'total_volume': total_volume,
+            'platform_fee_base': total_base,
+            'total_referral_amount': total_referral,
+            'platform_retained': total_base - total_referral,
+            'payout_ratio': total_referral / total_base if total_base else 0.0,
+            'max_level_reached': per_level[-1]['level'] if per_level else 0,
+            'earner_count': int((per_user > 0).sum()),
+            'per_level': per_level,
+            'top_users': top_users
+        }
+
+    def simulate_history(self, start_date: datetime = None, end_date: datetime = None,
+                         commission_rate: float = None, platform_rate: float = None,
+                         top_n: int = 20) -> Dict:
+        """
+        对历史交易按指定（或当前）配置进行模拟
+
+        Args:
+            start_date: 开始时间，默认一年前
+            end_date: 结束时间，默认当前
+            commission_rate: 佣金率（百分比），默认当前配置
+            platform_rate: 平台费率（小数），默认当前配置
+        """
+        end_date = end_date or datetime.utcnow()
+        start_date = start_date or end_date - timedelta(days=365)
+
+        current_commission_rate, current_platform_rate = self.get_current_rates()
+        if commission_rate is None:
+            commission_rate = current_commission_rate
+        if platform_rate is None:
+            platform_rate = current_platform_rate
+
+        trader_idx, amounts = self.load_trades(start_date, end_date)
+        result = self.evaluate(trader_idx, amounts, commission_rate, platform_rate, top_n=top_n)
+        result['start_date'] = start_date.isoformat()
+        result['end_date'] = end_date.isoformat()
+        return result
+
+    def compare_scenarios(self, scenarios: List[Dict], start_date: datetime = None,
+                          end_date: datetime = None, top_n: int = 10) -> Dict:
+        """
+        在同一批交易上对比当前配置与多个假设配置
+
+        Args:
+            scenarios: 假设配置列表，每项可包含 commission_rate（百分比）和 platform_rate（小数）
+
+        Returns:
+            Dict: 基准结果及每个假设配置相对基准的差异
+        """
+        end_date = end_date or datetime.utcnow()
+        start_date = start_date or end_date - timedelta(days=365)
+
+        commission_rate, platform_rate = self.get_current_rates()
+        trader_idx, amounts = self.load_trades(start_date, end_date)
+
+        baseline = self.evaluate(trader_idx, amounts, commission_rate, platform_rate, top_n=top_n)
+        results = []
+        for scenario in scenarios:
+            evaluated = self.evaluate(
+                trader_idx,
+                amounts,
+                float(scenario.get('commission_rate', commission_rate)),
+                float(scenario.get('platform_rate', platform_rate)),
+                top_n=top_n
+            )
+            evaluated['delta'] = {
+                'total_referral_amount': evaluated['total_referral_amount'] - baseline['total_referral_amount'],
+                'platform_retained': evaluated['platform_retained'] - baseline['platform_retained']
+            }
+            results.append(evaluated)
+
+        return {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'baseline': baseline,
+            'scenarios': results
+        }
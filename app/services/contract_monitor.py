@@ -79,6 +79,18 @@ class ContractMonitor:
                 logger.error(f"监控器运行错误: {str(e)}")
                 time.sleep(30)  # 出错后等待30秒再继续
     
+    @staticmethod
+    def _check_transaction(tx_hash: str) -> Dict[str, Any]:
+        """查询交易状态：优先使用事件流推送的结果，尚无结果时订阅该签名并回退到RPC查询"""
+        from app.services.chain_event_stream import watch_signature
+
+        pushed_status = watch_signature(tx_hash)
+        if pushed_status is not None:
+            if pushed_status.get('err') is None:
+                return {'confirmed': True}
+            return {'confirmed': False, 'error': str(pushed_status.get('err'))}
+        return check_transaction(tx_hash)
+    
     def monitor_asset_creation(self):
         """监控资产创建智能合约执行状态"""
         try:
@@ -96,7 +108,7 @@ class ContractMonitor:
                     # 检查是否有部署交易哈希
                     if asset.deployment_tx_hash:
                         # 检查部署交易状态
-                        tx_status = check_transaction(asset.deployment_tx_hash)
+                        tx_status = self._check_transaction(asset.deployment_tx_hash)
                         
                         if tx_status.get('confirmed', False):
                             # 部署成功，更新状态
@@ -172,7 +184,7 @@ class ContractMonitor:
             for trade in pending_trades:
                 try:
                     # 检查交易状态
-                    tx_status = check_transaction(trade.tx_hash)
+                    tx_status = self._check_transaction(trade.tx_hash)
                     
                     if tx_status.get('confirmed', False):
                         # 交易已确认
@@ -0,0 +1,553 @@
+"""
+仪表板统计服务
+
+资产、交易、用户、分红数据变更时，在同一事务内累加 dashboard_counters 中的运行计数器，
+仪表板只读取少量计数器行，耗时与业务表大小无关。
+绕过ORM的原生SQL批量更新需要调用 increment 同步计数器；
+定时对账任务用全量聚合校正偏差，并把每日数值写入 dashboard_stats 供趋势图使用。
+"""
+
+import logging
+import random
+from datetime import datetime, timedelta, date
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.extensions import db
+from app.models.admin import DashboardCounter, DashboardStats
+
+logger = logging.getLogger(__name__)
+
+# 每个计数器的分片数：并发事务随机选择分片，避免所有交易争抢同一行锁
+COUNTER_SHARDS = 8
+
+# 按日计数器名称前缀，格式为 daily:<名称>:<YYYY-MM-DD>
+DAILY_PREFIX = 'daily:'
+
+# 按日计数器保留天数（更早的数值已经写入 dashboard_stats）
+DAILY_RETENTION_DAYS = 2
+
+# 每个模型参与统计的字段
+_TRACKED_FIELDS = {
+    'Asset': ('status', 'asset_type', 'total_value', 'deleted_at'),
+    'Trade': ('amount', 'total'),
+    'User': ('id',),
+    'DividendRecord': ('amount',),
+}
+
+_hooks_registered = False
+
+
+def _number(value) -> Decimal:
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def _daily_name(name: str, day: date) -> str:
+    return f'{DAILY_PREFIX}{name}:{day.isoformat()}'
+
+
+def _asset_contribution(values: Dict) -> Dict[str, Decimal]:
+    """单个资产对计数器的贡献，已软删除的资产不计入"""
+    if values['deleted_at'] is not None:
+        return {}
+    value = _number(values['total_value'])
+    contribution = {
+        'assets_total': Decimal(1),
+        f"assets_status:{values['status']}": Decimal(1),
+        'assets_value': value,
+        f"assets_type:{values['asset_type']}": Decimal(1),
+        f"assets_type_value:{values['asset_type']}": value,
+    }
+    if values['status'] == 2:
+        contribution[f"assets_approved_type:{values['asset_type']}"] = Decimal(1)
+    return contribution
+
+
+def _trade_contribution(values: Dict) -> Dict[str, Decimal]:
+    return {
+        'trades_count': Decimal(1),
+        'trades_amount': _number(values['amount']),
+        'trades_volume': _number(values['total']),
+    }
+
+
+def _user_contribution(values: Dict) -> Dict[str, Decimal]:
+    return {'users_total': Decimal(1)}
+
+
+def _dividend_contribution(values: Dict) -> Dict[str, Decimal]:
+    return {
+        'dividends_count': Decimal(1),
+        'dividends_total': _number(values['amount']),
+    }
+
+
+_CONTRIBUTIONS = {
+    'Asset': _asset_contribution,
+    'Trade': _trade_contribution,
+    'User': _user_contribution,
+    'DividendRecord': _dividend_contribution,
+}
+
+# 新增记录额外计入当日计数器：{模型: {当日计数器名称: 取自总计数器的名称}}
+_DAILY_ON_INSERT = {
+    'Asset': {'assets_new': 'assets_total'},
+    'Trade': {'trades_count': 'trades_count', 'trades_amount': 'trades_amount'},
+    'User': {'users_new': 'users_total'},
+    'DividendRecord': {'dividends_total': 'dividends_total'},
+}
+
+
+def _current_values(obj, fields) -> Dict:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def _committed_values(obj, fields) -> Dict:
+    """flush之前数据库中的字段值"""
+    values = {}
+    for field in fields:
+        history = get_history(obj, field)
+        if history.deleted:
+            values[field] = history.deleted[0]
+        else:
+            values[field] = getattr(obj, field)
+    return values
+
+
+def _merge(deltas: Dict[str, Decimal], contribution: Dict[str, Decimal], sign: int) -> None:
+    for name, value in contribution.items():
+        deltas[name] = deltas.get(name, Decimal(0)) + sign * value
+
+
+def _collect_deltas(session: Session) -> Dict[str, Decimal]:
+    """根据本次flush中新增、修改、删除的对象计算计数器增量"""
+    deltas: Dict[str, Decimal] = {}
+    today = datetime.utcnow().date()
+
+    for obj in session.new:
+        model = type(obj).__name__
+        if model not in _CONTRIBUTIONS:
+            continue
+        contribution = _CONTRIBUTIONS[model](_current_values(obj, _TRACKED_FIELDS[model]))
+        _merge(deltas, contribution, 1)
+        for daily, source in _DAILY_ON_INSERT[model].items():
+            if source in contribution:
+                _merge(deltas, {_daily_name(daily, today): contribution[source]}, 1)
+
+    for obj in session.dirty:
+        model = type(obj).__name__
+        if model not in _CONTRIBUTIONS or not session.is_modified(obj, include_collections=False):
+            continue
+        fields = _TRACKED_FIELDS[model]
+        _merge(deltas, _CONTRIBUTIONS[model](_committed_values(obj, fields)), -1)
+        _merge(deltas, _CONTRIBUTIONS[model](_current_values(obj, fields)), 1)
+
+    for obj in session.deleted:
+        model = type(obj).__name__
+        if model not in _CONTRIBUTIONS:
+            continue
+        _merge(deltas, _CONTRIBUTIONS[model](_committed_values(obj, _TRACKED_FIELDS[model])), -1)
+
+    return {name: value for name, value in deltas.items() if value != 0}
+
+
+def _apply_deltas(connection, deltas: Dict[str, Decimal], shard: int) -> None:
+    """在当前事务内累加计数器（同一批计数器按名称顺序加锁）"""
+    if not deltas:
+        return
+    table = DashboardCounter.__table__
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    rows = [
+        {'name': name, 'shard': shard, 'value': deltas[name], 'updated_at': now}
+        for name in sorted(deltas)
+    ]
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name', 'shard'],
+            set_={
+                'value': table.c.value + stmt.excluded.value,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        connection.execute(stmt)
+        return
+
+    # 其他数据库：先更新，不存在时再插入
+    for row in rows:
+        result = connection.execute(
+            table.update().where(
+                table.c.name == row['name']
+            ).where(
+                table.c.shard == shard
+            ).values(value=table.c.value + row['value'], updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def _session_shard(session: Session) -> int:
+    """同一个会话固定使用一个分片，减少多次flush之间交叉加锁"""
+    shard = session.info.get('dashboard_counter_shard')
+    if shard is None:
+        shard = random.randrange(COUNTER_SHARDS)
+        session.info['dashboard_counter_shard'] = shard
+    return shard
+
+
+def _before_flush(session, flush_context, instances):
+    deltas = _collect_deltas(session)
+    if deltas:
+        _apply_deltas(session.connection(), deltas, _session_shard(session))
+
+
+def _track_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+class DashboardStatsService:
+    """仪表板统计：增量计数器、对账与每日快照"""
+
+    @staticmethod
+    def register_hooks() -> None:
+        """注册flush事件钩子（应用启动时调用一次）"""
+        global _hooks_registered
+        if _hooks_registered:
+            return
+
+        from app.models.asset import Asset
+        from app.models.trade import Trade
+        from app.models.user import User
+        from app.models.dividend import DividendRecord
+
+        # 参与统计的字段在赋值时加载旧值，flush前才能算出准确的差值
+        for model in (Asset, Trade, User, DividendRecord):
+            for field in _TRACKED_FIELDS[model.__name__]:
+                event.listen(getattr(model, field), 'set', _track_old_value,
+                             active_history=True, retval=True)
+
+        event.listen(Session, 'before_flush', _before_flush)
+        _hooks_registered = True
+
+    @staticmethod
+    def increment(deltas: Dict[str, float]) -> None:
+        """
+        在当前事务内累加计数器，供绕过ORM的批量更新使用
+
+        Args:
+            deltas: {计数器名称: 增量}
+        """
+        deltas = {name: _number(value) for name, value in deltas.items() if value}
+        _apply_deltas(db.session.connection(), deltas, _session_shard(db.session()))
+
+    @staticmethod
+    def asset_deltas(rows: Iterable, sign: int = -1) -> Dict[str, Decimal]:
+        """
+        计算一批资产加入或移出统计时的计数器增量
+
+        Args:
+            rows: 包含status、asset_type、total_value的行
+            sign: 1表示加入统计，-1表示移出统计（例如软删除）
+        """
+        deltas: Dict[str, Decimal] = {}
+        for row in rows:
+            _merge(deltas, _asset_contribution({
+                'status': row.status,
+                'asset_type': row.asset_type,
+                'total_value': row.total_value,
+                'deleted_at': None
+            }), sign)
+        return deltas
+
+    @staticmethod
+    def bulk_delete_deltas(model, *criteria) -> Dict[str, Decimal]:
+        """
+        计算用 query.delete() 批量删除交易或分红记录时的计数器增量（需在删除前调用）
+
+        Args:
+            model: Trade 或 DividendRecord
+            criteria: 删除条件
+        """
+        if model.__name__ == 'Trade':
+            columns = {
+                'trades_count': func.count(model.id),
+                'trades_amount': func.sum(model.amount),
+                'trades_volume': func.sum(model.total),
+            }
+        elif model.__name__ == 'DividendRecord':
+            columns = {
+                'dividends_count': func.count(model.id),
+                'dividends_total': func.sum(model.amount),
+            }
+        else:
+            raise ValueError(f"不支持的模型: {model.__name__}")
+
+        row = db.session.query(*columns.values()).filter(*criteria).one()
+        deltas = {name: -_number(value) for name, value in zip(columns, row)}
+        return {name: value for name, value in deltas.items() if value != 0}
+
+    @classmethod
+    def asset_status_deltas(cls, rows: Iterable, old_status: int) -> Dict[str, Decimal]:
+        """
+        计算一批资产从 old_status 变为当前状态时的计数器增量
+
+        Args:
+            rows: 更新后的行（包含status、asset_type、total_value）
+            old_status: 更新前的状态
+        """
+        rows = list(rows)
+        deltas = cls.asset_deltas(rows, 1)
+        previous = [
+            {'status': old_status, 'asset_type': row.asset_type, 'total_value': row.total_value, 'deleted_at': None}
+            for row in rows
+        ]
+        for values in previous:
+            _merge(deltas, _asset_contribution(values), -1)
+        return {name: value for name, value in deltas.items() if value != 0}
+
+    @classmethod
+    def get_asset_type_distribution(cls, approved_only: bool = False) -> Dict[int, Dict]:
+        """
+        按资产类型汇总未删除资产的数量与总价值
+
+        Args:
+            approved_only: 只统计已审核通过的资产（此时不返回总价值）
+
+        Returns:
+            dict: {资产类型: {'count': 数量, 'value': 总价值}}
+        """
+        prefix = 'assets_approved_type:' if approved_only else 'assets_type:'
+        rows = db.session.query(
+            DashboardCounter.name, func.sum(DashboardCounter.value)
+        ).filter(
+            DashboardCounter.name.like(f'{prefix}%') | DashboardCounter.name.like('assets_type_value:%')
+        ).group_by(DashboardCounter.name).all()
+
+        distribution: Dict[int, Dict] = {}
+        values = {}
+        for name, total in rows:
+            kind, asset_type = name.rsplit(':', 1)
+            if kind == 'assets_type_value':
+                values[asset_type] = float(_number(total))
+            elif int(total or 0) > 0:
+                distribution[int(asset_type)] = {'count': int(total), 'value': 0.0}
+        for asset_type, item in distribution.items():
+            if not approved_only:
+                item['value'] = values.get(str(asset_type), 0.0)
+        return distribution
+
+    @staticmethod
+    def read(names: Iterable[str]) -> Dict[str, Decimal]:
+        """读取计数器（各分片求和），不存在的计数器为0"""
+        names = list(names)
+        rows = db.session.query(
+            DashboardCounter.name, func.sum(DashboardCounter.value)
+        ).filter(DashboardCounter.name.in_(names)).group_by(DashboardCounter.name).all()
+        values = {name: Decimal(0) for name in names}
+        values.update({name: _number(total) for name, total in rows})
+        return values
+
+    @classmethod
+    def get_dashboard_stats(cls) -> Dict:
+        """仪表板汇总数据，只读取固定数量的计数器行"""
+        today = datetime.utcnow().date()
+        values = cls.read([
+            'assets_total', 'assets_status:1', 'assets_status:2', 'assets_value',
+            'trades_count', 'trades_volume', 'users_total', 'dividends_total',
+            _daily_name('users_new', today), _daily_name('trades_count', today),
+        ])
+        return {
+            'total_assets': int(values['assets_total']),
+            'pending_assets': int(values['assets_status:1']),
+            'approved_assets': int(values['assets_status:2']),
+            'total_value': float(values['assets_value']),
+            'total_trades': int(values['trades_count']),
+            'total_volume': float(values['trades_volume']),
+            'total_users': int(values['users_total']),
+            'total_dividends': float(values['dividends_total']),
+            'new_users_today': int(values[_daily_name('users_new', today)]),
+            'trades_today': int(values[_daily_name('trades_count', today)]),
+        }
+
+    @staticmethod
+    def _recount(group: str, today: date) -> Dict[str, Decimal]:
+        """全量聚合计算某一组计数器的准确值"""
+        if group == 'assets':
+            from app.models.asset import Asset
+
+            values: Dict[str, Decimal] = {'assets_total': Decimal(0), 'assets_value': Decimal(0)}
+            rows = db.session.query(
+                Asset.status, Asset.asset_type, func.count(Asset.id), func.sum(Asset.total_value)
+            ).filter(Asset.deleted_at.is_(None)).group_by(Asset.status, Asset.asset_type).all()
+            for status, asset_type, count, total_value in rows:
+                for name, value in (
+                    ('assets_total', Decimal(count)),
+                    ('assets_value', _number(total_value)),
+                    (f'assets_status:{status}', Decimal(count)),
+                    (f'assets_type:{asset_type}', Decimal(count)),
+                    (f'assets_type_value:{asset_type}', _number(total_value)),
+                ):
+                    values[name] = values.get(name, Decimal(0)) + value
+                if status == 2:
+                    values[f'assets_approved_type:{asset_type}'] = Decimal(count)
+            values[_daily_name('assets_new', today)] = Decimal(Asset.query.filter(
+                func.date(Asset.created_at) == today,
+                Asset.deleted_at.is_(None)
+            ).count())
+            return values
+
+        if group == 'trades':
+            from app.models.trade import Trade
+
+            count, amount, volume = db.session.query(
+                func.count(Trade.id), func.sum(Trade.amount), func.sum(Trade.total)
+            ).one()
+            today_count, today_amount = db.session.query(
+                func.count(Trade.id), func.sum(Trade.amount)
+            ).filter(func.date(Trade.created_at) == today).one()
+            return {
+                'trades_count': Decimal(count),
+                'trades_amount': _number(amount),
+                'trades_volume': _number(volume),
+                _daily_name('trades_count', today): Decimal(today_count),
+                _daily_name('trades_amount', today): _number(today_amount),
+            }
+
+        if group == 'users':
+            from app.models.user import User
+
+            return {
+                'users_total': Decimal(User.query.count()),
+                _daily_name('users_new', today): Decimal(User.query.filter(
+                    func.date(User.created_at) == today
+                ).count()),
+            }
+
+        if group == 'dividends':
+            from app.models.dividend import DividendRecord
+
+            count, total = db.session.query(
+                func.count(DividendRecord.id), func.sum(DividendRecord.amount)
+            ).one()
+            today_total = db.session.query(func.sum(DividendRecord.amount)).filter(
+                func.date(DividendRecord.created_at) == today
+            ).scalar()
+            return {
+                'dividends_count': Decimal(count),
+                'dividends_total': _number(total),
+                _daily_name('dividends_total', today): _number(today_total),
+            }
+
+        raise ValueError(f'未知的计数器分组: {group}')
+
+    @classmethod
+    def reconcile(cls, groups: Iterable[str] = ('assets', 'trades', 'users', 'dividends')) -> Dict[str, Dict]:
+        """
+        用全量聚合校正计数器，每组单独一个事务
+
+        先锁住该组已有的计数器行再做聚合：已累加但未提交的事务会先完成，
+        尚未累加的事务会等待对账提交，聚合结果与计数器保持一致。
+
+        Returns:
+            dict: {分组: {计数器名称: (原值, 校正值)}}，只包含发生偏差的计数器
+        """
+        today = datetime.utcnow().date()
+        drift: Dict[str, Dict] = {}
+        table = DashboardCounter.__table__
+
+        for group in groups:
+            try:
+                current: Dict[str, Decimal] = {}
+                locked = db.session.query(DashboardCounter).filter(
+                    DashboardCounter.name.like(f'{group}\\_%', escape='\\') |
+                    DashboardCounter.name.like(f'{DAILY_PREFIX}{group}\\_%:{today.isoformat()}', escape='\\')
+                ).with_for_update().all()
+                for counter in locked:
+                    current[counter.name] = current.get(counter.name, Decimal(0)) + _number(counter.value)
+
+                expected = cls._recount(group, today)
+                changed = {}
+                for name in set(current) | set(expected):
+                    actual = current.get(name, Decimal(0))
+                    value = expected.get(name, Decimal(0))
+                    if actual == value:
+                        continue
+                    changed[name] = (float(actual), float(value))
+                    db.session.execute(table.delete().where(table.c.name == name))
+                    db.session.execute(table.insert().values(
+                        name=name, shard=0, value=value, updated_at=datetime.utcnow()
+                    ))
+                db.session.commit()
+
+                if changed:
+                    drift[group] = changed
+                    logger.warning(f"仪表板计数器 {group} 已校正: {changed}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"仪表板计数器 {group} 对账失败: {str(e)}", exc_info=True)
+        return drift
+
+    @classmethod
+    def snapshot(cls, day: Optional[date] = None) -> Dict[str, float]:
+        """
+        把计数器写入 dashboard_stats 的每日统计（由调用方提交事务）
+
+        Args:
+            day: 统计日期，默认当天；累计值取写入时刻的计数器
+        """
+        day = day or datetime.utcnow().date()
+        values = cls.read([
+            'users_total', 'assets_total', 'assets_value', 'trades_count', 'trades_amount',
+            'dividends_total', 'assets_status:1', 'assets_status:2', 'assets_status:3',
+            _daily_name('users_new', day), _daily_name('assets_new', day),
+            _daily_name('trades_count', day), _daily_name('trades_amount', day),
+            _daily_name('dividends_total', day),
+        ])
+        stats = {
+            'user_count': values['users_total'],
+            'asset_count': values['assets_total'],
+            'asset_value': values['assets_value'],
+            'trade_count': values['trades_count'],
+            'trade_volume': values['trades_amount'],
+            'total_dividends': values['dividends_total'],
+            'pending_assets': values['assets_status:1'],
+            'approved_assets': values['assets_status:2'],
+            'rejected_assets': values['assets_status:3'],
+            'new_users': values[_daily_name('users_new', day)],
+            'new_users_today': values[_daily_name('users_new', day)],
+            'new_assets_today': values[_daily_name('assets_new', day)],
+            'trades_today': values[_daily_name('trades_count', day)],
+            'volume_today': values[_daily_name('trades_amount', day)],
+            'dividends_today': values[_daily_name('dividends_total', day)],
+        }
+        stats = {stat_type: float(value) for stat_type, value in stats.items()}
+        for stat_type, value in stats.items():
+            DashboardStats._update_stat(stat_type, 'daily', day, value)
+        return stats
+
+    @staticmethod
+    def prune_daily_counters(keep_days: int = DAILY_RETENTION_DAYS) -> int:
+        """删除已经写入每日快照的旧按日计数器"""
+        cutoff = (datetime.utcnow().date() - timedelta(days=keep_days)).isoformat()
+        removed = 0
+        names = db.session.query(DashboardCounter.name).filter(
+            DashboardCounter.name.like(f'{DAILY_PREFIX}%')
+        ).distinct().all()
+        for (name,) in names:
+            if name.rsplit(':', 1)[-1] < cutoff:
+                removed += DashboardCounter.query.filter_by(name=name).delete(synchronize_session=False)
+        return removed
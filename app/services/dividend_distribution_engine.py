@@ -0,0 +1,334 @@
+"""
+分红分配引擎
+一次流式查询快照资产的全部持仓，按持有数量用精确整数运算计算每位持有人的份额
+（最大余数法分配尾差），再批量写入分配明细并累加可领取汇总
+"""
+
+import csv
+import io
+import logging
+from datetime import datetime
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models.dividend import DividendRecord, DividendDistribution, DividendClaimableBalance
+from app.models.holding import Holding
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class DividendDistributionEngine:
+    """
+    按持仓比例分配分红
+
+    金额与持有数量都先换算为最小单位的整数：
+    持有人份额 = floor(总金额 * 持有数量 / 总持有数量)，
+    向下取整产生的尾差按余数从大到小逐个最小单位补给持有人，余数相同按持仓记录顺序，
+    因此各份额之和严格等于分红总额，且结果可复现。
+    """
+
+    AMOUNT_DECIMALS = 6      # 与 Numeric(20, 6) 金额字段一致
+    QUANTITY_DECIMALS = 6    # 持有数量换算为整数时保留的小数位
+    STREAM_BATCH_SIZE = 10000
+    INSERT_BATCH_SIZE = 5000
+
+    # ------------------------------------------------------------------
+    # 持仓快照与份额计算
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def snapshot_holdings(cls, asset_id: int) -> Tuple[List[str], np.ndarray]:
+        """
+        流式读取资产的全部有效持仓
+
+        Args:
+            asset_id: 资产ID
+
+        Returns:
+            Tuple[List[str], np.ndarray]: (持有人地址列表, 以最小单位表示的持有数量)
+        """
+        holder_address = func.coalesce(User.solana_address, User.eth_address)
+        query = db.session.query(
+            holder_address,
+            Holding.quantity
+        ).join(
+            User, User.id == Holding.user_id
+        ).filter(
+            Holding.asset_id == asset_id,
+            Holding.quantity > 0
+        ).order_by(Holding.id).execution_options(
+            stream_results=True,
+            yield_per=cls.STREAM_BATCH_SIZE
+        )
+
+        scale = Decimal(10) ** cls.QUANTITY_DECIMALS
+        addresses: List[str] = []
+        quantities: List[int] = []
+        skipped = 0
+        for address, quantity in query:
+            if not address:
+                skipped += 1
+                continue
+            units = int((Decimal(repr(quantity)) * scale).to_integral_value(rounding=ROUND_DOWN))
+            if units <= 0:
+                continue
+            addresses.append(address)
+            quantities.append(units)
+
+        if skipped:
+            logger.warning(f"资产 {asset_id} 有 {skipped} 条持仓缺少钱包地址，未参与分红")
+
+        return addresses, cls._int_array(quantities)
+
+    @classmethod
+    def snapshot_chain_holders(cls, asset_id: int) -> Tuple[List[str], np.ndarray]:
+        """
+        从链上持有人索引读取资产代币的全部持有人（包括未经平台交易的链上转入）
+
+        Args:
+            asset_id: 资产ID
+
+        Returns:
+            Tuple[List[str], np.ndarray]: (持有人地址列表, 链上最小单位余额)
+        """
+        from app.models import Asset
+        from app.services.token_holder_indexer import TokenHolderIndexer
+
+        asset = db.session.get(Asset, asset_id)
+        if asset is None or not asset.spl_mint_address:
+            raise ValueError('该资产没有发行SPL Token')
+        if TokenHolderIndexer.get_state(asset.spl_mint_address) is None:
+            raise ValueError('该资产的链上持有人索引尚未建立')
+
+        addresses: List[str] = []
+        quantities: List[int] = []
+        for owner, amount in TokenHolderIndexer.iter_holder_balances(asset.spl_mint_address):
+            addresses.append(owner)
+            quantities.append(amount)
+        return addresses, cls._int_array(quantities)
+
+    @classmethod
+    def compute_shares(cls, quantities: np.ndarray, total_units: int) -> np.ndarray:
+        """
+        按持有数量计算每位持有人的份额（最小单位整数）
+
+        Args:
+            quantities: 以最小单位表示的持有数量
+            total_units: 以最小单位表示的分红总额
+
+        Returns:
+            np.ndarray: 与quantities一一对应的份额，总和等于total_units
+        """
+        if len(quantities) == 0 or total_units <= 0:
+            return np.zeros(len(quantities), dtype=np.int64)
+
+        total_quantity = int(quantities.sum(dtype=object))
+        # 乘积可能超出int64时改用Python大整数（object数组），保持运算精确
+        if int(quantities.max()) * total_units >= 2 ** 63:
+            quantities = quantities.astype(object)
+
+        numerators = quantities * total_units
+        shares = numerators // total_quantity
+        remainders = numerators % total_quantity
+
+        leftover = total_units - int(shares.sum())
+        if leftover:
+            # 稳定排序保证余数相同时按持仓记录顺序分配
+            order = np.argsort(-remainders, kind='stable')
+            shares[order[:leftover]] += 1
+
+        return shares
+
+    # ------------------------------------------------------------------
+    # 分配
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def distribute(cls, asset_id: int, amount, distributor_address: str,
+                   interval: int = 0, source: str = 'holdings') -> Dict:
+        """
+        创建分红记录并按持仓比例分配给全部持有人，整个过程在一个事务内完成
+
+        Args:
+            asset_id: 资产ID
+            amount: 分红总额
+            distributor_address: 发起人地址
+            interval: 分红间隔（秒）
+            source: 持仓来源，holdings为平台持仓记录，chain为链上持有人索引
+
+        Returns:
+            Dict: 分配结果摘要
+        """
+        amount_scale = Decimal(10) ** cls.AMOUNT_DECIMALS
+        total_units = int((Decimal(str(amount)) * amount_scale).to_integral_value(rounding=ROUND_DOWN))
+        if total_units <= 0:
+            raise ValueError('分红金额必须大于0')
+
+        started = datetime.utcnow()
+        try:
+            if source == 'chain':
+                addresses, quantities = cls.snapshot_chain_holders(asset_id)
+            else:
+                addresses, quantities = cls.snapshot_holdings(asset_id)
+            if not addresses:
+                raise ValueError('该资产没有可分红的持有人')
+
+            shares = cls.compute_shares(quantities, total_units)
+
+            record = DividendRecord(
+                asset_id=asset_id,
+                amount=Decimal(total_units) / amount_scale,
+                distributor_address=distributor_address,
+                interval=interval
+            )
+            db.session.add(record)
+            db.session.flush()
+
+            allocations = [
+                (address, Decimal(int(units)) / amount_scale)
+                for address, units in zip(addresses, shares)
+                if units
+            ]
+            cls._bulk_insert_distributions(record.id, allocations)
+            cls._bulk_increment_claimable(asset_id, allocations)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info(
+            f"资产 {asset_id} 分红完成: 记录ID={record.id}, 持有人={len(allocations)}, "
+            f"总额={record.amount}, 耗时={elapsed:.2f}s"
+        )
+        return {
+            'dividend_record_id': record.id,
+            'asset_id': asset_id,
+            'amount': float(record.amount),
+            'holder_count': len(allocations),
+            'elapsed_seconds': elapsed
+        }
+
+    @classmethod
+    def _bulk_insert_distributions(cls, record_id: int, allocations: List[Tuple[str, Decimal]]) -> None:
+        """批量写入分配明细：PostgreSQL使用COPY，其他数据库使用executemany"""
+        now = datetime.utcnow()
+        connection = db.session.connection()
+
+        if connection.dialect.name == 'postgresql':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for address, amount in allocations:
+                writer.writerow((record_id, address, str(amount), 'pending', now.isoformat(), now.isoformat()))
+            buffer.seek(0)
+            cursor = connection.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    "COPY dividend_distributions "
+                    "(dividend_record_id, holder_address, amount, status, created_at, updated_at) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+            finally:
+                cursor.close()
+            return
+
+        table = DividendDistribution.__table__
+        rows = [
+            {
+                'dividend_record_id': record_id,
+                'holder_address': address,
+                'amount': amount,
+                'status': 'pending',
+                'created_at': now,
+                'updated_at': now
+            }
+            for address, amount in allocations
+        ]
+        for start in range(0, len(rows), cls.INSERT_BATCH_SIZE):
+            connection.execute(table.insert(), rows[start:start + cls.INSERT_BATCH_SIZE])
+
+    @classmethod
+    def _bulk_increment_claimable(cls, asset_id: int, allocations: List[Tuple[str, Decimal]]) -> None:
+        """按 (持有人, 资产) 累加可领取汇总"""
+        now = datetime.utcnow()
+        table = DividendClaimableBalance.__table__
+        connection = db.session.connection()
+        dialect = connection.dialect.name
+
+        rows = [
+            {
+                'holder_address': address,
+                'asset_id': asset_id,
+                'claimable_amount': amount,
+                'claimed_amount': 0,
+                'updated_at': now
+            }
+            for address, amount in allocations
+        ]
+
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['holder_address', 'asset_id'],
+                set_={
+                    'claimable_amount': table.c.claimable_amount + stmt.excluded.claimable_amount,
+                    'updated_at': stmt.excluded.updated_at
+                }
+            )
+            for start in range(0, len(rows), cls.INSERT_BATCH_SIZE):
+                connection.execute(stmt, rows[start:start + cls.INSERT_BATCH_SIZE])
+            return
+
+        # 其他数据库：先查出已有汇总行，再分别批量更新和插入
+        existing = set(
+            address for (address,) in db.session.query(table.c.holder_address).filter(
+                table.c.asset_id == asset_id
+            )
+        )
+        updates = [
+            {'b_holder': row['holder_address'], 'b_amount': row['claimable_amount']}
+            for row in rows if row['holder_address'] in existing
+        ]
+        inserts = [row for row in rows if row['holder_address'] not in existing]
+        if updates:
+            from sqlalchemy import bindparam
+            connection.execute(
+                table.update().where(
+                    table.c.asset_id == asset_id
+                ).where(
+                    table.c.holder_address == bindparam('b_holder')
+                ).values(
+                    claimable_amount=table.c.claimable_amount + bindparam('b_amount'),
+                    updated_at=now
+                ),
+                updates
+            )
+        if inserts:
+            connection.execute(table.insert(), inserts)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get_claimable(holder_address: str, asset_id: Optional[int] = None) -> Decimal:
+        """获取持有人的可领取分红金额"""
+        return DividendClaimableBalance.get_claimable(holder_address, asset_id)
+
+    @staticmethod
+    def _int_array(values: List[int]) -> np.ndarray:
+        """整数列表转数组，超出int64范围时使用object数组"""
+        if values and max(values) >= 2 ** 63:
+            return np.array(values, dtype=object)
+        return np.array(values, dtype=np.int64)
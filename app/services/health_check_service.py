@@ -13,7 +13,6 @@ from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import psutil
-import requests
 
 from app.extensions import db
 from sqlalchemy import text
@@ -357,53 +356,28 @@ class HealthCheckService:
         """检查Solana网络连接"""
         try:
             from app.config import Config
+            from app.utils.solana_compat.rpc.async_api import AsyncClient, gather_sync
             
             rpc_url = Config.SOLANA_RPC_URL
+            client = AsyncClient(rpc_url, timeout=10)
             
             start_time = time.time()
             
-            # 测试RPC连接
-            response = requests.post(
-                rpc_url,
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "getHealth"
-                },
-                timeout=10
-            )
+            # getHealth 与 getSlot 并发请求，耗时取两者中较慢的一个
+            health, slot = gather_sync(client.get_health(), client.get_slot(), timeout=12)
             
             response_time = time.time() - start_time
             
-            if response.status_code == 200:
-                result = response.json()
-                
-                if 'result' in result and result['result'] == 'ok':
+            # 带jsonrpc字段说明收到了节点响应（节点落后时getHealth返回RPC错误）
+            if isinstance(health, dict) and 'jsonrpc' in health:
+                if health.get('result') == 'ok':
                     status = HealthStatus.HEALTHY
                     message = "Solana网络连接正常"
                 else:
                     status = HealthStatus.WARNING
                     message = "Solana网络状态异常"
                 
-                # 获取更多网络信息
-                try:
-                    slot_response = requests.post(
-                        rpc_url,
-                        json={
-                            "jsonrpc": "2.0",
-                            "id": 1,
-                            "method": "getSlot"
-                        },
-                        timeout=5
-                    )
-                    
-                    current_slot = None
-                    if slot_response.status_code == 200:
-                        slot_result = slot_response.json()
-                        current_slot = slot_result.get('result')
-                    
-                except:
-                    current_slot = None
+                current_slot = slot.get('result') if isinstance(slot, dict) else None
                 
                 return HealthCheckResult(
                     name="solana_network",
@@ -413,23 +387,24 @@ class HealthCheckService:
                         'rpc_url': rpc_url,
                         'response_time': response_time,
                         'current_slot': current_slot,
-                        'network_status': result.get('result')
+                        'network_status': health.get('result')
                     }
                 )
-            else:
+            elif isinstance(health, dict) and 'status_code' in health['error']:
                 return HealthCheckResult(
                     name="solana_network",
                     status=HealthStatus.CRITICAL,
-                    message=f"Solana RPC请求失败: HTTP {response.status_code}",
+                    message=f"Solana RPC请求失败: HTTP {health['error']['status_code']}",
                     details={'rpc_url': rpc_url, 'response_time': response_time}
                 )
+            else:
+                error = health['error'].get('message') if isinstance(health, dict) else str(health)
+                return HealthCheckResult(
+                    name="solana_network",
+                    status=HealthStatus.CRITICAL,
+                    message=f"Solana网络连接失败: {error}"
+                )
                 
-        except requests.RequestException as e:
-            return HealthCheckResult(
-                name="solana_network",
-                status=HealthStatus.CRITICAL,
-                message=f"Solana网络连接失败: {str(e)}"
-            )
         except Exception as e:
             return HealthCheckResult(
                 name="solana_network",
@@ -4,6 +4,8 @@ Log aggregation service for transaction-related errors and monitoring.
 import logging
 import json
 import os
+import atexit
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from collections import defaultdict, deque
@@ -11,6 +13,13 @@ from dataclasses import dataclass
 import re
 
 from app.utils.error_handler import ErrorHandler
+from app.utils.log_rollup import LogRollupStore
+
+# Buffered rollup counters are written to the store at most this often (seconds)
+ROLLUP_FLUSH_INTERVAL = 5
+
+# Flush early once this many distinct counters are pending
+ROLLUP_FLUSH_THRESHOLD = 500
 
 
 @dataclass
@@ -60,6 +69,17 @@ class TransactionLogAggregator:
         
         # Compile regex patterns for efficiency
         self.compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.transaction_patterns]
+        
+        # Persisted daily rollups back the trend view; opened lazily on first use
+        self.rollup_source = 'transaction_errors'
+        self._rollup_store: Optional[LogRollupStore] = None
+        
+        # Pending rollup increments keyed by (day, dimension, key); a background
+        # thread writes them in one transaction instead of one per log entry
+        self._rollup_pending: Dict[tuple, int] = defaultdict(int)
+        self._rollup_lock = threading.Lock()
+        self._rollup_wakeup = threading.Event()
+        self._rollup_thread: Optional[threading.Thread] = None
     
     def process_log_entry(self, 
                          level: str, 
@@ -96,6 +116,7 @@ class TransactionLogAggregator:
         # Analyze for transaction-related patterns
         if self._is_transaction_related(message):
             self._analyze_transaction_error(log_entry)
+            self._record_rollup(log_entry)
     
     def get_transaction_error_summary(self, hours: int = 24) -> Dict[str, Any]:
         """Get summary of transaction-related errors"""
@@ -148,35 +169,38 @@ class TransactionLogAggregator:
         }
     
     def get_error_trends(self, days: int = 7) -> Dict[str, Any]:
-        """Get error trends over time"""
+        """Get error trends over time from the persisted daily rollups"""
         
-        cutoff_time = datetime.utcnow() - timedelta(days=days)
+        since_day = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # Filter logs by time period
-        filtered_logs = [
-            log for log in self.recent_logs 
-            if log.timestamp >= cutoff_time and self._is_transaction_related(log.message)
-        ]
+        store = self._get_rollup_store()
+        if store is None:
+            return {'trend_data': [], 'time_period_days': days, 'total_errors': 0}
+        self.flush_rollups()
         
         # Group by day and error type
         daily_trends = defaultdict(lambda: defaultdict(int))
+        daily_totals = defaultdict(int)
         
-        for log in filtered_logs:
-            day_key = log.timestamp.strftime('%Y-%m-%d')
-            error_type = log.error_type or self._classify_error(log.message)
-            daily_trends[day_key][error_type] += 1
+        for day, dimension, key, count, _ in store.query(self.rollup_source, since_day):
+            if dimension == 'total':
+                daily_totals[day] += count
+            elif dimension == 'error_type':
+                daily_trends[day][key] += count
         
         # Convert to list format for easier consumption
         trend_data = []
-        for day in sorted(daily_trends.keys()):
-            day_data = {'date': day, 'errors': dict(daily_trends[day])}
-            day_data['total'] = sum(daily_trends[day].values())
-            trend_data.append(day_data)
+        for day in sorted(daily_totals.keys()):
+            trend_data.append({
+                'date': day,
+                'errors': dict(daily_trends[day]),
+                'total': daily_totals[day]
+            })
         
         return {
             'trend_data': trend_data,
             'time_period_days': days,
-            'total_errors': len(filtered_logs)
+            'total_errors': sum(daily_totals.values())
         }
     
     def search_logs(self, 
@@ -313,6 +337,72 @@ class TransactionLogAggregator:
         else:
             raise ValueError(f"Unsupported format: {format}")
     
+    def _get_rollup_store(self) -> Optional[LogRollupStore]:
+        """Open the rollup store on first use; returns None if it is unavailable"""
+        if self._rollup_store is None:
+            try:
+                self._rollup_store = LogRollupStore()
+            except Exception as e:
+                self.logger.warning(f"Log rollup store unavailable: {e}")
+                return None
+        return self._rollup_store
+    
+    def _record_rollup(self, log_entry: LogEntry) -> None:
+        """Buffer the daily counters for a transaction-related entry"""
+        day = log_entry.timestamp.strftime('%Y-%m-%d')
+        error_type = log_entry.error_type or self._classify_error(log_entry.message)
+        with self._rollup_lock:
+            self._rollup_pending[(day, 'total', '')] += 1
+            self._rollup_pending[(day, 'error_type', error_type)] += 1
+            pending = len(self._rollup_pending)
+        self._ensure_rollup_thread()
+        if pending >= ROLLUP_FLUSH_THRESHOLD:
+            self._rollup_wakeup.set()
+    
+    def _ensure_rollup_thread(self) -> None:
+        """Start the background flusher on first use (and again after a fork)"""
+        thread = self._rollup_thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._rollup_lock:
+            if self._rollup_thread is not None and self._rollup_thread.is_alive():
+                return
+            if self._rollup_thread is None:
+                atexit.register(self.flush_rollups)
+            self._rollup_thread = threading.Thread(
+                target=self._rollup_flush_loop, name='log-rollup-flush', daemon=True
+            )
+            self._rollup_thread.start()
+    
+    def _rollup_flush_loop(self) -> None:
+        while True:
+            self._rollup_wakeup.wait(ROLLUP_FLUSH_INTERVAL)
+            self._rollup_wakeup.clear()
+            self.flush_rollups()
+    
+    def flush_rollups(self) -> None:
+        """Write the buffered rollup counters to the store in a single transaction"""
+        with self._rollup_lock:
+            if not self._rollup_pending:
+                return
+            pending = self._rollup_pending
+            self._rollup_pending = defaultdict(int)
+        
+        store = self._get_rollup_store()
+        if store is None:
+            return
+        try:
+            store.increment([
+                (self.rollup_source, day, dimension, key, count, 0.0)
+                for (day, dimension, key), count in pending.items()
+            ])
+        except Exception as e:
+            # Aggregation must never break the logging path; keep the counts for the next flush
+            self.logger.debug(f"Failed to record log rollup: {e}")
+            with self._rollup_lock:
+                for rollup_key, count in pending.items():
+                    self._rollup_pending[rollup_key] += count
+    
     def _is_transaction_related(self, message: str) -> bool:
         """Check if log message is transaction-related"""
         
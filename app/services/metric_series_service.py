@@ -0,0 +1,350 @@
+"""
+指标时间序列服务
+
+按固定时间桶保存趋势指标：汇总任务从业务表增量写入小时桶，
+再降采样为日、周、月桶；趋势图按时间范围直接读取对应粒度的桶，
+365天范围只需读取约365行，不再对业务表做 func.date(...) 分组。
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal
+
+from app.extensions import db
+from app.models.metric_series import MetricBucket, MetricRollupState
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = ('hour', 'day', 'week', 'month')
+
+# 降采样来源：日桶由小时桶汇总，周桶和月桶由日桶汇总
+_DOWNSAMPLE_FROM = {'day': 'hour', 'week': 'day', 'month': 'day'}
+
+# 每次汇总重新计算最近的小时数，覆盖延迟提交的记录
+DEFAULT_LOOKBACK_HOURS = 2
+
+# 小时桶保留天数，更早的数据只保留日/周/月桶
+HOUR_RETENTION_DAYS = 90
+
+# 全量回填时每批读取的行数
+BACKFILL_BATCH_SIZE = 2000
+
+
+def _floor(ts: datetime, resolution: str) -> datetime:
+    """时间所在桶的起始时间"""
+    if resolution == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = datetime(ts.year, ts.month, ts.day)
+    if resolution == 'day':
+        return day
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'month':
+        return datetime(ts.year, ts.month, 1)
+    raise ValueError(f'未知的时间粒度: {resolution}')
+
+
+def _next(start: datetime, resolution: str) -> datetime:
+    """下一个桶的起始时间"""
+    if resolution == 'hour':
+        return start + timedelta(hours=1)
+    if resolution == 'day':
+        return start + timedelta(days=1)
+    if resolution == 'week':
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return datetime(start.year + 1, 1, 1)
+    return datetime(start.year, start.month + 1, 1)
+
+
+def _naive_utc(ts: datetime) -> datetime:
+    if ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _number(value) -> Decimal:
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+class _Metric:
+    """
+    指标定义
+
+    kind 为 'sum' 时 source 返回 (时间列, 数值表达式, 过滤条件列表)，每个桶为区间内数值之和；
+    kind 为 'last' 时 sample 返回当前值，每个桶保留区间内最后一次采样。
+    """
+
+    def __init__(self, name: str, kind: str, source: Callable = None, sample: Callable = None):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.sample = sample
+
+
+def _new_users_source():
+    from app.models.user import User
+    return User.created_at, literal(1), []
+
+
+# 交易和佣金按完成/支付时间计入：创建很久之后才完成的记录落在最近的桶中，
+# 完成后的其他更新也不会让记录换桶
+def _trade_count_source():
+    from app.models.trade import Trade, TradeStatus
+    return Trade.completed_at, literal(1), [Trade.status == TradeStatus.COMPLETED.value]
+
+
+def _trade_volume_source():
+    from app.models.trade import Trade, TradeStatus
+    return Trade.completed_at, Trade.total, [Trade.status == TradeStatus.COMPLETED.value]
+
+
+def _commission_paid_source():
+    from app.models.referral import CommissionRecord
+    return CommissionRecord.paid_at, CommissionRecord.amount, [CommissionRecord.status == 'paid']
+
+
+def _dividends_source():
+    from app.models.dividend import DividendRecord
+    return DividendRecord.created_at, DividendRecord.amount, []
+
+
+def _asset_value_sample():
+    from app.services.dashboard_stats_service import DashboardStatsService
+    return DashboardStatsService.read(['assets_value'])['assets_value']
+
+
+METRICS: Dict[str, _Metric] = {
+    metric.name: metric for metric in (
+        _Metric('new_users', 'sum', source=_new_users_source),
+        _Metric('trade_count', 'sum', source=_trade_count_source),
+        _Metric('trade_volume', 'sum', source=_trade_volume_source),
+        _Metric('commission_paid', 'sum', source=_commission_paid_source),
+        _Metric('dividends_paid', 'sum', source=_dividends_source),
+        _Metric('asset_value', 'last', sample=_asset_value_sample),
+    )
+}
+
+
+class MetricSeriesService:
+    """趋势指标的增量汇总、降采样与区间查询"""
+
+    @staticmethod
+    def _write_buckets(metric: str, resolution: str, start: datetime, end: datetime,
+                       buckets: Dict[datetime, Decimal]) -> None:
+        """用新结果替换 [start, end) 内的桶（数值为0的桶不保存）"""
+        MetricBucket.query.filter(
+            MetricBucket.metric == metric,
+            MetricBucket.resolution == resolution,
+            MetricBucket.bucket_start >= start,
+            MetricBucket.bucket_start < end
+        ).delete(synchronize_session=False)
+        now = datetime.utcnow()
+        rows = [
+            {'metric': metric, 'resolution': resolution, 'bucket_start': bucket_start,
+             'value': value, 'updated_at': now}
+            for bucket_start, value in sorted(buckets.items()) if value != 0
+        ]
+        if rows:
+            db.session.execute(MetricBucket.__table__.insert(), rows)
+
+    @classmethod
+    def _aggregate_hours(cls, metric: _Metric, start: datetime, end: datetime) -> Dict[datetime, Decimal]:
+        ts_column, value_column, filters = metric.source()
+        query = db.session.query(ts_column, value_column).filter(
+            ts_column >= start, ts_column < end, *filters
+        ).execution_options(yield_per=BACKFILL_BATCH_SIZE)
+
+        buckets: Dict[datetime, Decimal] = {}
+        for ts, value in query:
+            if ts is None:
+                continue
+            hour = _floor(_naive_utc(ts), 'hour')
+            buckets[hour] = buckets.get(hour, Decimal(0)) + _number(value)
+        return buckets
+
+    @classmethod
+    def _downsample(cls, metric: _Metric, start: datetime, end: datetime) -> None:
+        """根据较细粒度的桶重新计算 [start, end) 覆盖到的日、周、月桶"""
+        for resolution in ('day', 'week', 'month'):
+            source = _DOWNSAMPLE_FROM[resolution]
+            range_start = _floor(start, resolution)
+            range_end = _next(_floor(end - timedelta(microseconds=1), resolution), resolution)
+
+            rows = MetricBucket.query.filter(
+                MetricBucket.metric == metric.name,
+                MetricBucket.resolution == source,
+                MetricBucket.bucket_start >= range_start,
+                MetricBucket.bucket_start < range_end
+            ).order_by(MetricBucket.bucket_start).all()
+
+            buckets: Dict[datetime, Decimal] = {}
+            for row in rows:
+                bucket_start = _floor(row.bucket_start, resolution)
+                if metric.kind == 'sum':
+                    buckets[bucket_start] = buckets.get(bucket_start, Decimal(0)) + _number(row.value)
+                else:
+                    buckets[bucket_start] = _number(row.value)
+            cls._write_buckets(metric.name, resolution, range_start, range_end, buckets)
+
+    @classmethod
+    def rollup_metric(cls, name: str, lookback_hours: int = DEFAULT_LOOKBACK_HOURS) -> Dict:
+        """
+        增量汇总单个指标（由调用方提交事务）
+
+        Args:
+            name: 指标名称
+            lookback_hours: 在上次进度之前重新计算的小时数
+
+        Returns:
+            dict: 本次汇总的时间范围
+        """
+        metric = METRICS[name]
+        now = datetime.utcnow()
+        current_hour = _floor(now, 'hour')
+        end = current_hour + timedelta(hours=1)
+
+        state = db.session.get(MetricRollupState, name)
+        if state is None:
+            state = MetricRollupState(metric=name)
+            db.session.add(state)
+
+        if metric.kind == 'last':
+            start = current_hour
+            cls._write_buckets(name, 'hour', start, end, {current_hour: _number(metric.sample())})
+        else:
+            if state.watermark is not None:
+                start = state.watermark - timedelta(hours=lookback_hours)
+            else:
+                # 首次运行：从最早的记录开始回填
+                ts_column, _, filters = metric.source()
+                earliest = db.session.query(func.min(ts_column)).filter(*filters).scalar()
+                start = _floor(_naive_utc(earliest), 'hour') if earliest else current_hour
+            start = min(_floor(start, 'hour'), current_hour)
+            cls._write_buckets(name, 'hour', start, end, cls._aggregate_hours(metric, start, end))
+
+        cls._downsample(metric, start, end)
+        state.watermark = current_hour
+        return {'metric': name, 'start': start.isoformat(), 'end': end.isoformat()}
+
+    @classmethod
+    def rollup(cls, lookback_hours: int = DEFAULT_LOOKBACK_HOURS) -> List[Dict]:
+        """汇总全部指标，每个指标单独提交，并清理过期的小时桶"""
+        results = []
+        for name in METRICS:
+            try:
+                results.append(cls.rollup_metric(name, lookback_hours))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"汇总指标 {name} 失败: {str(e)}", exc_info=True)
+
+        try:
+            cutoff = _floor(datetime.utcnow() - timedelta(days=HOUR_RETENTION_DAYS), 'day')
+            MetricBucket.query.filter(
+                MetricBucket.resolution == 'hour',
+                MetricBucket.bucket_start < cutoff
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"清理过期小时桶失败: {str(e)}")
+        return results
+
+    @staticmethod
+    def choose_resolution(days: int) -> str:
+        """按时间范围选择粒度，使数据点数量保持在几百个以内"""
+        if days <= 2:
+            return 'hour'
+        if days <= 400:
+            return 'day'
+        if days <= 2000:
+            return 'week'
+        return 'month'
+
+    @classmethod
+    def get_series(cls, name: str, start: datetime, end: datetime,
+                   resolution: str = 'day') -> List[Tuple[datetime, float]]:
+        """
+        读取 [start, end] 范围内的桶，缺失的桶补齐
+
+        Args:
+            name: 指标名称
+            start: 起始时间（UTC）
+            end: 结束时间（UTC，包含所在的桶）
+            resolution: hour, day, week, month
+
+        Returns:
+            list: [(桶起始时间, 数值)]；累加型指标缺失补0，采样型指标沿用上一个值
+        """
+        metric = METRICS[name]
+        first = _floor(start, resolution)
+        last = _floor(end, resolution)
+
+        rows = MetricBucket.query.filter(
+            MetricBucket.metric == name,
+            MetricBucket.resolution == resolution,
+            MetricBucket.bucket_start >= first,
+            MetricBucket.bucket_start <= last
+        ).all()
+        values = {row.bucket_start: float(row.value or 0) for row in rows}
+
+        carry = 0.0
+        if metric.kind == 'last':
+            previous = MetricBucket.query.filter(
+                MetricBucket.metric == name,
+                MetricBucket.resolution == resolution,
+                MetricBucket.bucket_start < first
+            ).order_by(MetricBucket.bucket_start.desc()).first()
+            if previous:
+                carry = float(previous.value or 0)
+
+        series = []
+        bucket_start = first
+        while bucket_start <= last:
+            if bucket_start in values:
+                value = values[bucket_start]
+                if metric.kind == 'last':
+                    carry = value
+            else:
+                value = carry if metric.kind == 'last' else 0.0
+            series.append((bucket_start, value))
+            bucket_start = _next(bucket_start, resolution)
+        return series
+
+    @classmethod
+    def get_trend(cls, name: str, days: int, resolution: Optional[str] = None) -> Dict[str, List]:
+        """
+        最近 days 天（含今天）的趋势，格式与前端图表一致
+
+        Returns:
+            dict: {'labels': [...], 'values': [...]}
+        """
+        days = max(int(days), 1)
+        resolution = resolution or cls.choose_resolution(days)
+        end = datetime.utcnow()
+        start = _floor(end, 'day') - timedelta(days=days - 1)
+        label_format = {'hour': '%m-%d %H:00', 'day': '%m-%d', 'week': '%Y-%m-%d', 'month': '%Y-%m'}[resolution]
+
+        series = cls.get_series(name, start, end, resolution)
+        return {
+            'labels': [bucket_start.strftime(label_format) for bucket_start, _ in series],
+            'values': [value for _, value in series],
+        }
+
+    @classmethod
+    def get_trend_points(cls, name: str, days: int) -> List[Dict]:
+        """最近 days 天的日趋势，格式与 DashboardStats.get_trend_data 一致"""
+        end = datetime.utcnow()
+        start = _floor(end, 'day') - timedelta(days=max(int(days), 1) - 1)
+        return [
+            {'date': bucket_start.date().isoformat(), 'value': value}
+            for bucket_start, value in cls.get_series(name, start, end, 'day')
+        ]
@@ -0,0 +1,337 @@
+"""
+代理资源磁盘缓存
+
+供 /proxy 路由使用：
+- 缓存未过期时直接从本地磁盘发送文件
+- 过期后先返回旧副本，同时在后台用条件请求（ETag/Last-Modified）刷新（stale-while-revalidate），
+  刷新失败后 REFRESH_RETRY_DELAY 秒内不再请求上游（记录在元数据中，各worker共用）
+- 同一资源的并发未命中只向上游请求一次，其余请求等待结果
+- 可设置磁盘容量上限，超出时按最近访问时间（LRU）淘汰
+
+容量按缓存目录中的实际文件统计，多个worker共用同一个上限；
+命中时更新文件的访问时间，淘汰时由文件锁保证同一时刻只有一个进程在清理。
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 下载时每次写入的字节数
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 后台刷新线程数
+REFRESH_WORKERS = 4
+
+# 后台刷新失败后，再次请求上游前等待的秒数
+REFRESH_RETRY_DELAY = 60
+
+# 命中时更新访问时间的最小间隔（秒），避免每次命中都写文件元数据
+TOUCH_INTERVAL = 60
+
+EVICT_LOCK_NAME = '.evict.lock'
+
+_refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='proxy-cache-refresh')
+
+
+class UpstreamError(Exception):
+    """上游请求失败且没有可用的缓存副本"""
+
+    def __init__(self, status_code: int, message: str = ''):
+        self.status_code = status_code
+        super().__init__(message or f'上游返回状态码 {status_code}')
+
+
+class CacheEntry:
+    """缓存的资源：本地文件路径和元数据"""
+
+    def __init__(self, path: str, meta: Dict):
+        self.path = path
+        self.meta = meta
+
+    @property
+    def content_type(self) -> str:
+        return self.meta.get('content_type') or 'application/octet-stream'
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.meta.get('etag')
+
+
+class _Inflight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry: Optional[CacheEntry] = None
+        self.error: Optional[Exception] = None
+
+
+class ProxyCache:
+    """
+    磁盘缓存
+
+    Args:
+        cache_dir: 缓存目录
+        ttl: 资源视为新鲜的秒数，过期后后台重新验证
+        max_bytes: 磁盘容量上限，None表示不限制
+        max_object_size: 单个资源的最大字节数
+        hashed_keys: 是否用键的哈希作为文件名（外部URL）；否则直接用键作为文件名（供应商文件）
+    """
+
+    def __init__(self, cache_dir: str, ttl: int = 86400, max_bytes: Optional[int] = None,
+                 max_object_size: int = 20 * 1024 * 1024, hashed_keys: bool = True, timeout: int = 10):
+        self.cache_dir = cache_dir
+        self.meta_dir = os.path.join(cache_dir, '.meta')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_object_size = max_object_size
+        self.hashed_keys = hashed_keys
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Inflight] = {}
+        self._refreshing = set()
+
+    def _name(self, key: str) -> str:
+        if self.hashed_keys:
+            return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+        return os.path.basename(key)
+
+    def _paths(self, key: str):
+        name = self._name(key)
+        return name, os.path.join(self.cache_dir, name), os.path.join(self.meta_dir, name + '.json')
+
+    def _load(self, key: str) -> Optional[CacheEntry]:
+        name, body_path, meta_path = self._paths(key)
+        if not os.path.isfile(body_path):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            # 没有元数据的旧文件（如已提交的供应商文件），以文件修改时间作为获取时间
+            meta = {'fetched_at': os.path.getmtime(body_path)}
+        return CacheEntry(body_path, meta)
+
+    def get(self, key: str, url: str) -> CacheEntry:
+        """
+        获取缓存的资源，必要时从上游下载
+
+        Args:
+            key: 缓存键（供应商文件名或外部URL）
+            url: 上游地址
+
+        Returns:
+            CacheEntry: 本地文件及元数据
+
+        Raises:
+            UpstreamError: 没有缓存且上游请求失败
+        """
+        entry = self._load(key)
+        if entry is not None:
+            self._touch(key)
+            now = time.time()
+            if now - entry.meta.get('fetched_at', 0) > self.ttl and now >= entry.meta.get('retry_after', 0):
+                self._schedule_refresh(key, url)
+            return entry
+        return self._fetch_coalesced(key, url)
+
+    def _fetch_coalesced(self, key: str, url: str) -> CacheEntry:
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = _Inflight()
+
+        if not leader:
+            inflight.event.wait(self.timeout + 5)
+            if inflight.entry is not None:
+                return inflight.entry
+            raise inflight.error or UpstreamError(504, '等待上游响应超时')
+
+        try:
+            inflight.entry = self._fetch(key, url, None)
+            return inflight.entry
+        except UpstreamError as e:
+            inflight.error = e
+            raise
+        except requests.RequestException as e:
+            inflight.error = UpstreamError(502, str(e))
+            raise inflight.error from e
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            inflight.event.set()
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _schedule_refresh(self, key: str, url: str) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch(key, url, self._load(key))
+            except Exception as e:
+                logger.warning(f"后台刷新代理缓存失败 {url}: {e}")
+                self._defer_refresh(key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _refresh_executor.submit(refresh)
+
+    def _fetch(self, key: str, url: str, current: Optional[CacheEntry]) -> CacheEntry:
+        """向上游请求资源；有缓存副本时发送条件请求"""
+        name, body_path, meta_path = self._paths(key)
+        headers = {}
+        if current is not None:
+            if current.meta.get('etag'):
+                headers['If-None-Match'] = current.meta['etag']
+            if current.meta.get('last_modified'):
+                headers['If-Modified-Since'] = current.meta['last_modified']
+
+        with requests.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and current is not None:
+                meta = dict(current.meta, fetched_at=time.time())
+                meta.pop('retry_after', None)
+                self._write_meta(meta_path, meta)
+                return CacheEntry(body_path, meta)
+
+            if response.status_code != 200:
+                raise UpstreamError(response.status_code)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.download-')
+            size = 0
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_object_size:
+                            raise UpstreamError(502, '上游资源超过缓存大小限制')
+                        f.write(chunk)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, body_path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+            meta = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_type': response.headers.get('Content-Type'),
+                'size': size,
+                'fetched_at': time.time(),
+            }
+        self._write_meta(meta_path, meta)
+        self._evict_if_needed(name)
+        return CacheEntry(body_path, meta)
+
+    def _defer_refresh(self, key: str) -> None:
+        """刷新失败后记录下次可重试的时间，期间继续使用旧副本"""
+        entry = self._load(key)
+        if entry is None:
+            return
+        _, _, meta_path = self._paths(key)
+        try:
+            self._write_meta(meta_path, dict(entry.meta, retry_after=time.time() + REFRESH_RETRY_DELAY))
+        except OSError as e:
+            logger.warning(f"记录代理缓存刷新失败时间失败: {e}")
+
+    def _write_meta(self, meta_path: str, meta: Dict) -> None:
+        os.makedirs(self.meta_dir, exist_ok=True)
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _scan_usage(self):
+        """从缓存目录统计各资源的大小和最近访问时间（包括其他worker写入的文件）"""
+        usage = {}
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.') or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    usage[entry.name] = (stat.st_size, max(stat.st_atime, stat.st_mtime))
+                    total += stat.st_size
+        except OSError:
+            pass
+        return usage, total
+
+    def _touch(self, key: str) -> None:
+        if self.max_bytes is None:
+            return
+        # 访问时间写在文件上，所有worker按同一份LRU顺序淘汰；不依赖挂载选项是否记录atime
+        body_path = os.path.join(self.cache_dir, self._name(key))
+        try:
+            stat = os.stat(body_path)
+            now = time.time()
+            if now - max(stat.st_atime, stat.st_mtime) >= TOUCH_INTERVAL:
+                os.utime(body_path, (now, stat.st_mtime))
+        except OSError:
+            pass
+
+    def _evict_if_needed(self, name: str) -> None:
+        """写入新资源后检查缓存目录总大小，超过容量上限时按LRU淘汰"""
+        if self.max_bytes is None:
+            return
+        lock_file = None
+        if fcntl is not None:
+            try:
+                lock_file = open(os.path.join(self.cache_dir, EVICT_LOCK_NAME), 'a')
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # 其他进程正在淘汰
+                if lock_file is not None:
+                    lock_file.close()
+                return
+        try:
+            usage, total = self._scan_usage()
+            if total <= self.max_bytes:
+                return
+            # 淘汰到容量上限的90%，避免每次写入都触发淘汰
+            target = self.max_bytes * 0.9
+            evicted = 0
+            for victim, (victim_size, _) in sorted(usage.items(), key=lambda item: item[1][1]):
+                if total <= target:
+                    break
+                if victim == name:
+                    continue
+                for path in (os.path.join(self.cache_dir, victim), os.path.join(self.meta_dir, victim + '.json')):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= victim_size
+                evicted += 1
+            if evicted:
+                logger.info(f"代理缓存淘汰 {evicted} 个资源")
+        finally:
+            if lock_file is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                finally:
+                    lock_file.close()
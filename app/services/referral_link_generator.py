@@ -3,11 +3,7 @@
 实现推荐链接生成、跟踪和统计功能
 """
 
-import hashlib
 import logging
-import random
-import string
-import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin, urlparse, parse_qs
@@ -17,6 +13,8 @@ from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db
 from app.models.shortlink import ShortLink
+from app.services.short_link_service import short_link_service
+from app.services.short_code_allocator import short_code_allocator
 from app.models.referral import UserReferral
 from app.models.commission_config import CommissionConfig
 from app.models.share_message import ShareMessage
@@ -59,18 +57,16 @@ class ReferralLinkGenerator:
             # 1. 生成或验证推荐码
             if custom_code:
                 referral_code = self._validate_custom_code(custom_code)
+                
+                # 2. 检查自定义推荐码唯一性（发号器分配的推荐码不会重复）
+                existing_link = ShortLink.query.filter_by(code=referral_code).first()
+                if existing_link:
+                    if existing_link.creator_address == referrer_address:
+                        # 返回现有链接
+                        return self._format_link_response(existing_link, campaign)
+                    raise ValueError("推荐码已被使用")
             else:
-                referral_code = self._generate_referral_code(referrer_address)
-            
-            # 2. 检查推荐码唯一性
-            existing_link = ShortLink.query.filter_by(code=referral_code).first()
-            if existing_link:
-                if existing_link.creator_address == referrer_address:
-                    # 返回现有链接
-                    return self._format_link_response(existing_link, campaign)
-                else:
-                    # 推荐码冲突，重新生成
-                    referral_code = self._generate_referral_code(referrer_address, force_unique=True)
+                referral_code = self._generate_referral_code()
             
             # 3. 构建原始URL
             original_url = self._build_original_url(referral_code, campaign)
@@ -132,54 +128,14 @@ class ReferralLinkGenerator:
         
         return code
     
-    def _generate_referral_code(self, referrer_address: str, force_unique: bool = False) -> str:
+    def _generate_referral_code(self) -> str:
         """
         生成推荐码
         
-        Args:
-            referrer_address: 推荐人地址
-            force_unique: 是否强制唯一
-            
         Returns:
-            str: 推荐码
+            str: 由发号器分配的7位base62推荐码，保证唯一
         """
-        # 基于地址和时间戳生成基础码
-        timestamp = int(time.time())
-        raw_data = f"{referrer_address}_{timestamp}"
-        
-        if force_unique:
-            # 添加随机数确保唯一性
-            raw_data += f"_{random.randint(1000, 9999)}"
-        
-        # 生成哈希
-        hash_object = hashlib.md5(raw_data.encode())
-        base_code = hash_object.hexdigest()[:8].upper()
-        
-        # 如果需要确保唯一性，添加随机后缀
-        attempts = 0
-        while attempts < 10:
-            test_code = base_code
-            if attempts > 0:
-                test_code += str(random.randint(10, 99))
-            
-            # 检查唯一性
-            existing = ShortLink.query.filter_by(code=test_code).first()
-            if not existing:
-                return test_code
-            
-            attempts += 1
-        
-        # 如果仍然冲突，使用完全随机的码
-        return self._generate_random_code()
-    
-    def _generate_random_code(self, length: int = 8) -> str:
-        """生成完全随机的推荐码"""
-        chars = string.ascii_uppercase + string.digits
-        while True:
-            code = ''.join(random.choice(chars) for _ in range(length))
-            existing = ShortLink.query.filter_by(code=code).first()
-            if not existing:
-                return code
+        return short_code_allocator.next_code()
     
     def _build_original_url(self, referral_code: str, campaign: str = None) -> str:
         """构建原始URL"""
@@ -275,46 +231,38 @@ class ReferralLinkGenerator:
             Dict: 跟踪结果
         """
         try:
-            # 1. 查找短链接
-            short_link = ShortLink.query.filter_by(code=referral_code).first()
+            # 1. 查找短链接（进程内缓存）
+            short_link = short_link_service.resolve(referral_code)
             if not short_link:
                 return {'success': False, 'error': '推荐链接不存在'}
             
             # 2. 检查链接是否过期
-            if short_link.is_expired():
+            if short_link_service.is_expired(short_link):
                 return {'success': False, 'error': '推荐链接已过期'}
             
-            # 3. 增加点击计数
-            short_link.increment_click()
-            
-            # 4. 记录详细的点击信息（如果需要）
-            if visitor_info:
-                self._record_click_details(referral_code, visitor_info)
+            # 3. 增加点击计数，点击明细随计数批量写入（需开启SHORT_LINK_CLICK_DETAILS）
+            visitor_info = visitor_info or {}
+            click_count = short_link_service.record_click(
+                short_link,
+                ip_address=visitor_info.get('ip'),
+                user_agent=visitor_info.get('user_agent'),
+                referer=visitor_info.get('referer')
+            )
             
-            # 5. 返回推荐人信息
+            # 4. 返回推荐人信息
             return {
                 'success': True,
-                'referrer_address': short_link.creator_address,
+                'referrer_address': short_link['creator_address'],
                 'referral_code': referral_code,
-                'original_url': short_link.original_url,
-                'click_count': short_link.click_count,
-                'created_at': short_link.created_at.isoformat() if short_link.created_at else None
+                'original_url': short_link['original_url'],
+                'click_count': click_count,
+                'created_at': short_link['created_at'].isoformat() if short_link['created_at'] else None
             }
             
         except Exception as e:
             logger.error(f"跟踪链接点击失败: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _record_click_details(self, referral_code: str, visitor_info: Dict):
-        """记录点击详情（可选功能）"""
-        try:
-            # 这里可以记录更详细的点击信息到单独的表
-            # 例如：IP地址、User-Agent、点击时间、地理位置等
-            # 为了简化，这里只记录到日志
-            logger.info(f"推荐链接点击: {referral_code}, 访客信息: {visitor_info}")
-        except Exception as e:
-            logger.error(f"记录点击详情失败: {e}")
-    
     def get_link_statistics(self, referrer_address: str) -> Dict:
         """
         获取推荐链接统计
@@ -398,30 +346,101 @@ class ReferralLinkGenerator:
             campaign: 活动标识
             
         Returns:
-            List[Dict]: 生成的链接列表
+            List[Dict]: 生成的链接列表，与输入顺序一致，每项带 index（从1开始）
         """
         if count > 100:
             raise ValueError("单次批量生成数量不能超过100个")
         
-        links = []
-        for i in range(count):
-            try:
-                custom_code = None
-                if prefix:
-                    custom_code = f"{prefix}{i+1:03d}"  # 例如：PROMO001, PROMO002
-                
-                link = self.generate_referral_link(
-                    referrer_address=referrer_address,
-                    custom_code=custom_code,
-                    campaign=campaign
-                )
-                links.append(link)
-                
-            except Exception as e:
-                logger.error(f"批量生成第{i+1}个链接失败: {e}")
-                links.append({'error': str(e), 'index': i+1})
+        results: List[Optional[Dict]] = [None] * count
+        if prefix:
+            # 例如：PROMO001, PROMO002
+            codes = []
+            for i in range(count):
+                try:
+                    codes.append(self._validate_custom_code(f"{prefix}{i+1:03d}"))
+                except ValueError as e:
+                    results[i] = {'error': str(e)}
+                    codes.append(None)
+            
+            # 一次查询找出已被占用的推荐码
+            taken = {
+                link.code: link for link in
+                ShortLink.query.filter(ShortLink.code.in_([c for c in codes if c])).all()
+            }
+        else:
+            codes = short_code_allocator.allocate(count)
+            taken = {}
+        
+        expires_at = datetime.utcnow() + timedelta(days=self.default_expiry_days)
+        rows = []
+        for i, code in enumerate(codes):
+            if not code:
+                continue
+            if code in taken:
+                if taken[code].creator_address == referrer_address:
+                    results[i] = self._format_link_response(taken[code], campaign)
+                else:
+                    results[i] = {'error': '推荐码已被使用'}
+                continue
+            rows.append((i, {
+                'code': code,
+                'original_url': self._build_original_url(code, campaign),
+                'creator_address': referrer_address,
+                'expires_at': expires_at
+            }))
+        
+        # 一条多行INSERT写入全部新链接
+        try:
+            created = ShortLink.bulk_create([row for _, row in rows])
+            for (i, _), values in zip(rows, created):
+                results[i] = self._format_link_response(ShortLink(**values), campaign)
+        except IntegrityError:
+            # 查询之后推荐码被并发占用，逐条写入，只让冲突的那几条失败
+            db.session.rollback()
+            for i, row in rows:
+                results[i] = self._create_batch_item(row, referrer_address, campaign, retry_code=not prefix)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"批量生成推荐链接失败: {e}")
+            raise
+        
+        # 多行INSERT不触发ORM事件，手动清除短链接缓存（可能有否定缓存）
+        short_link_service.invalidate()
+        
+        for i, result in enumerate(results):
+            result['index'] = i + 1
+        return results
+    
+    def _create_batch_item(self, row: Dict, referrer_address: str, campaign: str = None,
+                           retry_code: bool = False) -> Dict:
+        """
+        批量插入冲突后逐条写入一个链接
+        
+        Args:
+            row: 链接字段
+            referrer_address: 推荐人地址
+            campaign: 活动标识
+            retry_code: 推荐码冲突时是否换一个发号器分配的推荐码重试
+            
+        Returns:
+            Dict: 链接信息，失败时为 {'error': ...}
+        """
+        try:
+            short_link = ShortLink(click_count=0, created_at=datetime.utcnow(), **row)
+            db.session.add(short_link)
+            db.session.commit()
+            return self._format_link_response(short_link, campaign)
+        except IntegrityError:
+            db.session.rollback()
         
-        return links
+        existing = ShortLink.query.filter_by(code=row['code']).first()
+        if existing is not None and existing.creator_address == referrer_address:
+            return self._format_link_response(existing, campaign)
+        if retry_code:
+            code = short_code_allocator.allocate(1)[0]
+            row = dict(row, code=code, original_url=self._build_original_url(code, campaign))
+            return self._create_batch_item(row, referrer_address, campaign)
+        return {'error': '推荐码已被使用'}
     
     def cleanup_expired_links(self, days_after_expiry: int = 30) -> Dict:
         """
@@ -0,0 +1,214 @@
+"""
+公开JSON接口的响应缓存
+
+前端轮询的公开只读接口（资产列表、资产详情、交易历史、分红总额、支付/分享配置）
+用 cache_response 装饰后：
+- 序列化后的响应体和 ETag 按 路由 + 路径参数 + 规范化查询参数 存入缓存层，
+  命中时不再查询数据库和序列化
+- 请求带 If-None-Match 且 ETag 一致时返回 304
+- 设置 Cache-Control / Vary，浏览器每次用条件请求重新验证
+
+每个接口声明依赖的数据标签（assets/trades/dividends/config），缓存键包含各标签的当前代数。
+相关模型提交后递增标签代数，旧的缓存条目不再命中并随超时过期。
+原生SQL更新（绕过ORM）的地方需手动调用 invalidate_responses。
+出错时仍以200返回兜底数据的接口需调用 skip_response_cache，避免兜底结果被缓存。
+"""
+
+import json
+import time
+import hashlib
+import logging
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+from flask import Response, g, make_response, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 缓存条目的默认有效期（秒）
+DEFAULT_TIMEOUT = 300
+
+TAG_CACHE_KEY = 'http_cache:tag:{}'
+SESSION_INFO_KEY = 'response_cache_tags'
+SKIP_FLAG = '_skip_response_cache'
+
+# 不参与缓存键的查询参数（jQuery 等添加的防缓存时间戳）
+IGNORED_ARGS = frozenset({'_'})
+
+
+def _tag_generations(tags: Iterable[str]) -> list:
+    from app.services.cache_service import get_cache
+
+    cache = get_cache()
+    return [cache.get(TAG_CACHE_KEY.format(tag)) or 0 for tag in tags]
+
+
+def _cache_key(tags, ignore_args, variant) -> str:
+    args = sorted(
+        (key, sorted(values)) for key, values in request.args.lists()
+        if key not in ignore_args
+    )
+    key_data = {
+        'view_args': sorted((request.view_args or {}).items()),
+        'args': args,
+        'variant': variant,
+        'generations': _tag_generations(tags),
+    }
+    key_hash = hashlib.md5(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+    return f"http:{request.endpoint}:{key_hash}"
+
+
+def cache_response(tags: Iterable[str] = (), timeout: int = DEFAULT_TIMEOUT, max_age: int = 0,
+                   variant: Optional[Callable[[], str]] = None, vary: Iterable[str] = (),
+                   ignore_args: Iterable[str] = IGNORED_ARGS):
+    """
+    缓存GET接口的JSON响应并支持条件请求
+
+    Args:
+        tags: 响应依赖的数据标签，标签数据变更后缓存失效
+        timeout: 缓存条目在缓存层中的有效期（秒）
+        max_age: 浏览器可不经验证直接使用的秒数，0表示每次都用 If-None-Match 重新验证
+        variant: 返回响应变体标识的函数（如按是否管理员区分结果），设置后响应标记为 private
+        vary: 影响变体的请求头，写入 Vary
+        ignore_args: 不参与缓存键的查询参数
+
+    Returns:
+        装饰器
+    """
+    tags = tuple(tags)
+    vary = tuple(vary)
+    ignore_args = frozenset(ignore_args)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+
+            from app.services.cache_service import get_cache
+
+            cache = get_cache()
+            try:
+                cache_key = _cache_key(tags, ignore_args, variant() if variant else None)
+                cached = cache.get(cache_key)
+            except Exception as e:
+                logger.warning(f"读取响应缓存失败: {e}")
+                return f(*args, **kwargs)
+
+            if cached is not None:
+                logger.debug(f"响应缓存命中: {cache_key}")
+                response = Response(cached['body'], status=200, mimetype=cached['mimetype'])
+                etag = cached['etag']
+            else:
+                g.pop(SKIP_FLAG, None)
+                response = make_response(f(*args, **kwargs))
+                # 只缓存成功的JSON响应，出错时返回的兜底数据不缓存
+                if response.status_code != 200 or not response.is_json or response.direct_passthrough \
+                        or g.pop(SKIP_FLAG, False):
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha256(body).hexdigest()[:32]
+                try:
+                    cache.set(cache_key, {'body': body, 'mimetype': response.mimetype, 'etag': etag}, timeout)
+                except Exception as e:
+                    logger.warning(f"写入响应缓存失败: {e}")
+
+            response.set_etag(etag)
+            if variant:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            if max_age:
+                response.cache_control.max_age = max_age
+            else:
+                response.cache_control.no_cache = True
+            for header in vary:
+                response.vary.add(header)
+            return response.make_conditional(request)
+
+        return decorated_function
+    return decorator
+
+
+def skip_response_cache() -> None:
+    """当前请求的响应是出错后的兜底数据，不写入响应缓存"""
+    setattr(g, SKIP_FLAG, True)
+
+
+def invalidate_responses(*tags: str) -> None:
+    """
+    数据变更后调用：依赖这些标签的缓存响应全部失效
+
+    Args:
+        tags: 数据标签
+    """
+    try:
+        from app.services.cache_service import get_cache
+        cache = get_cache()
+        value = time.time_ns()
+        for tag in tags:
+            cache.set(TAG_CACHE_KEY.format(tag), value, timeout=7 * 24 * 3600)
+    except Exception as e:
+        logger.warning(f"更新响应缓存标签失败: {e}")
+
+
+def _mark(session, tag) -> None:
+    if session is not None:
+        session.info.setdefault(SESSION_INFO_KEY, set()).add(tag)
+
+
+def _listener(tag: str):
+    def mark_changed(mapper, connection, target):
+        _mark(Session.object_session(target), tag)
+    mark_changed.__name__ = f"_mark_{tag}_changed"
+    return mark_changed
+
+
+def _trade_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    _mark(session, 'trades')
+    # 交易完成时通常同时更新资产剩余供应量，这里兜底处理未经ORM更新资产的情况
+    if inspect(target).attrs.status.history.has_changes():
+        _mark(session, 'assets')
+
+
+def _after_commit(session):
+    tags = session.info.pop(SESSION_INFO_KEY, None)
+    if tags:
+        invalidate_responses(*tags)
+
+
+def _after_rollback(session):
+    session.info.pop(SESSION_INFO_KEY, None)
+
+
+_listeners = {}
+
+
+def register_hooks() -> None:
+    """相关模型提交后使对应标签的缓存响应失效"""
+    from app.models import Asset
+    from app.models.admin import SystemConfig
+    from app.models.commission_config import CommissionConfig
+    from app.models.dividend import Dividend, DividendRecord
+    from app.models.trade import Trade
+
+    models = [
+        (Asset, 'assets'),
+        (Dividend, 'dividends'),
+        (DividendRecord, 'dividends'),
+        (SystemConfig, 'config'),
+        (CommissionConfig, 'config'),
+    ]
+    listeners = []
+    for model, tag in models:
+        fn = _listeners.setdefault(tag, _listener(tag))
+        listeners += [(model, name, fn) for name in ('after_insert', 'after_update', 'after_delete')]
+    listeners += [(Trade, name, _trade_changed) for name in ('after_insert', 'after_update', 'after_delete')]
+    listeners += [(Session, 'after_commit', _after_commit), (Session, 'after_rollback', _after_rollback)]
+
+    for target, name, fn in listeners:
+        if not event.contains(target, name, fn):
+            event.listen(target, name, fn)
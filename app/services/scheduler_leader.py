@@ -0,0 +1,442 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+定时任务主节点选举
+多个 gunicorn worker / 独立脚本各自持有调度器时，只有当选主节点的进程真正执行定时任务。
+支持两种后端：
+- PostgreSQL 会话级 advisory lock：锁绑定在专用连接上，进程退出或连接断开时立即释放
+- Redis 租约：SET NX PX 获取、Lua 脚本续约，INCR 生成单调递增的任期编号
+
+任期编号只用于日志和执行指标，区分各任主节点；任务的数据库写入不校验它，
+主节点切换的瞬间（最长约 LEASE_TTL 秒）新旧主节点可能同时执行同一任务，
+定时任务需保证重复执行无副作用。
+"""
+
+import os
+import time
+import socket
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认选举名称，网站进程内的全部定时任务共用
+DEFAULT_ELECTION = 'scheduler'
+
+# 续约/重试间隔与租约有效期（秒），主节点失联后最迟约 LEASE_TTL 秒完成切换
+RENEW_INTERVAL = 5
+LEASE_TTL = 15
+
+# fork后子进程不能关闭从父进程继承的连接（会断开父进程的会话），保留引用避免被回收
+_inherited_resources = []
+
+
+def _advisory_key(name: str) -> int:
+    """选举名称 -> PostgreSQL advisory lock 的 bigint 键"""
+    return int.from_bytes(hashlib.sha1(f'lead:{name}'.encode()).digest()[:8], 'big', signed=True)
+
+
+class _PostgresBackend:
+    """基于 pg_try_advisory_lock 的选举后端"""
+
+    def __init__(self, database_url: str, name: str):
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import NullPool
+
+        # 专用连接不进入应用连接池，避免被 engine.dispose() 或请求复用
+        self._engine = create_engine(database_url, poolclass=NullPool)
+        self._key = _advisory_key(name)
+        self._conn = None
+
+    def acquire(self) -> Optional[int]:
+        from sqlalchemy import text
+
+        if self._conn is None:
+            self._conn = self._engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        acquired = self._conn.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': self._key}).scalar()
+        if not acquired:
+            return None
+        # txid_current() 在整个集群内单调递增，作为本次任期的编号
+        return int(self._conn.execute(text('SELECT txid_current()')).scalar())
+
+    def renew(self, token: int) -> bool:
+        from sqlalchemy import text
+
+        # 会话锁随连接存在而持有，续约只需确认连接和锁仍然有效
+        # bigint 键在 pg_locks 中拆分为高32位 classid 和低32位 objid
+        held = self._conn.execute(text(
+            "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND granted "
+            "AND pid = pg_backend_pid() AND objsubid = 1 "
+            "AND classid::bigint = :high AND objid::bigint = :low"
+        ), {'high': (self._key >> 32) & 0xFFFFFFFF, 'low': self._key & 0xFFFFFFFF}).scalar()
+        return bool(held)
+
+    def release(self, token: Optional[int]) -> None:
+        from sqlalchemy import text
+
+        if self._conn is None:
+            return
+        try:
+            if token is not None:
+                self._conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': self._key})
+        finally:
+            self.reset()
+
+    def reset(self) -> None:
+        """丢弃连接（连接异常后调用），数据库会随会话结束释放锁"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def detach(self) -> None:
+        """fork后在子进程中调用：放弃继承的连接但不关闭它"""
+        if self._conn is not None:
+            _inherited_resources.append(self._conn)
+        self._conn = None
+        _inherited_resources.append(self._engine)
+
+
+class _RedisBackend:
+    """基于 Redis 租约的选举后端"""
+
+    RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, client, name: str, identity: str):
+        self._client = client
+        self._key = f'scheduler:leader:{name}'
+        self._epoch_key = f'scheduler:leader:{name}:epoch'
+        self._identity = identity
+        self._value = None
+
+    def acquire(self) -> Optional[int]:
+        token = int(self._client.incr(self._epoch_key))
+        value = f'{token}:{self._identity}'
+        if not self._client.set(self._key, value, nx=True, px=LEASE_TTL * 1000):
+            return None
+        self._value = value
+        return token
+
+    def renew(self, token: int) -> bool:
+        return bool(self._client.eval(self.RENEW_SCRIPT, 1, self._key, self._value, LEASE_TTL * 1000))
+
+    def release(self, token: Optional[int]) -> None:
+        if self._value is not None:
+            try:
+                self._client.eval(self.RELEASE_SCRIPT, 1, self._key, self._value)
+            finally:
+                self._value = None
+
+    def reset(self) -> None:
+        self._value = None
+
+    def detach(self) -> None:
+        self._value = None
+
+
+class _LocalBackend:
+    """单进程部署（如开发环境的SQLite）：本进程始终是主节点"""
+
+    def acquire(self) -> Optional[int]:
+        return 1
+
+    def renew(self, token: int) -> bool:
+        return True
+
+    def release(self, token: Optional[int]) -> None:
+        pass
+
+    def reset(self) -> None:
+        pass
+
+    def detach(self) -> None:
+        pass
+
+
+class LeaderElector:
+    """
+    主节点选举器
+
+    后台线程定期获取或续约领导权；定时任务执行前通过 is_leader() 判断是否应当执行。
+    续约失败（连接断开、租约被抢占）时立即放弃领导权。
+    """
+
+    def __init__(self, name: str = DEFAULT_ELECTION, backend: str = None,
+                 database_url: str = None, redis_client=None):
+        """
+        Args:
+            name: 选举名称，相同名称的进程之间竞争
+            backend: 'postgres' / 'redis' / 'local'，为空时自动选择
+            database_url: PostgreSQL连接串
+            redis_client: Redis客户端
+        """
+        self.name = name
+        self.identity = f'{socket.gethostname()}:{os.getpid()}'
+        self.backend_name = backend or self._detect_backend(database_url, redis_client)
+        self._database_url = database_url
+        self._redis_client = redis_client
+        self._backend = self._create_backend()
+        self._token: Optional[int] = None
+        self._leader_since: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def _detect_backend(database_url: Optional[str], redis_client) -> str:
+        configured = os.environ.get('SCHEDULER_LEADER_BACKEND')
+        if configured:
+            return configured.lower()
+        if database_url and database_url.startswith('postgres'):
+            return 'postgres'
+        if redis_client is not None:
+            return 'redis'
+        return 'local'
+
+    def _create_backend(self):
+        if self.backend_name == 'postgres':
+            return _PostgresBackend(self._database_url, self.name)
+        if self.backend_name == 'redis':
+            return _RedisBackend(self._redis_client, self.name, self.identity)
+        return _LocalBackend()
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """启动选举线程；同步尝试一次获取，便于启动时立即执行的任务判断身份
+
+        在fork出的子进程中再次调用时，放弃从父进程继承的状态重新参选。
+        """
+        pid = os.getpid()
+        if self._pid is not None and self._pid != pid:
+            # 父进程的线程不会随fork复制，继承的锁可能停留在被持有状态
+            self._lock = threading.Lock()
+            self._thread = None
+
+        with self._lock:
+            if self._pid == pid and self._thread and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                self._backend.detach()
+                self._token = None
+                self._leader_since = None
+                self.identity = f'{socket.gethostname()}:{pid}'
+                self._backend = self._create_backend()
+            self._pid = pid
+            self._stop.clear()
+
+        self._tick()
+        self._thread = threading.Thread(target=self._run, name=f'leader-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止选举并主动释放领导权"""
+        self._stop.set()
+        with self._lock:
+            try:
+                self._backend.release(self._token)
+            except Exception as e:
+                logger.warning(f"释放主节点身份失败 {self.name}: {e}")
+            self._token = None
+            self._leader_since = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(RENEW_INTERVAL):
+            self._tick()
+
+    def _tick(self) -> None:
+        with self._lock:
+            try:
+                if self._token is None:
+                    token = self._backend.acquire()
+                    if token is not None:
+                        self._token = token
+                        self._leader_since = datetime.utcnow()
+                        logger.info(f"[{self.name}] {self.identity} 成为主节点，token={token}")
+                elif not self._backend.renew(self._token):
+                    logger.warning(f"[{self.name}] {self.identity} 失去主节点身份，token={self._token}")
+                    self._token = None
+                    self._leader_since = None
+            except Exception as e:
+                if self._token is not None:
+                    logger.warning(f"[{self.name}] 续约失败，放弃主节点身份: {e}")
+                else:
+                    logger.debug(f"[{self.name}] 参选失败: {e}")
+                self._token = None
+                self._leader_since = None
+                self._backend.reset()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def is_leader(self) -> bool:
+        if self._pid != os.getpid():
+            # fork后的子进程尚未参选
+            return False
+        return self._token is not None
+
+    @property
+    def term(self) -> Optional[int]:
+        return self._token if self.is_leader() else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'backend': self.backend_name,
+            'identity': self.identity,
+            'is_leader': self.is_leader(),
+            'term': self.term,
+            'leader_since': self._leader_since.isoformat() if self._leader_since and self.is_leader() else None
+        }
+
+
+class JobRunMetrics:
+    """定时任务执行指标，写入共享缓存以便任意进程查询主节点的执行情况"""
+
+    CACHE_PREFIX = 'scheduler:job_metrics:'
+    CACHE_TIMEOUT = 7 * 24 * 3600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, job_id: str) -> Dict[str, Any]:
+        entry = self._metrics.get(job_id)
+        if entry is None:
+            entry = self._metrics[job_id] = {
+                'job_id': job_id,
+                'runs': 0,
+                'failures': 0,
+                'skipped_not_leader': 0,
+                'last_run_at': None,
+                'last_duration': None,
+                'last_error': None,
+                'last_identity': None,
+                'last_term': None
+            }
+        return entry
+
+    def record_skip(self, job_id: str) -> None:
+        with self._lock:
+            self._entry(job_id)['skipped_not_leader'] += 1
+
+    def record_run(self, job_id: str, duration: float, error: Optional[str],
+                   identity: str, token: Optional[int]) -> None:
+        with self._lock:
+            entry = self._entry(job_id)
+            entry['runs'] += 1
+            if error:
+                entry['failures'] += 1
+            entry['last_run_at'] = datetime.utcnow().isoformat()
+            entry['last_duration'] = duration
+            entry['last_error'] = error
+            entry['last_identity'] = identity
+            entry['last_term'] = token
+            snapshot = dict(entry)
+
+        try:
+            from app.services.cache_service import get_cache
+            get_cache().set(f'{self.CACHE_PREFIX}{job_id}', snapshot, timeout=self.CACHE_TIMEOUT)
+        except Exception as e:
+            logger.debug(f"写入任务指标失败 {job_id}: {e}")
+
+    def get_local(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {job_id: dict(entry) for job_id, entry in self._metrics.items()}
+
+    def get_shared(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """读取主节点最近一次执行写入的指标"""
+        try:
+            from app.services.cache_service import get_cache
+            return get_cache().get(f'{self.CACHE_PREFIX}{job_id}')
+        except Exception:
+            return None
+
+
+# 全局实例
+_electors: Dict[str, LeaderElector] = {}
+_electors_lock = threading.Lock()
+job_metrics = JobRunMetrics()
+
+
+def get_leader_elector(name: str = DEFAULT_ELECTION, app=None) -> LeaderElector:
+    """获取（必要时创建）指定名称的选举器
+
+    Args:
+        name: 选举名称
+        app: Flask应用，用于读取数据库连接串；为空时尝试使用current_app
+    """
+    with _electors_lock:
+        elector = _electors.get(name)
+        if elector is None:
+            database_url = None
+            try:
+                if app is None:
+                    from flask import current_app
+                    app = current_app._get_current_object()
+                database_url = app.config.get('SQLALCHEMY_DATABASE_URI')
+            except Exception:
+                database_url = os.environ.get('DATABASE_URL')
+
+            redis_client = None
+            try:
+                from app.services.cache_service import get_cache
+                redis_client = get_cache().redis_client
+            except Exception:
+                pass
+
+            elector = _electors[name] = LeaderElector(name, database_url=database_url, redis_client=redis_client)
+        return elector
+
+
+def leader_only(job_id: str, func: Callable, election: str = DEFAULT_ELECTION) -> Callable:
+    """包装定时任务：仅在本进程是主节点时执行，并记录执行指标
+
+    执行前后对比任期编号，只用于发现执行期间主节点发生切换并记录日志，不会中止任务。
+
+    Args:
+        job_id: 任务ID（用于指标）
+        func: 任务函数
+        election: 选举名称
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        elector = get_leader_elector(election)
+        elector.start()
+        if not elector.is_leader():
+            job_metrics.record_skip(job_id)
+            logger.debug(f"非主节点，跳过定时任务 {job_id}")
+            return None
+
+        token = elector.term
+        started = time.time()
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            job_metrics.record_run(job_id, time.time() - started, error, elector.identity, token)
+            if elector.term != token:
+                logger.warning(f"定时任务 {job_id} 执行期间主节点身份发生变化（token={token}）")
+
+    return wrapper
@@ -0,0 +1,171 @@
+"""
+分享消息随机池
+
+分享组件每次渲染都会请求随机分享消息。各消息类型的启用消息及累计权重缓存在进程内，
+随机选择只在内存中进行（按权重二分查找），同一会话最近展示过的消息尽量不重复。
+管理后台增删改消息后递增共享缓存中的版本号，各进程在几秒内重新加载；
+共享缓存不可用时，进程内的池也会在 POOL_TTL 后自动重新加载。
+"""
+
+import time
+import random
+import bisect
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from flask import has_request_context, session
+
+logger = logging.getLogger(__name__)
+
+# 进程内读取共享版本号的间隔（秒）
+VERSION_CHECK_INTERVAL = 5
+
+# 共享版本号不可用时，池的最长有效期（秒）
+POOL_TTL = 600
+
+VERSION_CACHE_KEY = 'share_messages:version'
+SESSION_KEY = 'share_message_recent'
+
+# 每个类型在会话中记住的最近消息数
+RECENT_SIZE = 3
+
+# 按权重抽到最近展示过的消息时重新抽取的次数
+MAX_REDRAWS = 8
+
+DEFAULT_MESSAGES = {
+    'share_content': "🚀 发现优质RWA资产！真实世界资产数字化投资新机遇，透明度高、收益稳定。",
+    'reward_plan': "一次分享，终身收益 - 无限下级20%分成",
+}
+
+
+class _Pool:
+    """单个消息类型的启用消息及累计权重"""
+
+    def __init__(self, messages: List[Tuple[int, str, int]]):
+        self.ids = [message_id for message_id, _, _ in messages]
+        self.contents = [content for _, content, _ in messages]
+        weights = [max(weight or 0, 0) for _, _, weight in messages]
+        if not any(weights):
+            # 全部权重为0时等概率选择
+            weights = [1] * len(messages)
+        # 能被选中的消息数（权重大于0）
+        self.eligible = sum(1 for weight in weights if weight)
+        self.cumulative = []
+        total = 0
+        for weight in weights:
+            total += weight
+            self.cumulative.append(total)
+        self.total = total
+
+    def draw(self) -> int:
+        """按权重抽取一条消息的下标"""
+        return bisect.bisect_right(self.cumulative, random.random() * self.total)
+
+    def draw_excluding(self, excluded: set) -> int:
+        """按权重抽取不在 excluded 中的消息，全部被排除时忽略排除条件"""
+        for _ in range(MAX_REDRAWS):
+            index = self.draw()
+            if self.ids[index] not in excluded:
+                return index
+        candidates = [i for i, message_id in enumerate(self.ids) if message_id not in excluded]
+        weights = [self.cumulative[i] - (self.cumulative[i - 1] if i else 0) for i in candidates]
+        if not any(weights):
+            return self.draw()
+        return random.choices(candidates, weights=weights)[0]
+
+
+class ShareMessagePool:
+    """按消息类型缓存的分享消息池"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, _Pool] = {}
+        self._loaded_version = None
+        self._loaded_at = 0.0
+        self._version = None
+        self._checked_at = 0.0
+
+    def _current_version(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return self._version
+        try:
+            from app.services.cache_service import get_cache
+            value = get_cache().get(VERSION_CACHE_KEY)
+        except Exception as e:
+            logger.debug(f"读取分享消息版本号失败: {e}")
+            value = None
+        self._version = value or 0
+        self._checked_at = now
+        return self._version
+
+    def _get_pools(self) -> Dict[str, _Pool]:
+        version = self._current_version()
+        if version == self._loaded_version and time.monotonic() - self._loaded_at < POOL_TTL:
+            return self._pools
+        with self._lock:
+            if version == self._loaded_version and time.monotonic() - self._loaded_at < POOL_TTL:
+                return self._pools
+            self._pools = self._load()
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+            return self._pools
+
+    @staticmethod
+    def _load() -> Dict[str, _Pool]:
+        from app.models.share_message import ShareMessage
+
+        rows = ShareMessage.query.with_entities(
+            ShareMessage.id, ShareMessage.message_type, ShareMessage.content, ShareMessage.weight
+        ).filter_by(is_active=True).order_by(ShareMessage.id).all()
+
+        grouped: Dict[str, List[Tuple[int, str, int]]] = {}
+        for message_id, message_type, content, weight in rows:
+            grouped.setdefault(message_type, []).append((message_id, content, weight))
+        logger.debug(f"分享消息池已加载: {len(rows)} 条")
+        return {message_type: _Pool(messages) for message_type, messages in grouped.items()}
+
+    def pick(self, message_type: str = 'share_content') -> str:
+        """
+        按权重随机选择一条启用的消息
+
+        Args:
+            message_type: 消息类型，share_content 或 reward_plan
+
+        Returns:
+            str: 消息内容；该类型没有启用的消息时返回默认文案
+        """
+        pool = self._get_pools().get(message_type)
+        if pool is None:
+            return DEFAULT_MESSAGES.get(message_type, DEFAULT_MESSAGES['share_content'])
+        # 排除窗口不超过可选消息数的一半，剩下的候选仍按权重抽取
+        keep = min(RECENT_SIZE, pool.eligible // 2)
+        if keep <= 0 or not has_request_context():
+            return pool.contents[pool.draw()]
+
+        # 同一会话内避开最近展示过的消息
+        recent_by_type = session.get(SESSION_KEY) or {}
+        recent = list(recent_by_type.get(message_type, []))[-keep:]
+        index = pool.draw_excluding(set(recent))
+        recent_by_type = dict(recent_by_type)
+        recent_by_type[message_type] = (recent + [pool.ids[index]])[-keep:]
+        session[SESSION_KEY] = recent_by_type
+        return pool.contents[index]
+
+    def invalidate(self) -> None:
+        """分享消息变更后调用：本进程立即重新加载，其他进程在几秒内重新加载"""
+        value = time.time_ns()
+        try:
+            from app.services.cache_service import get_cache
+            get_cache().set(VERSION_CACHE_KEY, value, timeout=7 * 24 * 3600)
+        except Exception as e:
+            logger.warning(f"更新分享消息版本号失败: {e}")
+        with self._lock:
+            self._version = value
+            self._checked_at = time.monotonic()
+            self._loaded_version = None
+
+
+# 创建全局实例
+share_message_pool = ShareMessagePool()
@@ -0,0 +1,182 @@
+"""
+短链接代码分配
+
+代码由数据库序列号经 Feistel 置换后编码为定长 base62 字符串：
+序列号互不相同 -> 置换是双射 -> 代码互不相同，生成时无需查询数据库判重。
+各进程一次从 short_code_sequences 预留一个区间，区间内的代码在内存中分配，
+每创建一条链接只需一次写入。
+
+注意：SHORT_CODE_KEY 一旦使用不可修改，否则新代码可能与旧代码重复。
+"""
+
+import os
+import hashlib
+import logging
+import string
+import threading
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+
+# 代码长度，62^7 约 3.5 万亿个代码
+CODE_LENGTH = 7
+CODE_SPACE = BASE ** CODE_LENGTH
+
+# Feistel 网络的位宽（2^42 > 62^7），超出代码空间的结果按 cycle-walking 继续置换
+FEISTEL_HALF_BITS = 21
+FEISTEL_HALF_MASK = (1 << FEISTEL_HALF_BITS) - 1
+FEISTEL_ROUNDS = 4
+
+# 每次预留的序号数
+BLOCK_SIZE = 100
+
+DEFAULT_SEQUENCE = 'short_link'
+DEFAULT_KEY = 'rwa-hub-short-code'
+
+
+class ShortCodeAllocator:
+    """基于序列号置换的短链接代码分配器"""
+
+    def __init__(self, key: str = DEFAULT_KEY, sequence: str = DEFAULT_SEQUENCE, block_size: int = BLOCK_SIZE):
+        self.sequence = sequence
+        self.block_size = block_size
+        self._round_keys = self._derive_round_keys(key)
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._pid = None
+
+    def init_app(self, app):
+        """读取配置的置换密钥"""
+        self._round_keys = self._derive_round_keys(app.config.get('SHORT_CODE_KEY', DEFAULT_KEY))
+
+    @staticmethod
+    def _derive_round_keys(key: str) -> List[bytes]:
+        return [hashlib.sha256(f"{key}:{i}".encode('utf-8')).digest()[:16] for i in range(FEISTEL_ROUNDS)]
+
+    # ------------------------------------------------------------------
+    # 编码
+    # ------------------------------------------------------------------
+
+    def _round(self, value: int, round_key: bytes) -> int:
+        digest = hashlib.blake2b(value.to_bytes(4, 'big'), digest_size=4, key=round_key).digest()
+        return int.from_bytes(digest, 'big') & FEISTEL_HALF_MASK
+
+    def _permute(self, value: int) -> int:
+        left, right = value >> FEISTEL_HALF_BITS, value & FEISTEL_HALF_MASK
+        for round_key in self._round_keys:
+            left, right = right, left ^ self._round(right, round_key)
+        return (left << FEISTEL_HALF_BITS) | right
+
+    def _unpermute(self, value: int) -> int:
+        left, right = value >> FEISTEL_HALF_BITS, value & FEISTEL_HALF_MASK
+        for round_key in reversed(self._round_keys):
+            left, right = right ^ self._round(left, round_key), left
+        return (left << FEISTEL_HALF_BITS) | right
+
+    def encode(self, number: int) -> str:
+        """
+        把序列号编码为短链接代码
+
+        Args:
+            number: 序列号，0 <= number < 62^7
+
+        Returns:
+            str: 7位base62代码
+        """
+        if not 0 <= number < CODE_SPACE:
+            raise ValueError(f"序列号超出代码空间: {number}")
+        value = self._permute(number)
+        while value >= CODE_SPACE:
+            value = self._permute(value)
+
+        chars = []
+        for _ in range(CODE_LENGTH):
+            value, digit = divmod(value, BASE)
+            chars.append(ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+    def decode(self, code: str) -> int:
+        """把代码还原为序列号（encode 的逆运算）"""
+        if len(code) != CODE_LENGTH:
+            raise ValueError(f"无效的短链接代码: {code}")
+        value = 0
+        for char in code:
+            digit = ALPHABET.find(char)
+            if digit < 0:
+                raise ValueError(f"无效的短链接代码: {code}")
+            value = value * BASE + digit
+        value = self._unpermute(value)
+        while value >= CODE_SPACE:
+            value = self._unpermute(value)
+        return value
+
+    # ------------------------------------------------------------------
+    # 分配
+    # ------------------------------------------------------------------
+
+    def _reserve(self, count: int) -> Tuple[int, int]:
+        """在独立事务中原子地预留 count 个序号，返回 [start, end)"""
+        from sqlalchemy.exc import IntegrityError
+        from app.extensions import db
+
+        for attempt in range(2):
+            try:
+                with db.engine.begin() as conn:
+                    row = conn.execute(
+                        text("UPDATE short_code_sequences SET next_value = next_value + :n, "
+                             "updated_at = CURRENT_TIMESTAMP WHERE name = :name RETURNING next_value"),
+                        {'n': count, 'name': self.sequence}
+                    ).first()
+                    if row is not None:
+                        end = row[0]
+                        return end - count, end
+                    conn.execute(
+                        text("INSERT INTO short_code_sequences (name, next_value, updated_at) "
+                             "VALUES (:name, :next_value, CURRENT_TIMESTAMP)"),
+                        {'name': self.sequence, 'next_value': count + 1}
+                    )
+                    return 1, count + 1
+            except IntegrityError:
+                # 其他进程同时创建了序列行，重新执行UPDATE
+                if attempt == 1:
+                    raise
+        raise RuntimeError("预留短链接序号失败")
+
+    def allocate(self, count: int) -> List[str]:
+        """
+        分配 count 个互不相同的代码
+
+        Args:
+            count: 数量
+
+        Returns:
+            List[str]: 代码列表
+        """
+        numbers: List[int] = []
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 出的子进程不能沿用父进程预留的区间
+                self._next = self._end = 0
+                self._pid = os.getpid()
+
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    wanted = max(self.block_size, count - len(numbers))
+                    self._next, self._end = self._reserve(wanted)
+                take = min(self._end - self._next, count - len(numbers))
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+        return [self.encode(number) for number in numbers]
+
+    def next_code(self) -> str:
+        """分配一个代码"""
+        return self.allocate(1)[0]
+
+
+short_code_allocator = ShortCodeAllocator()
@@ -0,0 +1,320 @@
+"""
+短链接重定向与点击计数
+
+重定向路径不再访问数据库写入：
+- code -> 链接信息 缓存在进程内（短TTL，不存在的code也做短时间的否定缓存）
+- 点击数先累加在内存计数器中，后台线程定期用
+  UPDATE short_links SET click_count = click_count + n 原子地批量写入
+- 开启 SHORT_LINK_CLICK_DETAILS 时，点击明细批量追加到 short_link_clicks
+进程退出时（atexit）写完剩余的计数和明细。
+
+短链接增删改提交后递增共享缓存中的版本号，各进程每隔几秒读取一次版本号，
+版本变化时丢弃本进程缓存的链接信息；共享缓存不可用时条目最多保留 LINK_TTL 秒。
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 链接信息缓存有效期（秒）
+LINK_TTL = 300
+
+# 不存在的code的否定缓存有效期（秒）
+NEGATIVE_TTL = 30
+
+# 进程内缓存的最大条目数
+CACHE_MAX_SIZE = 10000
+
+# 进程内读取共享版本号的间隔（秒）
+VERSION_CHECK_INTERVAL = 5
+
+VERSION_CACHE_KEY = 'short_links:version'
+SESSION_INFO_KEY = 'short_links_changed'
+
+# 计数写入间隔（秒）
+FLUSH_INTERVAL = 5.0
+
+# 内存中最多保留的点击明细条数，超出时立即写入
+MAX_PENDING_DETAILS = 5000
+
+_MISSING = object()
+
+
+class ShortLinkService:
+    """短链接解析缓存与批量点击计数"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.record_details = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+        self._version = None
+        self._checked_at = 0.0
+        self._pending_counts: Dict[int, int] = {}
+        self._pending_details: List[Dict] = []
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopped = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """初始化应用并注册退出时写入"""
+        self.app = app
+        self.record_details = app.config.get('SHORT_LINK_CLICK_DETAILS', False)
+        register_hooks()
+        atexit.register(self.shutdown)
+
+    # ------------------------------------------------------------------
+    # 链接解析
+    # ------------------------------------------------------------------
+
+    def resolve(self, code: str) -> Optional[Dict]:
+        """
+        根据code获取链接信息（带缓存）
+
+        Args:
+            code: 短链接代码
+
+        Returns:
+            dict: {'id', 'code', 'original_url', 'creator_address', 'created_at', 'expires_at', 'click_count'}，
+                  不存在时返回None
+        """
+        now = time.monotonic()
+        version = self._current_version()
+        with self._lock:
+            cached = self._cache.get(code)
+            if cached is not None and cached[0] > now and cached[2] == version:
+                self._cache.move_to_end(code)
+                return None if cached[1] is _MISSING else cached[1]
+
+        from app.models.shortlink import ShortLink
+
+        short_link = ShortLink.query.filter_by(code=code).first()
+        if short_link is None:
+            link, ttl = _MISSING, NEGATIVE_TTL
+        else:
+            link = {
+                'id': short_link.id,
+                'code': short_link.code,
+                'original_url': short_link.original_url,
+                'creator_address': short_link.creator_address,
+                'created_at': short_link.created_at,
+                'expires_at': short_link.expires_at,
+                'click_count': short_link.click_count or 0,
+            }
+            ttl = LINK_TTL
+
+        with self._lock:
+            self._cache[code] = (now + ttl, link, version)
+            self._cache.move_to_end(code)
+            while len(self._cache) > CACHE_MAX_SIZE:
+                self._cache.popitem(last=False)
+        return None if link is _MISSING else link
+
+    def _current_version(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return self._version
+        try:
+            from app.services.cache_service import get_cache
+            value = get_cache().get(VERSION_CACHE_KEY)
+        except Exception as e:
+            logger.debug(f"读取短链接版本号失败: {e}")
+            value = None
+        self._version = value or 0
+        self._checked_at = now
+        return self._version
+
+    def invalidate(self, code: Optional[str] = None) -> None:
+        """
+        短链接变更后调用：本进程立即清除缓存，其他进程在几秒内丢弃缓存的链接信息
+
+        Args:
+            code: 变更的短链接代码，为空时清除全部
+        """
+        value = time.time_ns()
+        try:
+            from app.services.cache_service import get_cache
+            get_cache().set(VERSION_CACHE_KEY, value, timeout=7 * 24 * 3600)
+        except Exception as e:
+            logger.warning(f"更新短链接版本号失败: {e}")
+        with self._lock:
+            if code is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(code, None)
+            self._version = value
+            self._checked_at = time.monotonic()
+
+    @staticmethod
+    def is_expired(link: Dict) -> bool:
+        return bool(link.get('expires_at')) and datetime.utcnow() > link['expires_at']
+
+    # ------------------------------------------------------------------
+    # 点击计数
+    # ------------------------------------------------------------------
+
+    def record_click(self, link: Dict, ip_address: Optional[str] = None,
+                     user_agent: Optional[str] = None, referer: Optional[str] = None) -> int:
+        """
+        记录一次点击（只写内存，由后台线程批量写入数据库）
+
+        Args:
+            link: resolve 返回的链接信息
+            ip_address: 访客IP
+            user_agent: 访客User-Agent
+            referer: 来源页面
+
+        Returns:
+            int: 包含未写入部分的点击总数
+        """
+        flush_now = False
+        with self._lock:
+            pending = self._pending_counts.get(link['id'], 0) + 1
+            self._pending_counts[link['id']] = pending
+            if self.record_details:
+                self._pending_details.append({
+                    'code': link['code'],
+                    'clicked_at': datetime.utcnow(),
+                    'ip_address': (ip_address or '')[:64] or None,
+                    'user_agent': (user_agent or '')[:256] or None,
+                    'referer': (referer or '')[:512] or None,
+                })
+                flush_now = len(self._pending_details) >= MAX_PENDING_DETAILS
+
+        if self.app is None or self._stopped:
+            self.flush()
+        else:
+            self._ensure_started()
+            if flush_now:
+                self._wakeup.set()
+        return link.get('click_count', 0) + pending
+
+    def _ensure_started(self) -> None:
+        # gunicorn预加载后fork的worker需要重新启动写入线程
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # 父进程中未写入的计数由父进程负责
+                self._pending_counts = {}
+                self._pending_details = []
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='short-link-clicks', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        把内存中的点击计数和明细写入数据库
+
+        Returns:
+            int: 写入的点击数
+        """
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending_counts = self._pending_counts, {}
+                details, self._pending_details = self._pending_details, []
+            if not counts and not details:
+                return 0
+
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        self._write(counts, details)
+                else:
+                    self._write(counts, details)
+            except Exception as e:
+                logger.error(f"写入短链接点击计数失败: {str(e)}")
+                # 放回内存，下次重试
+                with self._lock:
+                    for link_id, n in counts.items():
+                        self._pending_counts[link_id] = self._pending_counts.get(link_id, 0) + n
+                    self._pending_details = (details + self._pending_details)[-MAX_PENDING_DETAILS:]
+                return 0
+
+            # 已写入的计数计入缓存中的基数
+            with self._lock:
+                for code, (expires, link, version) in self._cache.items():
+                    if link is not _MISSING and link['id'] in counts:
+                        link['click_count'] += counts[link['id']]
+            return sum(counts.values())
+
+    @staticmethod
+    def _write(counts: Dict[int, int], details: List[Dict]) -> None:
+        from sqlalchemy import text
+        from app.extensions import db
+        from app.models.shortlink import ShortLinkClick
+
+        try:
+            if counts:
+                # 原子累加，多个进程并发写入也不会丢失更新
+                db.session.execute(
+                    text("UPDATE short_links SET click_count = COALESCE(click_count, 0) + :n WHERE id = :id"),
+                    [{'id': link_id, 'n': n} for link_id, n in counts.items()]
+                )
+            if details:
+                db.session.execute(ShortLinkClick.__table__.insert(), details)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def shutdown(self) -> None:
+        """进程退出时调用，写完剩余的计数"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+
+short_link_service = ShortLinkService()
+
+
+def _mark_changed(mapper, connection, target):
+    from sqlalchemy.orm import Session
+
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(SESSION_INFO_KEY, set()).add(target.code)
+
+
+def _after_commit(session):
+    codes = session.info.pop(SESSION_INFO_KEY, None)
+    if codes:
+        short_link_service.invalidate(next(iter(codes)) if len(codes) == 1 else None)
+
+
+def _after_rollback(session):
+    session.info.pop(SESSION_INFO_KEY, None)
+
+
+def register_hooks():
+    """短链接增删改提交后使各进程缓存的链接信息失效"""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from app.models.shortlink import ShortLink
+
+    listeners = [(ShortLink, name, _mark_changed) for name in ('after_insert', 'after_update', 'after_delete')]
+    listeners += [(Session, 'after_commit', _after_commit), (Session, 'after_rollback', _after_rollback)]
+    for target, name, fn in listeners:
+        if not event.contains(target, name, fn):
+            event.listen(target, name, fn)
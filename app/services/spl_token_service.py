@@ -360,6 +360,9 @@ class SplTokenService:
 
             logger.info(f"[{operation_id}] Mint交易确认成功")
 
+            from app.services.token_account_cache import invalidate_wallet
+            invalidate_wallet(user_address, mints=[mint_address])
+
             return {
                 'success': True,
                 'message': f'成功mint {amount} 个代币给用户',
@@ -435,24 +438,38 @@ class SplTokenService:
             dict: 用户代币余额信息
         """
         try:
-            # 确保连接已初始化
-            if solana_connection is None:
-                initialize_solana_connection()
-            client = solana_connection
+            from app.utils.solana_compat.rpc.async_api import gather_sync
+            from app.services.token_account_cache import get_token_account_cache, rpc_context_slot
+
             user_pubkey = Pubkey.from_string(user_address)
             mint_pubkey = Pubkey.from_string(mint_address)
 
             # 获取用户的关联代币账户
             user_token_account = get_associated_token_address(user_pubkey, mint_pubkey)
 
-            # 查询余额
-            response = client.get_token_account_balance(user_token_account)
-            if response.value:
+            def _load():
+                client = SplTokenService._async_rpc_client()
+                response, = gather_sync(client.get_token_account_balance(str(user_token_account), 'confirmed'),
+                                        timeout=15)
+                if not isinstance(response, dict):
+                    raise response
+                if 'result' in response:
+                    return response['result'].get('value'), rpc_context_slot(response['result'])
+                if 'jsonrpc' in response:
+                    # 关联代币账户不存在
+                    return None, None
+                raise RuntimeError(response['error'].get('message'))
+
+            # 查询余额（按钱包和mint缓存，平台交易确认后失效）
+            cache = get_token_account_cache()
+            value = cache.get_or_load('ata_balance', user_address, mint_address, _load)
+            cache.watch(str(user_token_account), owner=user_address)
+            if value:
                 return {
                     'success': True,
                     'data': {
-                        'balance': int(response.value.amount),
-                        'decimals': response.value.decimals,
+                        'balance': int(value['amount']),
+                        'decimals': value['decimals'],
                         'token_account': str(user_token_account)
                     }
                 }
@@ -474,6 +491,122 @@ class SplTokenService:
                 'message': f'查询用户代币余额失败: {str(e)}'
             }
 
+    @staticmethod
+    def _async_rpc_client():
+        """与当前Solana连接使用同一节点的异步RPC客户端"""
+        from app.blockchain import solana_service
+        from app.utils.solana_compat.rpc.async_api import AsyncClient
+
+        if solana_service.solana_connection is None:
+            initialize_solana_connection()
+        return AsyncClient(solana_service.solana_connection.rpc_client.endpoint)
+
+    @staticmethod
+    def get_token_supplies(mint_addresses) -> Dict[str, Dict]:
+        """
+        并发获取多个代币的当前供应量
+
+        Args:
+            mint_addresses: Token mint地址列表
+
+        Returns:
+            dict: {mint地址: 与 get_token_supply 格式一致的结果}
+        """
+        from app.utils.solana_compat.rpc.async_api import gather_sync
+
+        mint_addresses = list(dict.fromkeys(mint_addresses))
+        if not mint_addresses:
+            return {}
+
+        client = SplTokenService._async_rpc_client()
+        responses = gather_sync(*[client.get_token_supply(mint) for mint in mint_addresses], timeout=15)
+
+        results = {}
+        for mint, response in zip(mint_addresses, responses):
+            value = response.get('result', {}).get('value') if isinstance(response, dict) else None
+            if value:
+                results[mint] = {
+                    'success': True,
+                    'data': {
+                        'total_supply': int(value['amount']),
+                        'decimals': value['decimals']
+                    }
+                }
+            else:
+                error = response.get('error') if isinstance(response, dict) else str(response)
+                logger.warning(f"获取代币 {mint} 供应量失败: {error}")
+                results[mint] = {
+                    'success': False,
+                    'error': 'SUPPLY_QUERY_ERROR',
+                    'message': f'查询代币供应量失败: {error}'
+                }
+        return results
+
+    @staticmethod
+    def get_wallet_token_overview(user_address: str, mint_address: str) -> Dict:
+        """
+        一次并发查询钱包SOL余额、关联代币账户（是否存在及余额）和代币供应量
+
+        Args:
+            user_address: 用户钱包地址
+            mint_address: Token mint地址
+
+        Returns:
+            dict: 汇总结果，三个查询的总耗时约等于其中最慢的一次
+        """
+        from app.utils.solana_compat.rpc.async_api import gather_sync
+
+        try:
+            user_pubkey = Pubkey.from_string(user_address)
+            mint_pubkey = Pubkey.from_string(mint_address)
+            token_account = str(get_associated_token_address(user_pubkey, mint_pubkey))
+
+            client = SplTokenService._async_rpc_client()
+            sol_balance, ata_balance, supply = gather_sync(
+                client.get_balance(user_address, 'confirmed'),
+                client.get_token_account_balance(token_account, 'confirmed'),
+                client.get_token_supply(mint_address, 'confirmed'),
+                timeout=15
+            )
+
+            def _value(response):
+                if isinstance(response, dict) and 'result' in response:
+                    return response['result'].get('value')
+                return None
+
+            lamports = _value(sol_balance)
+            token_amount = _value(ata_balance)
+            supply_value = _value(supply)
+            # 账户不存在时getTokenAccountBalance返回RPC错误；请求本身失败时无法判断
+            if token_amount is not None:
+                ata_exists = True
+            elif isinstance(ata_balance, dict) and 'jsonrpc' in ata_balance:
+                ata_exists = False
+            else:
+                ata_exists = None
+
+            return {
+                'success': True,
+                'data': {
+                    'wallet_address': user_address,
+                    'mint_address': mint_address,
+                    'sol_lamports': lamports,
+                    'token_account': token_account,
+                    'token_account_exists': ata_exists,
+                    'token_balance': int(token_amount['amount']) if token_amount else 0,
+                    'decimals': (token_amount or supply_value or {}).get('decimals'),
+                    'total_supply': int(supply_value['amount']) if supply_value else None
+                }
+            }
+
+        except Exception as e:
+            logger.error(f"获取钱包代币概览失败: {e}", exc_info=True)
+            return {
+                'success': False,
+                'error': 'OVERVIEW_QUERY_ERROR',
+                'message': f'查询钱包代币概览失败: {str(e)}'
+            }
+
     @staticmethod
     def _get_platform_keypair() -> Optional[Keypair]:
         """
@@ -952,6 +1085,10 @@ class SplTokenService:
 
             logger.info(f"[{operation_id}] 转账交易确认成功")
 
+            from app.services.token_account_cache import invalidate_wallet
+            invalidate_wallet(from_address, mints=[mint_address])
+            invalidate_wallet(to_address, mints=[mint_address])
+
             return {
                 'success': True,
                 'message': f'成功转移 {amount} 个代币',
@@ -1351,22 +1488,25 @@ class SplTokenService:
         logger.info(f"[{operation_id}] 获取Token持有者数量: {mint_address}")
 
         try:
-            # 确保连接已初始化
-            if solana_connection is None:
-                initialize_solana_connection()
-            client = solana_connection
-            mint_pubkey = Pubkey.from_string(mint_address)
+            # 优先使用链上持有人索引（由定时任务按getProgramAccounts快照+增量交易维护）
+            from app.services.token_holder_indexer import TokenHolderIndexer
 
-            # 获取所有关联代币账户
-            # 注意：这个方法在主网上可能很慢，因为需要扫描大量账户
-            # 实际生产环境建议使用Solana RPC的getProgramAccounts API
-            # 或者使用Solscan/SolanaFM等第三方API
+            state = TokenHolderIndexer.get_state(mint_address)
+            if state is not None:
+                return {
+                    'success': True,
+                    'data': {
+                        'mint_address': mint_address,
+                        'holder_count': state.holder_count,
+                        'token_account_count': state.account_count,
+                        'indexed_slot': state.last_slot or state.snapshot_slot,
+                        'last_synced_at': state.last_synced_at.isoformat() if state.last_synced_at else None,
+                        'note': '此数据来自链上持有人索引'
+                    }
+                }
 
-            # 这里提供一个简化实现，实际应用中可能需要优化
-            # 由于RPC调用可能很慢且不稳定，直接使用数据库估算值
+            # 尚未建立索引时使用数据库估算值
             holder_count = 0
-
-            # 尝试从数据库获取估算值
             asset = Asset.query.filter_by(token_address=mint_address).first()
             if asset:
                 db_holder_count = db.session.query(func.count(Holding.id)).filter(
@@ -1415,6 +1555,56 @@ class SplTokenService:
                 'message': f'获取持有者数量失败: {str(e)}'
             }
 
+    @staticmethod
+    def get_top_holders(mint_address: str, limit: int = 10) -> Dict:
+        """
+        获取持有量最高的持有人（来自链上持有人索引）
+
+        Args:
+            mint_address: Token mint地址
+            limit: 返回数量
+
+        Returns:
+            dict: 持有人列表及其占比
+        """
+        try:
+            from app.models.token_holder import TokenHolderAccount
+            from app.services.token_holder_indexer import TokenHolderIndexer
+
+            state = TokenHolderIndexer.get_state(mint_address)
+            if state is None:
+                return {
+                    'success': False,
+                    'error': 'INDEX_NOT_READY',
+                    'message': f'代币 {mint_address} 的持有人索引尚未建立'
+                }
+
+            total = int(state.total_amount or 0)
+            holders = [{
+                'owner': owner,
+                'amount': int(amount),
+                'share': float(amount) / total if total else 0.0
+            } for owner, amount in TokenHolderAccount.top_holders(mint_address, limit)]
+
+            return {
+                'success': True,
+                'data': {
+                    'mint_address': mint_address,
+                    'holder_count': state.holder_count,
+                    'total_amount': total,
+                    'holders': holders,
+                    'indexed_slot': state.last_slot or state.snapshot_slot
+                }
+            }
+
+        except Exception as e:
+            logger.error(f"获取头部持有人失败: {e}", exc_info=True)
+            return {
+                'success': False,
+                'error': 'TOP_HOLDERS_ERROR',
+                'message': f'获取头部持有人失败: {str(e)}'
+            }
+
     @staticmethod
     def monitor_token_activity(mint_address: str, hours: int = 24) -> Dict:
         """
@@ -1485,6 +1675,30 @@ class SplTokenService:
                 'note': '此数据基于数据库记录，不包含链上直接转账'
             }
 
+            # 链上持有人索引记录的全部交易（含不经过平台的直接转账）
+            from app.models.token_holder import TokenActivity
+            from app.services.token_holder_indexer import TokenHolderIndexer
+
+            state = TokenHolderIndexer.get_state(mint_address)
+            if state is not None:
+                chain_count, chain_moved, supply_delta = db.session.query(
+                    func.count(TokenActivity.id),
+                    func.coalesce(func.sum(TokenActivity.amount_moved), 0),
+                    func.coalesce(func.sum(TokenActivity.supply_delta), 0)
+                ).filter(
+                    TokenActivity.mint == mint_address,
+                    TokenActivity.block_time >= start_time,
+                    TokenActivity.block_time <= end_time
+                ).one()
+                activity_data['onchain_summary'] = {
+                    'total_transactions': chain_count,
+                    'total_tokens_moved': int(chain_moved),
+                    'net_supply_change': int(supply_delta),
+                    'holder_count': state.holder_count,
+                    'indexed_slot': state.last_slot or state.snapshot_slot
+                }
+                activity_data['note'] = 'activity_summary基于数据库记录；onchain_summary来自链上持有人索引，包含直接转账'
+
             return {
                 'success': True,
                 'data': activity_data
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+代币账户与余额缓存
+按 (类型, 地址, mint) 缓存链上读取结果，并记录读取时所在的slot。
+平台自己的购买、转账、取现确认后，按钱包地址设置失效下限（时间 + slot），
+早于下限读到的条目不再使用；落后节点返回的旧slot数据也不会写回缓存。
+可选地通过账户订阅（accountSubscribe）在链上账户变化时主动失效。
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 条目默认有效期（秒）
+DEFAULT_TTL = 20
+
+# 失效下限的保留时间，需长于条目有效期
+FLOOR_TTL = 600
+
+# 账户订阅的最大数量，超出后取消最久未使用的订阅
+MAX_WATCHED_ACCOUNTS = 1000
+
+
+def rpc_context_slot(response: Any) -> Optional[int]:
+    """从RPC结果（含context）中取出slot"""
+    if isinstance(response, dict):
+        context = response.get('context')
+        if isinstance(context, dict):
+            return context.get('slot')
+    return None
+
+
+class TokenAccountCache:
+    """
+    代币账户/余额缓存
+
+    条目结构: {'value': 值, 'slot': 读取时的slot, 'at': 读取时间}
+    失效下限: {'slot': 确认交易的slot, 'at': 失效时间}
+    条目仅在 at 晚于下限时间、且slot不低于下限slot时有效。
+    """
+
+    KEY_PREFIX = 'token_acct'
+
+    def __init__(self, cache=None, ttl: int = DEFAULT_TTL, subscribe_accounts: bool = None):
+        """
+        Args:
+            cache: 缓存后端，默认使用全局CacheService（Redis，不可用时为内存）
+            ttl: 条目有效期（秒）
+            subscribe_accounts: 是否订阅账户变化；默认读取环境变量 TOKEN_CACHE_ACCOUNT_SUBSCRIBE
+        """
+        self._cache = cache
+        self.ttl = ttl
+        if subscribe_accounts is None:
+            subscribe_accounts = os.environ.get('TOKEN_CACHE_ACCOUNT_SUBSCRIBE', '0').lower() in ('1', 'true', 'yes')
+        self.subscribe_accounts = subscribe_accounts
+        # 账户地址 -> (订阅ID, 所属钱包地址)
+        self._watched: 'OrderedDict[str, Tuple[int, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'rejected': 0, 'invalidations': 0}
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from app.services.cache_service import get_cache
+            self._cache = get_cache()
+        return self._cache
+
+    def _entry_key(self, kind: str, address: str, mint: str) -> str:
+        return f"{self.KEY_PREFIX}:{kind}:{address}:{mint or '-'}"
+
+    def _floor_key(self, address: str) -> str:
+        return f"{self.KEY_PREFIX}:floor:{address}"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def get(self, kind: str, address: str, mint: str = None) -> Optional[Dict]:
+        """读取有效条目，不存在或已失效时返回None"""
+        entry = self.cache.get(self._entry_key(kind, address, mint))
+        if entry is None:
+            return None
+        if not self._is_fresh(entry, self.cache.get(self._floor_key(address))):
+            self._count('stale')
+            return None
+        return entry
+
+    @staticmethod
+    def _is_fresh(entry: Dict, floor: Optional[Dict]) -> bool:
+        if floor is None:
+            return True
+        if entry['at'] <= floor['at']:
+            return False
+        floor_slot = floor.get('slot')
+        return floor_slot is None or entry.get('slot') is None or entry['slot'] >= floor_slot
+
+    def put(self, kind: str, address: str, mint: str, value: Any, slot: Optional[int],
+            read_at: float = None) -> bool:
+        """
+        写入条目
+
+        Args:
+            read_at: 开始读取的时间，默认当前时间；读取期间发生失效时条目不会被写入
+
+        Returns:
+            bool: 数据早于该地址的失效下限（时间或slot）时拒绝写入并返回False
+        """
+        entry = {'value': value, 'slot': slot, 'at': read_at or time.time()}
+        if not self._is_fresh(entry, self.cache.get(self._floor_key(address))):
+            self._count('rejected')
+            logger.debug(f"拒绝缓存 {kind}:{address}，读取结果早于失效下限")
+            return False
+        return bool(self.cache.set(self._entry_key(kind, address, mint), entry, timeout=self.ttl))
+
+    def get_or_load(self, kind: str, address: str, mint: Optional[str],
+                    loader: Callable[[], Optional[Tuple[Any, Optional[int]]]]) -> Optional[Any]:
+        """
+        优先返回缓存值，未命中时调用loader读取链上数据并写入缓存
+
+        Args:
+            kind: 数据类型（token_balance、token_accounts、account_info等）
+            address: 钱包或账户地址
+            mint: 代币mint地址，没有时为None
+            loader: 返回 (值, slot)；读取失败时返回None，失败结果不缓存
+
+        Returns:
+            缓存或新读取的值；读取失败时返回None
+        """
+        entry = self.get(kind, address, mint)
+        if entry is not None:
+            self._count('hits')
+            return entry['value']
+
+        self._count('misses')
+        read_at = time.time()
+        loaded = loader()
+        if loaded is None:
+            return None
+        value, slot = loaded
+        self.put(kind, address, mint, value, slot, read_at=read_at)
+        return value
+
+    # ------------------------------------------------------------------
+    # 失效
+    # ------------------------------------------------------------------
+
+    def invalidate(self, address: str, slot: Optional[int] = None, mints: Iterable[str] = ()) -> None:
+        """
+        使某个地址（及其在给定mint下的关联代币账户）的全部条目失效
+
+        Args:
+            address: 钱包地址
+            slot: 导致变化的交易所在slot；之后读到的低于该slot的数据不会被缓存
+            mints: 同时失效这些mint对应的关联代币账户地址
+        """
+        addresses = [address] + [ata for ata in (associated_token_address(address, mint) for mint in mints if mint) if ata]
+        now = time.time()
+        for target in addresses:
+            key = self._floor_key(target)
+            floor = self.cache.get(key) or {}
+            if floor.get('slot') is not None and (slot is None or slot < floor['slot']):
+                slot_floor = floor['slot']
+            else:
+                slot_floor = slot
+            self.cache.set(key, {'slot': slot_floor, 'at': now}, timeout=FLOOR_TTL)
+        self._count('invalidations')
+
+    # ------------------------------------------------------------------
+    # 账户订阅
+    # ------------------------------------------------------------------
+
+    def watch(self, account: str, owner: str = None) -> None:
+        """订阅账户变化，变化时失效该账户及其所属钱包的条目（未开启订阅时忽略）"""
+        if not self.subscribe_accounts or not account:
+            return
+        with self._lock:
+            if account in self._watched:
+                self._watched.move_to_end(account)
+                return
+
+        try:
+            from app.services.chain_event_stream import get_event_stream
+            stream = get_event_stream()
+            if stream is None:
+                return
+
+            def _on_change(event):
+                self.invalidate(account, slot=event.slot)
+                if owner:
+                    self.invalidate(owner, slot=event.slot)
+
+            local_id = stream.subscribe_account(account, _on_change)
+        except Exception as e:
+            logger.warning(f"订阅账户 {account} 变化失败: {e}")
+            return
+
+        evicted = []
+        with self._lock:
+            self._watched[account] = (local_id, owner)
+            while len(self._watched) > MAX_WATCHED_ACCOUNTS:
+                evicted.append(self._watched.popitem(last=False)[1][0])
+        if evicted:
+            for local_id in evicted:
+                stream.unsubscribe(local_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'watched_accounts': len(self._watched), 'ttl': self.ttl}
+
+
+def associated_token_address(owner: str, mint: str) -> Optional[str]:
+    """计算关联代币账户地址，地址无效时返回None"""
+    try:
+        from solders.pubkey import Pubkey
+        from spl.token.instructions import get_associated_token_address
+
+        return str(get_associated_token_address(Pubkey.from_string(owner), Pubkey.from_string(mint)))
+    except Exception:
+        return None
+
+
+# 全局实例
+_token_account_cache: Optional[TokenAccountCache] = None
+
+
+def get_token_account_cache() -> TokenAccountCache:
+    """获取全局代币账户缓存"""
+    global _token_account_cache
+    if _token_account_cache is None:
+        _token_account_cache = TokenAccountCache()
+    return _token_account_cache
+
+
+def invalidate_wallet(address: str, slot: Optional[int] = None, mints: Iterable[str] = ()) -> None:
+    """
+    平台交易（购买、转账、取现）确认后的失效入口，失败只记录日志，不影响业务流程
+
+    Args:
+        address: 钱包地址
+        slot: 交易确认所在slot，未知时为None
+        mints: 交易涉及的代币mint；平台USDC的关联代币账户总是一并失效
+    """
+    if not address:
+        return
+    try:
+        from app.utils.config_manager import ConfigManager
+
+        mints = set(mints)
+        mints.add(ConfigManager.get_usdc_mint())
+        get_token_account_cache().invalidate(address, slot=slot, mints=mints)
+    except Exception as e:
+        logger.warning(f"失效钱包 {address} 的代币账户缓存失败: {e}")
@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+链上代币持有人索引
+每个mint先用一次 getProgramAccounts（dataSize + memcmp 过滤，dataSlice 只取owner和amount）建立全量快照，
+之后按 getSignaturesForAddress(mint) 增量拉取新交易，用交易前后的代币余额更新持有人表。
+持有人数量、头部持有人和分红快照直接读取索引表，不再依赖数据库持仓估算，也能反映链上直接转账。
+
+不带mint账户的旧式 transfer 指令不会出现在mint的签名列表中，因此索引定期重新做全量快照校正。
+"""
+
+import base64
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import base58
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models.token_holder import TokenHolderAccount, TokenHolderIndexState, TokenActivity
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PROGRAM_ID = 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'
+
+# SPL Token账户布局：mint(0..32) owner(32..64) amount(64..72)，总长165字节
+TOKEN_ACCOUNT_SIZE = 165
+OWNER_OFFSET = 32
+AMOUNT_END = 72
+
+
+class TokenHolderIndexer:
+    """
+    代币持有人索引器
+
+    rpc_call 为空时通过异步RPC客户端并发请求；
+    传入 rpc_call(method, params) -> result 时按顺序调用，用于从本地fixture回放。
+    """
+
+    SIGNATURE_PAGE_SIZE = 1000
+    MAX_SIGNATURES_PER_SYNC = 5000   # 积压超过该数量时直接重新快照
+    TX_FETCH_CONCURRENCY = 16        # 同时拉取的交易数
+    RESNAPSHOT_HOURS = 24            # 全量快照校正周期
+    WRITE_BATCH_SIZE = 5000
+
+    def __init__(self, rpc_url: str = None, rpc_call: Callable[[str, list], Any] = None,
+                 commitment: str = 'confirmed'):
+        """
+        Args:
+            rpc_url: RPC节点地址，默认与当前Solana连接一致
+            rpc_call: 自定义RPC调用函数
+            commitment: 读取的确认级别
+        """
+        self.rpc_url = rpc_url
+        self._rpc_call = rpc_call
+        self.commitment = commitment
+
+    # ------------------------------------------------------------------
+    # RPC
+    # ------------------------------------------------------------------
+
+    def _client(self):
+        from app.utils.solana_compat.rpc.async_api import AsyncClient
+
+        if self.rpc_url is None:
+            from app.utils.config_manager import ConfigManager
+            self.rpc_url = ConfigManager.get_solana_rpc_url()
+        return AsyncClient(self.rpc_url, timeout=30)
+
+    def _call_many(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """执行多个RPC调用，返回各自的result；任一失败时抛出异常"""
+        if self._rpc_call is not None:
+            return [self._rpc_call(method, params) for method, params in calls]
+
+        from app.utils.solana_compat.rpc.async_api import gather_sync
+
+        client = self._client()
+        responses = gather_sync(*[client.request(method, params) for method, params in calls], timeout=60)
+        results = []
+        for (method, _), response in zip(calls, responses):
+            if not isinstance(response, dict):
+                raise response
+            if 'error' in response:
+                raise RuntimeError(f"{method} 调用失败: {response['error']}")
+            results.append(response.get('result'))
+        return results
+
+    def _call(self, method: str, params: list) -> Any:
+        return self._call_many([(method, params)])[0]
+
+    # ------------------------------------------------------------------
+    # 全量快照
+    # ------------------------------------------------------------------
+
+    def snapshot(self, mint: str, program_id: str = TOKEN_PROGRAM_ID) -> Dict[str, Any]:
+        """
+        用一次 getProgramAccounts 重建mint的全部代币账户
+
+        Returns:
+            dict: 快照slot与账户数量
+        """
+        # 先记下当前最新签名，快照之后从这里开始增量；重叠部分按slot比较不会回退余额
+        latest = self._call('getSignaturesForAddress', [mint, {'limit': 1, 'commitment': self.commitment}])
+        response = self._call('getProgramAccounts', [program_id, {
+            'encoding': 'base64',
+            'commitment': self.commitment,
+            'withContext': True,
+            'dataSlice': {'offset': OWNER_OFFSET, 'length': AMOUNT_END - OWNER_OFFSET},
+            'filters': [
+                {'dataSize': TOKEN_ACCOUNT_SIZE},
+                {'memcmp': {'offset': 0, 'bytes': mint}}
+            ]
+        }])
+        if isinstance(response, dict) and 'context' in response:
+            slot, accounts = response['context']['slot'], response['value']
+        else:
+            slot, accounts = None, response or []
+
+        now = datetime.utcnow()
+        rows = []
+        for account in accounts:
+            owner, amount = self._decode_owner_amount(account['account']['data'])
+            rows.append({
+                'mint': mint, 'token_account': account['pubkey'], 'owner': owner,
+                'amount': amount, 'slot': slot, 'updated_at': now
+            })
+
+        try:
+            TokenHolderAccount.query.filter_by(mint=mint).delete(synchronize_session=False)
+            for start in range(0, len(rows), self.WRITE_BATCH_SIZE):
+                db.session.bulk_insert_mappings(TokenHolderAccount, rows[start:start + self.WRITE_BATCH_SIZE])
+
+            state = db.session.get(TokenHolderIndexState, mint) or TokenHolderIndexState(mint=mint)
+            state.program_id = program_id
+            state.snapshot_slot = slot
+            state.snapshot_at = now
+            if latest:
+                state.last_signature = latest[0]['signature']
+                state.last_slot = latest[0].get('slot')
+            db.session.add(state)
+            self._refresh_totals(state)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        logger.info(f"代币 {mint} 持有人快照完成: slot={slot}, 代币账户={len(rows)}, 持有人={state.holder_count}")
+        return {'mint': mint, 'slot': slot, 'accounts': len(rows), 'holder_count': state.holder_count}
+
+    @staticmethod
+    def _decode_owner_amount(data) -> Tuple[str, int]:
+        """解析dataSlice截取的 owner(32字节) + amount(u64小端)"""
+        raw = base64.b64decode(data[0] if isinstance(data, (list, tuple)) else data)
+        return base58.b58encode(raw[:32]).decode('ascii'), int.from_bytes(raw[32:40], 'little')
+
+    # ------------------------------------------------------------------
+    # 增量同步
+    # ------------------------------------------------------------------
+
+    def sync(self, mint: str, program_id: str = TOKEN_PROGRAM_ID) -> Dict[str, Any]:
+        """
+        同步一个mint：没有快照或快照过期时重建，否则处理上次之后的新交易
+
+        Returns:
+            dict: 本次处理的交易数与剩余积压（pending）
+        """
+        state = db.session.get(TokenHolderIndexState, mint)
+        stale_before = datetime.utcnow() - timedelta(hours=self.RESNAPSHOT_HOURS)
+        if state is None or state.snapshot_at is None or state.snapshot_at < stale_before:
+            result = self.snapshot(mint, program_id)
+            return {'mint': mint, 'processed': 0, 'pending': 0, 'snapshot': result}
+
+        signatures = self._new_signatures(mint, state.last_signature)
+        if len(signatures) > self.MAX_SIGNATURES_PER_SYNC:
+            logger.info(f"代币 {mint} 积压 {len(signatures)} 笔交易，改为重新快照")
+            result = self.snapshot(mint, state.program_id or program_id)
+            return {'mint': mint, 'processed': 0, 'pending': 0, 'snapshot': result}
+
+        # 签名按从新到旧返回，按时间顺序处理
+        signatures.reverse()
+        processed = 0
+        for start in range(0, len(signatures), self.TX_FETCH_CONCURRENCY):
+            chunk = signatures[start:start + self.TX_FETCH_CONCURRENCY]
+            transactions = self._call_many([
+                ('getTransaction', [entry['signature'], {
+                    'encoding': 'jsonParsed',
+                    'commitment': self.commitment,
+                    'maxSupportedTransactionVersion': 0
+                }]) for entry in chunk
+            ])
+            # 交易尚不可读时停在这里，下次从该签名之前继续
+            ready = []
+            for entry, transaction in zip(chunk, transactions):
+                if transaction is None:
+                    break
+                ready.append((entry, transaction))
+            if ready:
+                self._apply(mint, state, ready)
+                processed += len(ready)
+            if len(ready) < len(chunk):
+                break
+
+        return {'mint': mint, 'processed': processed, 'pending': len(signatures) - processed}
+
+    def _new_signatures(self, mint: str, until: Optional[str]) -> List[Dict]:
+        """上次处理的签名之后的全部签名（从新到旧）"""
+        signatures: List[Dict] = []
+        before = None
+        while len(signatures) <= self.MAX_SIGNATURES_PER_SYNC:
+            options = {'limit': self.SIGNATURE_PAGE_SIZE, 'commitment': self.commitment}
+            if until:
+                options['until'] = until
+            if before:
+                options['before'] = before
+            page = self._call('getSignaturesForAddress', [mint, options]) or []
+            signatures.extend(page)
+            if len(page) < self.SIGNATURE_PAGE_SIZE:
+                break
+            before = page[-1]['signature']
+        return signatures
+
+    def _apply(self, mint: str, state: TokenHolderIndexState, batch: List[Tuple[Dict, Dict]]) -> None:
+        """把一批交易的余额变化写入索引（单个事务）"""
+        changes: Dict[str, Tuple[str, int, int]] = {}
+        activities = []
+        for entry, transaction in batch:
+            slot = transaction.get('slot') or entry.get('slot')
+            meta = transaction.get('meta') or {}
+            if meta.get('err') is not None:
+                continue
+            balances = self.balance_changes(mint, transaction)
+            if not balances:
+                continue
+            amount_moved = 0
+            supply_delta = 0
+            for account, (owner, before, after) in balances.items():
+                changes[account] = (owner, after, slot)
+                amount_moved += max(0, after - before)
+                supply_delta += after - before
+            block_time = transaction.get('blockTime') or entry.get('blockTime')
+            activities.append({
+                'mint': mint,
+                'signature': entry['signature'],
+                'slot': slot,
+                'block_time': datetime.utcfromtimestamp(block_time) if block_time else None,
+                'accounts_changed': len(balances),
+                'amount_moved': amount_moved,
+                'supply_delta': supply_delta
+            })
+
+        last_entry, last_transaction = batch[-1]
+        try:
+            self._upsert_accounts(mint, changes, state.snapshot_slot)
+            if activities:
+                known = {signature for (signature,) in db.session.query(TokenActivity.signature).filter(
+                    TokenActivity.mint == mint,
+                    TokenActivity.signature.in_([activity['signature'] for activity in activities])
+                )}
+                db.session.bulk_insert_mappings(
+                    TokenActivity, [activity for activity in activities if activity['signature'] not in known]
+                )
+            state.last_signature = last_entry['signature']
+            state.last_slot = last_transaction.get('slot') or last_entry.get('slot')
+            self._refresh_totals(state)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def balance_changes(mint: str, transaction: Dict) -> Dict[str, Tuple[str, int, int]]:
+        """
+        从交易的 pre/postTokenBalances 提取该mint下代币账户的余额变化
+
+        Returns:
+            dict: {代币账户: (owner, 交易前余额, 交易后余额)}；交易中关闭的账户交易后余额为0
+        """
+        meta = transaction.get('meta') or {}
+        message = (transaction.get('transaction') or {}).get('message') or {}
+        keys = [key['pubkey'] if isinstance(key, dict) else key for key in message.get('accountKeys', [])]
+        loaded = meta.get('loadedAddresses') or {}
+        keys += loaded.get('writable', []) + loaded.get('readonly', [])
+
+        def _collect(entries):
+            result = {}
+            for entry in entries or []:
+                if entry.get('mint') != mint or entry.get('accountIndex', -1) >= len(keys):
+                    continue
+                amount = int(entry.get('uiTokenAmount', {}).get('amount') or 0)
+                result[keys[entry['accountIndex']]] = (entry.get('owner'), amount)
+            return result
+
+        pre = _collect(meta.get('preTokenBalances'))
+        post = _collect(meta.get('postTokenBalances'))
+        changes = {}
+        for account in set(pre) | set(post):
+            owner_before, before = pre.get(account, (None, 0))
+            owner_after, after = post.get(account, (None, 0))
+            if before != after or account not in pre:
+                changes[account] = (owner_after or owner_before, before, after)
+        return changes
+
+    def _upsert_accounts(self, mint: str, changes: Dict[str, Tuple[str, int, int]],
+                         snapshot_slot: Optional[int] = None) -> None:
+        if not changes:
+            return
+        existing = {
+            row.token_account: row for row in TokenHolderAccount.query.filter(
+                TokenHolderAccount.mint == mint,
+                TokenHolderAccount.token_account.in_(list(changes))
+            )
+        }
+        now = datetime.utcnow()
+        inserts = []
+        for account, (owner, amount, slot) in changes.items():
+            row = existing.get(account)
+            if row is None:
+                # 快照之前的变更：快照时该账户已不存在，以快照为准
+                if slot is not None and snapshot_slot is not None and slot <= snapshot_slot:
+                    continue
+                inserts.append({'mint': mint, 'token_account': account, 'owner': owner or '',
+                                'amount': amount, 'slot': slot, 'updated_at': now})
+            elif row.slot is None or slot is None or slot > row.slot:
+                row.amount = amount
+                row.slot = slot
+                if owner:
+                    row.owner = owner
+        if inserts:
+            db.session.bulk_insert_mappings(TokenHolderAccount, inserts)
+
+    @staticmethod
+    def _refresh_totals(state: TokenHolderIndexState) -> None:
+        """重新汇总持有人数量等统计值（走 mint 前缀索引）"""
+        db.session.flush()
+        holder_count, account_count, total_amount = db.session.query(
+            func.count(func.distinct(TokenHolderAccount.owner)),
+            func.count(TokenHolderAccount.id),
+            func.coalesce(func.sum(TokenHolderAccount.amount), 0)
+        ).filter(
+            TokenHolderAccount.mint == state.mint,
+            TokenHolderAccount.amount > 0
+        ).one()
+        state.holder_count = holder_count
+        state.account_count = account_count
+        state.total_amount = total_amount
+        state.last_synced_at = datetime.utcnow()
+
+    # ------------------------------------------------------------------
+    # 批量任务
+    # ------------------------------------------------------------------
+
+    def sync_all(self) -> Dict[str, int]:
+        """
+        同步全部已发行SPL Token的资产
+
+        Returns:
+            dict: {'pending_signatures': 剩余积压}，供自适应轮询调整间隔
+        """
+        from app.models import Asset
+
+        mints = [mint for (mint,) in db.session.query(Asset.spl_mint_address).filter(
+            Asset.spl_mint_address.isnot(None),
+            Asset.deleted_at.is_(None)
+        ).distinct()]
+
+        pending = 0
+        for mint in mints:
+            try:
+                pending += self.sync(mint)['pending']
+            except Exception as e:
+                logger.error(f"同步代币 {mint} 持有人索引失败: {e}", exc_info=True)
+        return {'pending_signatures': pending}
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get_state(mint: str) -> Optional[TokenHolderIndexState]:
+        """索引状态（含持有人数量），未建立索引时返回None"""
+        return db.session.get(TokenHolderIndexState, mint)
+
+    @staticmethod
+    def iter_holder_balances(mint: str) -> Iterable[Tuple[str, int]]:
+        """按持有人汇总的链上余额 (owner, amount)，按owner排序以保证分红结果可复现"""
+        query = db.session.query(
+            TokenHolderAccount.owner,
+            func.sum(TokenHolderAccount.amount)
+        ).filter(
+            TokenHolderAccount.mint == mint,
+            TokenHolderAccount.amount > 0
+        ).group_by(TokenHolderAccount.owner).order_by(TokenHolderAccount.owner)
+        for owner, amount in query:
+            yield owner, int(amount)
+
+
+def sync_token_holder_index() -> Dict[str, int]:
+    """定时任务入口"""
+    return TokenHolderIndexer().sync_all()
@@ -727,6 +727,10 @@ class TradeServiceV3:
                     logger.error(f"[{confirmation_id}] SPL Token处理阶段发生异常（不影响购买结果）: {spl_e}", exc_info=True)
                     # SPL Token异常不影响主购买流程
 
+                # 购买者的USDC与资产代币余额已变化，失效其代币账户缓存
+                from app.services.token_account_cache import invalidate_wallet
+                invalidate_wallet(trade.trader_address, mints=[asset.spl_mint_address])
+
             except SQLAlchemyError as e:
                 logger.error(f"[{confirmation_id}] 数据库SQLAlchemy错误，执行回滚: {e}", exc_info=True)
                 db.session.rollback()
@@ -0,0 +1,628 @@
+"""
+批量取现处理服务
+一次查询锁定并校验所有到期的取现申请，将多笔USDC转账打包进尽量少的Solana交易，
+以有限并发提交，最后一次性批量回写取现状态和用户余额
+
+交易签名后、发送前先把签名写入取现记录：发送失败或确认超时的交易可能已经上链，
+这些记录保持processing，由 reconcile_unconfirmed 按签名重新查询链上状态后结算或退回，
+不会因为发送异常直接退款而重复打款。
+"""
+
+import logging
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func
+
+from app.extensions import db
+from app.models.commission_config import CommissionConfig, UserCommissionBalance
+from app.models.commission_withdrawal import CommissionWithdrawal
+
+logger = logging.getLogger(__name__)
+
+# 提交后ORM对象会过期，后续处理只使用这些纯值，避免逐条刷新
+_WithdrawalRef = namedtuple('_WithdrawalRef', ['id', 'user_address', 'amount'])
+
+
+class _Payout:
+    """发往同一目标地址的合并转账"""
+
+    __slots__ = ('to_address', 'withdrawals', 'amount', 'fee', 'needs_ata', 'signature', 'slot', 'error')
+
+    def __init__(self, to_address: str):
+        self.to_address = to_address
+        self.withdrawals: List[_WithdrawalRef] = []
+        self.amount = Decimal('0')   # 实际转出金额（已扣除手续费）
+        self.fee = Decimal('0')
+        self.needs_ata = False
+        self.signature: Optional[str] = None
+        self.slot: Optional[int] = None
+        self.error: Optional[str] = None
+
+
+class WithdrawalBatchProcessor:
+    """批量取现处理器"""
+
+    PACKET_DATA_SIZE = 1232      # Solana单笔交易序列化后的最大字节数
+    MAX_ACCOUNT_KEYS = 64        # 单笔交易最多锁定的账户数
+    MAX_WORKERS = 4              # 并发提交的交易数
+    CONFIRM_TIMEOUT = 60         # 等待确认的最长秒数
+    CONFIRM_POLL_INTERVAL = 2
+    # 区块哈希约150个slot（1~2分钟）后过期，超过该时间仍查不到的签名不可能再上链
+    SIGNATURE_EXPIRY = 15 * 60
+    USDC_DECIMALS = 6
+
+    def __init__(self, connection=None, payer_keypair=None, max_workers: int = None):
+        self._connection = connection
+        self._payer = payer_keypair
+        self.max_workers = max_workers or self.MAX_WORKERS
+
+    # ------------------------------------------------------------------
+    # 入口
+    # ------------------------------------------------------------------
+
+    def process_ready(self, limit: int = 500) -> Dict:
+        """
+        处理所有到期的取现申请
+
+        Returns:
+            Dict: 与 AutoCommissionService.process_pending_withdrawals 相同结构的处理结果
+        """
+        # 先处理之前确认超时的交易
+        reconciled = self.reconcile_unconfirmed()
+
+        payer = self._get_payer()
+        if payer is None:
+            # 没有平台私钥时不锁定任何申请，保持pending等待下一轮
+            return {
+                'processed_count': 0,
+                'failed_count': 0,
+                'total_amount': 0.0,
+                'results': [],
+                'reconciled': reconciled,
+                'error': '无法获取平台私钥'
+            }
+
+        payouts, failed = self._lock_and_validate(limit)
+        if not payouts:
+            return dict(self._summarize([], failed), reconciled=reconciled)
+
+        try:
+            self._resolve_token_accounts(payouts)
+            batches = self._pack(payouts, payer)
+            self._submit(batches, payer)
+        except Exception as e:
+            logger.error(f"批量取现提交失败: {str(e)}", exc_info=True)
+            for payout in payouts:
+                if payout.error is not None or payout.slot is not None:
+                    continue
+                # 已签名的交易可能已经发出，不能退款，留给 reconcile_unconfirmed 核对
+                payout.error = 'UNCONFIRMED' if payout.signature else f"提交异常: {str(e)}"
+
+        self._reconcile(payouts)
+        return dict(self._summarize(payouts, failed), reconciled=reconciled)
+
+    # ------------------------------------------------------------------
+    # 锁定与校验
+    # ------------------------------------------------------------------
+
+    def _lock_and_validate(self, limit: int):
+        """
+        锁定到期申请及其用户余额，校验后批量标记为processing并冻结余额
+        """
+        now = datetime.utcnow()
+        withdrawals = CommissionWithdrawal.query.filter(
+            CommissionWithdrawal.status == 'pending',
+            CommissionWithdrawal.process_at <= now
+        ).order_by(
+            CommissionWithdrawal.process_at
+        ).with_for_update(skip_locked=True).limit(limit).all()
+
+        if not withdrawals:
+            db.session.rollback()
+            return [], []
+
+        # 锁定涉及的余额行（按地址排序加锁，避免与其他更新余额的事务死锁），
+        # 校验期间余额不会被并发修改
+        users = sorted({w.user_address for w in withdrawals})
+        balances = {
+            balance.user_address: balance
+            for balance in UserCommissionBalance.query.filter(
+                UserCommissionBalance.user_address.in_(users)
+            ).order_by(UserCommissionBalance.user_address).with_for_update().all()
+        }
+        rows = [(withdrawal, balances.get(withdrawal.user_address)) for withdrawal in withdrawals]
+
+        fee_rate = Decimal(str(CommissionConfig.get_config('withdraw_fee_rate', 0.0) or 0))
+        remaining: Dict[str, Decimal] = {}
+        payouts: Dict[str, _Payout] = OrderedDict()
+        failed: List[_WithdrawalRef] = []
+        freeze: Dict[str, Decimal] = defaultdict(Decimal)
+
+        for withdrawal, balance in rows:
+            user = withdrawal.user_address
+            if user not in remaining:
+                remaining[user] = Decimal(str(balance.available_balance or 0)) if balance else Decimal('0')
+
+            amount = Decimal(str(withdrawal.amount))
+            ref = _WithdrawalRef(withdrawal.id, user, amount)
+            if remaining[user] < amount:
+                failed.append(ref)
+                continue
+
+            remaining[user] -= amount
+            freeze[user] += amount
+
+            fee = (amount * fee_rate).quantize(Decimal('0.000001'), rounding=ROUND_DOWN)
+            payout = payouts.get(withdrawal.to_address)
+            if payout is None:
+                payout = payouts[withdrawal.to_address] = _Payout(withdrawal.to_address)
+            payout.withdrawals.append(ref)
+            payout.amount += amount - fee
+            payout.fee += fee
+
+        if failed:
+            db.session.execute(
+                CommissionWithdrawal.__table__.update().where(
+                    CommissionWithdrawal.id.in_([w.id for w in failed])
+                ).values(status='failed', failure_reason='余额不足', processed_at=now, updated_at=now)
+            )
+
+        if payouts:
+            db.session.execute(
+                CommissionWithdrawal.__table__.update().where(
+                    CommissionWithdrawal.id.in_([w.id for p in payouts.values() for w in p.withdrawals])
+                ).values(status='processing', updated_at=now)
+            )
+            self._apply_balance_deltas(freeze, available=-1, frozen=1)
+
+        db.session.commit()
+        return list(payouts.values()), failed
+
+    @staticmethod
+    def _apply_balance_deltas(deltas: Dict[str, Decimal], available: int = 0, frozen: int = 0, withdrawn: int = 0):
+        """按用户批量调整余额（单条executemany）"""
+        if not deltas:
+            return
+
+        table = UserCommissionBalance.__table__
+        stmt = table.update().where(
+            table.c.user_address == bindparam('b_user')
+        ).values(
+            available_balance=func.coalesce(table.c.available_balance, 0) + bindparam('b_available'),
+            frozen_amount=func.coalesce(table.c.frozen_amount, 0) + bindparam('b_frozen'),
+            withdrawn_amount=func.coalesce(table.c.withdrawn_amount, 0) + bindparam('b_withdrawn'),
+            last_updated=datetime.utcnow()
+        )
+        db.session.connection().execute(stmt, [
+            {
+                'b_user': user,
+                'b_available': amount * available,
+                'b_frozen': amount * frozen,
+                'b_withdrawn': amount * withdrawn
+            }
+            for user, amount in deltas.items()
+        ])
+
+    # ------------------------------------------------------------------
+    # 链上打包与提交
+    # ------------------------------------------------------------------
+
+    def _get_connection(self):
+        if self._connection is None:
+            from app.blockchain import solana_service
+            if solana_service.solana_connection is None:
+                solana_service.initialize_solana_connection()
+            self._connection = solana_service.solana_connection
+        return self._connection
+
+    def _get_payer(self):
+        if self._payer is None:
+            from app.services.spl_token_service import SplTokenService
+            self._payer = SplTokenService._get_platform_keypair()
+        return self._payer
+
+    @staticmethod
+    def _usdc_mint():
+        from solders.pubkey import Pubkey
+        from app.utils.config_manager import ConfigManager
+        return Pubkey.from_string(ConfigManager.get_usdc_mint())
+
+    def _resolve_token_accounts(self, payouts: List[_Payout]):
+        """批量检查接收方USDC关联账户是否存在"""
+        from solders.pubkey import Pubkey
+        from spl.token.instructions import get_associated_token_address
+
+        mint = self._usdc_mint()
+        valid = []
+        atas = []
+        for payout in payouts:
+            try:
+                atas.append(get_associated_token_address(Pubkey.from_string(payout.to_address), mint))
+                valid.append(payout)
+            except ValueError:
+                payout.error = '无效的收款地址'
+
+        accounts = self._get_connection().get_multiple_accounts(atas)
+        for payout, account in zip(valid, accounts):
+            payout.needs_ata = account is None
+
+    def _build_transaction(self, payouts: List[_Payout], payer, blockhash):
+        from solders.message import Message
+        from solders.pubkey import Pubkey
+        from solders.transaction import Transaction
+        from spl.token.constants import TOKEN_PROGRAM_ID
+        from spl.token.instructions import (
+            create_associated_token_account, get_associated_token_address,
+            transfer_checked, TransferCheckedParams
+        )
+
+        mint = self._usdc_mint()
+        source = get_associated_token_address(payer.pubkey(), mint)
+        scale = Decimal(10) ** self.USDC_DECIMALS
+
+        instructions = []
+        for payout in payouts:
+            owner = Pubkey.from_string(payout.to_address)
+            if payout.needs_ata:
+                instructions.append(create_associated_token_account(
+                    payer=payer.pubkey(), owner=owner, mint=mint
+                ))
+            instructions.append(transfer_checked(TransferCheckedParams(
+                program_id=TOKEN_PROGRAM_ID,
+                source=source,
+                mint=mint,
+                dest=get_associated_token_address(owner, mint),
+                owner=payer.pubkey(),
+                amount=int((payout.amount * scale).to_integral_value(rounding=ROUND_DOWN)),
+                decimals=self.USDC_DECIMALS
+            )))
+
+        message = Message.new_with_blockhash(instructions, payer.pubkey(), blockhash)
+        return Transaction.new_unsigned(message)
+
+    def _fits(self, transaction) -> bool:
+        return (len(bytes(transaction)) <= self.PACKET_DATA_SIZE
+                and len(transaction.message.account_keys) <= self.MAX_ACCOUNT_KEYS)
+
+    def _pack(self, payouts: List[_Payout], payer) -> List[List[_Payout]]:
+        """
+        按交易大小和账户数上限贪心打包，返回每笔交易包含的转账分组
+        """
+        from solders.hash import Hash
+
+        # 打包只关心大小，使用占位区块哈希
+        placeholder = Hash.default()
+        batches: List[List[_Payout]] = []
+        current: List[_Payout] = []
+
+        for payout in payouts:
+            if payout.error:
+                continue
+            candidate = current + [payout]
+            if self._fits(self._build_transaction(candidate, payer, placeholder)):
+                current = candidate
+                continue
+
+            if current:
+                batches.append(current)
+            current = [payout]
+            if not self._fits(self._build_transaction(current, payer, placeholder)):
+                payout.error = '单笔转账超出交易大小限制'
+                current = []
+
+        if current:
+            batches.append(current)
+
+        logger.info(f"批量取现打包完成: {len(payouts)} 个收款地址，{len(batches)} 笔交易")
+        return batches
+
+    def _submit(self, batches: List[List[_Payout]], payer):
+        """签名并记录签名后有限并发发送交易，再批量轮询确认状态"""
+        from solders.hash import Hash
+
+        if not batches:
+            return
+
+        connection = self._get_connection()
+        response = connection.get_latest_blockhash()
+        blockhash = Hash.from_string(response['result']['value']['blockhash'])
+
+        signed = []
+        for batch in batches:
+            transaction = self._build_transaction(batch, payer, blockhash)
+            transaction.sign([payer], blockhash)
+            signed.append((str(transaction.signatures[0]), batch, bytes(transaction)))
+
+        # 发送前落库签名：进程在发送后崩溃时也能按签名核对
+        self._record_signatures([(signature, batch) for signature, batch, _ in signed])
+
+        def send(raw):
+            return connection.send_raw_transaction(raw)
+
+        sent: Dict[str, List[_Payout]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(signature, batch, executor.submit(send, raw)) for signature, batch, raw in signed]
+            for signature, batch, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    # 发送报错或超时不代表交易没有上链，按签名查询状态，查不到则保持未确认
+                    logger.warning(f"取现交易 {signature} 发送异常，按签名核对状态: {str(e)}")
+                sent[signature] = batch
+
+        self._await_confirmations(sent)
+
+    def _record_signatures(self, signed: List):
+        """把交易签名和每笔申请的手续费写入取现记录"""
+        now = datetime.utcnow()
+        rows = []
+        for signature, batch in signed:
+            for payout in batch:
+                payout.signature = signature
+                for withdrawal in payout.withdrawals:
+                    fee = self._withdrawal_fee(payout, withdrawal.amount)
+                    rows.append({
+                        'id': withdrawal.id,
+                        'tx_hash': signature,
+                        'actual_amount': withdrawal.amount - fee,
+                        'gas_fee': fee,
+                        'updated_at': now
+                    })
+        try:
+            db.session.bulk_update_mappings(CommissionWithdrawal, rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for _, batch in signed:
+                for payout in batch:
+                    payout.signature = None
+            raise
+
+    @staticmethod
+    def _withdrawal_fee(payout: _Payout, amount: Decimal) -> Decimal:
+        """按金额比例分摊合并转账的手续费"""
+        return payout.fee * amount / (payout.amount + payout.fee) if payout.fee else Decimal('0')
+
+    def _await_confirmations(self, sent: Dict[str, List[_Payout]]):
+        connection = self._get_connection()
+        pending = list(sent.keys())
+        deadline = time.time() + self.CONFIRM_TIMEOUT
+
+        while pending and time.time() < deadline:
+            time.sleep(self.CONFIRM_POLL_INTERVAL)
+            still_pending = []
+            for start in range(0, len(pending), 256):
+                chunk = pending[start:start + 256]
+                try:
+                    statuses = connection.get_signature_statuses(chunk)
+                except Exception as e:
+                    logger.warning(f"查询取现交易状态失败: {str(e)}")
+                    still_pending.extend(chunk)
+                    continue
+
+                for signature, status in zip(chunk, statuses):
+                    if status and status.get('err'):
+                        for payout in sent[signature]:
+                            payout.error = f"区块链转账失败: {status['err']}"
+                    elif status and status.get('confirmationStatus') in ('confirmed', 'finalized'):
+                        for payout in sent[signature]:
+                            payout.slot = status.get('slot')
+                    else:
+                        still_pending.append(signature)
+            pending = still_pending
+
+        for signature in pending:
+            # 超时未确认的交易无法判断是否上链，保留processing状态等待人工核对
+            for payout in sent[signature]:
+                payout.error = 'UNCONFIRMED'
+
+    # ------------------------------------------------------------------
+    # 状态回写
+    # ------------------------------------------------------------------
+
+    def _reconcile(self, payouts: List[_Payout]):
+        """一次性批量回写取现状态与余额"""
+        now = datetime.utcnow()
+        completed_rows = []
+        failed_rows = []
+        settle: Dict[str, Decimal] = defaultdict(Decimal)
+        refund: Dict[str, Decimal] = defaultdict(Decimal)
+
+        for payout in payouts:
+            if payout.error == 'UNCONFIRMED':
+                logger.warning(f"取现交易 {payout.signature} 确认超时，保持processing状态")
+                continue
+
+            for withdrawal in payout.withdrawals:
+                amount = withdrawal.amount
+                if payout.error is None and payout.signature:
+                    fee = self._withdrawal_fee(payout, amount)
+                    completed_rows.append({
+                        'id': withdrawal.id,
+                        'status': 'completed',
+                        'tx_hash': payout.signature,
+                        'actual_amount': amount - fee,
+                        'gas_fee': fee,
+                        'processed_at': now,
+                        'updated_at': now
+                    })
+                    settle[withdrawal.user_address] += amount
+                else:
+                    failed_rows.append({
+                        'id': withdrawal.id,
+                        'status': 'failed',
+                        'failure_reason': payout.error or '区块链转账失败',
+                        'processed_at': now,
+                        'updated_at': now
+                    })
+                    refund[withdrawal.user_address] += amount
+
+        try:
+            if completed_rows:
+                db.session.bulk_update_mappings(CommissionWithdrawal, completed_rows)
+            if failed_rows:
+                db.session.bulk_update_mappings(CommissionWithdrawal, failed_rows)
+            self._apply_balance_deltas(settle, frozen=-1, withdrawn=1)
+            self._apply_balance_deltas(refund, available=1, frozen=-1)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"批量回写取现状态失败: {str(e)}", exc_info=True)
+            raise
+
+        # 收款地址的USDC余额已变化，失效其代币账户缓存
+        from app.services.token_account_cache import invalidate_wallet
+        for payout in payouts:
+            if payout.error is None and payout.signature:
+                invalidate_wallet(payout.to_address, slot=payout.slot)
+
+    def reconcile_unconfirmed(self, limit: int = 500) -> Dict:
+        """
+        核对已签名但未确认的取现（发送异常、确认超时或进程中断）
+
+        按签名查询链上状态：已确认的结算，链上失败的退回余额；
+        仍查不到的签名在区块哈希过期（SIGNATURE_EXPIRY）后才视为未上链并退回，之前保持processing。
+
+        Returns:
+            Dict: {'completed': 数量, 'failed': 数量, 'pending': 数量}
+        """
+        result = {'completed': 0, 'failed': 0, 'pending': 0}
+        now = datetime.utcnow()
+        # 留出本轮发送和确认的时间，避免与正在等待确认的处理重叠
+        settled_before = now - timedelta(seconds=self.CONFIRM_TIMEOUT * 2)
+        withdrawals = CommissionWithdrawal.query.filter(
+            CommissionWithdrawal.status == 'processing',
+            CommissionWithdrawal.tx_hash.isnot(None),
+            CommissionWithdrawal.updated_at <= settled_before
+        ).order_by(CommissionWithdrawal.id).with_for_update(skip_locked=True).limit(limit).all()
+
+        if not withdrawals:
+            db.session.rollback()
+            return result
+
+        by_signature: Dict[str, List[CommissionWithdrawal]] = defaultdict(list)
+        for withdrawal in withdrawals:
+            by_signature[withdrawal.tx_hash].append(withdrawal)
+
+        statuses = {}
+        signatures = list(by_signature.keys())
+        try:
+            connection = self._get_connection()
+            for start in range(0, len(signatures), 256):
+                chunk = signatures[start:start + 256]
+                for signature, status in zip(chunk, connection.get_signature_statuses(
+                        chunk, search_transaction_history=True)):
+                    statuses[signature] = status
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"核对未确认取现交易失败: {str(e)}")
+            return result
+
+        completed_rows = []
+        failed_rows = []
+        settle: Dict[str, Decimal] = defaultdict(Decimal)
+        refund: Dict[str, Decimal] = defaultdict(Decimal)
+        paid_addresses = set()
+
+        for signature, group in by_signature.items():
+            status = statuses.get(signature)
+            if status and status.get('err'):
+                reason = f"区块链转账失败: {status['err']}"
+            elif status and status.get('confirmationStatus') in ('confirmed', 'finalized'):
+                reason = None
+            elif all(w.updated_at <= now - timedelta(seconds=self.SIGNATURE_EXPIRY) for w in group):
+                reason = '交易未上链（区块哈希已过期）'
+            else:
+                result['pending'] += len(group)
+                continue
+
+            for withdrawal in group:
+                amount = Decimal(str(withdrawal.amount))
+                if reason is None:
+                    completed_rows.append({
+                        'id': withdrawal.id, 'status': 'completed', 'processed_at': now, 'updated_at': now
+                    })
+                    settle[withdrawal.user_address] += amount
+                    paid_addresses.add((withdrawal.to_address, status.get('slot')))
+                else:
+                    failed_rows.append({
+                        'id': withdrawal.id, 'status': 'failed', 'failure_reason': reason,
+                        'processed_at': now, 'updated_at': now
+                    })
+                    refund[withdrawal.user_address] += amount
+
+        try:
+            if completed_rows:
+                db.session.bulk_update_mappings(CommissionWithdrawal, completed_rows)
+            if failed_rows:
+                db.session.bulk_update_mappings(CommissionWithdrawal, failed_rows)
+            self._apply_balance_deltas(settle, frozen=-1, withdrawn=1)
+            self._apply_balance_deltas(refund, available=1, frozen=-1)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"回写未确认取现状态失败: {str(e)}", exc_info=True)
+            return result
+
+        from app.services.token_account_cache import invalidate_wallet
+        for to_address, slot in paid_addresses:
+            invalidate_wallet(to_address, slot=slot)
+
+        result['completed'] = len(completed_rows)
+        result['failed'] = len(failed_rows)
+        if completed_rows or failed_rows:
+            logger.info(f"核对未确认取现: 完成 {result['completed']} 笔，失败 {result['failed']} 笔，"
+                        f"仍待确认 {result['pending']} 笔")
+        return result
+
+    @staticmethod
+    def _summarize(payouts: List[_Payout], failed: List[_WithdrawalRef]) -> Dict:
+        processed_count = 0
+        failed_count = len(failed)
+        total_amount = 0.0
+        results = [
+            {
+                'withdrawal_id': w.id,
+                'user_address': w.user_address,
+                'amount': float(w.amount),
+                'status': 'failed'
+            }
+            for w in failed
+        ]
+
+        for payout in payouts:
+            if payout.error == 'UNCONFIRMED':
+                status = 'processing'
+            elif payout.error is None and payout.signature:
+                status = 'success'
+            else:
+                status = 'failed'
+
+            for withdrawal in payout.withdrawals:
+                if status == 'success':
+                    processed_count += 1
+                    total_amount += float(withdrawal.amount)
+                elif status == 'failed':
+                    failed_count += 1
+                results.append({
+                    'withdrawal_id': withdrawal.id,
+                    'user_address': withdrawal.user_address,
+                    'amount': float(withdrawal.amount),
+                    'status': status,
+                    'tx_hash': payout.signature
+                })
+
+        logger.info(f"批量取现处理完成: 成功 {processed_count} 笔，失败 {failed_count} 笔，总金额 {total_amount}")
+
+        return {
+            'processed_count': processed_count,
+            'failed_count': failed_count,
+            'total_amount': total_amount,
+            'transaction_count': len({p.signature for p in payouts if p.signature}),
+            'results': results
+        }
@@ -9,7 +9,7 @@
 import logging
 import time
 import traceback
-from datetime import datetime
+from datetime import datetime, timedelta
 import threading
 from threading import Thread
 from queue import Queue
@@ -249,6 +249,26 @@ def monitor_creation_payment(asset_id, tx_hash, max_retries=30, retry_interval=1
                 # logger.info(f"使用RPC地址: {rpc_url}")
                 logger.debug(f"AssetID={asset_id}: 使用RPC地址: {rpc_url} 监控 {tx_hash}")
                 
+                # 优先通过websocket订阅等待确认推送；事件流不可用或超时时回退到轮询
+                from app.services.chain_event_stream import wait_for_signature
+                wait_started = time.monotonic()
+                pushed_status = wait_for_signature(tx_hash, timeout=max_retries * retry_interval)
+                if pushed_status is None:
+                    # 轮询只用剩余的时间预算；等满整个预算时仍补一次查询，防止推送丢失
+                    waited = time.monotonic() - wait_started
+                    retry_count = min(int(waited // retry_interval), max_retries - 1)
+                    if retry_count:
+                        logger.info(f"AssetID={asset_id}: 等待推送 {waited:.0f} 秒未得到结果，轮询剩余 {max_retries - retry_count} 次")
+                else:
+                    if pushed_status.get('err') is None:
+                        confirmed = True
+                        logger.info(f"资产创建支付已确认(推送): AssetID={asset_id}, TxHash={tx_hash}")
+                    else:
+                        transaction_error = pushed_status.get('err')
+                        logger.warning(f"资产创建支付交易失败(推送): AssetID={asset_id}, TxHash={tx_hash}, Error: {transaction_error}")
+                    # 已得到结果，跳过轮询
+                    retry_count = max_retries
+                
                 while retry_count < max_retries:
                     try:
                         # 构造 RPC 请求
@@ -436,12 +456,12 @@ def monitor_creation_payment(asset_id, tx_hash, max_retries=30, retry_interval=1
                         # 添加定时重试逻辑
                         if retry_count >= max_retries:
                             logger.info(f"AssetID={asset_id}: 达到最大重试次数 ({max_retries}) for Tx {tx_hash}，安排30分钟后再次尝试监控。")
-                            # 30分钟后再次尝试
+                            # 30分钟后再次尝试（届时本次监控已结束并释放租约）
                             def delayed_retry_func(): # 确保函数名唯一或使用lambda
                                 logger.info(f"AssetID={asset_id}: 执行延时重试任务 for Tx {tx_hash}")
                                 monitor_creation_payment_task.delay(asset_id, tx_hash)
                             
-                            retry_thread = Thread(target=delayed_retry_func)
+                            retry_thread = threading.Timer(1800, delayed_retry_func)
                             retry_thread.daemon = True
                             retry_thread.start()
 
@@ -475,25 +495,120 @@ def monitor_creation_payment(asset_id, tx_hash, max_retries=30, retry_interval=1
             finally:
                 logger.info(f"完成监控创建支付: AssetID={asset_id}, TxHash={tx_hash}")
 
+# 每轮各阶段处理的资产数量上限
+PAYMENT_SWEEP_LIMIT = 20
+DEPLOY_SWEEP_LIMIT = 10
+RETRY_SWEEP_LIMIT = 5
+
+# 部署标记超时、失败后重试的等待时间（秒）
+DEPLOYMENT_TIMEOUT_SECONDS = 7200
+FAILED_RETRY_DELAY_SECONDS = 1800
+
+# 最近一次扫描看到的队列深度，写入共享缓存供任意进程查询
+PIPELINE_DEPTHS_CACHE_KEY = 'scheduler:asset_pipeline_depths'
+
+
+def _payment_processing_filter():
+    """PAYMENT_PROCESSING 待确认资产（与 ix_assets_payment_processing 部分索引对应）"""
+    return (
+        Asset.status == AssetStatus.PAYMENT_PROCESSING.value,
+        Asset.deleted_at.is_(None),
+        Asset.payment_tx_hash != None,
+        Asset.payment_confirmed != True,
+    )
+
+
+def _awaiting_deployment_filter():
+    """已支付确认但未上链的资产（与 ix_assets_awaiting_deployment 部分索引对应）"""
+    return (
+        Asset.status == AssetStatus.CONFIRMED.value,
+        Asset.deleted_at.is_(None),
+        Asset.payment_confirmed == True,
+        Asset.token_address == None,
+        Asset.deployment_in_progress != True,
+    )
+
+
+def _retryable_failed_filter(now):
+    """部署失败且已超过重试等待时间的资产（与 ix_assets_deployment_failed 部分索引对应）"""
+    return (
+        Asset.status == AssetStatus.DEPLOYMENT_FAILED.value,
+        Asset.deleted_at.is_(None),
+        Asset.payment_confirmed == True,
+        Asset.token_address == None,
+        Asset.deployment_in_progress != True,
+        Asset.updated_at <= now - timedelta(seconds=FAILED_RETRY_DELAY_SECONDS),
+    )
+
+
+def _stale_deployment_filter(now):
+    """部署标记已超时的资产（与 ix_assets_deployment_in_progress 部分索引对应）"""
+    return (
+        Asset.deployment_in_progress == True,
+        Asset.deployment_started_at != None,
+        Asset.deployment_started_at < now - timedelta(seconds=DEPLOYMENT_TIMEOUT_SECONDS),
+    )
+
+
+def get_asset_pipeline_depths(now=None):
+    """一次往返统计上链流水线各阶段的待处理数量
+
+    Returns:
+        dict: {payment_processing, awaiting_deployment, deployment_failed_retryable, deployment_stale}
+    """
+    from sqlalchemy import func
+    
+    now = now or datetime.utcnow()
+    
+    def _count(criteria):
+        return db.session.query(func.count(Asset.id)).filter(*criteria).scalar_subquery()
+    
+    row = db.session.query(
+        _count(_payment_processing_filter()),
+        _count(_awaiting_deployment_filter()),
+        _count(_retryable_failed_filter(now)),
+        _count(_stale_deployment_filter(now))
+    ).one()
+    
+    return {
+        'payment_processing': int(row[0] or 0),
+        'awaiting_deployment': int(row[1] or 0),
+        'deployment_failed_retryable': int(row[2] or 0),
+        'deployment_stale': int(row[3] or 0)
+    }
+
+
 def auto_monitor_pending_payments():
-    """自动监控待处理的支付交易 和 资产上链"""
+    """自动监控待处理的支付交易 和 资产上链
+    
+    Returns:
+        dict: 本轮开始时各阶段的待处理数量，供自适应调度调整执行间隔；执行失败时返回None
+    """
     try:
         logger.info("开始执行周期性任务：自动监控待处理支付及资产上链...")
         
         flask_app = get_flask_app()
         if not flask_app:
             logger.error("无法获取应用上下文，取消自动监控")
-            return
+            return None
         
         with flask_app.app_context():
             try:
+                current_time = datetime.utcnow()
+                
+                # 先统计各阶段积压，空闲时只需这一次查询
+                depths = get_asset_pipeline_depths(current_time)
+                _publish_pipeline_depths(depths)
+                if not any(depths.values()):
+                    logger.debug("上链流水线没有待处理的资产")
+                    return depths
+                
                 # 0. 查找PAYMENT_PROCESSING状态的资产，触发支付确认监控（排除已删除的资产）
-                payment_processing_assets = Asset.query.filter(
-                    Asset.status == AssetStatus.PAYMENT_PROCESSING.value,
-                    Asset.payment_tx_hash != None,
-                    Asset.payment_confirmed != True,
-                    Asset.deleted_at.is_(None)  # 排除已删除的资产
-                ).limit(20).all()
+                payment_processing_assets = []
+                if depths['payment_processing']:
+                    payment_processing_assets = Asset.query.filter(
+                        *_payment_processing_filter()
+                    ).order_by(Asset.id).limit(PAYMENT_SWEEP_LIMIT).all()
                 
                 if payment_processing_assets:
                     logger.info(f"找到 {len(payment_processing_assets)} 个支付处理中的资产，开始监控支付确认...")
@@ -501,7 +616,7 @@ def auto_monitor_pending_payments():
                     for asset in payment_processing_assets:
                         try:
                             logger.info(f"触发资产 {asset.id} 的支付确认监控 (TxHash: {asset.payment_tx_hash})")
-                            # 触发支付确认监控任务
+                            # 触发支付确认监控任务（已有监控在排队或执行时自动跳过）
                             monitor_creation_payment_task.delay(asset.id, asset.payment_tx_hash)
                         except Exception as e:
                             logger.error(f"触发资产 {asset.id} 支付确认监控失败: {str(e)}")
@@ -509,13 +624,11 @@ def auto_monitor_pending_payments():
                     logger.debug("没有找到支付处理中的资产。")
                 
                 # 1. 查找已支付确认但未上链的资产（排除已删除的资产）
-                confirmed_assets = Asset.query.filter(
-                    Asset.payment_confirmed == True,
-                    Asset.token_address == None,
-                    Asset.deployment_in_progress != True,
-                    Asset.status == AssetStatus.CONFIRMED.value,
-                    Asset.deleted_at.is_(None)  # 排除已删除的资产
-                ).limit(10).all()
+                confirmed_assets = []
+                if depths['awaiting_deployment']:
+                    confirmed_assets = Asset.query.filter(
+                        *_awaiting_deployment_filter()
+                    ).order_by(Asset.id).limit(DEPLOY_SWEEP_LIMIT).all()
                 
                 if confirmed_assets:
                     logger.info(f"找到 {len(confirmed_assets)} 个已支付确认但待上链的资产，开始处理...")
@@ -578,44 +691,30 @@ def auto_monitor_pending_payments():
                 else:
                     logger.debug("没有找到已支付确认但待上链的资产。")
                 
-                # 2. 清理超时的部署标记（超过2小时的）
-                timeout_assets = Asset.query.filter(
-                    Asset.deployment_in_progress == True,
-                    Asset.deployment_started_at != None
-                ).all()
-                
-                current_time = datetime.utcnow()
-                for asset in timeout_assets:
-                    time_diff = (current_time - asset.deployment_started_at).total_seconds()
-                    if time_diff > 7200:  # 2小时超时
+                # 2. 清理超时的部署标记（超过2小时的），只查询已超时的记录
+                if depths['deployment_stale']:
+                    timeout_assets = Asset.query.filter(*_stale_deployment_filter(current_time)).all()
+                    for asset in timeout_assets:
+                        time_diff = (current_time - asset.deployment_started_at).total_seconds()
                         logger.warning(f"清理超时的部署标记: AssetID={asset.id}, 开始时间: {asset.deployment_started_at}, 超时: {time_diff}秒")
                         asset.deployment_in_progress = False
                         asset.error_message = f"部署超时（{time_diff}秒），已清理标记"
-                        db.session.commit()
-                
-                # 3. 检查部署失败的资产，如果失败时间超过30分钟，尝试重新部署（排除已删除的资产）
-                failed_assets = Asset.query.filter(
-                    Asset.status == AssetStatus.DEPLOYMENT_FAILED.value,
-                    Asset.payment_confirmed == True,
-                    Asset.token_address == None,
-                    Asset.deployment_in_progress != True,
-                    Asset.deleted_at.is_(None)  # 排除已删除的资产
-                ).limit(5).all()  # 限制重试数量
+                    db.session.commit()
                 
-                for asset in failed_assets:
-                    # 检查失败时间（如果有记录的话）
-                    should_retry = True
-                    if hasattr(asset, 'updated_at') and asset.updated_at:
-                        time_since_failure = (current_time - asset.updated_at).total_seconds()
-                        if time_since_failure < 1800:  # 30分钟内不重试
-                            should_retry = False
+                # 3. 部署失败超过30分钟的资产，重置为CONFIRMED重新部署（排除已删除的资产）
+                if depths['deployment_failed_retryable']:
+                    failed_assets = Asset.query.filter(
+                        *_retryable_failed_filter(current_time)
+                    ).order_by(Asset.updated_at).limit(RETRY_SWEEP_LIMIT).all()  # 限制重试数量
                     
-                    if should_retry:
+                    for asset in failed_assets:
                         logger.info(f"尝试重新部署失败的资产: AssetID={asset.id}")
                         # 重置状态为CONFIRMED，让正常流程处理
                         asset.status = AssetStatus.CONFIRMED.value
                         asset.error_message = None
-                        db.session.commit()
+                    db.session.commit()
+                
+                return depths
                     
             except Exception as e:
                 logger.error(f"周期性任务执行内部失败: {str(e)}")
@@ -623,6 +722,96 @@ def auto_monitor_pending_payments():
     except Exception as e:
         logger.error(f"周期性任务执行最外层失败: {str(e)}")
         logger.error(traceback.format_exc())
+    return None
+
+
+def _publish_pipeline_depths(depths):
+    """记录队列深度：写入共享缓存，超过阈值时输出告警日志"""
+    try:
+        from app.services.cache_service import get_cache
+        get_cache().set(PIPELINE_DEPTHS_CACHE_KEY, {
+            'depths': depths,
+            'updated_at': datetime.utcnow().isoformat()
+        }, timeout=24 * 3600)
+    except Exception as e:
+        logger.debug(f"写入上链流水线队列深度失败: {str(e)}")
+    
+    if any(depths.values()):
+        logger.info(f"上链流水线队列深度: {depths}")
+
+
+def sync_token_holder_index():
+    """同步链上代币持有人索引
+
+    Returns:
+        dict: 剩余未处理的交易签名数，供自适应调度调整执行间隔；执行失败时返回None
+    """
+    flask_app = get_flask_app()
+    if not flask_app:
+        logger.error("无法获取应用上下文，取消持有人索引同步")
+        return None
+    
+    with flask_app.app_context():
+        try:
+            from app.services.token_holder_indexer import TokenHolderIndexer
+            return TokenHolderIndexer().sync_all()
+        except Exception as e:
+            logger.error(f"同步代币持有人索引失败: {str(e)}", exc_info=True)
+            return None
+
+
+def reconcile_dashboard_counters():
+    """用全量聚合校正仪表板计数器（修正原生SQL等绕过ORM的变更造成的偏差）"""
+    flask_app = get_flask_app()
+    if not flask_app:
+        logger.error("无法获取应用上下文，取消仪表板计数器对账")
+        return
+    
+    with flask_app.app_context():
+        try:
+            from app.services.dashboard_stats_service import DashboardStatsService
+            DashboardStatsService.reconcile()
+        except Exception as e:
+            logger.error(f"仪表板计数器对账失败: {str(e)}", exc_info=True)
+
+
+def snapshot_dashboard_stats():
+    """写入前一天的仪表板每日统计，并清理已快照的按日计数器"""
+    flask_app = get_flask_app()
+    if not flask_app:
+        logger.error("无法获取应用上下文，取消仪表板每日快照")
+        return
+    
+    with flask_app.app_context():
+        try:
+            from app.services.dashboard_stats_service import DashboardStatsService
+            yesterday = datetime.utcnow().date() - timedelta(days=1)
+            DashboardStatsService.snapshot(yesterday)
+            removed = DashboardStatsService.prune_daily_counters()
+            db.session.commit()
+            logger.info(f"仪表板每日统计已写入: {yesterday}，清理按日计数器 {removed} 行")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"写入仪表板每日统计失败: {str(e)}", exc_info=True)
+
+
+def rollup_metric_series(lookback_hours=None):
+    """增量汇总趋势指标时间序列
+
+    Args:
+        lookback_hours: 重新计算的小时数，为空时使用默认值
+    """
+    flask_app = get_flask_app()
+    if not flask_app:
+        logger.error("无法获取应用上下文，取消趋势指标汇总")
+        return
+    
+    with flask_app.app_context():
+        try:
+            from app.services.metric_series_service import MetricSeriesService, DEFAULT_LOOKBACK_HOURS
+            MetricSeriesService.rollup(lookback_hours or DEFAULT_LOOKBACK_HOURS)
+        except Exception as e:
+            logger.error(f"汇总趋势指标失败: {str(e)}", exc_info=True)
 
 
 # 创建定期任务
@@ -645,26 +834,93 @@ def start_scheduled_tasks():
     logger.info("启动定时任务...")
     
     try:
-        # 立即执行一次自动监控
-        logger.info("系统启动：立即触发一次周期性任务 (监控支付及上链)...")
-        auto_monitor_pending_payments()
-        
-        # 每5分钟执行一次
+        # 仅主节点进程执行，避免多个worker重复扫描
+        from app.services.scheduler_leader import leader_only
+        from app.services.adaptive_polling import register_adaptive_job
         from app.extensions import scheduler # 确保 scheduler 已初始化
         
+        # 有积压时缩短间隔，空闲时退避到较长间隔
+        monitor_job = register_adaptive_job(
+            scheduler, 'auto_monitor_all_assets',
+            leader_only('auto_monitor_all_assets', auto_monitor_pending_payments)
+        )
+        
         # 确保任务只添加一次
         if not scheduler.get_job('auto_monitor_all_assets'): # 更改任务ID
             scheduler.add_job(
                 id='auto_monitor_all_assets', # 更改任务ID
-                func=auto_monitor_pending_payments,
+                func=monitor_job,
                 trigger='interval',
-                minutes=5, # 5分钟频率是否合适需要评估
+                seconds=monitor_job.current_seconds,
                 replace_existing=True
             )
-            logger.info("周期性任务 (监控支付及上链) 已添加到调度器: 每5分钟执行一次")
+            logger.info("周期性任务 (监控支付及上链) 已添加到调度器: 默认每5分钟执行一次，按积压情况自适应调整")
         else:
             logger.info("周期性任务 (监控支付及上链) 已存在，跳过添加")
         
+        # 链上持有人索引：有新交易积压时缩短间隔
+        holder_index_job = register_adaptive_job(
+            scheduler, 'sync_token_holder_index',
+            leader_only('sync_token_holder_index', sync_token_holder_index),
+            busy_seconds=60, default_seconds=300, idle_seconds=900
+        )
+        if not scheduler.get_job('sync_token_holder_index'):
+            scheduler.add_job(
+                id='sync_token_holder_index',
+                func=holder_index_job,
+                trigger='interval',
+                seconds=holder_index_job.current_seconds,
+                replace_existing=True
+            )
+            logger.info("周期性任务 (链上持有人索引同步) 已添加到调度器")
+        
+        # 仪表板计数器：每小时对账，每天零点后写入前一天的快照
+        if not scheduler.get_job('reconcile_dashboard_counters'):
+            scheduler.add_job(
+                id='reconcile_dashboard_counters',
+                func=leader_only('reconcile_dashboard_counters', reconcile_dashboard_counters),
+                trigger='interval',
+                hours=1,
+                replace_existing=True
+            )
+        if not scheduler.get_job('snapshot_dashboard_stats'):
+            scheduler.add_job(
+                id='snapshot_dashboard_stats',
+                func=leader_only('snapshot_dashboard_stats', snapshot_dashboard_stats),
+                trigger='cron',
+                hour=0,
+                minute=10,
+                timezone='UTC',
+                replace_existing=True
+            )
+            logger.info("周期性任务 (仪表板计数器对账及每日快照) 已添加到调度器")
+        
+        # 趋势指标：每5分钟增量汇总，每天重算最近两天，补上稍后才完成的交易
+        if not scheduler.get_job('rollup_metric_series'):
+            scheduler.add_job(
+                id='rollup_metric_series',
+                func=leader_only('rollup_metric_series', rollup_metric_series),
+                trigger='interval',
+                minutes=5,
+                replace_existing=True
+            )
+        if not scheduler.get_job('repair_metric_series'):
+            scheduler.add_job(
+                id='repair_metric_series',
+                func=leader_only('repair_metric_series', rollup_metric_series),
+                kwargs={'lookback_hours': 48},
+                trigger='cron',
+                hour=0,
+                minute=20,
+                timezone='UTC',
+                replace_existing=True
+            )
+            logger.info("周期性任务 (趋势指标汇总) 已添加到调度器")
+        
+        # 立即执行一次自动监控（执行后按结果调整间隔）
+        logger.info("系统启动：立即触发一次周期性任务 (监控支付及上链)...")
+        monitor_job()
+        
         # 设置全局初始化标志
         scheduler_initialized = True
         logger.info("定时任务模块已启动")
@@ -699,8 +955,82 @@ def run_task(func_name, *args, **kwargs):
         logger.error(f"运行任务 {func_name} 出错: {str(e)}")
         logger.error(traceback.format_exc())
 
+class CreationPaymentMonitorTask(DelayedTask):
+    """资产创建支付监控任务
+
+    同一资产、同一笔支付同时只保留一个排队或执行中的监控：周期扫描每轮都会触发，
+    而单次监控最长会轮询约 max_retries * retry_interval 秒。
+    进程内用集合去重，共享缓存可用时再用 Redis 租约在进程之间去重。
+    """
+
+    LEASE_KEY = 'tasks:creation_payment_monitor:{}:{}'
+    # 租约有效期（秒），覆盖排队等待和一次完整监控；进程异常退出时租约自动过期
+    LEASE_TTL = 900
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__(func, *args, **kwargs)
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+
+    @staticmethod
+    def _redis_client():
+        try:
+            from app.services.cache_service import get_cache
+            return get_cache().redis_client
+        except Exception:
+            return None
+
+    def _acquire(self, asset_id, tx_hash):
+        with self._in_flight_lock:
+            if (asset_id, tx_hash) in self._in_flight:
+                return False
+            self._in_flight.add((asset_id, tx_hash))
+
+        redis_client = self._redis_client()
+        if redis_client is not None:
+            try:
+                if not redis_client.set(self.LEASE_KEY.format(asset_id, tx_hash), '1', nx=True, ex=self.LEASE_TTL):
+                    with self._in_flight_lock:
+                        self._in_flight.discard((asset_id, tx_hash))
+                    return False
+            except Exception as e:
+                # 共享缓存不可用时只做进程内去重
+                logger.debug(f"获取支付监控租约失败: AssetID={asset_id}, {e}")
+        return True
+
+    def _release(self, asset_id, tx_hash):
+        with self._in_flight_lock:
+            self._in_flight.discard((asset_id, tx_hash))
+        redis_client = self._redis_client()
+        if redis_client is not None:
+            try:
+                redis_client.delete(self.LEASE_KEY.format(asset_id, tx_hash))
+            except Exception as e:
+                logger.debug(f"释放支付监控租约失败: AssetID={asset_id}, {e}")
+
+    def _run(self, asset_id, tx_hash, *args, **kwargs):
+        try:
+            return self.func(asset_id, tx_hash, *args, **kwargs)
+        finally:
+            self._release(asset_id, tx_hash)
+
+    def delay(self, asset_id, tx_hash, *args, **kwargs):
+        """排队监控任务；该支付已有排队或执行中的监控时跳过"""
+        if not self._acquire(asset_id, tx_hash):
+            logger.debug(f"资产 {asset_id} 的支付 {tx_hash} 已有监控在排队或执行，跳过")
+            return self
+        try:
+            task_queue.put((self._run, (asset_id, tx_hash) + args, kwargs))
+            _ensure_task_processor_running()
+        except Exception:
+            self._release(asset_id, tx_hash)
+            raise
+        logger.debug(f"任务已添加到队列: func={self.func.__name__}, args={(asset_id, tx_hash) + args}, kwargs={kwargs}")
+        return self
+
+
 # 导出延迟任务对象
-monitor_creation_payment_task = DelayedTask(_original_monitor_creation_payment)
+monitor_creation_payment_task = CreationPaymentMonitorTask(_original_monitor_creation_payment)
 
 # 如果还需要监控购买交易确认，可以添加类似的任务
 # def monitor_purchase_confirmation(trade_id, tx_hash, ...):
@@ -9,6 +9,10 @@ from datetime import datetime
 from flask import current_app
 from app import create_app
 from app.services.auto_commission_service import AutoCommissionService
+from app.services.scheduler_leader import get_leader_elector, leader_only
+
+# 佣金自动化脚本独立参选，与网站进程内的定时任务互不影响
+AUTOMATION_ELECTION = 'commission_automation'
 
 # 配置日志
 logging.basicConfig(
@@ -23,22 +27,30 @@ def run_commission_automation():
     app = create_app()
     
     with app.app_context():
-        try:
-            logger.info("开始运行佣金自动化处理任务")
-            
-            # 运行完整的自动化周期
-            result = AutoCommissionService.run_automation_cycle()
+        # 同时运行多个自动化脚本时，只有当选主节点的进程处理
+        elector = get_leader_elector(AUTOMATION_ELECTION, app=app)
+        elector.start()
+        leader_only('commission_automation', _run_automation_cycle, AUTOMATION_ELECTION)()
+
+
+def _run_automation_cycle():
+    """执行一次佣金自动化周期"""
+    try:
+        logger.info("开始运行佣金自动化处理任务")
+        
+        # 运行完整的自动化周期
+        result = AutoCommissionService.run_automation_cycle()
+        
+        if result.get('success'):
+            logger.info(f"自动化处理成功完成:")
+            logger.info(f"  - 更新佣金: {result['commission_update']['updated_count']} 用户")
+            logger.info(f"  - 处理取现: {result['withdrawal_process']['processed_count']} 笔")
+            logger.info(f"  - 取现金额: ${result['withdrawal_process']['total_amount']}")
+        else:
+            logger.error(f"自动化处理失败: {result.get('error', '未知错误')}")
             
-            if result.get('success'):
-                logger.info(f"自动化处理成功完成:")
-                logger.info(f"  - 更新佣金: {result['commission_update']['updated_count']} 用户")
-                logger.info(f"  - 处理取现: {result['withdrawal_process']['processed_count']} 笔")
-                logger.info(f"  - 取现金额: ${result['withdrawal_process']['total_amount']}")
-            else:
-                logger.error(f"自动化处理失败: {result.get('error', '未知错误')}")
-                
-        except Exception as e:
-            logger.error(f"佣金自动化任务执行异常: {str(e)}", exc_info=True)
+    except Exception as e:
+        logger.error(f"佣金自动化任务执行异常: {str(e)}", exc_info=True)
 
 
 def start_automation_scheduler():
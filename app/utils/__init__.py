@@ -15,7 +15,7 @@ __all__ = [
     'has_permission'
 ]
 
-def save_files(files, asset_type, asset_id, token_symbol=None):
+def save_files(files, asset_type, asset_id, token_symbol=None, max_size=20 * 1024 * 1024):
     """保存上传的文件到本地存储
     
     Args:
@@ -23,6 +23,7 @@ def save_files(files, asset_type, asset_id, token_symbol=None):
         asset_type: 资产类型 (real_estate 或 quasi_real_estate)
         asset_id: 资产ID
         token_symbol: 代币符号 (可选)
+        max_size: 单个文件最大字节数 (默认20MB)
         
     Returns:
         保存的文件 URL 列表
@@ -32,7 +33,7 @@ def save_files(files, asset_type, asset_id, token_symbol=None):
     import shutil
     from werkzeug.utils import secure_filename
     from flask import current_app
-    from .storage import get_storage
+    from .storage import get_storage, write_stream, UploadTooLargeError
     
     # 允许的文件扩展名 - 添加webp格式
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'pdf', 'doc', 'docx', 'txt', 'xls', 'xlsx'}
@@ -127,50 +128,40 @@ def save_files(files, asset_type, asset_id, token_symbol=None):
                 
                 current_app.logger.info(f'处理文件 {i+1}/{len(files)}: {filename}')
                 
-                # 读取文件内容（只读取一次）
-                if retry_count == 0:
-                    file_data = file.read()
-                    if not file_data:
-                        current_app.logger.error(f'文件内容为空: {filename}')
-                        failed_files.append({
-                            'name': file.filename,
-                            'error': '文件内容为空'
-                        })
-                        break
-                    
-                    # 检查文件大小
-                    file_size = len(file_data)
-                    current_app.logger.info(f'文件大小: {file_size} bytes')
-                    
-                    if file_size > 20 * 1024 * 1024:  # 20MB
-                        current_app.logger.error(f'文件大小超过限制: {filename} ({file_size} bytes)')
-                        failed_files.append({
-                            'name': file.filename,
-                            'error': '文件大小超过限制(20MB)'
-                        })
-                        break
-                
                 # 确保目录存在
                 target_dir = os.path.join(current_app.static_folder, 'uploads', os.path.dirname(filename))
                 os.makedirs(target_dir, exist_ok=True)
                 
-                # 上传到本地存储
+                # 上传到本地存储（按块流式写入，不把整个文件读入内存）
                 current_app.logger.info(f'尝试上传文件 (第{retry_count + 1}次): {filename}')
                 
                 # 首先尝试使用storage服务
-                result = storage.upload(file_data, filename)
+                result = storage.upload_stream(file, filename, max_size=max_size)
+                
+                if result and result.get('size') == 0:
+                    current_app.logger.error(f'文件内容为空: {filename}')
+                    storage.delete(filename)
+                    failed_files.append({
+                        'name': file.filename,
+                        'error': '文件内容为空'
+                    })
+                    break
                 
                 if result and result.get('url'):
                     # 存储服务上传成功
                     file_urls.append(result['url'])
-                    current_app.logger.info(f'文件上传成功: {result["url"]}')
+                    current_app.logger.info(f'文件上传成功: {result["url"]} ({result["size"]} bytes)')
                     break
                 else:
                     # 存储服务失败，尝试直接保存到本地文件系统
                     current_app.logger.warning(f'存储服务失败，尝试直接保存到本地')
                     full_path = os.path.join(target_dir, os.path.basename(filename))
-                    with open(full_path, 'wb') as f:
-                        f.write(file_data)
+                    file.seek(0)
+                    _, digest = write_stream(file, full_path, max_size)
+                    from .upload_index import upload_index
+                    from .image_derivatives import image_derivatives
+                    upload_index.add(full_path, digest=digest)
+                    image_derivatives.schedule(full_path)
                     
                     # 构建URL
                     url = f'/static/uploads/{filename}'
@@ -178,6 +169,13 @@ def save_files(files, asset_type, asset_id, token_symbol=None):
                     current_app.logger.info(f'文件保存成功: {url}')
                     break
                     
+            except UploadTooLargeError:
+                current_app.logger.error(f'文件大小超过限制: {file.filename}')
+                failed_files.append({
+                    'name': file.filename,
+                    'error': f'文件大小超过限制({max_size // (1024 * 1024)}MB)'
+                })
+                break
             except Exception as e:
                 last_error = str(e)
                 current_app.logger.error(f'上传失败 (第{retry_count + 1}次): {str(e)}')
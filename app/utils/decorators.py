@@ -196,8 +196,8 @@ def api_admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         # 记录请求头和参数，帮助调试
-        current_app.logger.info(f"API管理员验证 - 请求头: {dict(request.headers)}")
-        current_app.logger.info(f"API管理员验证 - 请求参数: {dict(request.args)}")
+        current_app.logger.debug(f"API管理员验证 - 请求头: {dict(request.headers)}")
+        current_app.logger.debug(f"API管理员验证 - 请求参数: {dict(request.args)}")
         
         # 尝试从多个来源获取钱包地址
         eth_address = request.headers.get('X-Eth-Address') or \
@@ -207,7 +207,7 @@ def api_admin_required(f):
                      session.get('admin_eth_address')
         
         # 记录找到的钱包地址
-        current_app.logger.info(f"API管理员验证 - 找到的钱包地址: {eth_address}")
+        current_app.logger.debug(f"API管理员验证 - 找到的钱包地址: {eth_address}")
                      
         if not eth_address:
             current_app.logger.warning("API管理员验证失败 - 未提供钱包地址")
@@ -220,7 +220,7 @@ def api_admin_required(f):
             
         g.eth_address = eth_address.lower()
         g.admin_info = admin_info
-        current_app.logger.info(f"API管理员验证成功 - 地址: {eth_address}")
+        current_app.logger.debug(f"API管理员验证成功 - 地址: {eth_address}")
         return f(*args, **kwargs)
     return decorated_function
 
@@ -0,0 +1,318 @@
+"""
+上传图片衍生图生成
+
+图片上传后在进程池中用 Pillow 生成多个宽度的缩略图和 WebP 版本（去除EXIF），
+衍生图和清单保存在原图所在目录的 _variants 子目录中：
+    projects/<token>/images/_variants/<原文件名>.json
+    projects/<token>/images/_variants/<文件名主干>.w640.webp
+模板通过 image_srcset 按清单输出 srcset，列表和详情页按显示尺寸加载图片。
+"""
+
+import os
+import json
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 生成的宽度（像素），不超过原图宽度
+VARIANT_WIDTHS = (320, 640, 1280)
+
+# 处理的原图扩展名
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+
+VARIANTS_DIR = '_variants'
+MANIFEST_VERSION = 1
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# 防止超大图片（解压炸弹）占满工作进程内存
+MAX_IMAGE_PIXELS = 50_000_000
+
+
+def variants_dir(path: str) -> str:
+    return os.path.join(os.path.dirname(path), VARIANTS_DIR)
+
+
+def manifest_path(path: str) -> str:
+    return os.path.join(variants_dir(path), os.path.basename(path) + '.json')
+
+
+def is_image(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS and \
+        os.path.basename(os.path.dirname(path)) != VARIANTS_DIR
+
+
+def generate_derivatives(path: str, digest: str) -> Optional[Dict]:
+    """
+    生成单张图片的衍生图和清单（在工作进程中执行，只依赖 Pillow）
+
+    Args:
+        path: 原图绝对路径
+        digest: 原图内容摘要，写入清单用于判断是否需要重新生成
+
+    Returns:
+        dict: 清单内容，失败时返回None
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out_dir = variants_dir(path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(path) as img:
+        # 动图只处理第一帧
+        img.seek(0)
+        # 按EXIF方向旋转后再丢弃EXIF
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        width, height = img.size
+
+        fallback_format = 'png' if has_alpha else 'jpeg'
+        fallback_ext = 'png' if has_alpha else 'jpg'
+        widths = [w for w in VARIANT_WIDTHS if w < width] + [width]
+
+        variants = []
+        for target in widths:
+            if target == width:
+                resized = img
+            else:
+                resized = img.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+
+            webp_name = f"{stem}.w{target}.webp"
+            resized.save(os.path.join(out_dir, webp_name), 'WEBP', quality=WEBP_QUALITY, method=4)
+            variants.append({'width': target, 'format': 'webp', 'file': webp_name})
+
+            # 原尺寸的回退格式直接使用原图
+            if target != width:
+                fallback_name = f"{stem}.w{target}.{fallback_ext}"
+                options = {'optimize': True}
+                if fallback_format == 'jpeg':
+                    options.update(quality=JPEG_QUALITY, progressive=True)
+                resized.save(os.path.join(out_dir, fallback_name), fallback_format.upper(), **options)
+                variants.append({'width': target, 'format': fallback_format, 'file': fallback_name})
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': os.path.basename(path),
+        'digest': digest,
+        'width': width,
+        'height': height,
+        'variants': variants,
+    }
+    tmp_path = manifest_path(path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path(path))
+    return manifest
+
+
+class ImageDerivatives:
+    """衍生图生成调度与清单读取"""
+
+    def __init__(self):
+        self.enabled = True
+        self.max_workers = 2
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._manifests: Dict[str, tuple] = {}
+
+    def init_app(self, app):
+        """读取配置并注册退出时关闭进程池"""
+        self.enabled = app.config.get('IMAGE_DERIVATIVES_ENABLED', True)
+        self.max_workers = app.config.get('IMAGE_DERIVATIVE_WORKERS', 2)
+        atexit.register(self.shutdown)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 使用spawn，避免在带有后台线程的进程中fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def needs_update(self, path: str, digest: str) -> bool:
+        manifest = self._read_manifest(path)
+        return not manifest or manifest.get('digest') != digest or manifest.get('version') != MANIFEST_VERSION
+
+    def schedule(self, path: str, force: bool = False):
+        """
+        上传后提交衍生图生成任务，不阻塞请求
+
+        Args:
+            path: 原图绝对路径
+            force: 清单已是最新时也重新生成
+
+        Returns:
+            Future: 未提交任务时返回None
+        """
+        if not self.enabled or not is_image(path):
+            return None
+        from app.utils.upload_index import upload_index
+
+        digest = upload_index.digest(path)
+        if not digest or (not force and not self.needs_update(path, digest)):
+            return None
+        try:
+            future = self._get_executor().submit(generate_derivatives, path, digest)
+        except Exception as e:
+            logger.warning(f"提交衍生图任务失败 {path}: {e}")
+            return None
+        future.add_done_callback(lambda f, p=path: self._on_done(p, f))
+        return future
+
+    def _on_done(self, path: str, future) -> None:
+        try:
+            manifest = future.result()
+        except Exception as e:
+            logger.warning(f"生成衍生图失败 {path}: {e}")
+            return
+        if not manifest:
+            return
+        from app.utils.upload_index import upload_index
+
+        out_dir = variants_dir(path)
+        for variant in manifest['variants']:
+            upload_index.add(os.path.join(out_dir, variant['file']))
+        self._manifests.pop(manifest_path(path), None)
+
+    def _read_manifest(self, path: str) -> Optional[Dict]:
+        mpath = manifest_path(path)
+        try:
+            mtime = os.stat(mpath).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._manifests.get(mpath)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(mpath) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._manifests[mpath] = (mtime, manifest)
+        return manifest
+
+    def _current_manifest(self, image: Optional[str], token_symbol: Optional[str] = None):
+        """返回原图的 (相对路径, 清单)；不是上传图片或清单不是当前内容的衍生图时返回None"""
+        from app.utils.upload_index import upload_index
+
+        if not image or image.startswith(('http://', 'https://', '//', 'data:')):
+            return None
+        found = upload_index.media_path(image, token_symbol)
+        if not found:
+            return None
+        manifest = self._read_manifest(os.path.join(upload_index.root, found[1]))
+        if not manifest or manifest.get('digest') != found[0]:
+            return None
+        return found[1], manifest
+
+    @staticmethod
+    def _variant_rel(rel: str, variant: Dict) -> str:
+        base = os.path.dirname(rel)
+        return '/'.join(p for p in (base, VARIANTS_DIR, variant['file']) if p)
+
+    def srcset(self, image: Optional[str], token_symbol: Optional[str] = None, fmt: Optional[str] = None) -> str:
+        """
+        按清单生成 srcset 属性值
+
+        Args:
+            image: 原图地址（与 media_url 相同的格式）
+            token_symbol: 代币代码
+            fmt: 'webp' 输出WebP版本，默认输出与原图同类的回退格式（最大宽度为原图）
+
+        Returns:
+            str: 如 "/assets/media/.../a.w320.jpg 320w, ..."；没有衍生图时返回空字符串
+        """
+        from app.utils.upload_index import upload_index
+
+        current = self._current_manifest(image, token_symbol)
+        if not current:
+            return ''
+        rel, manifest = current
+
+        entries: List[str] = []
+        for variant in manifest['variants']:
+            is_webp = variant['format'] == 'webp'
+            if (fmt == 'webp') != is_webp:
+                continue
+            entries.append(f"{upload_index.media_url(self._variant_rel(rel, variant))} {variant['width']}w")
+        if fmt != 'webp':
+            entries.append(f"{upload_index.media_url(rel)} {manifest['width']}w")
+        return ', '.join(entries)
+
+    def thumbnail_url(self, image: Optional[str], token_symbol: Optional[str] = None,
+                      width: int = 640, fmt: str = 'webp') -> str:
+        """
+        不支持 srcset 的场景（如JSON接口）使用的单张缩略图地址
+
+        Args:
+            image: 原图地址（与 media_url 相同的格式）
+            token_symbol: 代币代码
+            width: 期望的显示宽度，取不小于该宽度的最小衍生图，都小于时取最大的
+            fmt: 'webp' 或 None（与原图同类的格式）
+
+        Returns:
+            str: 缩略图地址；没有衍生图时返回 media_url 的结果
+        """
+        from app.utils.upload_index import upload_index
+
+        current = self._current_manifest(image, token_symbol)
+        if not current:
+            return upload_index.media_url(image, token_symbol)
+        rel, manifest = current
+
+        variants = sorted(
+            (v for v in manifest['variants'] if (v['format'] == 'webp') == (fmt == 'webp')),
+            key=lambda v: v['width']
+        )
+        if not variants:
+            return upload_index.media_url(rel)
+        chosen = next((v for v in variants if v['width'] >= width), variants[-1])
+        return upload_index.media_url(self._variant_rel(rel, chosen))
+
+    def backfill(self, force: bool = False) -> Dict[str, int]:
+        """
+        为已有上传图片补生成衍生图
+
+        Returns:
+            dict: {'scheduled': 提交数, 'failed': 失败数}
+        """
+        from app.utils.upload_index import upload_index
+
+        upload_index.rebuild()
+        futures = []
+        for rel in sorted(upload_index.paths()):
+            path = os.path.join(upload_index.root, rel)
+            if is_image(path):
+                future = self.schedule(path, force=force)
+                if future is not None:
+                    futures.append(future)
+
+        failed = 0
+        for future in futures:
+            try:
+                if not future.result():
+                    failed += 1
+            except Exception:
+                failed += 1
+        return {'scheduled': len(futures), 'failed': failed}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# 创建全局实例
+image_derivatives = ImageDerivatives()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+按分钟滚动的延迟分位数草图
+采用对数分桶（DDSketch 思路）：每个桶覆盖相对误差固定的区间，
+同一布局下的桶数组可以逐元素相加合并，任意时间窗口的 p50/p95/p99
+只需合并窗口内各分钟的桶，复杂度与桶数成正比。
+"""
+
+import math
+import threading
+from array import array
+
+
+class SketchLayout:
+    """对数分桶布局，同一布局的草图可直接合并"""
+
+    def __init__(self, relative_accuracy: float = 0.02,
+                 min_value: float = 1e-4, max_value: float = 1e3):
+        """
+        Args:
+            relative_accuracy: 分位数的相对误差上限
+            min_value: 可区分的最小值，更小的值落入第0个桶
+            max_value: 可区分的最大值，更大的值落入最后一个桶
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inv_log_gamma = 1.0 / math.log(self.gamma)
+        self.min_value = min_value
+        self._offset = int(math.ceil(math.log(min_value) * self._inv_log_gamma))
+        self.size = int(math.ceil(math.log(max_value) * self._inv_log_gamma)) - self._offset + 2
+
+    def index(self, value: float) -> int:
+        """值所在的桶序号"""
+        if value <= self.min_value:
+            return 0
+        i = int(math.ceil(math.log(value) * self._inv_log_gamma)) - self._offset + 1
+        return i if i < self.size else self.size - 1
+
+    def value(self, index: int) -> float:
+        """桶的代表值（区间 (gamma^(k-1), gamma^k] 的中点，相对误差不超过 relative_accuracy）"""
+        if index <= 0:
+            return self.min_value
+        k = index + self._offset - 1
+        return 2 * self.gamma ** k / (self.gamma + 1)
+
+    def quantiles(self, buckets, total: int, qs):
+        """从合并后的桶计数计算多个分位数
+
+        Args:
+            buckets: 桶计数序列
+            total: 样本总数
+            qs: 升序的分位点列表，取值0~1
+
+        Returns:
+            list: 与qs一一对应的分位数值
+        """
+        if total <= 0:
+            return [0.0 for _ in qs]
+        ranks = [q * (total - 1) for q in qs]
+        results = []
+        cumulative = 0
+        pos = 0
+        for i, count in enumerate(buckets):
+            if not count:
+                continue
+            cumulative += count
+            while pos < len(ranks) and ranks[pos] < cumulative:
+                results.append(self.value(i))
+                pos += 1
+            if pos == len(ranks):
+                break
+        while len(results) < len(qs):
+            results.append(self.value(self.size - 1))
+        return results
+
+
+class MinuteSketchRing:
+    """单个序列（如某个接口）的分钟级环形缓冲
+
+    每个槽位保存一分钟内的请求数、错误数、耗时总和/最大/最小值以及分桶计数，
+    全部存放在预分配的 array 中；记录时只做原地累加，不创建对象。
+    """
+
+    def __init__(self, layout: SketchLayout, minutes: int = 60):
+        self.layout = layout
+        self.minutes = minutes
+        self.lock = threading.Lock()
+        self.stamps = array('q', [-1]) * minutes
+        self.counts = array('I', [0]) * minutes
+        self.errors = array('I', [0]) * minutes
+        self.sums = array('d', [0.0]) * minutes
+        self.maxes = array('d', [0.0]) * minutes
+        self.mins = array('d', [0.0]) * minutes
+        self._zero = array('I', [0]) * layout.size
+        # 槽位的分桶数组在首次使用时分配，之后循环复用
+        self.buckets = [None] * minutes
+
+    def record(self, minute: int, value: float, is_error: bool = False):
+        """记录一个样本
+
+        Args:
+            minute: 样本所在的分钟序号（unix时间 // 60）
+            value: 样本值
+            is_error: 是否计为错误
+        """
+        slot = minute % self.minutes
+        bucket_index = self.layout.index(value)
+        with self.lock:
+            if self.stamps[slot] != minute:
+                self._reset_slot(slot, minute)
+            buckets = self.buckets[slot]
+            buckets[bucket_index] += 1
+            count = self.counts[slot]
+            self.counts[slot] = count + 1
+            self.sums[slot] += value
+            if count == 0 or value > self.maxes[slot]:
+                self.maxes[slot] = value
+            if count == 0 or value < self.mins[slot]:
+                self.mins[slot] = value
+            if is_error:
+                self.errors[slot] += 1
+
+    def _reset_slot(self, slot: int, minute: int):
+        buckets = self.buckets[slot]
+        if buckets is None:
+            self.buckets[slot] = array('I', self._zero)
+        else:
+            buckets[:] = self._zero
+        self.stamps[slot] = minute
+        self.counts[slot] = 0
+        self.errors[slot] = 0
+        self.sums[slot] = 0.0
+        self.maxes[slot] = 0.0
+        self.mins[slot] = 0.0
+
+    def summarize(self, now_minute: int, window: int, qs=(0.5, 0.95, 0.99)):
+        """合并最近window分钟（含当前分钟）的数据
+
+        Returns:
+            dict: count/errors/sum/max/min/quantiles，无数据时返回None
+        """
+        window = max(1, min(window, self.minutes))
+        earliest = now_minute - window + 1
+        merged = None
+        total = errors = 0
+        total_sum = 0.0
+        max_value = min_value = None
+
+        with self.lock:
+            for slot in range(self.minutes):
+                stamp = self.stamps[slot]
+                if stamp < earliest or stamp > now_minute or not self.counts[slot]:
+                    continue
+                total += self.counts[slot]
+                errors += self.errors[slot]
+                total_sum += self.sums[slot]
+                if max_value is None or self.maxes[slot] > max_value:
+                    max_value = self.maxes[slot]
+                if min_value is None or self.mins[slot] < min_value:
+                    min_value = self.mins[slot]
+                if merged is None:
+                    merged = array('I', self.buckets[slot])
+                else:
+                    for i, count in enumerate(self.buckets[slot]):
+                        if count:
+                            merged[i] += count
+
+        if not total:
+            return None
+        return {
+            'count': total,
+            'errors': errors,
+            'sum': total_sum,
+            'max': max_value,
+            'min': min_value,
+            'quantiles': self.layout.quantiles(merged, total, list(qs)),
+        }
+
+
+class MinuteCounterRing:
+    """分钟级计数环，用于错误次数等只需要计数的序列"""
+
+    def __init__(self, minutes: int = 60):
+        self.minutes = minutes
+        self.lock = threading.Lock()
+        self.stamps = array('q', [-1]) * minutes
+        self.counts = array('I', [0]) * minutes
+
+    def add(self, minute: int, amount: int = 1):
+        slot = minute % self.minutes
+        with self.lock:
+            if self.stamps[slot] != minute:
+                self.stamps[slot] = minute
+                self.counts[slot] = 0
+            self.counts[slot] += amount
+
+    def total(self, now_minute: int, window: int) -> int:
+        """最近window分钟（含当前分钟）的计数和"""
+        window = max(1, min(window, self.minutes))
+        earliest = now_minute - window + 1
+        with self.lock:
+            return sum(
+                self.counts[slot] for slot in range(self.minutes)
+                if earliest <= self.stamps[slot] <= now_minute
+            )
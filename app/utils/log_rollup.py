@@ -0,0 +1,213 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 汇总库默认位置，与日志放在一起，重启后历史统计仍然保留
+DEFAULT_ROLLUP_PATH = os.path.join('logs', 'log_rollups.db')
+
+# 用于识别日志轮转的文件头部字节数
+FINGERPRINT_BYTES = 256
+
+# 单次同步最多消费的字节数，避免首次同步大文件时长时间持有写锁
+MAX_SYNC_BYTES = 64 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_rollups (
+    source TEXT NOT NULL,
+    day TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    value_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, day, dimension, key)
+);
+CREATE TABLE IF NOT EXISTS log_cursors (
+    source TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    file_offset INTEGER NOT NULL DEFAULT 0,
+    fingerprint TEXT,
+    updated_at TEXT
+);
+"""
+
+
+class LogRollupStore:
+    """按 (来源, 日期, 维度, 键) 累加计数和数值的SQLite汇总表
+
+    多个进程共享同一个库文件，写入通过SQLite事务串行化。
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_ROLLUP_PATH
+        self._local = threading.local()
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        # sqlite3连接不能跨线程使用，每个线程各持有一个
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def transaction(self):
+        """开启写事务，返回上下文管理器"""
+        return _Transaction(self._connection())
+
+    def increment(self, rows, conn=None):
+        """累加汇总数据
+
+        Args:
+            rows: 可迭代的 (source, day, dimension, key, count, value_sum)
+            conn: 已开启事务的连接（可选）
+        """
+        sql = (
+            "INSERT INTO log_rollups (source, day, dimension, key, count, value_sum) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, day, dimension, key) DO UPDATE SET "
+            "count = count + excluded.count, value_sum = value_sum + excluded.value_sum"
+        )
+        if conn is not None:
+            conn.executemany(sql, rows)
+            return
+        with self.transaction() as tx:
+            tx.executemany(sql, rows)
+
+    def query(self, source, since_day, dimension=None):
+        """查询汇总数据
+
+        Args:
+            source: 数据来源
+            since_day: 起始日期（含），格式 YYYY-MM-DD
+            dimension: 维度（可选）
+
+        Returns:
+            list: (day, dimension, key, count, value_sum) 列表，按日期升序
+        """
+        sql = "SELECT day, dimension, key, count, value_sum FROM log_rollups WHERE source = ? AND day >= ?"
+        params = [source, since_day]
+        if dimension is not None:
+            sql += " AND dimension = ?"
+            params.append(dimension)
+        sql += " ORDER BY day"
+        return self._connection().execute(sql, params).fetchall()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE 事务上下文，保证游标移动与计数累加原子完成"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
+
+
+class LogTailAggregator:
+    """从记录的文件偏移处继续消费JSONL日志，并把新行累加到汇总表
+
+    每个来源对应一个日志文件和一个提取函数。提取函数把一条日志转换为
+    (dimension, key, count, value_sum) 列表；日期取自日志的 timestamp 字段。
+    """
+
+    def __init__(self, store, sources):
+        """
+        Args:
+            store: LogRollupStore 实例
+            sources: {source: (file_path, extractor)}
+        """
+        self.store = store
+        self.sources = sources
+
+    def sync(self, source):
+        """同步一个来源的新增日志
+
+        Returns:
+            int: 本次消费的日志行数
+        """
+        file_path, extractor = self.sources[source]
+        if not os.path.exists(file_path):
+            return 0
+
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT file_offset, fingerprint FROM log_cursors WHERE source = ?", (source,)
+            ).fetchone()
+            offset, fingerprint = row if row else (0, None)
+
+            with open(file_path, 'rb') as f:
+                file_size = os.fstat(f.fileno()).st_size
+                if file_size < offset or (offset and self._fingerprint(f, min(FINGERPRINT_BYTES, offset)) != fingerprint):
+                    # 日志已轮转：从新文件开头继续，已累加的历史保留在汇总表中
+                    logger.info(f"日志文件 {file_path} 已轮转，从头开始汇总")
+                    offset = 0
+
+                if file_size == offset:
+                    return 0
+
+                totals = defaultdict(lambda: [0, 0.0])
+                consumed = 0
+                f.seek(offset)
+                position = offset
+                for raw in f:
+                    if not raw.endswith(b'\n') or position - offset >= MAX_SYNC_BYTES:
+                        break
+                    position += len(raw)
+                    try:
+                        entry = json.loads(raw)
+                    except (ValueError, UnicodeDecodeError):
+                        continue
+                    if not isinstance(entry, dict):
+                        continue
+
+                    day = str(entry.get('timestamp', ''))[:10]
+                    if not day:
+                        continue
+                    for dimension, key, count, value in extractor(entry):
+                        bucket = totals[(day, dimension, str(key))]
+                        bucket[0] += count
+                        bucket[1] += value
+                    consumed += 1
+
+                new_fingerprint = self._fingerprint(f, min(FINGERPRINT_BYTES, position))
+
+            self.store.increment(
+                [(source, day, dimension, key, count, value) for (day, dimension, key), (count, value) in totals.items()],
+                conn=conn
+            )
+            conn.execute(
+                "INSERT INTO log_cursors (source, file_path, file_offset, fingerprint, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (source) DO UPDATE SET file_path = excluded.file_path, file_offset = excluded.file_offset, "
+                "fingerprint = excluded.fingerprint, updated_at = excluded.updated_at",
+                (source, file_path, position, new_fingerprint, datetime.utcnow().isoformat())
+            )
+
+        return consumed
+
+    def sync_all(self):
+        """同步全部来源"""
+        return {source: self.sync(source) for source in self.sources}
+
+    @staticmethod
+    def _fingerprint(f, length):
+        f.seek(0)
+        return hashlib.md5(f.read(length)).hexdigest()
@@ -147,6 +147,12 @@ class TransactionMonitor:
                 # 模拟环境，直接返回成功
                 return True
             
+            # 事件流已推送过结果时直接使用，否则订阅该签名（限时），下一轮检查即可命中
+            from app.services.chain_event_stream import watch_signature
+            pushed_status = watch_signature(tx_hash)
+            if pushed_status is not None:
+                return pushed_status.get('err') is None
+            
             # 真实环境，调用 Solana API
             # 检查交易是否存在
             transaction_info = solana_client.get_transaction(tx_hash)
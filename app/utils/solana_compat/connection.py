@@ -155,4 +155,65 @@ class Connection:
         if value and len(value) > 0:
             return value[0]
         
-        return None 
\ No newline at end of file
+        return None 
+
+    def get_latest_blockhash(self, commitment: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取最新的区块哈希
+        
+        Args:
+            commitment: 可选的承诺级别
+            
+        Returns:
+            Dict包含最新的区块哈希
+        """
+        return self.rpc_client.get_latest_blockhash(commitment or self.commitment)
+    
+    def get_multiple_accounts(
+        self, public_keys: List[Union[PublicKey, str]], commitment: Optional[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        批量获取账户信息，自动按每批100个拆分请求
+        
+        Args:
+            public_keys: 账户公钥列表
+            commitment: 可选的承诺级别
+            
+        Returns:
+            与输入顺序一致的账户信息列表，不存在的账户为None
+        """
+        accounts: List[Optional[Dict[str, Any]]] = []
+        keys = [str(key) for key in public_keys]
+        for start in range(0, len(keys), 100):
+            chunk = keys[start:start + 100]
+            response = self.rpc_client.get_multiple_accounts(chunk, commitment or self.commitment)
+            if "error" in response:
+                error_msg = response.get("error", {}).get("message", "Unknown error")
+                raise Exception(f"批量获取账户信息失败: {error_msg}")
+            accounts.extend(response.get("result", {}).get("value", []))
+        
+        return accounts
+    
+    def get_signature_statuses(
+        self, signatures: List[str], commitment: Optional[str] = None,
+        search_transaction_history: bool = False
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        批量获取交易签名状态
+        
+        Args:
+            signatures: 交易签名列表（单次最多256个）
+            commitment: 可选的承诺级别
+            search_transaction_history: 是否查询超出近期状态缓存的历史交易
+            
+        Returns:
+            与输入顺序一致的签名状态列表，未知签名为None
+        """
+        response = self.rpc_client.get_signature_statuses(
+            signatures, commitment or self.commitment, search_transaction_history
+        )
+        if "error" in response:
+            error_msg = response.get("error", {}).get("message", "Unknown error")
+            raise Exception(f"获取交易状态失败: {error_msg}")
+        
+        return response.get("result", {}).get("value", [])
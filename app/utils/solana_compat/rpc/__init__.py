@@ -1,6 +1,7 @@
 # rpc包初始化文件 
 
 from .api import Client
+from .async_api import AsyncClient, gather_sync, hedge_sync, race_sync
 from .types import TxOpts
 
-__all__ = ['Client', 'TxOpts'] 
\ No newline at end of file
+__all__ = ['Client', 'AsyncClient', 'gather_sync', 'hedge_sync', 'race_sync', 'TxOpts']
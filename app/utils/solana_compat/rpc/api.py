@@ -75,18 +75,16 @@ class Client:
     def send_transaction(self, transaction, opts: Optional[TxOpts] = None) -> Dict[str, Any]:
         """Send a transaction."""
         tx_data = base64.b64encode(transaction.serialize()).decode('ascii')
-        params = [tx_data]
+        config = {"encoding": "base64"}
+        params = [tx_data, config]
         
         if opts:
-            config = {}
             if opts.skip_preflight:
                 config["skipPreflight"] = opts.skip_preflight
             if opts.preflight_commitment:
                 config["preflightCommitment"] = opts.preflight_commitment
             if opts.commitment:
                 config["commitment"] = opts.commitment
-            if config:
-                params.append(config)
         
         return self._make_request("sendTransaction", params)
     
@@ -143,21 +141,40 @@ class Client:
         """
         # 将原始交易数据编码为base64格式
         tx_data = base64.b64encode(raw_transaction).decode('ascii')
-        params = [tx_data]
+        # 节点默认按base58解析交易数据，必须声明编码
+        config = {"encoding": "base64"}
+        params = [tx_data, config]
         
         if opts:
-            config = {}
             if opts.skip_preflight:
                 config["skipPreflight"] = opts.skip_preflight
             if opts.preflight_commitment:
                 config["preflightCommitment"] = opts.preflight_commitment
             if opts.commitment:
                 config["commitment"] = opts.commitment
-            if config:
-                params.append(config)
         
         return self._make_request("sendTransaction", params)
     
-    def get_signature_statuses(self, signatures: List[str], commitment: str) -> Dict[str, Any]:
-        """获取交易签名状态"""
-        return self._make_request("getSignatureStatuses", [signatures, {"commitment": commitment}]) 
\ No newline at end of file
+    def get_signature_statuses(self, signatures: List[str], commitment: str,
+                               search_transaction_history: bool = False) -> Dict[str, Any]:
+        """获取交易签名状态，search_transaction_history 为真时也查询较早的交易"""
+        config = {"commitment": commitment}
+        if search_transaction_history:
+            config["searchTransactionHistory"] = True
+        return self._make_request("getSignatureStatuses", [signatures, config]) 
+    
+    def get_latest_blockhash(self, commitment: Optional[str] = None) -> Dict[str, Any]:
+        """获取最新区块哈希"""
+        params = []
+        if commitment:
+            params.append({"commitment": commitment})
+
+        return self._make_request("getLatestBlockhash", params)
+
+    def get_multiple_accounts(self, pubkeys: List[str], commitment: Optional[str] = None) -> Dict[str, Any]:
+        """批量获取账户信息（单次最多100个）"""
+        config = {"encoding": "base64"}
+        if commitment:
+            config["commitment"] = commitment
+
+        return self._make_request("getMultipleAccounts", [[str(pubkey) for pubkey in pubkeys], config])
@@ -0,0 +1,307 @@
+"""
+异步 Solana JSON RPC 客户端
+
+基于 httpx.AsyncClient，所有请求共享同一个后台事件循环上的连接池；
+同步代码通过 gather_sync / race_sync 一次提交多个协程并发执行，
+多次读取的耗时取决于最慢的一次请求，而不是所有请求耗时之和；
+hedge_sync 先只请求主节点，主节点失败或超过延迟阈值时才追加备用节点。
+
+在 gevent monkey.patch_all 之后，后台线程与 Future 等待都会被替换为协程友好的实现，
+调用方阻塞等待结果时会让出给其他 greenlet。
+"""
+
+import os
+import json
+import asyncio
+import logging
+import itertools
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 连接池配置：同一节点复用keep-alive连接
+POOL_MAX_CONNECTIONS = 100
+POOL_MAX_KEEPALIVE = 20
+DEFAULT_TIMEOUT = 10.0
+
+# hedge_sync 等待主节点的默认时间（秒），超过后追加备用节点请求
+DEFAULT_HEDGE_DELAY = 0.8
+
+
+class _LoopRunner:
+    """
+    后台事件循环线程，供同步代码提交协程
+
+    连接池绑定在这个事件循环上；进程fork之后（gunicorn预加载）自动重建。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        # proxy -> httpx.AsyncClient，只在后台事件循环中访问
+        self._pools: Dict[Optional[str], Any] = {}
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        ready = threading.Event()
+        self._pools = {}
+        self._loop = asyncio.new_event_loop()
+        self._pid = os.getpid()
+
+        def _run(loop):
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, args=(self._loop,), name='solana-async-rpc', daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5)
+
+    def pool(self, proxy: Optional[str] = None):
+        """当前事件循环上的共享 httpx.AsyncClient（按代理区分）"""
+        client = self._pools.get(proxy)
+        if client is None:
+            import httpx
+
+            client = httpx.AsyncClient(
+                proxy=proxy,
+                timeout=DEFAULT_TIMEOUT,
+                limits=httpx.Limits(max_connections=POOL_MAX_CONNECTIONS,
+                                    max_keepalive_connections=POOL_MAX_KEEPALIVE),
+                headers={'Content-Type': 'application/json'}
+            )
+            self._pools[proxy] = client
+        return client
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop())
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+
+_runner = _LoopRunner()
+
+
+class AsyncClient:
+    """
+    Client 的异步版本，返回值格式与同步 Client._make_request 一致：
+    成功时为RPC原始响应（含result），失败时为 {"error": {"message": ...}}
+    """
+
+    def __init__(self, endpoint: str, timeout: float = DEFAULT_TIMEOUT, proxy: Optional[str] = None):
+        """
+        Args:
+            endpoint: RPC节点地址
+            timeout: 单次请求超时（秒）
+            proxy: 代理地址，为空时直连
+        """
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.proxy = proxy
+        self._ids = itertools.count(1)
+
+    async def _make_request(self, method: str, params: List[Any] = None) -> Dict[str, Any]:
+        """发送一次RPC请求"""
+        data = {"jsonrpc": "2.0", "id": next(self._ids), "method": method}
+        if params:
+            data["params"] = params
+
+        try:
+            response = await _runner.pool(self.proxy).post(self.endpoint, json=data, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.error(f"Solana RPC请求失败，HTTP状态码: {response.status_code}")
+                return {"error": {"message": f"HTTP错误: {response.status_code}", "status_code": response.status_code}}
+
+            result = response.json()
+            if "error" in result:
+                logger.error(f"Solana RPC返回错误: {result['error']}")
+            return result
+        except asyncio.CancelledError:
+            raise
+        except json.JSONDecodeError as e:
+            logger.error(f"解析Solana RPC响应时发生JSON解析错误: {str(e)}")
+            return {"error": {"message": f"JSON解析错误: {str(e)}"}}
+        except Exception as e:
+            logger.error(f"发送Solana RPC请求 {method} 到 {self.endpoint} 失败: {str(e)}")
+            return {"error": {"message": f"网络错误: {str(e)}"}}
+
+    async def request(self, method: str, params: List[Any] = None) -> Dict[str, Any]:
+        """调用任意RPC方法"""
+        return await self._make_request(method, params)
+
+    @staticmethod
+    def _with_commitment(params: List[Any], commitment: Optional[str], **extra) -> List[Any]:
+        config = dict(extra)
+        if commitment:
+            config["commitment"] = commitment
+        if config:
+            params.append(config)
+        return params
+
+    async def get_health(self) -> Dict[str, Any]:
+        return await self._make_request("getHealth")
+
+    async def get_slot(self, commitment: Optional[str] = None) -> Dict[str, Any]:
+        return await self._make_request("getSlot", self._with_commitment([], commitment))
+
+    async def get_balance(self, pubkey: str, commitment: Optional[str] = None) -> Dict[str, Any]:
+        return await self._make_request("getBalance", self._with_commitment([str(pubkey)], commitment))
+
+    async def get_account_info(self, pubkey: str, commitment: Optional[str] = None,
+                               encoding: str = "base64") -> Dict[str, Any]:
+        return await self._make_request(
+            "getAccountInfo", self._with_commitment([str(pubkey)], commitment, encoding=encoding)
+        )
+
+    async def get_multiple_accounts(self, pubkeys: Sequence[str], commitment: Optional[str] = None,
+                                    encoding: str = "base64") -> Dict[str, Any]:
+        return await self._make_request(
+            "getMultipleAccounts",
+            self._with_commitment([[str(key) for key in pubkeys]], commitment, encoding=encoding)
+        )
+
+    async def get_token_supply(self, mint: str, commitment: Optional[str] = None) -> Dict[str, Any]:
+        return await self._make_request("getTokenSupply", self._with_commitment([str(mint)], commitment))
+
+    async def get_token_account_balance(self, account: str, commitment: Optional[str] = None) -> Dict[str, Any]:
+        return await self._make_request(
+            "getTokenAccountBalance", self._with_commitment([str(account)], commitment)
+        )
+
+    async def get_token_accounts_by_owner(self, owner: str, mint: str,
+                                          commitment: Optional[str] = None) -> Dict[str, Any]:
+        return await self._make_request(
+            "getTokenAccountsByOwner",
+            self._with_commitment([str(owner), {"mint": str(mint)}], commitment, encoding="jsonParsed")
+        )
+
+    async def get_signature_statuses(self, signatures: Sequence[str],
+                                     search_history: bool = False) -> Dict[str, Any]:
+        return await self._make_request(
+            "getSignatureStatuses",
+            [list(signatures), {"searchTransactionHistory": search_history}]
+        )
+
+
+def gather_sync(*coros: Awaitable, timeout: Optional[float] = None) -> List[Any]:
+    """
+    在后台事件循环上并发执行多个协程，阻塞直到全部完成
+
+    Args:
+        coros: 协程对象
+        timeout: 整体超时（秒），超时后未完成的请求会被取消
+
+    Returns:
+        list: 与输入顺序一致的结果；单个协程抛出的异常作为结果返回而不是向上抛出
+    """
+    if not coros:
+        return []
+
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    return _runner.run(_gather(), timeout=timeout)
+
+
+def race_sync(coros: Sequence[Awaitable], accept: Callable[[Any], bool] = None,
+              timeout: Optional[float] = None) -> Optional[Any]:
+    """
+    并发执行多个等价请求（例如同一查询发往多个RPC节点），返回第一个可用的结果
+
+    Args:
+        coros: 协程对象列表
+        accept: 判断结果是否可用，默认要求RPC响应中包含result
+        timeout: 整体超时（秒）
+
+    Returns:
+        第一个可用结果；全部失败时返回None。返回后其余请求会被取消。
+    """
+    if not coros:
+        return None
+    accept = accept or (lambda response: isinstance(response, dict) and 'result' in response)
+
+    async def _race():
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    result = await next_done
+                except Exception as e:
+                    logger.debug(f"并发请求失败: {e}")
+                    continue
+                if accept(result):
+                    return result
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return _runner.run(_race(), timeout=timeout)
+
+
+def hedge_sync(factories: Sequence[Callable[[], Awaitable]], hedge_delay: float = DEFAULT_HEDGE_DELAY,
+               accept: Callable[[Any], bool] = None, timeout: Optional[float] = None) -> Optional[Any]:
+    """
+    对冲请求：按顺序向等价节点发送同一查询，先只请求第一个节点，
+    该请求失败或 hedge_delay 秒内未返回时才追加下一个节点，采用最先可用的结果
+
+    Args:
+        factories: 按优先级排列的协程工厂函数，只有需要请求该节点时才会调用
+        hedge_delay: 追加下一个节点前等待的秒数
+        accept: 判断结果是否可用，默认要求RPC响应中包含result
+        timeout: 整体超时（秒）
+
+    Returns:
+        第一个可用结果；全部失败时返回None。返回后其余请求会被取消。
+    """
+    if not factories:
+        return None
+    accept = accept or (lambda response: isinstance(response, dict) and 'result' in response)
+
+    async def _hedge():
+        remaining = iter(factories)
+        pending = set()
+
+        def _launch() -> bool:
+            factory = next(remaining, None)
+            if factory is None:
+                return False
+            pending.add(asyncio.ensure_future(factory()))
+            return True
+
+        _launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 当前请求超过延迟阈值，追加下一个节点
+                    _launch()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.debug(f"对冲请求失败: {e}")
+                        result = None
+                    if result is not None and accept(result):
+                        return result
+                    # 失败的请求立即由下一个节点补上
+                    _launch()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    return _runner.run(_hedge(), timeout=timeout)
@@ -0,0 +1,277 @@
+import os
+import json
+import pickle
+import hashlib
+import calendar
+import datetime
+import logging
+import threading
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# 每个索引文件的格式版本，结构变化时递增以触发重建
+INDEX_VERSION = 1
+
+# 指纹取文件头部字节，用于识别日志轮转或被重写
+FINGERPRINT_BYTES = 256
+
+# 两次持久化之间的最短间隔（秒）和最少新增行数
+PERSIST_INTERVAL = 60
+PERSIST_MIN_LINES = 10000
+
+
+def parse_log_timestamp(value):
+    """将日志时间戳转换为整数秒（按日志本地时间，不做时区换算）
+
+    Args:
+        value: 形如 '2024-01-01 12:00:00' 或 '2024-01-01T12:00:00' 的字符串
+
+    Returns:
+        int: 秒数，无法解析时返回0
+    """
+    if not value or not isinstance(value, str):
+        return 0
+    try:
+        text = value.strip()
+        if text.endswith('Z'):
+            text = text[:-1]
+        parsed = datetime.datetime.fromisoformat(text)
+        return calendar.timegm(parsed.replace(tzinfo=None).timetuple())
+    except ValueError:
+        return 0
+
+
+def cutoff_timestamp(days):
+    """与原先按日期字符串比较的语义保持一致：从 (今天 - days) 的零点开始"""
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=days)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return calendar.timegm(cutoff.timetuple())
+
+
+class SolanaLogIndex:
+    """JSONL日志文件的旁路索引
+
+    为每一行记录字节偏移和时间戳，并为常用筛选字段维护倒排表，
+    使分页读取只需 seek 到目标行而无需解析整个文件。索引随文件增长增量更新，
+    并以 <日志文件>.idx 的形式持久化，重启后可直接加载。
+    """
+
+    def __init__(self, file_path, indexed_fields=()):
+        self.file_path = file_path
+        self.index_path = file_path + '.idx'
+        self.indexed_fields = tuple(indexed_fields)
+        self._lock = threading.Lock()
+        self._reset()
+        self._last_persist = 0.0
+        self._unpersisted_lines = 0
+        self._loaded = False
+
+    def _reset(self):
+        self.size = 0
+        self.fingerprint = None
+        self.offsets = array('Q')
+        self.timestamps = array('q')
+        self.postings = {field: {} for field in self.indexed_fields}
+        # 文件按时间顺序追加时可直接按行号倒序分页
+        self.monotonic = True
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def _read_fingerprint(self, f, length):
+        f.seek(0)
+        return hashlib.md5(f.read(length)).hexdigest()
+
+    def _load(self):
+        self._loaded = True
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != INDEX_VERSION or tuple(state.get('fields', ())) != self.indexed_fields:
+                return
+            self.size = state['size']
+            self.fingerprint = state['fingerprint']
+            self.offsets = state['offsets']
+            self.timestamps = state['timestamps']
+            self.postings = state['postings']
+            self.monotonic = state['monotonic']
+        except Exception as e:
+            logger.warning(f"加载日志索引失败，将重建: {self.index_path}: {str(e)}")
+            self._reset()
+
+    def _persist(self, force=False):
+        now = time.time()
+        if not force and self._unpersisted_lines < PERSIST_MIN_LINES and now - self._last_persist < PERSIST_INTERVAL:
+            return
+        state = {
+            'version': INDEX_VERSION,
+            'fields': self.indexed_fields,
+            'size': self.size,
+            'fingerprint': self.fingerprint,
+            'offsets': self.offsets,
+            'timestamps': self.timestamps,
+            'postings': self.postings,
+            'monotonic': self.monotonic,
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.index_path)
+            self._last_persist = now
+            self._unpersisted_lines = 0
+        except OSError as e:
+            logger.warning(f"保存日志索引失败: {self.index_path}: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------------
+
+    def refresh(self):
+        """根据文件当前大小增量更新索引
+
+        Returns:
+            bool: 日志文件是否存在
+        """
+        if not os.path.exists(self.file_path):
+            return False
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+            with open(self.file_path, 'rb') as f:
+                file_size = os.fstat(f.fileno()).st_size
+
+                # 文件被截断或轮转（头部内容变化）时重建索引
+                if file_size < self.size or (
+                    self.size and self._read_fingerprint(f, min(FINGERPRINT_BYTES, self.size)) != self.fingerprint
+                ):
+                    self._reset()
+
+                if file_size == self.size:
+                    return True
+
+                added = self._scan(f, self.size)
+                self.fingerprint = self._read_fingerprint(f, min(FINGERPRINT_BYTES, self.size))
+
+            if added:
+                self._unpersisted_lines += added
+                self._persist()
+            return True
+
+    def _scan(self, f, start):
+        """从start处开始解析新增的完整行，返回新增的有效行数"""
+        f.seek(start)
+        position = start
+        added = 0
+        last_ts = self.timestamps[-1] if self.timestamps else None
+
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                # 最后一行尚未写完，等待下次刷新
+                break
+            line_offset = position
+            position += len(raw)
+
+            try:
+                entry = json.loads(raw)
+            except (ValueError, UnicodeDecodeError):
+                continue
+            if not isinstance(entry, dict):
+                continue
+
+            line_no = len(self.offsets)
+            ts = parse_log_timestamp(entry.get('timestamp'))
+            self.offsets.append(line_offset)
+            self.timestamps.append(ts)
+            if last_ts is not None and ts < last_ts:
+                self.monotonic = False
+            last_ts = ts
+
+            for field in self.indexed_fields:
+                if field in entry:
+                    key = json.dumps(entry[field], sort_keys=True)
+                    posting = self.postings[field].get(key)
+                    if posting is None:
+                        posting = self.postings[field][key] = array('I')
+                    posting.append(line_no)
+            added += 1
+
+        self.size = position
+        return added
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def read_entry(self, f, line_no):
+        """读取并解析单行"""
+        f.seek(self.offsets[line_no])
+        return json.loads(f.readline())
+
+    def candidates(self, equality_filters, matcher, since=None):
+        """根据倒排表和时间下限计算候选行号
+
+        Args:
+            equality_filters: 只包含已建索引字段的筛选条件
+            matcher: (日志值, 筛选值) -> bool，与逐行筛选语义一致
+            since: 时间下限（秒），None表示不限
+
+        Returns:
+            list或range: 升序排列的候选行号
+        """
+        result = None
+        for field, value in equality_filters.items():
+            matched = set()
+            for key, posting in self.postings.get(field, {}).items():
+                if matcher(json.loads(key), value):
+                    matched.update(posting)
+            result = matched if result is None else result & matched
+            if not result:
+                return []
+
+        if since is not None:
+            if self.monotonic:
+                start = self._first_at_or_after(since)
+                if result is None:
+                    return range(start, len(self.offsets))
+                return sorted(line for line in result if line >= start)
+            timestamps = self.timestamps
+            if result is None:
+                return [line for line in range(len(timestamps)) if timestamps[line] >= since]
+            return sorted(line for line in result if timestamps[line] >= since)
+
+        if result is None:
+            return range(len(self.offsets))
+        return sorted(result)
+
+    def _first_at_or_after(self, since):
+        low, high = 0, len(self.timestamps)
+        while low < high:
+            mid = (low + high) // 2
+            if self.timestamps[mid] < since:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def newest_first(self, lines):
+        """将候选行按时间倒序排列；文件按时间追加时直接倒序行号"""
+        if self.monotonic:
+            return reversed(lines)
+        timestamps = self.timestamps
+        return iter(sorted(lines, key=lambda line: (timestamps[line], line), reverse=True))
@@ -1,9 +1,20 @@
 import os
 import json
+import heapq
+import logging
 import datetime
+import itertools
 from collections import defaultdict
 import re
 
+from app.utils.solana_log_index import SolanaLogIndex, cutoff_timestamp
+from app.utils.log_rollup import LogRollupStore, LogTailAggregator
+
+# 各日志文件建立倒排索引的低基数字段
+TRANSACTION_INDEX_FIELDS = ('status', 'type', 'token')
+API_INDEX_FIELDS = ('method', 'status_code', 'endpoint')
+ERROR_INDEX_FIELDS = ('type', 'level', 'component')
+
 class SolanaLogReader:
     """Solana日志读取服务类"""
     
@@ -15,49 +26,82 @@ class SolanaLogReader:
         
         # 确保日志目录存在
         os.makedirs(self.log_dir, exist_ok=True)
+        
+        # 每个日志文件一个旁路索引，按需增量刷新
+        self._indexes = {
+            self.transaction_log_path: SolanaLogIndex(self.transaction_log_path, TRANSACTION_INDEX_FIELDS),
+            self.api_log_path: SolanaLogIndex(self.api_log_path, API_INDEX_FIELDS),
+            self.error_log_path: SolanaLogIndex(self.error_log_path, ERROR_INDEX_FIELDS),
+        }
+        
+        # 统计数据来自按天汇总表，从上次记录的偏移处增量消费日志
+        self._rollups = LogRollupStore()
+        self._tailer = LogTailAggregator(self._rollups, {
+            'transactions': (self.transaction_log_path, self._transaction_rollup),
+            'api': (self.api_log_path, self._api_rollup),
+            'errors': (self.error_log_path, self._error_rollup),
+        })
     
-    def get_transaction_logs(self, limit=20, offset=0, filters=None):
+    def get_transaction_logs(self, limit=20, offset=0, filters=None, days_ago=None):
         """获取交易日志
         
         Args:
             limit: 返回的日志条数限制
             offset: 分页偏移量
             filters: 筛选条件，dict格式 {field: value}
+            days_ago: 只返回最近N天的记录（可选）
             
         Returns:
             tuple: (日志记录列表, 总记录数)
         """
-        logs, total = self._read_log_file(self.transaction_log_path, limit, offset, filters)
+        logs, total = self._read_log_file(self.transaction_log_path, limit, offset, filters, days_ago)
         return logs, total
     
-    def get_api_logs(self, limit=20, offset=0, filters=None):
+    def count_transaction_logs(self, filters=None, days_ago=None):
+        """统计符合条件的记录数，只使用索引，不解析日志内容"""
+        _, total = self._read_log_file(self.transaction_log_path, 0, 0, filters, days_ago)
+        return total
+    
+    def get_api_logs(self, limit=20, offset=0, filters=None, days_ago=None):
         """获取API调用日志
         
         Args:
             limit: 返回的日志条数限制
             offset: 分页偏移量
             filters: 筛选条件，dict格式 {field: value}
+            days_ago: 只返回最近N天的记录（可选）
             
         Returns:
             tuple: (日志记录列表, 总记录数)
         """
-        logs, total = self._read_log_file(self.api_log_path, limit, offset, filters)
+        logs, total = self._read_log_file(self.api_log_path, limit, offset, filters, days_ago)
         return logs, total
     
-    def get_error_logs(self, limit=20, offset=0, filters=None):
+    def count_api_logs(self, filters=None, days_ago=None):
+        """统计符合条件的记录数，只使用索引，不解析日志内容"""
+        _, total = self._read_log_file(self.api_log_path, 0, 0, filters, days_ago)
+        return total
+    
+    def get_error_logs(self, limit=20, offset=0, filters=None, days_ago=None):
         """获取错误日志
         
         Args:
             limit: 返回的日志条数限制
             offset: 分页偏移量
             filters: 筛选条件，dict格式 {field: value}
+            days_ago: 只返回最近N天的记录（可选）
             
         Returns:
             tuple: (日志记录列表, 总记录数)
         """
-        logs, total = self._read_log_file(self.error_log_path, limit, offset, filters)
+        logs, total = self._read_log_file(self.error_log_path, limit, offset, filters, days_ago)
         return logs, total
     
+    def count_error_logs(self, filters=None, days_ago=None):
+        """统计符合条件的记录数，只使用索引，不解析日志内容"""
+        _, total = self._read_log_file(self.error_log_path, 0, 0, filters, days_ago)
+        return total
+    
     def search_logs(self, query, log_type='all', limit=20, offset=0):
         """全文搜索所有类型的日志
         
@@ -71,7 +115,6 @@ class SolanaLogReader:
             tuple: (日志记录列表, 总记录数)
         """
         query = query.lower()
-        all_logs = []
         
         # 根据日志类型确定需要搜索的文件列表
         log_files = []
@@ -82,27 +125,31 @@ class SolanaLogReader:
         if log_type in ['all', 'error']:
             log_files.append(self.error_log_path)
         
-        # 搜索所有指定的日志文件
+        # 按索引中的时间戳把多个文件归并为统一的倒序流，逐行解析，只保留当前页
+        streams = []
+        handles = {}
         for log_file in log_files:
-            if not os.path.exists(log_file):
+            index = self._indexes[log_file]
+            if not index.refresh():
                 continue
-                
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        log_entry = json.loads(line.strip())
-                        # 转换所有文本值为小写进行搜索
-                        if self._log_contains_query(log_entry, query):
-                            all_logs.append(log_entry)
-                    except (json.JSONDecodeError, ValueError) as e:
-                        continue
+            handles[log_file] = open(log_file, 'rb')
+            streams.append(self._timeline(index, log_file, index.candidates({}, self._match_value)))
         
-        # 按时间戳排序（最新的在前）
-        all_logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        
-        # 分页处理
-        total = len(all_logs)
-        logs = all_logs[offset:offset+limit] if offset < total else []
+        logs = []
+        total = 0
+        try:
+            for _, log_file, line in heapq.merge(*streams):
+                try:
+                    log_entry = self._indexes[log_file].read_entry(handles[log_file], line)
+                except (json.JSONDecodeError, ValueError):
+                    continue
+                if self._log_contains_query(log_entry, query):
+                    if offset <= total < offset + limit:
+                        logs.append(log_entry)
+                    total += 1
+        finally:
+            for handle in handles.values():
+                handle.close()
         
         return logs, total
     
@@ -117,52 +164,25 @@ class SolanaLogReader:
         """
         if not os.path.exists(self.transaction_log_path):
             return None
-            
-        # 计算起始日期
-        cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # 统计数据初始化
+        # 先消费新增日志，再从按天汇总表读取统计
+        rows = self._query_rollups('transactions', days)
+        
         daily_transactions = defaultdict(int)
         daily_volume = defaultdict(float)
         token_distribution = defaultdict(float)
         total_transactions = 0
         successful_transactions = 0
-        failed_transactions = 0
         
-        with open(self.transaction_log_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    log = json.loads(line.strip())
-                    timestamp = log.get('timestamp', '')
-                    
-                    # 跳过超出时间范围的记录
-                    if timestamp < cutoff_date:
-                        continue
-                    
-                    # 提取日期部分
-                    date = timestamp.split('T')[0]
-                    
-                    # 计数
-                    total_transactions += 1
-                    daily_transactions[date] += 1
-                    
-                    # 计算交易成功/失败
-                    status = log.get('status', '')
-                    if status == 'success':
-                        successful_transactions += 1
-                    else:
-                        failed_transactions += 1
-                    
-                    # 交易金额
-                    amount = float(log.get('amount', 0))
-                    daily_volume[date] += amount
-                    
-                    # 代币分布
-                    token = log.get('token', 'UNKNOWN')
-                    token_distribution[token] += amount
-                    
-                except (json.JSONDecodeError, ValueError, KeyError):
-                    continue
+        for day, dimension, key, count, value_sum in rows:
+            if dimension == 'total':
+                total_transactions += count
+                daily_transactions[day] += count
+                daily_volume[day] += value_sum
+            elif dimension == 'status' and key == 'success':
+                successful_transactions += count
+            elif dimension == 'token':
+                token_distribution[key] += value_sum
         
         # 转换代币分布为列表格式
         token_dist_list = [
@@ -174,7 +194,7 @@ class SolanaLogReader:
         return {
             'total_transactions': total_transactions,
             'successful_transactions': successful_transactions,
-            'failed_transactions': failed_transactions,
+            'failed_transactions': total_transactions - successful_transactions,
             'total_volume': sum(daily_volume.values()),
             'daily_transactions': daily_transactions,
             'daily_volume': daily_volume,
@@ -192,56 +212,34 @@ class SolanaLogReader:
         """
         if not os.path.exists(self.api_log_path):
             return None
-            
-        # 计算起始日期
-        cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # 统计数据初始化
+        rows = self._query_rollups('api', days)
+        
         daily_calls = defaultdict(int)
         endpoint_distribution = defaultdict(int)
         total_calls = 0
         successful_calls = 0
         failed_calls = 0
-        response_times = []
-        
-        with open(self.api_log_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    log = json.loads(line.strip())
-                    timestamp = log.get('timestamp', '')
-                    
-                    # 跳过超出时间范围的记录
-                    if timestamp < cutoff_date:
-                        continue
-                    
-                    # 提取日期部分
-                    date = timestamp.split('T')[0]
-                    
-                    # 计数
-                    total_calls += 1
-                    daily_calls[date] += 1
-                    
-                    # 端点统计
-                    endpoint = log.get('endpoint', '/unknown')
-                    endpoint_distribution[endpoint] += 1
-                    
-                    # 状态统计
-                    status_code = log.get('status_code', 0)
-                    if 200 <= status_code < 400:
-                        successful_calls += 1
-                    else:
-                        failed_calls += 1
-                    
-                    # 响应时间
-                    response_time = log.get('response_time')
-                    if response_time is not None:
-                        response_times.append(float(response_time))
-                    
-                except (json.JSONDecodeError, ValueError, KeyError):
-                    continue
+        response_time_sum = 0.0
+        response_time_count = 0
+        
+        for day, dimension, key, count, value_sum in rows:
+            if dimension == 'total':
+                total_calls += count
+                daily_calls[day] += count
+            elif dimension == 'outcome':
+                if key == 'success':
+                    successful_calls += count
+                else:
+                    failed_calls += count
+            elif dimension == 'endpoint':
+                endpoint_distribution[key] += count
+            elif dimension == 'response_time':
+                response_time_sum += value_sum
+                response_time_count += count
         
         # 计算平均响应时间
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+        avg_response_time = response_time_sum / response_time_count if response_time_count else 0
         
         # 转换端点分布为列表格式
         endpoint_dist_list = [
@@ -272,40 +270,19 @@ class SolanaLogReader:
         """
         if not os.path.exists(self.error_log_path):
             return None
-            
-        # 计算起始日期
-        cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # 统计数据初始化
+        rows = self._query_rollups('errors', days)
+        
         error_distribution = defaultdict(int)
-        recent_errors = []
         total_errors = 0
+        for day, dimension, key, count, value_sum in rows:
+            if dimension == 'total':
+                total_errors += count
+            elif dimension == 'type':
+                error_distribution[key] += count
         
-        with open(self.error_log_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    log = json.loads(line.strip())
-                    timestamp = log.get('timestamp', '')
-                    
-                    # 跳过超出时间范围的记录
-                    if timestamp < cutoff_date:
-                        continue
-                    
-                    # 计数
-                    total_errors += 1
-                    
-                    # 错误类型统计
-                    error_type = log.get('type', 'Unknown')
-                    error_distribution[error_type] += 1
-                    
-                    # 收集最近的错误
-                    recent_errors.append(log)
-                    
-                except (json.JSONDecodeError, ValueError, KeyError):
-                    continue
-        
-        # 按时间排序，最新的在前
-        recent_errors.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        # 最近的错误直接通过索引倒序读取
+        recent_errors, _ = self._read_log_file(self.error_log_path, 10, 0, None, days)
         
         # 转换错误分布为列表格式
         error_dist_list = [
@@ -319,48 +296,138 @@ class SolanaLogReader:
         return {
             'total_errors': total_errors,
             'error_distribution': error_dist_list,
-            'recent_errors': recent_errors[:10]  # 只返回前10个
+            'recent_errors': recent_errors  # 只返回前10个
         }
     
-    def _read_log_file(self, file_path, limit=20, offset=0, filters=None):
+    def sync_rollups(self):
+        """消费所有日志文件的新增行并更新汇总表
+        
+        Returns:
+            dict: 每个来源本次消费的行数
+        """
+        return self._tailer.sync_all()
+    
+    def _query_rollups(self, source, days):
+        """同步指定来源后读取最近days天的汇总行"""
+        try:
+            self._tailer.sync(source)
+        except Exception as e:
+            # 同步失败时仍可返回已汇总的历史数据
+            logging.getLogger(__name__).warning(f"同步日志汇总失败 {source}: {str(e)}")
+        cutoff_day = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+        return self._rollups.query(source, cutoff_day)
+    
+    @staticmethod
+    def _transaction_rollup(log):
+        """交易日志 -> 汇总维度"""
+        try:
+            amount = float(log.get('amount', 0))
+        except (TypeError, ValueError):
+            amount = 0.0
+        return [
+            ('total', '', 1, amount),
+            ('status', log.get('status', ''), 1, amount),
+            ('token', log.get('token', 'UNKNOWN'), 1, amount),
+        ]
+    
+    @staticmethod
+    def _api_rollup(log):
+        """API调用日志 -> 汇总维度"""
+        status_code = log.get('status_code', 0)
+        success = isinstance(status_code, int) and 200 <= status_code < 400
+        rows = [
+            ('total', '', 1, 0.0),
+            ('outcome', 'success' if success else 'failed', 1, 0.0),
+            ('endpoint', log.get('endpoint', '/unknown'), 1, 0.0),
+            ('method', log.get('method', ''), 1, 0.0),
+        ]
+        response_time = log.get('response_time')
+        if response_time is not None:
+            try:
+                rows.append(('response_time', '', 1, float(response_time)))
+            except (TypeError, ValueError):
+                pass
+        return rows
+    
+    @staticmethod
+    def _error_rollup(log):
+        """错误日志 -> 汇总维度"""
+        return [
+            ('total', '', 1, 0.0),
+            ('type', log.get('type', 'Unknown'), 1, 0.0),
+        ]
+    
+    @staticmethod
+    def _timeline(index, file_path, lines):
+        """产出 (负时间戳, 文件, 行号)，供 heapq.merge 做多文件倒序归并"""
+        timestamps = index.timestamps
+        for line in index.newest_first(lines):
+            yield -timestamps[line], file_path, line
+    
+    def _read_log_file(self, file_path, limit=20, offset=0, filters=None, days_ago=None):
         """从日志文件读取记录
         
+        通过旁路索引定位候选行：已建索引字段的筛选直接使用倒排表，
+        其余筛选条件只对候选行解析判断；结果按时间倒序分页，只解析当前页。
+        
         Args:
             file_path: 日志文件路径
             limit: 返回的记录数量限制
             offset: 分页偏移量
             filters: 筛选条件
+            days_ago: 只返回最近N天的记录（可选）
             
         Returns:
             tuple: (日志记录列表, 总记录数)
         """
-        if not os.path.exists(file_path):
+        index = self._indexes[file_path]
+        if not index.refresh():
             return [], 0
-            
-        all_logs = []
-        filtered_logs = []
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
+        # 拆分为倒排表可直接处理的条件和需要逐行判断的条件
+        indexed_filters = {}
+        residual_filters = {}
+        for key, value in (filters or {}).items():
+            if key in index.indexed_fields:
+                indexed_filters[key] = value
+            else:
+                residual_filters[key] = value
+        
+        since = cutoff_timestamp(days_ago) if days_ago else None
+        lines = index.candidates(indexed_filters, self._match_value, since=since)
+        
+        with open(file_path, 'rb') as f:
+            if not residual_filters:
+                total = len(lines)
+                logs = []
+                for line in itertools.islice(index.newest_first(lines), offset, offset + limit):
+                    try:
+                        logs.append(index.read_entry(f, line))
+                    except (json.JSONDecodeError, ValueError):
+                        continue
+                return logs, total
+            
+            logs = []
+            total = 0
+            for line in index.newest_first(lines):
                 try:
-                    log_entry = json.loads(line.strip())
-                    all_logs.append(log_entry)
-                    
-                    # 应用筛选条件
-                    if self._apply_filters(log_entry, filters):
-                        filtered_logs.append(log_entry)
+                    log_entry = index.read_entry(f, line)
                 except (json.JSONDecodeError, ValueError):
                     continue
-        
-        # 按时间戳排序
-        filtered_logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        
-        # 分页处理
-        total = len(filtered_logs)
-        logs = filtered_logs[offset:offset+limit] if offset < total else []
+                if self._apply_filters(log_entry, residual_filters):
+                    if offset <= total < offset + limit:
+                        logs.append(log_entry)
+                    total += 1
         
         return logs, total
     
+    @staticmethod
+    def _match_value(log_value, filter_value):
+        """单个字段的匹配规则：字符串部分匹配（忽略大小写），其他类型精确匹配"""
+        if isinstance(log_value, str) and isinstance(filter_value, str):
+            return filter_value.lower() in log_value.lower()
+        return log_value == filter_value
+    
     def _apply_filters(self, log_entry, filters):
         """应用筛选条件
         
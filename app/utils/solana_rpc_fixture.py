@@ -0,0 +1,59 @@
+"""
+从本地JSON文件回放的 Solana RPC，用于在没有节点的环境中建立或校验持有人索引
+
+文件格式:
+    {
+        "slot": 250000000,
+        "program_accounts": {"<mint>": [{"pubkey": "...", "account": {"data": ["<base64>", "base64"]}}]},
+        "signatures": {"<mint>": [{"signature": "...", "slot": 1, "blockTime": 1700000000, "err": null}]},
+        "transactions": {"<signature>": {getTransaction jsonParsed 结果}}
+    }
+signatures 按从新到旧排列，与 getSignaturesForAddress 一致。
+"""
+
+import json
+from typing import Any, Dict, Union
+
+
+class SolanaRpcFixture:
+    """与 TokenHolderIndexer 的 rpc_call 接口一致的回放RPC"""
+
+    def __init__(self, source: Union[str, Dict]):
+        """
+        Args:
+            source: fixture文件路径或已解析的字典
+        """
+        if isinstance(source, str):
+            with open(source, 'r', encoding='utf-8') as f:
+                source = json.load(f)
+        self.slot = source.get('slot', 0)
+        self.program_accounts = source.get('program_accounts', {})
+        self.signatures = source.get('signatures', {})
+        self.transactions = source.get('transactions', {})
+
+    def rpc_call(self, method: str, params: list) -> Any:
+        options = params[1] if len(params) > 1 and isinstance(params[1], dict) else {}
+        if method == 'getProgramAccounts':
+            mint = next(f['memcmp']['bytes'] for f in options.get('filters', []) if 'memcmp' in f)
+            accounts = self.program_accounts.get(mint, [])
+            if options.get('withContext'):
+                return {'context': {'slot': self.slot}, 'value': accounts}
+            return accounts
+        if method == 'getSignaturesForAddress':
+            entries = self.signatures.get(params[0], [])
+            before, until = options.get('before'), options.get('until')
+            result = []
+            started = before is None
+            for entry in entries:
+                if not started:
+                    started = entry['signature'] == before
+                    continue
+                if entry['signature'] == until:
+                    break
+                result.append(entry)
+                if len(result) >= options.get('limit', 1000):
+                    break
+            return result
+        if method == 'getTransaction':
+            return self.transactions.get(params[0])
+        raise ValueError(f'不支持的方法: {method}')
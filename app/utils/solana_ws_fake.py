@@ -0,0 +1,195 @@
+"""
+Solana websocket 订阅接口的本地模拟服务，用于在没有真实节点的环境中测试事件接入
+支持 signatureSubscribe / logsSubscribe / accountSubscribe 及对应的取消订阅，
+并提供与推送状态一致的 rpc_call，供事件流断线补偿查询使用
+"""
+
+import json
+import asyncio
+import itertools
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class FakeSolanaWebsocketServer:
+    """
+    本地模拟的 Solana websocket 服务
+
+    用法:
+        server = FakeSolanaWebsocketServer()
+        server.start()
+        stream = SolanaEventStream(server.url, rpc_call=server.rpc_call)
+        server.confirm_signature('sig', err=None)
+        server.drop_connections()   # 模拟断线
+        server.stop()
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.slot = 1000
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server = None
+        self._ready = threading.Event()
+        self._ids = itertools.count(1)
+        # 订阅ID -> (websocket, kind, key)
+        self._subscriptions: Dict[int, tuple] = {}
+        self._connections = set()
+        # 链上状态，供补偿查询返回
+        self.signature_statuses: Dict[str, Dict] = {}
+        self.accounts: Dict[str, Any] = {}
+        self.address_signatures: Dict[str, List[Dict]] = {}
+        self.received_requests: List[Dict] = []
+        # 为True时只记录状态不推送，用于模拟推送丢失
+        self.suppress_notifications = False
+
+    @property
+    def url(self) -> str:
+        return f'ws://{self.host}:{self.port}'
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self) -> 'FakeSolanaWebsocketServer':
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='fake-solana-ws', daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+
+        async def _shutdown():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(_shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        import websockets
+
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(websockets.serve(self._handler, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handler(self, websocket, path=None) -> None:
+        self._connections.add(websocket)
+        try:
+            async for raw in websocket:
+                request = json.loads(raw)
+                self.received_requests.append(request)
+                await websocket.send(json.dumps(self._handle_request(websocket, request)))
+        except Exception:
+            pass
+        finally:
+            self._connections.discard(websocket)
+            for sub_id in [sid for sid, (ws, _, _) in self._subscriptions.items() if ws is websocket]:
+                del self._subscriptions[sub_id]
+
+    def _handle_request(self, websocket, request: Dict) -> Dict:
+        method = request.get('method', '')
+        params = request.get('params') or []
+        if method.endswith('Unsubscribe'):
+            removed = self._subscriptions.pop(params[0], None) is not None
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': removed}
+
+        kinds = {'signatureSubscribe': 'signature', 'logsSubscribe': 'logs', 'accountSubscribe': 'account'}
+        kind = kinds.get(method)
+        if kind is None:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32601, 'message': 'Method not found'}}
+
+        key = params[0]['mentions'][0] if kind == 'logs' else params[0]
+        sub_id = next(self._ids)
+        self._subscriptions[sub_id] = (websocket, kind, key)
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': sub_id}
+
+    # ------------------------------------------------------------------
+    # 模拟链上事件
+    # ------------------------------------------------------------------
+
+    def confirm_signature(self, signature: str, err: Any = None) -> None:
+        """交易确认（err非空表示执行失败），推送给该签名的订阅者"""
+        self.slot += 1
+        self.signature_statuses[signature] = {
+            'slot': self.slot, 'confirmations': 0, 'err': err, 'confirmationStatus': 'confirmed'
+        }
+        self._notify('signature', signature, 'signatureNotification', {'err': err}, one_shot=True)
+
+    def emit_logs(self, address: str, signature: str, logs: List[str], err: Any = None) -> None:
+        """提及address的交易日志"""
+        self.slot += 1
+        self.address_signatures.setdefault(address, []).insert(0, {
+            'signature': signature, 'slot': self.slot, 'err': err
+        })
+        self._notify('logs', address, 'logsNotification', {'signature': signature, 'err': err, 'logs': logs})
+
+    def update_account(self, pubkey: str, account: Dict) -> None:
+        """账户数据变化"""
+        self.slot += 1
+        self.accounts[pubkey] = account
+        self._notify('account', pubkey, 'accountNotification', account)
+
+    def drop_connections(self) -> None:
+        """断开全部客户端连接，模拟网络中断"""
+        async def _drop():
+            for websocket in list(self._connections):
+                await websocket.close()
+
+        asyncio.run_coroutine_threadsafe(_drop(), self._loop).result(timeout=5)
+
+    def subscription_count(self) -> int:
+        return len(self._subscriptions)
+
+    def _notify(self, kind: str, key: str, method: str, value: Any, one_shot: bool = False) -> None:
+        if self.suppress_notifications:
+            return
+
+        async def _send():
+            for sub_id, (websocket, sub_kind, sub_key) in list(self._subscriptions.items()):
+                if sub_kind != kind or sub_key != key:
+                    continue
+                message = {
+                    'jsonrpc': '2.0',
+                    'method': method,
+                    'params': {
+                        'result': {'context': {'slot': self.slot}, 'value': value},
+                        'subscription': sub_id
+                    }
+                }
+                try:
+                    await websocket.send(json.dumps(message))
+                except Exception:
+                    pass
+                if one_shot:
+                    self._subscriptions.pop(sub_id, None)
+
+        asyncio.run_coroutine_threadsafe(_send(), self._loop).result(timeout=5)
+
+    # ------------------------------------------------------------------
+    # 补偿查询
+    # ------------------------------------------------------------------
+
+    def rpc_call(self, method: str, params: list):
+        """与 SolanaEventStream 的 rpc_call 接口一致的 HTTP RPC 模拟"""
+        context = {'slot': self.slot}
+        if method == 'getSignatureStatuses':
+            return {'context': context, 'value': [self.signature_statuses.get(sig) for sig in params[0]]}
+        if method == 'getMultipleAccounts':
+            return {'context': context, 'value': [self.accounts.get(key) for key in params[0]]}
+        if method == 'getSignaturesForAddress':
+            until = (params[1] if len(params) > 1 else {}).get('until')
+            entries = []
+            for entry in self.address_signatures.get(params[0], []):
+                if entry['signature'] == until:
+                    break
+                entries.append(entry)
+            return entries
+        raise ValueError(f'不支持的方法: {method}')
@@ -1,11 +1,68 @@
 import os
+import io
+import hashlib
 import logging
+import tempfile
 from werkzeug.utils import secure_filename
 from flask import current_app
 import time
+from app.utils.upload_index import upload_index
+from app.utils.image_derivatives import image_derivatives
 
 logger = logging.getLogger(__name__)
 
+# 流式写入时每次复制的字节数
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """上传内容超过大小限制"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        super().__init__(f'文件大小超过限制（最大{max_size / (1024 * 1024):.0f}MB）')
+
+
+def write_stream(stream, file_path, max_size=None):
+    """
+    把上传流按块复制到临时文件，复制时检查大小并计算内容摘要，完成后原子替换到目标路径
+
+    Args:
+        stream: 可读的文件对象（如 FileStorage）
+        file_path: 目标文件绝对路径
+        max_size: 最大字节数，超过时删除临时文件并抛出 UploadTooLargeError
+
+    Returns:
+        tuple: (文件大小, SHA-256 十六进制摘要)
+    """
+    file_dir = os.path.dirname(file_path)
+    os.makedirs(file_dir, exist_ok=True)
+
+    sha = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=file_dir, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLargeError(max_size)
+                sha.update(chunk)
+                f.write(chunk)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return size, sha.hexdigest()
+
+
 class LocalStorage:
     def __init__(self, upload_folder):
         self.upload_folder = upload_folder
@@ -13,22 +70,35 @@ class LocalStorage:
             os.makedirs(upload_folder)
             
     def upload(self, file_data, key):
+        return self.upload_stream(io.BytesIO(file_data), key)
+
+    def upload_stream(self, stream, key, max_size=None):
+        """
+        流式保存上传文件，内存占用与文件大小无关
+
+        Args:
+            stream: 可读的文件对象
+            key: 上传目录内的相对路径
+            max_size: 最大字节数，超过时抛出 UploadTooLargeError
+
+        Returns:
+            dict: {'url', 'key', 'size', 'digest'}，保存失败时返回None
+        """
         try:
-            # 确保目录存在
-            file_dir = os.path.join(self.upload_folder, os.path.dirname(key))
-            if not os.path.exists(file_dir):
-                os.makedirs(file_dir)
-            
-            # 保存文件
             file_path = os.path.join(self.upload_folder, key)
-            with open(file_path, 'wb') as f:
-                f.write(file_data)
+            size, digest = write_stream(stream, file_path, max_size)
+            upload_index.add(file_path, digest=digest)
+            image_derivatives.schedule(file_path)
             
             # 返回相对路径
             return {
                 'url': f'/static/uploads/{key}',
-                'key': key
+                'key': key,
+                'size': size,
+                'digest': digest
             }
+        except UploadTooLargeError:
+            raise
         except Exception as e:
             logger.error(f"保存文件失败: {str(e)}")
             return None
@@ -38,6 +108,7 @@ class LocalStorage:
             file_path = os.path.join(self.upload_folder, key)
             if os.path.exists(file_path):
                 os.remove(file_path)
+            upload_index.remove(file_path)
             return True
         except Exception as e:
             logger.error(f"删除文件失败: {str(e)}")
@@ -85,11 +156,8 @@ def upload_file(file):
         timestamp = int(time.time() * 1000)
         filename = f"{timestamp}_{secure_filename(file.filename)}"
         
-        # 读取文件数据
-        file_data = file.read()
-        
-        # 上传到存储服务
-        result = storage.upload(file_data, f"uploads/{filename}")
+        # 流式上传到存储服务
+        result = storage.upload_stream(file, f"uploads/{filename}")
         if result:
             current_app.logger.info(f'文件上传成功: {result}')
             return result
@@ -0,0 +1,540 @@
+"""
+上传文件位置索引
+
+把 static/uploads 下的文件按文件名（以及 projects/<token>/ 目录下的代币代码）
+映射到规范路径，图片代理按索引直接定位文件，不再逐个探测目录或递归搜索。
+启动时用 os.scandir 建立索引，LocalStorage 上传/删除时同步更新；
+配置 UPLOAD_INDEX_FILE 时索引会持久化到该文件，其他进程未命中时据此重新加载。
+多个进程共享同一个索引文件：每次增删只在文件锁内向 <UPLOAD_INDEX_FILE>.journal 追加一行，
+日志超过 JOURNAL_MAX_BYTES 时合并进索引文件并清空；其他进程只读取日志中新增的部分。
+索引未命中时再按候选目录探测一次磁盘，探测不到的结果短时间内不再探测。
+"""
+
+import os
+import json
+import hashlib
+import logging
+import time
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# 计算摘要时每次读取的字节数
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# 单一文件名未命中索引时探测的目录（相对上传目录），{token} 为代币代码
+PROBE_DIRS = (
+    'projects/{token}/images',
+    'projects/{token}',
+    '',
+    '10/temp/image',
+    '20/temp/image',
+    'temp/images',
+    'projects/temp/images',
+)
+
+# 除固定目录外，最多再探测的已知上传目录数
+MAX_PROBE_DIRS = 64
+
+# 未找到的文件的否定缓存有效期（秒）
+MISS_TTL = 10
+
+# 否定缓存的最大条目数，超出时清空
+MAX_MISSES = 10000
+
+# 增删日志超过该大小时合并进索引文件
+JOURNAL_MAX_BYTES = 256 * 1024
+
+
+class UploadIndex:
+    """文件名 -> 上传目录内相对路径 的内存索引"""
+
+    def __init__(self):
+        self.root: Optional[str] = None
+        self.index_file: Optional[str] = None
+        self._lock = threading.Lock()
+        self._paths: Set[str] = set()
+        self._by_name: Dict[str, str] = {}
+        self._by_token: Dict[Tuple[str, str], str] = {}
+        # 文件名 -> 同名文件的相对路径，删除时由同名的其他文件接替
+        self._same_name: Dict[str, Set[str]] = {}
+        # 目录 -> 索引中该目录下的文件数，供单一文件名探测使用
+        self._dirs: Dict[str, int] = {}
+        # (请求路径, 代币代码) -> 否定缓存到期时间
+        self._misses: Dict[Tuple[str, Optional[str]], float] = {}
+        # 已加载的索引文件 (inode, 修改时间) 和已读取到的日志位置
+        self._loaded_snapshot: Optional[Tuple[int, int]] = None
+        self._journal_offset = 0
+        # 相对路径 -> (文件大小, 修改时间, 内容摘要)
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+
+    def init_app(self, app):
+        """启动时扫描上传目录建立索引"""
+        self.root = os.path.abspath(os.path.join(app.static_folder, 'uploads'))
+        self.index_file = app.config.get('UPLOAD_INDEX_FILE')
+        self.rebuild()
+
+    def rebuild(self) -> int:
+        """
+        重新扫描上传目录
+
+        Returns:
+            int: 索引中的文件数
+        """
+        if not self.root:
+            return 0
+        paths = list(self._scan(self.root))
+        with self._lock:
+            self._reset(paths)
+        self._save_snapshot(rebuilt=True)
+        logger.info(f"上传文件索引已建立: {len(paths)} 个文件")
+        return len(paths)
+
+    def _scan(self, root: str) -> Iterable[str]:
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            yield os.path.relpath(entry.path, root).replace(os.sep, '/')
+            except OSError as e:
+                logger.warning(f"扫描上传目录失败 {current}: {e}")
+
+    def _reset(self, paths: Iterable[str]) -> None:
+        self._paths = set()
+        self._by_name = {}
+        self._by_token = {}
+        self._same_name = {}
+        self._dirs = {}
+        self._misses.clear()
+        # 排序保证同名文件在各进程中解析到同一路径
+        for rel in sorted(paths):
+            self._add(rel)
+
+    def _add(self, rel: str) -> None:
+        if rel not in self._paths and '/' in rel:
+            directory = rel.rsplit('/', 1)[0]
+            self._dirs[directory] = self._dirs.get(directory, 0) + 1
+        self._paths.add(rel)
+        name = rel.rsplit('/', 1)[-1]
+        self._same_name.setdefault(name, set()).add(rel)
+        self._by_name.setdefault(name, rel)
+        parts = rel.split('/')
+        if len(parts) >= 3 and parts[0] == 'projects':
+            self._by_token.setdefault((parts[1], name), rel)
+
+    def _discard(self, rel: str) -> None:
+        if rel in self._paths and '/' in rel:
+            directory = rel.rsplit('/', 1)[0]
+            if self._dirs.get(directory, 0) <= 1:
+                self._dirs.pop(directory, None)
+            else:
+                self._dirs[directory] -= 1
+        self._paths.discard(rel)
+        self._digests.pop(rel, None)
+        name = rel.rsplit('/', 1)[-1]
+        parts = rel.split('/')
+        same_name = self._same_name.get(name)
+        if same_name is not None:
+            same_name.discard(rel)
+            if not same_name:
+                del self._same_name[name]
+        if self._by_name.get(name) == rel:
+            del self._by_name[name]
+            # 同名的其他文件接替
+            if same_name:
+                self._by_name[name] = min(same_name)
+        if len(parts) >= 3 and parts[0] == 'projects' and self._by_token.get((parts[1], name)) == rel:
+            del self._by_token[(parts[1], name)]
+
+    def _relative(self, path: str) -> Optional[str]:
+        if not self.root:
+            return None
+        path = os.path.abspath(path)
+        if os.path.commonpath([self.root, path]) != self.root:
+            return None
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def add(self, path: str, digest: Optional[str] = None) -> None:
+        """
+        登记新上传的文件
+
+        Args:
+            path: 文件绝对路径
+            digest: 写入时已计算的 SHA-256 十六进制摘要，避免再读一遍文件
+        """
+        rel = self._relative(path)
+        if not rel:
+            return
+        with self._lock:
+            self._add(rel)
+            self._misses.clear()
+            if digest:
+                try:
+                    stat = os.stat(path)
+                    self._digests[rel] = (stat.st_size, stat.st_mtime_ns, digest[:16])
+                except OSError:
+                    pass
+        self._append_journal('+', rel)
+
+    def remove(self, path: str) -> None:
+        """移除已删除的文件（绝对路径）"""
+        rel = self._relative(path)
+        if not rel:
+            return
+        with self._lock:
+            if rel not in self._paths:
+                return
+            self._discard(rel)
+        self._append_journal('-', rel)
+
+    def media_url(self, image: Optional[str], token_symbol: Optional[str] = None) -> str:
+        """
+        模板中使用的图片地址：已索引的上传文件返回带内容哈希、可长期缓存的URL，
+        其他地址原样返回（相对路径按 static/uploads 处理）
+        """
+        from flask import url_for
+
+        if not image:
+            return ''
+        if image.startswith(('http://', 'https://', '//', 'data:')):
+            return image
+        found = self.media_path(image, token_symbol)
+        if found:
+            return url_for('assets.media_file', digest=found[0], image_path=found[1])
+        if image.startswith('/'):
+            return image
+        return url_for('static', filename='uploads/' + image)
+
+    def lookup(self, image_path: str, token_symbol: Optional[str] = None) -> Optional[str]:
+        """
+        定位上传文件
+
+        Args:
+            image_path: 上传目录内的相对路径、以uploads/开头的路径或单一文件名
+            token_symbol: 代币代码，优先在该代币的项目目录中查找
+
+        Returns:
+            str: 文件绝对路径，找不到时返回None
+        """
+        rel = self._find(image_path, token_symbol)
+        if rel is None and self._reload_if_changed():
+            rel = self._find(image_path, token_symbol)
+        if rel is None:
+            # 直接检查一次磁盘（其他进程写入、尚未同步到索引的文件），探测不到时短时间内不再探测
+            key = (image_path, token_symbol)
+            now = time.monotonic()
+            with self._lock:
+                if self._misses.get(key, 0) > now:
+                    return None
+            path = self._probe(image_path, token_symbol)
+            if path is None:
+                with self._lock:
+                    if len(self._misses) >= MAX_MISSES:
+                        self._misses.clear()
+                    self._misses[key] = now + MISS_TTL
+            return path
+
+        path = os.path.join(self.root, rel)
+        if not os.path.isfile(path):
+            # 文件已在索引之外被删除
+            with self._lock:
+                self._discard(rel)
+            return None
+        return path
+
+    def _probe(self, image_path: str, token_symbol: Optional[str] = None) -> Optional[str]:
+        if not self.root:
+            return None
+        rel = image_path.replace(os.sep, '/').lstrip('/')
+        if rel.startswith('uploads/'):
+            rel = rel[len('uploads/'):]
+        if '/' in rel:
+            candidates = [rel]
+        else:
+            candidates = [f"{directory}/{rel}" if directory else rel for directory in self._probe_dirs(token_symbol)]
+
+        for candidate in candidates:
+            path = os.path.abspath(os.path.join(self.root, candidate))
+            found = self._relative(path)
+            if found is None or not os.path.isfile(path):
+                continue
+            with self._lock:
+                self._add(found)
+            return path
+        return None
+
+    def _probe_dirs(self, token_symbol: Optional[str]) -> List[str]:
+        """单一文件名的候选目录：代币项目目录、历史上传目录，以及索引中已有文件所在的目录"""
+        directories = []
+        for template in PROBE_DIRS:
+            if '{token}' in template:
+                if not token_symbol or '/' in token_symbol or token_symbol.startswith('.'):
+                    continue
+                template = template.format(token=token_symbol)
+            if template not in directories:
+                directories.append(template)
+        extra = []
+        with self._lock:
+            for directory in self._dirs:
+                if len(extra) >= MAX_PROBE_DIRS:
+                    break
+                if directory not in directories:
+                    extra.append(directory)
+        return directories + extra
+
+    def paths(self) -> Set[str]:
+        """索引中的全部相对路径"""
+        with self._lock:
+            return set(self._paths)
+
+    def _find(self, image_path: str, token_symbol: Optional[str]) -> Optional[str]:
+        rel = image_path.replace(os.sep, '/').lstrip('/')
+        if rel.startswith('uploads/'):
+            rel = rel[len('uploads/'):]
+        if rel in self._paths:
+            return rel
+        name = rel.rsplit('/', 1)[-1]
+        if token_symbol:
+            found = self._by_token.get((token_symbol, name))
+            if found:
+                return found
+        return self._by_name.get(name)
+
+    def digest(self, path: str) -> Optional[str]:
+        """
+        计算上传文件的内容摘要（按大小和修改时间缓存）
+
+        Args:
+            path: 文件绝对路径
+
+        Returns:
+            str: SHA-256 前16位十六进制，文件不存在时返回None
+        """
+        rel = self._relative(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cached = self._digests.get(rel) if rel else None
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        value = sha.hexdigest()[:16]
+        if rel:
+            self._digests[rel] = (stat.st_size, stat.st_mtime_ns, value)
+        return value
+
+    def media_path(self, image_path: str, token_symbol: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        返回上传文件的 (内容摘要, 相对路径)，用于生成带内容哈希的URL
+
+        Args:
+            image_path: 图片地址，支持 /static/uploads/...、uploads/...、相对路径和文件名
+
+        Returns:
+            tuple: 找不到文件时返回None
+        """
+        if image_path.startswith('/static/'):
+            image_path = image_path[len('/static/'):]
+        path = self.lookup(image_path, token_symbol)
+        if not path:
+            return None
+        rel = self._relative(path)
+        # 带目录的地址必须精确命中，不按同名文件替换
+        requested = image_path.lstrip('/')
+        if '/' in requested and requested not in (rel, 'uploads/' + rel):
+            return None
+        value = self.digest(path)
+        if not value:
+            return None
+        return value, rel
+
+    @property
+    def journal_file(self) -> str:
+        return f"{self.index_file}.journal"
+
+    def _append_journal(self, op: str, rel: str) -> None:
+        """向增删日志追加一行，日志过大时合并进索引文件"""
+        if not self.index_file:
+            return
+        try:
+            with self._file_lock():
+                with open(self.journal_file, 'a') as f:
+                    f.write(json.dumps([op, rel]) + '\n')
+                    size = f.tell()
+            if size > JOURNAL_MAX_BYTES:
+                self._save_snapshot()
+        except Exception as e:
+            logger.warning(f"写入上传文件索引日志失败: {e}")
+
+    def _read_journal(self, offset: int = 0) -> Tuple[List[Tuple[str, str]], int]:
+        """从 offset 开始读取日志，返回 ([(操作, 相对路径)], 读到的位置)"""
+        entries = []
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return entries, 0
+        for line in data.splitlines():
+            try:
+                op, rel = json.loads(line)
+            except ValueError:
+                continue
+            entries.append((op, rel))
+        return entries, offset + len(data)
+
+    @staticmethod
+    def _apply_journal(files: Set[str], entries: Iterable[Tuple[str, str]]) -> Set[str]:
+        for op, rel in entries:
+            if op == '+':
+                files.add(rel)
+            else:
+                files.discard(rel)
+        return files
+
+    def _snapshot_key(self) -> Optional[Tuple[int, int]]:
+        stat = os.stat(self.index_file)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _save_snapshot(self, rebuilt: bool = False) -> None:
+        """
+        把索引文件和增删日志合并成新的索引文件并清空日志（文件锁内读取-合并-替换）
+
+        Args:
+            rebuilt: 本进程刚重新扫描过上传目录；文件中本次扫描之后其他进程登记、
+                     且仍存在于磁盘上的文件会被保留
+        """
+        if not self.index_file:
+            return
+        try:
+            with self._file_lock():
+                stored = self._read_index_file()
+                entries, _ = self._read_journal()
+                if rebuilt:
+                    with self._lock:
+                        local = set(self._paths)
+                    others = self._apply_journal(stored or set(), entries) - local
+                    files = local | {rel for rel in others if os.path.isfile(os.path.join(self.root, rel))}
+                elif stored is None:
+                    with self._lock:
+                        files = set(self._paths)
+                else:
+                    files = self._apply_journal(stored, entries)
+
+                tmp_path = f"{self.index_file}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'root': self.root, 'files': sorted(files)}, f)
+                os.replace(tmp_path, self.index_file)
+                open(self.journal_file, 'w').close()
+
+                with self._lock:
+                    if files != self._paths:
+                        self._reset(files)
+                self._loaded_snapshot = self._snapshot_key()
+                self._journal_offset = 0
+        except Exception as e:
+            logger.warning(f"保存上传文件索引失败: {e}")
+
+    def _file_lock(self):
+        """索引文件的进程间排他锁（不支持 fcntl 的平台上不加锁）"""
+        return _FileLock(f"{self.index_file}.lock")
+
+    def _read_index_file(self) -> Optional[Set[str]]:
+        """读取索引文件中的文件列表；文件不存在、损坏或属于其他上传目录时返回None"""
+        try:
+            with open(self.index_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('root') != self.root:
+            return None
+        return set(data.get('files', []))
+
+    def _reload_if_changed(self) -> bool:
+        """
+        其他进程更新过持久化索引时同步，返回是否有变化
+
+        索引文件未被合并替换时只应用日志中新增的部分；本进程追加的行重复应用也不影响结果。
+        """
+        if not self.index_file:
+            return False
+        try:
+            snapshot = self._snapshot_key()
+            try:
+                journal_size = os.path.getsize(self.journal_file)
+            except OSError:
+                journal_size = 0
+            if snapshot == self._loaded_snapshot and journal_size == self._journal_offset:
+                return False
+
+            with self._file_lock():
+                snapshot = self._snapshot_key()
+                if snapshot == self._loaded_snapshot:
+                    entries, offset = self._read_journal(self._journal_offset)
+                    with self._lock:
+                        for op, rel in entries:
+                            if op == '+':
+                                self._add(rel)
+                            else:
+                                self._discard(rel)
+                        self._misses.clear()
+                else:
+                    stored = self._read_index_file()
+                    if stored is None:
+                        return False
+                    entries, offset = self._read_journal()
+                    files = self._apply_journal(stored, entries)
+                    with self._lock:
+                        self._reset(files)
+            self._loaded_snapshot = snapshot
+            self._journal_offset = offset
+            return True
+        except Exception as e:
+            logger.debug(f"加载上传文件索引失败: {e}")
+            return False
+
+
+class _FileLock:
+    """基于 fcntl.flock 的文件锁上下文"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self._file.close()
+                self._file = None
+        return False
+
+
+# 创建全局实例
+upload_index = UploadIndex()
@@ -0,0 +1,33 @@
+"""create short code sequence table
+
+Revision ID: a8e5b0c4d7f2
+Revises: f7d4a9b3c6e1
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8e5b0c4d7f2'
+down_revision = 'f7d4a9b3c6e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('short_code_sequences',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute(
+        "INSERT INTO short_code_sequences (name, next_value, updated_at) "
+        "VALUES ('short_link', 1, CURRENT_TIMESTAMP)"
+    )
+
+
+def downgrade():
+    op.drop_table('short_code_sequences')
@@ -0,0 +1,49 @@
+"""create dividend claimable balances table
+
+Revision ID: b3f6d1a9e2c8
+Revises: a8e5b0c4d7f2
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f6d1a9e2c8'
+down_revision = 'a8e5b0c4d7f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dividend_claimable_balances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('holder_address', sa.String(length=64), nullable=False),
+        sa.Column('asset_id', sa.Integer(), nullable=False),
+        sa.Column('claimable_amount', sa.Numeric(precision=20, scale=6), nullable=False, server_default='0'),
+        sa.Column('claimed_amount', sa.Numeric(precision=20, scale=6), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['asset_id'], ['assets.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('holder_address', 'asset_id', name='uix_dividend_claimable_holder_asset')
+    )
+    op.create_index('idx_dividend_claimable_asset', 'dividend_claimable_balances', ['asset_id'], unique=False)
+
+    # 按已有分配明细回填汇总
+    if sa.inspect(op.get_bind()).has_table('dividend_distributions'):
+        op.execute(
+            "INSERT INTO dividend_claimable_balances "
+            "(holder_address, asset_id, claimable_amount, claimed_amount, updated_at) "
+            "SELECT d.holder_address, r.asset_id, "
+            "SUM(CASE WHEN d.status = 'claimed' THEN 0 ELSE d.amount END), "
+            "SUM(CASE WHEN d.status = 'claimed' THEN d.amount ELSE 0 END), "
+            "CURRENT_TIMESTAMP "
+            "FROM dividend_distributions d JOIN dividend_records r ON r.id = d.dividend_record_id "
+            "GROUP BY d.holder_address, r.asset_id"
+        )
+
+
+def downgrade():
+    op.drop_index('idx_dividend_claimable_asset', table_name='dividend_claimable_balances')
+    op.drop_table('dividend_claimable_balances')
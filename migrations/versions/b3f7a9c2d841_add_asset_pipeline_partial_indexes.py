@@ -0,0 +1,38 @@
+"""Add partial indexes for the asset on-chain pipeline states
+
+Revision ID: b3f7a9c2d841
+Revises: a1b2c3d4e5f6, add_spl_token_fields
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f7a9c2d841'
+down_revision = ('a1b2c3d4e5f6', 'add_spl_token_fields')
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_assets_payment_processing', 'assets', ['id'],
+                    postgresql_where=sa.text('status = 8 AND deleted_at IS NULL'),
+                    sqlite_where=sa.text('status = 8 AND deleted_at IS NULL'))
+    op.create_index('ix_assets_awaiting_deployment', 'assets', ['id'],
+                    postgresql_where=sa.text('status = 5 AND deleted_at IS NULL'),
+                    sqlite_where=sa.text('status = 5 AND deleted_at IS NULL'))
+    op.create_index('ix_assets_deployment_failed', 'assets', ['updated_at'],
+                    postgresql_where=sa.text('status = 7 AND deleted_at IS NULL'),
+                    sqlite_where=sa.text('status = 7 AND deleted_at IS NULL'))
+    op.create_index('ix_assets_deployment_in_progress', 'assets', ['deployment_started_at'],
+                    postgresql_where=sa.text('deployment_in_progress = true'),
+                    sqlite_where=sa.text('deployment_in_progress = 1'))
+
+
+def downgrade():
+    op.drop_index('ix_assets_deployment_in_progress', table_name='assets')
+    op.drop_index('ix_assets_deployment_failed', table_name='assets')
+    op.drop_index('ix_assets_awaiting_deployment', table_name='assets')
+    op.drop_index('ix_assets_payment_processing', table_name='assets')
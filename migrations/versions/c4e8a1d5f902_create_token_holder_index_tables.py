@@ -0,0 +1,69 @@
+"""create on-chain token holder index tables
+
+Revision ID: c4e8a1d5f902
+Revises: b3f7a9c2d841
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1d5f902'
+down_revision = 'b3f7a9c2d841'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('token_holder_accounts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mint', sa.String(length=64), nullable=False),
+        sa.Column('token_account', sa.String(length=64), nullable=False),
+        sa.Column('owner', sa.String(length=64), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=20, scale=0), nullable=False, server_default='0'),
+        sa.Column('slot', sa.BigInteger(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('mint', 'token_account', name='uix_token_holder_mint_account')
+    )
+    op.create_index('idx_token_holder_mint_owner', 'token_holder_accounts', ['mint', 'owner'], unique=False)
+    op.create_index('idx_token_holder_mint_amount', 'token_holder_accounts', ['mint', 'amount'], unique=False)
+
+    op.create_table('token_holder_index_state',
+        sa.Column('mint', sa.String(length=64), nullable=False),
+        sa.Column('program_id', sa.String(length=64), nullable=False),
+        sa.Column('holder_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('account_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_amount', sa.Numeric(precision=20, scale=0), nullable=False, server_default='0'),
+        sa.Column('snapshot_slot', sa.BigInteger(), nullable=True),
+        sa.Column('snapshot_at', sa.DateTime(), nullable=True),
+        sa.Column('last_signature', sa.String(length=128), nullable=True),
+        sa.Column('last_slot', sa.BigInteger(), nullable=True),
+        sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('mint')
+    )
+
+    op.create_table('token_activities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mint', sa.String(length=64), nullable=False),
+        sa.Column('signature', sa.String(length=128), nullable=False),
+        sa.Column('slot', sa.BigInteger(), nullable=False),
+        sa.Column('block_time', sa.DateTime(), nullable=True),
+        sa.Column('accounts_changed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('amount_moved', sa.Numeric(precision=20, scale=0), nullable=False, server_default='0'),
+        sa.Column('supply_delta', sa.Numeric(precision=21, scale=0), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('mint', 'signature', name='uix_token_activity_mint_signature')
+    )
+    op.create_index('idx_token_activity_mint_time', 'token_activities', ['mint', 'block_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_token_activity_mint_time', table_name='token_activities')
+    op.drop_table('token_activities')
+    op.drop_table('token_holder_index_state')
+    op.drop_index('idx_token_holder_mint_amount', table_name='token_holder_accounts')
+    op.drop_index('idx_token_holder_mint_owner', table_name='token_holder_accounts')
+    op.drop_table('token_holder_accounts')
@@ -0,0 +1,50 @@
+"""add trade completed_at and commission paid_at
+
+Revision ID: c7a2e4f9b1d3
+Revises: b3f6d1a9e2c8
+Create Date: 2026-10-19 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a2e4f9b1d3'
+down_revision = 'b3f6d1a9e2c8'
+branch_labels = None
+depends_on = None
+
+# 改为按完成/支付时间分桶的指标，需重新回填
+REBUILT_METRICS = "('trade_count', 'trade_volume', 'commission_paid')"
+
+
+def upgrade():
+    with op.batch_alter_table('trades', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('completed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_trades_completed_at', ['completed_at'], unique=False)
+
+    with op.batch_alter_table('commission_records', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('paid_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_commission_records_paid_at', ['paid_at'], unique=False)
+
+    # 历史记录没有完成时间：交易取创建时间，佣金取最后更新时间
+    op.execute("UPDATE trades SET completed_at = created_at WHERE status = 'completed'")
+    op.execute("UPDATE commission_records SET paid_at = updated_at WHERE status = 'paid'")
+
+    # 清除旧的桶和汇总进度，下次汇总从最早的记录重新回填
+    op.execute(f"DELETE FROM metric_buckets WHERE metric IN {REBUILT_METRICS}")
+    op.execute(f"DELETE FROM metric_rollup_state WHERE metric IN {REBUILT_METRICS}")
+
+
+def downgrade():
+    op.execute(f"DELETE FROM metric_buckets WHERE metric IN {REBUILT_METRICS}")
+    op.execute(f"DELETE FROM metric_rollup_state WHERE metric IN {REBUILT_METRICS}")
+
+    with op.batch_alter_table('commission_records', schema=None) as batch_op:
+        batch_op.drop_index('ix_commission_records_paid_at')
+        batch_op.drop_column('paid_at')
+
+    with op.batch_alter_table('trades', schema=None) as batch_op:
+        batch_op.drop_index('ix_trades_completed_at')
+        batch_op.drop_column('completed_at')
@@ -0,0 +1,70 @@
+"""create dashboard counters table
+
+Revision ID: d5b2e7f1a3c4
+Revises: c4e8a1d5f902
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b2e7f1a3c4'
+down_revision = 'c4e8a1d5f902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dashboard_counters',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('value', sa.Numeric(precision=30, scale=6), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name', 'shard')
+    )
+
+    # 用现有数据初始化累计计数器，按日计数器由对账任务补齐
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'users_total', 0, COUNT(*), CURRENT_TIMESTAMP FROM users"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'assets_total', 0, COUNT(*), CURRENT_TIMESTAMP FROM assets WHERE deleted_at IS NULL"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'assets_value', 0, COALESCE(SUM(total_value), 0), CURRENT_TIMESTAMP "
+        "FROM assets WHERE deleted_at IS NULL"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'assets_status:' || CAST(status AS VARCHAR), 0, COUNT(*), CURRENT_TIMESTAMP "
+        "FROM assets WHERE deleted_at IS NULL GROUP BY status"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'trades_count', 0, COUNT(*), CURRENT_TIMESTAMP FROM trades"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'trades_amount', 0, COALESCE(SUM(amount), 0), CURRENT_TIMESTAMP FROM trades"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'trades_volume', 0, COALESCE(SUM(total), 0), CURRENT_TIMESTAMP FROM trades"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'dividends_count', 0, COUNT(*), CURRENT_TIMESTAMP FROM dividend_records"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'dividends_total', 0, COALESCE(SUM(amount), 0), CURRENT_TIMESTAMP FROM dividend_records"
+    )
+
+
+def downgrade():
+    op.drop_table('dashboard_counters')
@@ -0,0 +1,67 @@
+"""create metric time-series tables
+
+Revision ID: e6c3f8a2b4d5
+Revises: d5b2e7f1a3c4
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6c3f8a2b4d5'
+down_revision = 'd5b2e7f1a3c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('metric_buckets',
+        sa.Column('metric', sa.String(length=64), nullable=False),
+        sa.Column('resolution', sa.String(length=8), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('value', sa.Numeric(precision=30, scale=6), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('metric', 'resolution', 'bucket_start')
+    )
+    op.create_table('metric_rollup_state',
+        sa.Column('metric', sa.String(length=64), nullable=False),
+        sa.Column('watermark', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('metric')
+    )
+
+    # 指标汇总按时间范围增量读取业务表
+    op.create_index('ix_users_created_at', 'users', ['created_at'], unique=False)
+    op.create_index('ix_trades_created_at', 'trades', ['created_at'], unique=False)
+    op.create_index('ix_commission_records_updated_at', 'commission_records', ['updated_at'], unique=False)
+
+    # 资产类型分布计数器
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'assets_type:' || CAST(asset_type AS VARCHAR), 0, COUNT(*), CURRENT_TIMESTAMP "
+        "FROM assets WHERE deleted_at IS NULL GROUP BY asset_type"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'assets_type_value:' || CAST(asset_type AS VARCHAR), 0, COALESCE(SUM(total_value), 0), "
+        "CURRENT_TIMESTAMP FROM assets WHERE deleted_at IS NULL GROUP BY asset_type"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, shard, value, updated_at) "
+        "SELECT 'assets_approved_type:' || CAST(asset_type AS VARCHAR), 0, COUNT(*), CURRENT_TIMESTAMP "
+        "FROM assets WHERE deleted_at IS NULL AND status = 2 GROUP BY asset_type"
+    )
+
+
+def downgrade():
+    op.execute(
+        "DELETE FROM dashboard_counters WHERE name LIKE 'assets_type:%' "
+        "OR name LIKE 'assets_type_value:%' OR name LIKE 'assets_approved_type:%'"
+    )
+    op.drop_index('ix_commission_records_updated_at', table_name='commission_records')
+    op.drop_index('ix_trades_created_at', table_name='trades')
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_table('metric_rollup_state')
+    op.drop_table('metric_buckets')
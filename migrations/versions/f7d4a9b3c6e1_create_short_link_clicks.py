@@ -0,0 +1,36 @@
+"""create short link click table
+
+Revision ID: f7d4a9b3c6e1
+Revises: e6c3f8a2b4d5
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7d4a9b3c6e1'
+down_revision = 'e6c3f8a2b4d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('short_link_clicks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(length=10), nullable=False),
+        sa.Column('clicked_at', sa.DateTime(), nullable=False),
+        sa.Column('ip_address', sa.String(length=64), nullable=True),
+        sa.Column('user_agent', sa.String(length=256), nullable=True),
+        sa.Column('referer', sa.String(length=512), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_short_link_clicks_code', 'short_link_clicks', ['code'], unique=False)
+    op.create_index('ix_short_link_clicks_clicked_at', 'short_link_clicks', ['clicked_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_short_link_clicks_clicked_at', table_name='short_link_clicks')
+    op.drop_index('ix_short_link_clicks_code', table_name='short_link_clicks')
+    op.drop_table('short_link_clicks')
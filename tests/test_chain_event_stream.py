@@ -0,0 +1,134 @@
+"""
+链上事件流测试：使用本地模拟的 Solana websocket 服务
+"""
+
+import time
+import threading
+
+import pytest
+
+pytest.importorskip('websockets')
+
+from app.services.chain_event_stream import SolanaEventStream
+from app.utils.solana_ws_fake import FakeSolanaWebsocketServer
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def server():
+    server = FakeSolanaWebsocketServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def stream(server):
+    stream = SolanaEventStream(server.url, rpc_call=server.rpc_call)
+    stream.start()
+    assert stream.connected.wait(timeout=5)
+    yield stream
+    stream.stop()
+
+
+def test_fake_server_subscribe_and_unsubscribe(server):
+    websocket = object()
+    response = server._handle_request(websocket, {'id': 1, 'method': 'signatureSubscribe', 'params': ['sig']})
+    assert server.subscription_count() == 1
+
+    unsubscribed = server._handle_request(websocket, {'id': 2, 'method': 'signatureUnsubscribe',
+                                                      'params': [response['result']]})
+    assert unsubscribed['result'] is True
+    assert server.subscription_count() == 0
+
+    unknown = server._handle_request(websocket, {'id': 3, 'method': 'fooSubscribe', 'params': []})
+    assert unknown['error']['code'] == -32601
+
+
+def test_fake_server_rpc_call_matches_pushed_state(server):
+    server.confirm_signature('sig-1')
+    server.confirm_signature('sig-2', err={'InstructionError': [0, 'Custom']})
+    server.emit_logs('program', 'log-1', ['a'])
+    server.emit_logs('program', 'log-2', ['b'])
+    server.update_account('acct', {'lamports': 5})
+
+    statuses = server.rpc_call('getSignatureStatuses', [['sig-1', 'sig-2', 'missing']])['value']
+    assert statuses[0]['err'] is None and statuses[0]['confirmationStatus'] == 'confirmed'
+    assert statuses[1]['err'] == {'InstructionError': [0, 'Custom']}
+    assert statuses[2] is None
+
+    entries = server.rpc_call('getSignaturesForAddress', ['program', {'until': 'log-1'}])
+    assert [entry['signature'] for entry in entries] == ['log-2']
+
+    accounts = server.rpc_call('getMultipleAccounts', [['acct', 'missing']])['value']
+    assert accounts == [{'lamports': 5}, None]
+
+    with pytest.raises(ValueError):
+        server.rpc_call('getBalance', ['acct'])
+
+
+def test_wait_for_signature_receives_push(server, stream):
+    result = {}
+
+    def _wait():
+        result['status'] = stream.wait_for_signature('sig-push', timeout=5)
+
+    waiter = threading.Thread(target=_wait)
+    waiter.start()
+    assert _wait_until(lambda: server.subscription_count() == 1)
+    server.confirm_signature('sig-push')
+    waiter.join(timeout=5)
+
+    assert result['status']['err'] is None
+    assert stream.get_signature_status('sig-push') is not None
+    assert server.subscription_count() == 0
+
+
+def test_wait_for_signature_times_out_and_unsubscribes(server, stream):
+    assert stream.wait_for_signature('sig-never', timeout=0.3) is None
+    assert _wait_until(lambda: server.subscription_count() == 0)
+    assert stream.status()['subscriptions'] == 0
+
+
+def test_confirmed_before_subscribe_is_caught_up(server, stream):
+    server.suppress_notifications = True
+    server.confirm_signature('sig-early')
+
+    status = stream.wait_for_signature('sig-early', timeout=5)
+    assert status is not None and status['err'] is None
+
+
+def test_signature_subscription_ttl_expires(server, stream):
+    events = []
+    local_id = stream.subscribe_signature('sig-ttl', events.append, ttl=0.2)
+    assert local_id
+    assert _wait_until(lambda: server.subscription_count() == 1)
+
+    assert _wait_until(lambda: server.subscription_count() == 0)
+    assert stream.status()['subscriptions'] == 0
+    assert events == []
+
+
+def test_reconnect_resubscribes_and_catches_up(server, stream):
+    events = []
+    stream.subscribe_logs('program', events.append)
+    assert _wait_until(lambda: server.subscription_count() == 1)
+    server.emit_logs('program', 'log-1', ['first'])
+    assert _wait_until(lambda: len(events) == 1)
+
+    # 断线期间产生的日志在重连后通过补偿查询补齐
+    server.drop_connections()
+    assert _wait_until(lambda: not stream.connected.is_set())
+    server.emit_logs('program', 'log-2', ['missed'])
+    assert stream.connected.wait(timeout=5)
+
+    assert _wait_until(lambda: [event.value['signature'] for event in events] == ['log-1', 'log-2'])
+    assert events[1].source == 'poll'
+    assert _wait_until(lambda: server.subscription_count() == 1)